@@ -2,17 +2,62 @@
 Aplicação principal - Extrator de Apólices V20 (Visão Nativa)
 """
 import streamlit as st
-import json
-import os
-import traceback
 import logging
+import time
+from typing import Optional
 
-from config.settings import app_config, validate_config
-from services.database_service import DatabaseService
+from config.settings import app_config, job_queue_config, validate_config
+from services.batch_runner import STATUS_ERRO, STATUS_INCOMPLETO, STATUS_SEM_ANEXOS
+from services.cache_service import obter_cache_extracoes
+from services.gemini_pool import obter_pool_gemini
+from services.metrics import obter_registro_metricas
+from services.rate_limiter import obter_limitador_gemini
 from services.pdf_processor import PDFProcessor
-from ui.components import exibir_telas_json
+from services.job_queue import (
+    ESTADO_CANCELADO,
+    ESTADO_PENDENTE,
+    Job,
+    PoolWorkers,
+    obter_fila_jobs,
+    obter_pool_workers
+)
+from services.pipeline import ETAPAS
+from ui.components import exibir_jobs_recentes, exibir_metricas_chamadas, exibir_telas_json
 from utils.logger import setup_logger
-from utils.formatters import sanitizar_nome_arquivo
+
+# Mensagens exibidas no status ao iniciar cada etapa do pipeline
+MENSAGENS_ETAPAS = {
+    'carregar_anexos': "📥 Carregando anexos do banco de dados...",
+    'processar_apolice': "🔍 Extraindo dados da apólice e da especificação financeira...",
+    'consolidar_dados': "📊 Consolidando dados...",
+    'salvar_json': "💾 Salvando resultado..."
+}
+
+
+@st.cache_resource
+def obter_processor() -> PDFProcessor:
+    """
+    Cria o processador compartilhado por todas as sessões e aquece o pool Gemini
+    
+    Returns:
+        PDFProcessor reaproveitado entre cliques e usuários
+    """
+    obter_pool_gemini().aquecer(verificar_conexao=True)
+    return PDFProcessor()
+
+
+@st.cache_resource
+def obter_workers() -> Optional[PoolWorkers]:
+    """
+    Inicia (uma vez por processo) os workers que executam a fila de extrações
+    
+    Returns:
+        Pool de workers ou None se a fila for consumida por worker.py
+        (JOB_EMBEDDED_WORKERS=false)
+    """
+    if not job_queue_config.EMBEDDED_WORKERS:
+        return None
+    return obter_pool_workers(obter_processor())
 
 
 def main():
@@ -34,6 +79,10 @@ def main():
         st.info("Configure as variáveis de ambiente GEMINI_API_KEY e SQL_CONNECTION_STRING no arquivo .env")
         st.stop()
     
+    # Inicializa (uma vez por processo) o processador, o pool de clientes Gemini e os workers
+    obter_processor()
+    obter_workers()
+    
     # Interface
     num_solic_input = st.text_input(
         "Número da solicitação:",
@@ -50,139 +99,158 @@ def main():
     # Informações
     st.info(
         f"💡 Modo automático: Os anexos serão carregados da base de dados "
-        f"para a solicitação {num_solic_input}"
+        f"para a solicitação {num_solic_input}. O processamento continua mesmo "
+        f"se a página for recarregada."
     )
     
-    # Botão de processamento
+    # Botão de processamento: só enfileira; o job continua se a página recarregar
     if st.button("🚀 Processar Apólice", type="primary"):
-        processar_apolice(num_solic_input, logger)
+        enfileirar_apolice(num_solic_input, logger)
+    
+    # O job acompanhado fica na URL para sobreviver a um refresh do navegador
+    job_id = st.query_params.get("job")
+    if job_id and job_id.isdigit():
+        exibir_job(int(job_id), logger)
+    
+    with st.expander("🗂️ Jobs recentes"):
+        exibir_jobs_recentes(obter_fila_jobs().listar())
 
 
-def processar_apolice(num_solic: str, logger: logging.Logger):
+def enfileirar_apolice(num_solic: str, logger: logging.Logger):
     """
-    Processa uma apólice completa
+    Enfileira a extração de uma apólice e passa a acompanhar o job
     
     Args:
         num_solic: Número da solicitação
         logger: Logger configurado
     """
-    status = st.status("Processando...", expanded=True)
-    
     try:
-        # Valida número da solicitação
-        try:
-            num_solic_int = int(num_solic)
-        except ValueError:
-            st.error("❌ Número de solicitação inválido")
-            return
-        
-        # Inicializa serviços
-        logger.info("Inicializando serviços...")
-        db_service = DatabaseService()
-        processor = PDFProcessor()
-        
-        # Carrega anexos do banco
-        status.write("📥 Carregando anexos do banco de dados...")
-        f_apolice, f_especificacao = db_service.carregar_anexos(num_solic_int)
-        
-        if not f_apolice or not f_especificacao:
-            status.update(
-                label="❌ Erro: Anexos não encontrados",
-                state="error"
-            )
-            st.error(
-                "Não foi possível localizar os anexos (Apólice e Especificação) "
-                "no banco de dados para a solicitação informada."
-            )
-            return
-        
-        logger.info(f"✅ Anexos carregados: {f_apolice.name}, {f_especificacao.name}")
-        
-        # Processa apólice
-        status.write("🔍 Extraindo dados da apólice...")
-        dados_apolice = processor.processar_apolice(f_apolice)
-        
-        # Verifica erros no processamento da apólice
-        if any('erro' in v or 'erro_agente' in v for v in dados_apolice.values()):
-            logger.warning("⚠️ Alguns dados da apólice podem estar incompletos")
-        
-        # Processa especificação
-        status.write("💰 Extraindo dados da especificação financeira...")
-        dados_especificacao = processor.processar_especificacao(f_especificacao)
-        
-        # Consolida dados
-        status.write("📊 Consolidando dados...")
-        final_json = processor.consolidar_dados(
-            dados_apolice,
-            dados_especificacao,
-            f_apolice.name
-        )
-        
-        # Salva JSON
-        status.write("💾 Salvando resultado...")
-        caminho_arquivo = salvar_json(final_json, logger)
-        
-        # Sucesso
-        status.update(label="✅ Processamento concluído!", state="complete")
-        
-        st.success(f"🎉 Arquivo salvo com sucesso: `{caminho_arquivo}`")
-        
-        # Exibe JSON bruto
-        with st.expander("📋 Visualizar JSON Completo"):
-            st.json(final_json)
-        
-        # Exibe interface organizada
-        st.markdown("---")
-        st.subheader("📑 Dados Extraídos")
-        exibir_telas_json(final_json)
-        
-    except Exception as e:
-        status.update(label="❌ Erro no processamento", state="error")
-        logger.error(f"Erro: {str(e)}")
-        st.error(f"❌ Erro no processamento: {str(e)}")
-        
-        with st.expander("🔍 Detalhes do Erro"):
-            st.code(traceback.format_exc())
-
-
-def salvar_json(final_json: dict, logger: logging.Logger) -> str:
+        num_solic_int = int(num_solic)
+    except ValueError:
+        st.error("❌ Número de solicitação inválido")
+        return
+    
+    job_id = obter_fila_jobs().enfileirar(num_solic_int)
+    st.query_params["job"] = str(job_id)
+    logger.info(f"📨 Solicitação {num_solic_int} na fila (job {job_id})")
+
+
+def exibir_job(job_id: int, logger: logging.Logger):
     """
-    Salva o JSON em arquivo
+    Exibe o andamento ou o resultado de um job
     
     Args:
-        final_json: Dicionário com dados processados
+        job_id: Id do job na fila
         logger: Logger configurado
-        
-    Returns:
-        Caminho do arquivo salvo
     """
-    # Cria diretório se não existir
-    os.makedirs(app_config.JSON_OUTPUT_DIR, exist_ok=True)
-    
-    # Extrai informações para nome do arquivo
-    dados_apolice = final_json.get("dados_gerais_apolice", {})
-    seguradora = dados_apolice.get("metadata", {}).get("arquivo", "DESCONHECIDA")
+    job = obter_fila_jobs().obter(job_id)
+    if job is None:
+        st.warning(f"Job {job_id} não encontrado na fila")
+        return
     
-    # Tenta extrair nome da seguradora do arquivo
-    if "dados_gerais_apolice" in final_json:
-        seguradora_nome = "SEGURADORA"
-        apolice_numero = dados_apolice.get("numero_apolice_lider", "000")
+    if job.ativo:
+        acompanhar_job(job_id)
     else:
-        seguradora_nome = "SEGURADORA"
-        apolice_numero = "000"
+        exibir_resultado_job(job, logger)
+
+
+@st.fragment(run_every=job_queue_config.POLL_INTERVAL)
+def acompanhar_job(job_id: int):
+    """
+    Consulta periodicamente um job em andamento; só este trecho da página é reexecutado
+    
+    Args:
+        job_id: Id do job na fila
+    """
+    fila = obter_fila_jobs()
+    job = fila.obter(job_id)
+    if job is None or not job.ativo:
+        # Terminou: recarrega a página inteira para exibir o resultado
+        st.rerun()
+    
+    if job.estado == ESTADO_PENDENTE:
+        st.status(f"⏳ Solicitação {job.num_solic} aguardando na fila (job {job.id})...", state="running")
+        if st.button("✖️ Cancelar", key=f"cancelar_{job.id}") and fila.cancelar(job.id):
+            st.rerun()
+        return
+    
+    status = st.status(f"Processando solicitação {job.num_solic} (job {job.id})...", expanded=True)
+    for etapa in ETAPAS[:ETAPAS.index(job.etapa) + 1] if job.etapa in ETAPAS else ():
+        if etapa in MENSAGENS_ETAPAS:
+            status.write(MENSAGENS_ETAPAS[etapa])
+    if job.progresso:
+        status.write(f"📍 {job.progresso}...")
+    status.caption(
+        f"Tentativa {job.tentativas} · {job.worker} · "
+        f"{time.time() - job.iniciado_em:.0f}s em execução"
+    )
+
+
+def exibir_resultado_job(job: Job, logger: logging.Logger):
+    """
+    Exibe o resultado de um job concluído ou cancelado
+    
+    Args:
+        job: Job lido com o resultado (FilaJobs.obter)
+        logger: Logger configurado
+    """
+    if job.estado == ESTADO_CANCELADO:
+        st.info(f"Job {job.id} cancelado antes de começar.")
+        return
+    
+    if job.status == STATUS_SEM_ANEXOS:
+        st.status("❌ Erro: Anexos não encontrados", state="error")
+        st.error(
+            "Não foi possível localizar os anexos (Apólice e Especificação) "
+            "no banco de dados para a solicitação informada."
+        )
+        return
+    
+    if job.status == STATUS_ERRO:
+        st.status("❌ Erro no processamento", state="error")
+        logger.error(f"Erro: {job.erro}")
+        st.error(f"❌ Erro no processamento: {job.erro}")
+        return
+    
+    if job.status == STATUS_INCOMPLETO:
+        logger.warning("⚠️ Alguns dados da apólice podem estar incompletos")
+    
+    final_json = job.resultado or {}
+    caminho_arquivo = job.caminho_arquivo
+    logger.info(f"✅ JSON salvo em: {caminho_arquivo} (job {job.id}, {job.duracao_s:.1f}s)")
+    
+    cache = obter_cache_extracoes()
+    if cache:
+        estatisticas = cache.estatisticas()
+        logger.info(
+            f"📦 Cache de extrações: {estatisticas['hits']} hits, "
+            f"{estatisticas['misses']} misses"
+        )
+    logger.info(f"🔌 Pool Gemini: {obter_pool_gemini().estatisticas()}")
+    workers = obter_workers()
+    if workers:
+        logger.info(f"🗄️ Fonte de anexos: {workers.fonte.estatisticas()}")
+        logger.info(f"👷 Workers: {workers.estatisticas()}")
+    logger.info(f"🚦 Limitador Gemini: {obter_limitador_gemini().estatisticas()}")
+    
+    # Sucesso
+    st.status("✅ Processamento concluído!", state="complete")
     
-    # Monta nome do arquivo
-    nome_arquivo = sanitizar_nome_arquivo(f"{seguradora_nome}-{apolice_numero}.json")
-    caminho_completo = os.path.join(app_config.JSON_OUTPUT_DIR, nome_arquivo)
+    st.success(f"🎉 Arquivo salvo com sucesso: `{caminho_arquivo}`")
     
-    # Salva
-    with open(caminho_completo, "w", encoding="utf-8") as f:
-        json.dump(final_json, f, indent=2, ensure_ascii=False)
+    # Exibe JSON bruto
+    with st.expander("📋 Visualizar JSON Completo"):
+        st.json(final_json)
     
-    logger.info(f"✅ JSON salvo em: {caminho_completo}")
+    # Exibe tempos e tokens por prompt (chamadas recentes do processo)
+    with st.expander("⏱️ Métricas das chamadas ao Gemini"):
+        exibir_metricas_chamadas(obter_registro_metricas().resumo())
     
-    return caminho_completo
+    # Exibe interface organizada
+    st.markdown("---")
+    st.subheader("📑 Dados Extraídos")
+    exibir_telas_json(final_json)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
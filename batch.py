@@ -0,0 +1,120 @@
+"""
+Processamento em lote pela linha de comando - Extrator de Apólices V20
+
+Roda o mesmo fluxo do app (anexos, extração, consolidação e gravação do
+JSON) para muitas solicitações em paralelo, sem o Streamlit. O status de
+cada solicitação vai para um checkpoint JSONL: rodar de novo com o mesmo
+checkpoint retoma de onde parou. Ctrl+C para de enviar novas solicitações
+e aguarda as que estão em andamento.
+
+Uso:
+    python batch.py --intervalo 559000-559999 --concorrencia 8
+    python batch.py --arquivo solicitacoes.txt --checkpoint lote/backfill.jsonl
+    python batch.py --nums 559616,559617 --repetir-falhas
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import List
+from config.settings import app_config, batch_config, validate_config
+from services.attachment_sources import criar_fonte_anexos
+from services.batch_runner import (
+    STATUS_FALHA,
+    CheckpointLote,
+    gravar_relatorio,
+    ler_numeros,
+    processar_lote
+)
+from services.pdf_processor import PDFProcessor
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Ponto de entrada da linha de comando
+    
+    Args:
+        argv: Argumentos (opcional, usa sys.argv)
+    
+    Returns:
+        Código de saída: 0, 1 se alguma solicitação terminou com erro ou
+        incompleta, 2 se a configuração ou a lista de solicitações for inválida
+    """
+    parser = argparse.ArgumentParser(description="Processa solicitações em lote, sem interface")
+    parser.add_argument("--nums", nargs="+", default=[], help="Números de solicitação (separados por espaço ou vírgula)")
+    parser.add_argument("--arquivo", help="Arquivo com um número de solicitação por linha")
+    parser.add_argument("--intervalo", help="Intervalo inclusivo de solicitações, ex.: 559000-559999")
+    parser.add_argument("--concorrencia", type=int, default=batch_config.CONCURRENCY, help="Solicitações simultâneas")
+    parser.add_argument("--checkpoint", default=batch_config.CHECKPOINT_PATH, help="Checkpoint JSONL para retomar o lote")
+    parser.add_argument("--relatorio", help="CSV com o status de cada solicitação (padrão: ao lado do checkpoint)")
+    parser.add_argument("--saida", default=app_config.JSON_OUTPUT_DIR, help="Diretório dos JSONs gerados")
+    parser.add_argument("--fonte", choices=["odbc", "diretorio", "sqlite"], default=None,
+                        help="Origem dos anexos (padrão: ATTACHMENT_SOURCE)")
+    parser.add_argument("--fonte-caminho", default=None, help="String de conexão, diretório ou arquivo SQLite da fonte")
+    parser.add_argument("--repetir-falhas", action="store_true",
+                        help="Refaz solicitações registradas como erro ou incompletas")
+    parser.add_argument("--verbose", action="store_true", help="Exibe os logs de cada solicitação")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if not args.verbose:
+        # Mantém só o progresso do lote e os avisos dos demais módulos
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("services.batch_runner").setLevel(logging.INFO)
+    
+    try:
+        nums_solic = ler_numeros(args.nums, args.arquivo, args.intervalo)
+    except (OSError, ValueError) as e:
+        print(f"Lista de solicitações inválida: {e}", file=sys.stderr)
+        return 2
+    if not nums_solic:
+        parser.print_usage(sys.stderr)
+        print("Informe as solicitações com --nums, --arquivo ou --intervalo", file=sys.stderr)
+        return 2
+    
+    try:
+        validate_config(args.fonte)
+        fonte = criar_fonte_anexos(args.fonte, args.fonte_caminho)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro de configuração: {e}", file=sys.stderr)
+        return 2
+    
+    # Primeiro Ctrl+C: termina as solicitações em andamento e grava o relatório
+    parar = threading.Event()
+    tratador_anterior = signal.signal(signal.SIGINT, lambda *_: parar.set())
+    
+    checkpoint = CheckpointLote(args.checkpoint)
+    try:
+        progresso = processar_lote(
+            nums_solic,
+            fonte,
+            PDFProcessor(),
+            checkpoint,
+            concorrencia=args.concorrencia,
+            diretorio_saida=args.saida,
+            repetir_falhas=args.repetir_falhas,
+            parar=parar
+        )
+    finally:
+        signal.signal(signal.SIGINT, tratador_anterior)
+    
+    relatorio = args.relatorio or os.path.join(os.path.dirname(args.checkpoint) or ".", "status.csv")
+    registros = checkpoint.carregar()
+    gravar_relatorio(registros, relatorio, nums_solic)
+    
+    falhas = sum(1 for n in nums_solic if registros.get(n, {}).get("status") in STATUS_FALHA)
+    print(f"\n{progresso.resumo()}")
+    print(f"Puladas (já no checkpoint): {progresso.ignoradas}")
+    print(f"Relatório por solicitação: {relatorio}")
+    if parar.is_set():
+        print(f"Lote interrompido; rode o mesmo comando para retomar ({args.checkpoint})")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
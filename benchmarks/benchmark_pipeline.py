@@ -0,0 +1,383 @@
+"""
+Benchmark de ponta a ponta do pipeline de uma solicitação
+
+Processa N solicitações com anexos sintéticos, um banco simulado e o
+backend Gemini local, e relata p50/p95/p99 por etapa, vazão e pico de
+memória. Com --fonte, os anexos vêm de um corpus real (diretório de PDFs
+ou base SQLite, ver services/attachment_sources.py) em vez dos sintéticos. O relatório pode ser salvo como linha de base e comparado em
+execuções seguintes para detectar regressões.
+
+Uso:
+    python -m benchmarks.benchmark_pipeline --solicitacoes 20 --concorrencia 4 --perfil rapido
+    python -m benchmarks.benchmark_pipeline --salvar benchmarks/resultados/base.json
+    python -m benchmarks.benchmark_pipeline --comparar benchmarks/resultados/base.json
+    python -m benchmarks.benchmark_pipeline --fonte sqlite --fonte-caminho corpus/anexos.sqlite
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import local_backend_config
+from services.attachment_sources import FonteAnexos, criar_fonte_anexos
+from services.cache_service import ExtractionCache
+from services.gemini_local import PERFIS, BackendGeminiLocal
+from services.gemini_pool import GeminiClientPool
+from services.gemini_service import GeminiService
+from services.metrics import RegistroMetricas, percentil
+from services.pdf_processor import PDFProcessor
+from services.pipeline import ETAPAS, processar_solicitacao
+from services.rate_limiter import GeminiRateLimiter
+from services.upload_service import InlineUploader
+from utils.pdf_utils import gerar_pdf_texto
+
+logger = logging.getLogger(__name__)
+
+# Diferenças abaixo disso (segundos) não contam como regressão, para não
+# acusar ruído em etapas que levam poucos milissegundos
+FOLGA_MINIMA_SEGUNDOS = 0.05
+
+
+class BancoSimulado(FonteAnexos):
+    """
+    Fonte de anexos que gera os documentos em memória
+    
+    Cada solicitação recebe documentos distintos (o número da solicitação
+    entra no texto), de modo que o cache de extrações não mascara as
+    chamadas ao Gemini.
+    """
+    
+    def __init__(self, paginas_apolice: int = 12, latencia: float = 0.0):
+        """
+        Inicializa o banco simulado
+        
+        Args:
+            paginas_apolice: Páginas da apólice sintética (mínimo 4)
+            latencia: Segundos de espera simulados por carregamento
+        """
+        self.paginas_apolice = max(paginas_apolice, 4)
+        self.latencia = latencia
+    
+    def _textos_apolice(self, num_solic: int) -> List[str]:
+        """Páginas da apólice: dados gerais, locais, coberturas e condições"""
+        textos = [
+            f"Apolice No 118{num_solic:07d} Segurado Empresa Sintetica Ltda CNPJ 11.222.333/0001-81 "
+            f"Vigencia das 24h de 01/01/2024 as 24h de 01/01/2025"
+        ]
+        restantes = self.paginas_apolice - 1
+        locais = max(restantes // 4, 1)
+        coberturas = max(restantes // 4, 1)
+        
+        textos.append(f"Relacao de locais de risco Local 1 Endereco Rua Sintetica {num_solic} CEP 01000-000 Cidade Sao Paulo")
+        for i in range(1, locais):
+            textos.append(f"Local {i + 1} Endereco Avenida {num_solic} CEP 02000-000 Cidade Campinas Atividade Industria Predio")
+        textos.append("Coberturas contratadas Cobertura Basica Incendio LMI 10.000.000,00 Franquia 10% Premio 5.000,00")
+        for i in range(1, coberturas):
+            textos.append(f"Cobertura adicional {i} LMI 1.000.000,00 Franquia POS 10% Premio 1.000,00 solicitacao {num_solic}")
+        while len(textos) < self.paginas_apolice:
+            textos.append(
+                f"Condicoes gerais clausula {len(textos)}: disposicoes aplicaveis ao contrato de seguro "
+                f"da solicitacao {num_solic}, conforme regulamentacao vigente."
+            )
+        return textos
+    
+    def _textos_especificacao(self, num_solic: int) -> List[str]:
+        """Páginas da especificação de cosseguro cedido"""
+        return [
+            f"Especificacao de cosseguro cedido solicitacao {num_solic} Seguradora lider Tomador Empresa Sintetica",
+            f"Parcelas 1 a 4 Premio tarifario 12.500,00 Comissao cosseguro 1.250,00 solicitacao {num_solic}"
+        ]
+    
+    def carregar_anexos(self, num_solic: int) -> Tuple[BytesIO, BytesIO]:
+        """
+        Gera apólice e especificação da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+        
+        Returns:
+            Tupla (apólice, especificação) em memória, com atributo name
+        """
+        if self.latencia:
+            time.sleep(self.latencia)
+        
+        f_apolice = BytesIO(gerar_pdf_texto(self._textos_apolice(num_solic)))
+        f_apolice.name = f"apolice_{num_solic}.pdf"
+        f_especificacao = BytesIO(gerar_pdf_texto(self._textos_especificacao(num_solic)))
+        f_especificacao.name = f"especificacao_{num_solic}.pdf"
+        return f_apolice, f_especificacao
+
+
+def medir_memoria_pico_mb() -> Optional[float]:
+    """
+    Pico de memória residente do processo em MB
+    
+    Usa resource (Linux/macOS) ou psutil (Windows, se instalado). O valor é
+    o pico desde o início do processo.
+    
+    Returns:
+        Pico em MB, ou None se não houver como medir
+    """
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é informado em bytes no macOS e em KB no Linux
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        pass
+    
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _estatisticas(valores: List[float]) -> Dict[str, Optional[float]]:
+    """p50, p95, p99 e média de uma lista de durações"""
+    return {
+        "p50": percentil(valores, 0.5),
+        "p95": percentil(valores, 0.95),
+        "p99": percentil(valores, 0.99),
+        "media": sum(valores) / len(valores) if valores else None
+    }
+
+
+def executar_benchmark(
+    solicitacoes: int = 20,
+    concorrencia: int = 4,
+    perfil: str = None,
+    paginas: int = 12,
+    latencia_banco: float = 0.05,
+    diretorio: str = None,
+    fonte: FonteAnexos = None
+) -> Dict[str, Any]:
+    """
+    Executa o benchmark e monta o relatório
+    
+    Args:
+        solicitacoes: Quantidade de solicitações processadas
+        concorrencia: Solicitações processadas ao mesmo tempo
+        perfil: Perfil do backend local (opcional, usa local_backend_config.PROFILE)
+        paginas: Páginas de cada apólice sintética
+        latencia_banco: Segundos simulados por carregamento de anexos
+        diretorio: Diretório de trabalho para cache e JSONs (opcional, temporário)
+        fonte: Fonte de anexos real (opcional, usa o banco simulado); são
+            processadas as primeiras solicitações de fonte.listar_solicitacoes()
+    
+    Returns:
+        Relatório com parâmetros, estatísticas por etapa, vazão, memória,
+        resumo por prompt e estatísticas do backend
+    """
+    perfil = perfil or local_backend_config.PROFILE
+    
+    with tempfile.TemporaryDirectory() as temporario:
+        diretorio = diretorio or temporario
+        
+        backend = BackendGeminiLocal(perfil=PERFIS[perfil])
+        metricas = RegistroMetricas()
+        servico = GeminiService(
+            cache=ExtractionCache(diretorio=os.path.join(diretorio, "cache_extracoes")),
+            uploader=InlineUploader(),
+            pool=GeminiClientPool(fabrica=backend.criar_modelo),
+            limitador=GeminiRateLimiter(),
+            metricas=metricas
+        )
+        processor = PDFProcessor(gemini_service=servico)
+        if fonte is not None:
+            banco = fonte
+            nums_solic = fonte.listar_solicitacoes()[:solicitacoes]
+        else:
+            banco = BancoSimulado(paginas_apolice=paginas, latencia=latencia_banco)
+            nums_solic = list(range(1, solicitacoes + 1))
+        diretorio_saida = os.path.join(diretorio, "json")
+        
+        duracoes: Dict[str, List[float]] = {etapa: [] for etapa in ETAPAS}
+        duracoes["total"] = []
+        erros = 0
+        
+        def executar(num_solic: int):
+            inicio = time.monotonic()
+            resultado = processar_solicitacao(num_solic, banco, processor, diretorio_saida)
+            return resultado, time.monotonic() - inicio
+        
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            futuros = [executor.submit(executar, n) for n in nums_solic]
+            for futuro in futuros:
+                try:
+                    resultado, total = futuro.result()
+                except Exception as e:
+                    erros += 1
+                    logger.warning(f"Solicitação falhou no benchmark: {e}")
+                    continue
+                for etapa, duracao in resultado.duracoes.items():
+                    duracoes.setdefault(etapa, []).append(duracao)
+                duracoes["total"].append(total)
+        duracao_total = time.monotonic() - inicio
+    
+    concluidas = len(nums_solic) - erros
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {
+            "fonte": type(banco).__name__,
+            "solicitacoes": len(nums_solic),
+            "concorrencia": concorrencia,
+            "perfil": perfil,
+            "paginas": paginas,
+            "latencia_banco": latencia_banco
+        },
+        "etapas": {etapa: _estatisticas(valores) for etapa, valores in duracoes.items()},
+        "duracao_total": duracao_total,
+        "vazao_por_minuto": concluidas * 60 / duracao_total if duracao_total else None,
+        "erros": erros,
+        "memoria_pico_mb": medir_memoria_pico_mb(),
+        "prompts": metricas.resumo(),
+        "backend": backend.estatisticas()
+    }
+
+
+def comparar_relatorios(
+    atual: Dict[str, Any],
+    base: Dict[str, Any],
+    tolerancia: float = 0.2
+) -> List[str]:
+    """
+    Compara o relatório com uma linha de base
+    
+    Args:
+        atual: Relatório desta execução
+        base: Relatório salvo anteriormente
+        tolerancia: Piora relativa aceita (0.2 = 20%)
+    
+    Returns:
+        Descrição de cada regressão encontrada (lista vazia se nenhuma)
+    """
+    regressoes = []
+    
+    for etapa, estatisticas in base.get("etapas", {}).items():
+        for medida in ("p50", "p95"):
+            anterior = estatisticas.get(medida)
+            novo = atual.get("etapas", {}).get(etapa, {}).get(medida)
+            if anterior is None or novo is None:
+                continue
+            if novo > anterior * (1 + tolerancia) and novo - anterior > FOLGA_MINIMA_SEGUNDOS:
+                regressoes.append(f"{etapa} {medida}: {anterior:.3f}s -> {novo:.3f}s")
+    
+    anterior, novo = base.get("vazao_por_minuto"), atual.get("vazao_por_minuto")
+    if anterior and novo is not None and novo < anterior * (1 - tolerancia):
+        regressoes.append(f"vazão: {anterior:.1f}/min -> {novo:.1f}/min")
+    
+    anterior, novo = base.get("memoria_pico_mb"), atual.get("memoria_pico_mb")
+    if anterior and novo is not None and novo > anterior * (1 + tolerancia):
+        regressoes.append(f"memória de pico: {anterior:.0f} MB -> {novo:.0f} MB")
+    
+    if base.get("parametros") != atual.get("parametros"):
+        logger.warning("Linha de base gerada com outros parâmetros; a comparação pode não ser válida")
+    
+    return regressoes
+
+
+def formatar_relatorio(relatorio: Dict[str, Any]) -> str:
+    """
+    Formata o relatório como tabela de texto
+    
+    Args:
+        relatorio: Relatório de executar_benchmark
+    
+    Returns:
+        Texto pronto para exibição
+    """
+    def segundos(valor):
+        return f"{valor:8.3f}" if valor is not None else f"{'-':>8}"
+    
+    parametros = relatorio["parametros"]
+    linhas = [
+        f"Solicitações: {parametros['solicitacoes']} | concorrência: {parametros['concorrencia']} | "
+        f"perfil: {parametros['perfil']} | páginas: {parametros['paginas']}",
+        "",
+        f"{'etapa':<26}{'p50':>8}{'p95':>8}{'p99':>8}{'média':>8}"
+    ]
+    for etapa, estatisticas in relatorio["etapas"].items():
+        linhas.append(
+            f"{etapa:<26}" + "".join(segundos(estatisticas[m]) for m in ("p50", "p95", "p99", "media"))
+        )
+    
+    memoria = relatorio["memoria_pico_mb"]
+    linhas += [
+        "",
+        f"Duração total: {relatorio['duracao_total']:.2f}s | erros: {relatorio['erros']}",
+        f"Vazão: {relatorio['vazao_por_minuto'] or 0:.1f} solicitações/min",
+        f"Memória de pico: {f'{memoria:.0f} MB' if memoria is not None else 'indisponível'}",
+        f"Backend: {relatorio['backend']}"
+    ]
+    return "\n".join(linhas)
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Ponto de entrada da linha de comando
+    
+    Args:
+        argv: Argumentos (opcional, usa sys.argv)
+    
+    Returns:
+        Código de saída: 0, ou 1 se houver regressão em relação à linha de base
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline de extração")
+    parser.add_argument("--solicitacoes", type=int, default=20, help="Solicitações processadas")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Solicitações simultâneas")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default=None, help="Perfil do backend Gemini local")
+    parser.add_argument("--paginas", type=int, default=12, help="Páginas de cada apólice sintética")
+    parser.add_argument("--latencia-banco", type=float, default=0.05, help="Segundos por carregamento de anexos")
+    parser.add_argument("--fonte", choices=["sintetica", "diretorio", "sqlite"], default="sintetica",
+                        help="Origem dos anexos")
+    parser.add_argument("--fonte-caminho", default=None,
+                        help="Diretório ou arquivo SQLite da fonte (opcional, usa ATTACHMENT_SOURCE_DIR/SQLITE)")
+    parser.add_argument("--salvar", help="Grava o relatório JSON neste caminho")
+    parser.add_argument("--comparar", help="Relatório JSON usado como linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora relativa aceita na comparação")
+    parser.add_argument("--verbose", action="store_true", help="Exibe os logs do pipeline")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    
+    relatorio = executar_benchmark(
+        solicitacoes=args.solicitacoes,
+        concorrencia=args.concorrencia,
+        perfil=args.perfil,
+        paginas=args.paginas,
+        latencia_banco=args.latencia_banco,
+        fonte=None if args.fonte == "sintetica" else criar_fonte_anexos(args.fonte, args.fonte_caminho)
+    )
+    print(formatar_relatorio(relatorio))
+    
+    if args.salvar:
+        os.makedirs(os.path.dirname(args.salvar) or ".", exist_ok=True)
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"\nRelatório salvo em: {args.salvar}")
+    
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar_relatorios(relatorio, base, args.tolerancia)
+        if regressoes:
+            print("\nRegressões em relação à linha de base:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            return 1
+        print("\nSem regressões em relação à linha de base")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
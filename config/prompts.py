@@ -61,6 +61,18 @@ Analise o documento e retorne JSON:
 { "lmi_unico": "Sim/Não", "tem_cobertura_cbi": "Sim/Não" }
 """
 
+# Acrescentado ao prompt original quando a lista da resposta foi cortada pelo
+# limite de saída; formatado com quantidade, chave_lista e ultimo_item
+PROMPT_CONTINUACAO_LISTA = """
+ATENÇÃO: a resposta anterior foi interrompida pelo limite de tamanho depois de
+{quantidade} itens de "{chave_lista}". O último item já extraído foi:
+{ultimo_item}
+
+Continue a extração a partir do item SEGUINTE a esse, sem repetir itens já
+extraídos, e retorne JSON no mesmo formato, apenas com os itens restantes:
+{{ "{chave_lista}": [ ... ] }}
+"""
+
 PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL = """
 Você é um especialista contábil. Analise VISUALMENTE este documento de "Especificação de Cosseguro".
 Ignore a formatação de texto quebrado e olhe para as TABELAS.
@@ -106,4 +118,102 @@ Retorne JSON:
     }
   }
 }
-"""
\ No newline at end of file
+"""
+
+
+# Schemas de resposta (subconjunto OpenAPI aceito em response_schema pelo Gemini).
+# São enviados ao modelo junto com o prompt e usados para validar a resposta.
+def _texto(*campos: str) -> dict:
+    """Propriedades de texto para os campos informados"""
+    return {campo: {"type": "string"} for campo in campos}
+
+
+def _objeto(propriedades: dict, obrigatorios=None) -> dict:
+    """Schema de objeto; por padrão todos os campos são obrigatórios"""
+    return {
+        "type": "object",
+        "properties": propriedades,
+        "required": list(propriedades) if obrigatorios is None else obrigatorios
+    }
+
+
+def _lista(item: dict) -> dict:
+    """Schema de lista de itens"""
+    return {"type": "array", "items": item}
+
+
+_CAMPOS_LOCAL = (
+    "nro_local_risco", "endereco", "cidade", "estado", "cep", "atividade_principal_risco",
+    "valor_risco_predio", "valor_risco_mmu", "valor_risco_mmp"
+)
+_CAMPOS_COBERTURA = ("nome_raw", "lmi", "franquia_raw", "premio")
+_CAMPOS_DADOS_GERAIS = (
+    "codigo_lider", "seguradora_lider", "tomador", "cnpj_tomador", "corretor",
+    "codigo_susep_corretor", "ramo_seguro", "tipo_documento", "apolice", "doc_complementar",
+    "endosso_cancelamento", "num_ordem_doc_cancelado", "codigo_operacao",
+    "percentual_sobre_premio_tarifario", "percentual_comissao", "data_emissao",
+    "vigencia_inicio", "vigencia_fim", "sorteio", "qtd_prestacao", "importancia_segurada",
+    "moeda", "taxa_moeda", "data_base", "percentual_desconto"
+)
+
+SCHEMA_MESTRE_APOLICE = _objeto({
+    **_texto(
+        "document_type", "seguradora_canon", "segurado", "cnpj", "numero_apolice_lider",
+        "inicio_vigencia", "fim_vigencia", "moeda", "valor_limite_maximo_garantia",
+        "premio_emitido_ou_liquido", "participacao_mitsui_sumitomo", "lmi_unico",
+        "tem_cobertura_cbi"
+    ),
+    "cosseguro_completo": _lista(_objeto({
+        **_texto("nome_raw", "percentual"),
+        "lider": {"type": "boolean"}
+    }))
+})
+
+# Campos dos itens não são obrigatórios: a tabela pode não ter a coluna
+SCHEMA_LOCAIS = _objeto({"locais_risco": _lista(_objeto(_texto(*_CAMPOS_LOCAL), obrigatorios=[]))})
+
+SCHEMA_COBERTURAS = _objeto({
+    "coberturas_completas": _lista(_objeto(_texto(*_CAMPOS_COBERTURA), obrigatorios=["nome_raw"]))
+})
+
+SCHEMA_LMI_UNICO_CBI = _objeto(_texto("lmi_unico", "tem_cobertura_cbi"))
+
+SCHEMA_ESPECIFICACAO_FINANCEIRA = _objeto({
+    "especificacao_cosseguro_cedido": _objeto(
+        {
+            "dados_gerais": _objeto(_texto(*_CAMPOS_DADOS_GERAIS), obrigatorios=[]),
+            "seguradoras_participantes": _lista(_objeto(
+                _texto("codigo", "nome", "numero_ordem", "percentual_participacao"),
+                obrigatorios=["nome"]
+            )),
+            "outros_ramos": _lista(_objeto(
+                _texto("ramo", "codigo", "is", "percentual_sobre_premio", "percentual_comissao"),
+                obrigatorios=[]
+            )),
+            "parcelas": _lista(_objeto(
+                _texto(
+                    "num_parc", "premio_tarifario", "desconto", "ad_fracionamento",
+                    "comissao_cosseguro", "total_liquido"
+                ),
+                obrigatorios=[]
+            )),
+            "totais_parcelas": _objeto(
+                _texto(
+                    "total_premio_tarifario", "total_desconto", "total_ad_fracionamento",
+                    "total_comissao_cosseguro", "total_liquido"
+                ),
+                obrigatorios=[]
+            )
+        },
+        obrigatorios=["dados_gerais", "seguradoras_participantes", "parcelas"]
+    )
+})
+
+# Schema de cada prompt, consultado pelo GeminiService
+SCHEMAS_RESPOSTA = {
+    PROMPT_MESTRE_APOLICE: SCHEMA_MESTRE_APOLICE,
+    PROMPT_LOCAIS_V4_1: SCHEMA_LOCAIS,
+    PROMPT_COBERTURAS_V3_GENERICO: SCHEMA_COBERTURAS,
+    PROMPT_LMI_UNICO_CBI: SCHEMA_LMI_UNICO_CBI,
+    PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL: SCHEMA_ESPECIFICACAO_FINANCEIRA
+}
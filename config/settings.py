@@ -16,6 +16,31 @@ class GeminiConfig:
     TIMEOUT: int = 600
     TEMPERATURE: float = 0.0
     RESPONSE_MIME_TYPE: str = "application/json"
+    # Envia o schema de cada prompt (config/prompts.py) e valida a resposta contra ele
+    RESPONSE_SCHEMA: bool = os.getenv('GEMINI_RESPONSE_SCHEMA', 'true').lower() == 'true'
+    # "inline": envia o PDF em cada chamada; "file_api" (opcional): envia uma vez
+    # para a File API do Gemini e reaproveita entre prompts
+    UPLOAD_MODE: str = os.getenv('GEMINI_UPLOAD_MODE', 'inline')
+    POOL_SIZE: int = int(os.getenv('GEMINI_POOL_SIZE', '8'))
+    # Cotas compartilhadas por todas as chamadas do processo
+    RATE_LIMIT_RPM: int = int(os.getenv('GEMINI_RATE_LIMIT_RPM', '300'))
+    RATE_LIMIT_TPM: int = int(os.getenv('GEMINI_RATE_LIMIT_TPM', '1000000'))
+    # Concorrência adaptativa (AIMD); o máximo não deve passar de POOL_SIZE
+    CONCURRENCY_INITIAL: int = 4
+    CONCURRENCY_MIN: int = 1
+    CONCURRENCY_MAX: int = int(os.getenv('GEMINI_CONCURRENCY_MAX', '8'))
+    # Retry com backoff exponencial e jitter para erros transitórios
+    MAX_RETRIES: int = 3
+    RETRY_BASE_DELAY: float = 2.0
+    RETRY_MAX_DELAY: float = 60.0
+    # Chamadas extras para completar listas cortadas pelo limite de saída do modelo
+    MAX_CONTINUATIONS: int = int(os.getenv('GEMINI_MAX_CONTINUATIONS', '5'))
+    # Hedging: duplica a chamada quando ela passa do percentil histórico
+    HEDGE_ENABLED: bool = os.getenv('GEMINI_HEDGE_ENABLED', 'false').lower() == 'true'
+    HEDGE_PERCENTILE: float = 0.95
+    HEDGE_MIN_DELAY: float = 20.0
+    # "api": Gemini real; "local": backend simulado (services/gemini_local.py)
+    BACKEND: str = os.getenv('GEMINI_BACKEND', 'api')
 
 
 @dataclass
@@ -23,7 +48,28 @@ class DatabaseConfig:
     """Configurações do banco de dados"""
     CONNECTION_STRING: str = os.getenv('SQL_CONNECTION_STRING')
     TIMEOUT: int = 30
-    MAX_RETRIES: int = 3
+    # Limite de cada consulta (SQL_ATTR_QUERY_TIMEOUT), incluindo a transferência dos anexos
+    QUERY_TIMEOUT: int = int(os.getenv('SQL_QUERY_TIMEOUT', '120'))
+    # Retry com backoff exponencial e jitter para erros transitórios do ODBC,
+    # limitado a RETRY_DEADLINE segundos entre a primeira tentativa e a última espera
+    MAX_RETRIES: int = int(os.getenv('SQL_MAX_RETRIES', '3'))
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 10.0
+    RETRY_DEADLINE: float = float(os.getenv('SQL_RETRY_DEADLINE', '60'))
+    # Disjuntor compartilhado: falhas seguidas que abrem o circuito e segundos até a sondagem
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv('SQL_CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv('SQL_CIRCUIT_RESET_TIMEOUT', '30'))
+    # Pool de conexões compartilhado por sessões e workers (services/database_pool.py)
+    POOL_MIN_SIZE: int = int(os.getenv('SQL_POOL_MIN_SIZE', '1'))
+    POOL_MAX_SIZE: int = int(os.getenv('SQL_POOL_MAX_SIZE', '8'))
+    # Segundos ociosa antes de ser fechada / antes de exigir "SELECT 1" no empréstimo
+    POOL_IDLE_TIMEOUT: float = float(os.getenv('SQL_POOL_IDLE_TIMEOUT', '300'))
+    POOL_HEALTHCHECK_AFTER: float = float(os.getenv('SQL_POOL_HEALTHCHECK_AFTER', '30'))
+    # Carga em lote: solicitações por consulta e linhas por fetchmany
+    BULK_BATCH_SIZE: int = int(os.getenv('SQL_BULK_BATCH_SIZE', '200'))
+    BULK_FETCH_SIZE: int = 50
+    # Anexos decodificados ficam em memória até este tamanho e depois em arquivo temporário
+    SPOOL_MAX_MEMORY_MB: int = int(os.getenv('SQL_SPOOL_MAX_MEMORY_MB', '8'))
 
 
 @dataclass
@@ -36,15 +82,117 @@ class AppConfig:
     PAGE_LAYOUT: str = "wide"
 
 
+@dataclass
+class CacheConfig:
+    """Configurações do cache local de extrações"""
+    ENABLED: bool = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    EXTRACTION_DIR: str = os.getenv('CACHE_EXTRACTION_DIR', '.cache/extracoes')
+    EXTRACTION_MAX_MB: int = 500
+    EXTRACTION_MAX_AGE_HOURS: int = 24 * 7
+    # Anexos decodificados por versão da solicitação (num_solic, num_hist_solic)
+    ATTACHMENTS_ENABLED: bool = os.getenv('CACHE_ATTACHMENTS', 'true').lower() == 'true'
+    ATTACHMENTS_DIR: str = os.getenv('CACHE_ATTACHMENTS_DIR', '.cache/anexos')
+    ATTACHMENTS_MAX_MB: int = int(os.getenv('CACHE_ATTACHMENTS_MAX_MB', '1000'))
+
+
+@dataclass
+class PageSelectionConfig:
+    """Configurações da seleção de páginas antes do envio ao Gemini"""
+    ENABLED: bool = os.getenv('PDF_PAGE_SELECTION', 'true').lower() == 'true'
+    # Documentos com menos páginas que isso são enviados inteiros
+    MIN_PAGES: int = 6
+    # Se a seleção passar dessa fração do documento, envia o documento inteiro
+    MAX_FRACTION: float = 0.6
+    # Páginas extras após cada bloco (tabelas que continuam sem cabeçalho)
+    TRAILING_PAGES: int = 1
+    # Abaixo disso a página é tratada como imagem sem camada de texto
+    MIN_CHARS_PER_PAGE: int = 50
+    # Campos simples (CNPJ, número, vigência, LMI único, CBI) lidos do texto sem chamar o Gemini
+    TEXT_FAST_PATH: bool = os.getenv('PDF_TEXT_FAST_PATH', 'true').lower() == 'true'
+    # Locais e coberturas com mais páginas que SHARD_MIN_PAGES são divididos em
+    # faixas de SHARD_PAGES páginas extraídas em paralelo
+    SHARDING_ENABLED: bool = os.getenv('PDF_SHARDING', 'true').lower() == 'true'
+    SHARD_MIN_PAGES: int = int(os.getenv('PDF_SHARD_MIN_PAGES', '30'))
+    SHARD_PAGES: int = int(os.getenv('PDF_SHARD_PAGES', '15'))
+    # Páginas repetidas entre faixas vizinhas (linhas de tabela na virada de página)
+    SHARD_OVERLAP: int = 1
+
+
+@dataclass
+class MetricsConfig:
+    """Configurações das métricas por chamada ao Gemini"""
+    # Gravação em JSONL; o registro em memória fica sempre ativo
+    ENABLED: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    JSONL_PATH: str = os.getenv('METRICS_JSONL_PATH', 'metricas/chamadas_gemini.jsonl')
+    MEMORY_CAPACITY: int = 1000
+
+
+@dataclass
+class LocalBackendConfig:
+    """Configurações do backend Gemini local (GEMINI_BACKEND=local)"""
+    # Perfil de latência e falhas: instantaneo, rapido, realista ou instavel
+    PROFILE: str = os.getenv('GEMINI_LOCAL_PROFILE', 'rapido')
+    # Diretório com respostas gravadas por prompt (<nome>.json)
+    RESPONSES_DIR: str = os.getenv('GEMINI_LOCAL_RESPONSES_DIR', '')
+    SEED: int = int(os.getenv('GEMINI_LOCAL_SEED', '42'))
+
+
+@dataclass
+class AttachmentSourceConfig:
+    """Configurações da fonte dos anexos das solicitações"""
+    # odbc (SQL Server), diretorio (<DIR>/<num_solic>/*.pdf) ou sqlite (mesma tabela de anexos)
+    TYPE: str = os.getenv('ATTACHMENT_SOURCE', 'odbc')
+    DIR: str = os.getenv('ATTACHMENT_SOURCE_DIR', 'anexos')
+    SQLITE_PATH: str = os.getenv('ATTACHMENT_SOURCE_SQLITE', 'anexos.sqlite')
+
+
+@dataclass
+class BatchConfig:
+    """Configurações do processamento em lote (batch.py)"""
+    CONCURRENCY: int = int(os.getenv('BATCH_CONCURRENCY', '4'))
+    # JSONL com o status de cada solicitação; permite retomar um lote interrompido
+    CHECKPOINT_PATH: str = os.getenv('BATCH_CHECKPOINT_PATH', 'lote/checkpoint.jsonl')
+    # Segundos entre as linhas de progresso no log
+    PROGRESS_INTERVAL: float = 30.0
+
+
+@dataclass
+class JobQueueConfig:
+    """Configurações da fila persistente de extrações (app.py e worker.py)"""
+    # Base SQLite dos jobs; sobrevive a reruns do Streamlit e a reinícios do processo
+    PATH: str = os.getenv('JOB_QUEUE_PATH', 'fila/jobs.sqlite')
+    WORKERS: int = int(os.getenv('JOB_WORKERS', '2'))
+    # Workers dentro do processo do Streamlit; com false, rode python worker.py à parte
+    EMBEDDED_WORKERS: bool = os.getenv('JOB_EMBEDDED_WORKERS', 'true').lower() == 'true'
+    # Job em execução sem sinal de vida por esse tempo volta para a fila (worker encerrado)
+    HEARTBEAT_TIMEOUT: float = float(os.getenv('JOB_HEARTBEAT_TIMEOUT', '120'))
+    # Execuções interrompidas aceitas antes de o job terminar com erro
+    MAX_ATTEMPTS: int = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    # Segundos entre consultas à fila (workers) e ao status do job (interface)
+    POLL_INTERVAL: float = 1.0
+
+
 # Instâncias globais
 gemini_config = GeminiConfig()
 db_config = DatabaseConfig()
 app_config = AppConfig()
+cache_config = CacheConfig()
+page_selection_config = PageSelectionConfig()
+metrics_config = MetricsConfig()
+local_backend_config = LocalBackendConfig()
+attachment_source_config = AttachmentSourceConfig()
+batch_config = BatchConfig()
+job_queue_config = JobQueueConfig()
 
 
-def validate_config():
-    """Valida se todas as configurações necessárias estão presentes"""
-    if not gemini_config.API_KEY:
+def validate_config(fonte_anexos: str = None):
+    """
+    Valida se todas as configurações necessárias estão presentes
+    
+    Args:
+        fonte_anexos: Fonte de anexos em uso (opcional, usa attachment_source_config.TYPE)
+    """
+    if not gemini_config.API_KEY and gemini_config.BACKEND != "local":
         raise ValueError("GEMINI_API_KEY não configurada. Configure no arquivo .env")
-    if not db_config.CONNECTION_STRING:
+    if not db_config.CONNECTION_STRING and (fonte_anexos or attachment_source_config.TYPE) == "odbc":
         raise ValueError("SQL_CONNECTION_STRING não configurada. Configure no arquivo .env")
\ No newline at end of file
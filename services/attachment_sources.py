@@ -0,0 +1,601 @@
+"""
+Fontes dos anexos das solicitações: SQL Server (ODBC), diretório de PDFs e SQLite
+"""
+import asyncio
+import base64
+import logging
+import os
+import sqlite3
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from config.settings import app_config, attachment_source_config, db_config
+from services.cache_service import ArquivoAnexo
+from utils.base64_incremental import AnexoTemporario, decodificar_base64_em_partes
+
+logger = logging.getLogger(__name__)
+
+# Nomes de arquivo considerados anexos de apólice ou especificação
+FILTRO_NOMES = """(
+                anexo.nom_arquivo LIKE '%AP%LICE%.pdf'
+                OR anexo.nom_arquivo LIKE '%FRONT%'
+                OR anexo.nom_arquivo LIKE '%ESPEC%'
+          )"""
+
+# Mesma tabela de anexos do SQL Server, para bases SQLite exportadas ou montadas à mão
+_SQL_CRIAR_TABELA_SQLITE = """
+CREATE TABLE IF NOT EXISTS tb_solic_cotacao_anexo (
+    num_solic INTEGER NOT NULL,
+    num_hist_solic INTEGER NOT NULL,
+    num_seq INTEGER NOT NULL,
+    nom_arquivo TEXT,
+    arq_anexo_base64 TEXT,
+    PRIMARY KEY (num_solic, num_hist_solic, num_seq)
+);
+"""
+
+
+class FonteAnexos:
+    """
+    Origem dos anexos (apólice e especificação) de cada solicitação
+    
+    As subclasses implementam carregar_anexos; a carga em lote e a variante
+    assíncrona padrão chamam carregar_anexos uma solicitação por vez.
+    Qualquer fonte serve ao app, ao pipeline e aos executores em lote.
+    """
+    
+    def carregar_anexos(self, num_solic: int) -> Tuple[Optional[Any], Optional[Any]]:
+        """
+        Busca os anexos da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+        
+        Returns:
+            Tupla (arquivo_apolice, arquivo_especificacao); arquivos não
+            encontrados vêm None
+        """
+        raise NotImplementedError
+    
+    def carregar_anexos_em_lote(
+        self,
+        nums_solic: Iterable[int]
+    ) -> Iterator[Tuple[int, Optional[Any], Optional[Any]]]:
+        """
+        Busca os anexos de várias solicitações
+        
+        Args:
+            nums_solic: Números das solicitações
+        
+        Yields:
+            Tupla (num_solic, arquivo_apolice, arquivo_especificacao), em ordem crescente
+        """
+        for num_solic in sorted({int(n) for n in nums_solic}):
+            yield (num_solic, *self.carregar_anexos(num_solic))
+    
+    async def carregar_anexos_async(
+        self,
+        num_solic: int,
+        timeout: float = None
+    ) -> Tuple[Optional[Any], Optional[Any]]:
+        """
+        Variante assíncrona de carregar_anexos, executada numa thread
+        
+        Args:
+            num_solic: Número da solicitação
+            timeout: Tempo máximo da operação em segundos (opcional)
+        
+        Returns:
+            Tupla (arquivo_apolice, arquivo_especificacao)
+        
+        Raises:
+            asyncio.TimeoutError: Se a operação passar do timeout
+        """
+        return await asyncio.wait_for(asyncio.to_thread(self.carregar_anexos, num_solic), timeout)
+    
+    def listar_solicitacoes(self) -> List[int]:
+        """
+        Lista as solicitações com anexos disponíveis na fonte
+        
+        Returns:
+            Números das solicitações em ordem crescente
+        """
+        raise NotImplementedError(f"{type(self).__name__} não permite listar as solicitações")
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores da fonte
+        
+        Returns:
+            Dicionário com os contadores (vazio se a fonte não tiver nenhum)
+        """
+        return {}
+
+
+class FonteAnexosDiretorio(FonteAnexos):
+    """
+    Anexos lidos de um diretório de PDFs, um subdiretório por solicitação
+    
+    Layout: <diretorio>/<num_solic>/<arquivo>.pdf. Os arquivos são
+    considerados em ordem de nome, como os anexos em ordem de num_seq, e
+    escolhidos pelas mesmas regras de nome e tamanho da base.
+    """
+    
+    def __init__(self, diretorio: str = None):
+        """
+        Inicializa a fonte
+        
+        Args:
+            diretorio: Diretório raiz (opcional, usa attachment_source_config.DIR)
+        
+        Raises:
+            FileNotFoundError: Se o diretório não existir
+        """
+        self.diretorio = diretorio or attachment_source_config.DIR
+        if not os.path.isdir(self.diretorio):
+            raise FileNotFoundError(f"Diretório de anexos não encontrado: {self.diretorio}")
+        
+        self._carregamentos = 0
+        self._lock = threading.Lock()
+    
+    def carregar_anexos(self, num_solic: int) -> Tuple[Optional[ArquivoAnexo], Optional[ArquivoAnexo]]:
+        """
+        Abre os anexos da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+        
+        Returns:
+            Tupla (arquivo_apolice, arquivo_especificacao) abertos para leitura
+        """
+        with self._lock:
+            self._carregamentos += 1
+        
+        pasta = os.path.join(self.diretorio, str(num_solic))
+        if not os.path.isdir(pasta):
+            logger.info(f"Nenhum anexo no diretório para num_solic={num_solic}")
+            return None, None
+        
+        rows = []
+        for num_seq, nome in enumerate(sorted(os.listdir(pasta)), start=1):
+            caminho = os.path.join(pasta, nome)
+            if os.path.isfile(caminho):
+                # Tamanho que o arquivo teria em base64, para a mesma verificação da base
+                tamanho_base64 = (os.path.getsize(caminho) + 2) // 3 * 4
+                rows.append(SimpleNamespace(
+                    num_seq=num_seq, nom_arquivo=nome, caminho=caminho, tamanho_base64=tamanho_base64
+                ))
+        
+        arquivos = {}
+        for tipo, lista in candidatos_por_tipo(rows).items():
+            if lista:
+                arquivos[tipo] = ArquivoAnexo(lista[0].caminho, nome_anexo(lista[0]))
+                registrar_escolha(tipo, arquivos[tipo].name)
+        return arquivos.get("apolice"), arquivos.get("especificacao")
+    
+    def listar_solicitacoes(self) -> List[int]:
+        """
+        Lista os subdiretórios numéricos
+        
+        Returns:
+            Números das solicitações em ordem crescente
+        """
+        return sorted(
+            int(nome) for nome in os.listdir(self.diretorio)
+            if nome.isdigit() and os.path.isdir(os.path.join(self.diretorio, nome))
+        )
+    
+    def gravar_anexo(self, num_solic: int, nome: str, conteudo: bytes):
+        """
+        Grava um anexo no diretório da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+            nome: Nome do arquivo
+            conteudo: Bytes do anexo
+        """
+        pasta = os.path.join(self.diretorio, str(num_solic))
+        os.makedirs(pasta, exist_ok=True)
+        with open(os.path.join(pasta, os.path.basename(nome)), "wb") as f:
+            f.write(conteudo)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores da fonte
+        
+        Returns:
+            Dicionário com o diretório e o número de carregamentos
+        """
+        with self._lock:
+            return {"diretorio": self.diretorio, "carregamentos": self._carregamentos}
+
+
+class FonteAnexosSQLite(FonteAnexos):
+    """
+    Anexos lidos de uma base SQLite com a mesma tabela do SQL Server
+    
+    A tabela tb_solic_cotacao_anexo tem as mesmas colunas (num_solic,
+    num_hist_solic, num_seq, nom_arquivo, arq_anexo_base64) e a busca segue
+    as mesmas duas fases: metadados da última versão primeiro e depois só
+    o conteúdo dos anexos escolhidos. Cada thread usa sua própria conexão.
+    """
+    
+    def __init__(self, caminho: str = None, criar: bool = False):
+        """
+        Inicializa a fonte
+        
+        Args:
+            caminho: Arquivo SQLite (opcional, usa attachment_source_config.SQLITE_PATH)
+            criar: Cria o arquivo e a tabela se não existirem
+        
+        Raises:
+            FileNotFoundError: Se o arquivo não existir e criar for False
+        """
+        self.caminho = caminho or attachment_source_config.SQLITE_PATH
+        if not criar and not os.path.isfile(self.caminho):
+            raise FileNotFoundError(f"Base SQLite de anexos não encontrada: {self.caminho}")
+        
+        self._local = threading.local()
+        self._carregamentos = 0
+        self._lock = threading.Lock()
+        
+        if criar:
+            with self._conexao() as conexao:
+                conexao.executescript(_SQL_CRIAR_TABELA_SQLITE)
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual, com linhas acessíveis por atributo como no pyodbc"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=db_config.TIMEOUT)
+            conexao.row_factory = _linha_sqlite
+            self._local.conexao = conexao
+        return conexao
+    
+    def carregar_anexos(self, num_solic: int) -> Tuple[Optional[AnexoTemporario], Optional[AnexoTemporario]]:
+        """
+        Busca os anexos da última versão da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+        
+        Returns:
+            Tupla (arquivo_apolice, arquivo_especificacao) como arquivos temporários
+        """
+        with self._lock:
+            self._carregamentos += 1
+        
+        query = f"""
+        SELECT anexo.num_solic, anexo.num_hist_solic, anexo.num_seq, anexo.nom_arquivo,
+               length(anexo.arq_anexo_base64) AS tamanho_base64
+        FROM tb_solic_cotacao_anexo anexo
+        WHERE anexo.num_solic = ?
+          AND {FILTRO_NOMES}
+          AND anexo.num_hist_solic = (
+                SELECT MAX(t.num_hist_solic)
+                FROM tb_solic_cotacao_anexo t
+                WHERE t.num_solic = anexo.num_solic
+          )
+        ORDER BY anexo.num_seq ASC;
+        """
+        rows = self._conexao().execute(query, (num_solic,)).fetchall()
+        logger.info(f"{len(rows)} anexos retornados da base SQLite.")
+        
+        arquivos = escolher_anexos(candidatos_por_tipo(rows), self._buscar_conteudos)
+        return (
+            arquivos["apolice"][1] if "apolice" in arquivos else None,
+            arquivos["especificacao"][1] if "especificacao" in arquivos else None
+        )
+    
+    def _buscar_conteudos(self, rows: list) -> Dict[int, str]:
+        """Lê o base64 dos anexos escolhidos de uma mesma solicitação"""
+        marcadores = ", ".join("?" for _ in rows)
+        query = f"""
+        SELECT anexo.num_seq, anexo.arq_anexo_base64
+        FROM tb_solic_cotacao_anexo anexo
+        WHERE anexo.num_solic = ?
+          AND anexo.num_hist_solic = ?
+          AND anexo.num_seq IN ({marcadores});
+        """
+        params = (rows[0].num_solic, rows[0].num_hist_solic, *(row.num_seq for row in rows))
+        return {
+            conteudo.num_seq: conteudo.arq_anexo_base64
+            for conteudo in self._conexao().execute(query, params)
+        }
+    
+    def listar_solicitacoes(self) -> List[int]:
+        """
+        Lista as solicitações presentes na tabela
+        
+        Returns:
+            Números das solicitações em ordem crescente
+        """
+        rows = self._conexao().execute(
+            "SELECT DISTINCT num_solic FROM tb_solic_cotacao_anexo ORDER BY num_solic"
+        ).fetchall()
+        return [row.num_solic for row in rows]
+    
+    def gravar_anexo(
+        self,
+        num_solic: int,
+        nome: str,
+        conteudo: bytes,
+        num_hist_solic: int = 1,
+        num_seq: int = None
+    ):
+        """
+        Grava um anexo na tabela, codificado em base64 como no SQL Server
+        
+        Args:
+            num_solic: Número da solicitação
+            nome: Nome do arquivo
+            conteudo: Bytes do anexo
+            num_hist_solic: Versão da solicitação
+            num_seq: Sequência do anexo (opcional, usa a próxima livre)
+        """
+        with self._conexao() as conexao:
+            if num_seq is None:
+                num_seq = conexao.execute(
+                    "SELECT COALESCE(MAX(num_seq), 0) + 1 AS num_seq FROM tb_solic_cotacao_anexo "
+                    "WHERE num_solic = ? AND num_hist_solic = ?",
+                    (num_solic, num_hist_solic)
+                ).fetchone().num_seq
+            conexao.execute(
+                "INSERT OR REPLACE INTO tb_solic_cotacao_anexo "
+                "(num_solic, num_hist_solic, num_seq, nom_arquivo, arq_anexo_base64) VALUES (?, ?, ?, ?, ?)",
+                (num_solic, num_hist_solic, num_seq, nome, base64.b64encode(conteudo).decode("ascii"))
+            )
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores da fonte
+        
+        Returns:
+            Dicionário com o arquivo e o número de carregamentos
+        """
+        with self._lock:
+            return {"caminho": self.caminho, "carregamentos": self._carregamentos}
+
+
+def _linha_sqlite(cursor: sqlite3.Cursor, valores: tuple) -> SimpleNamespace:
+    """Converte uma linha do SQLite em objeto com as colunas como atributos"""
+    return SimpleNamespace(**{coluna[0]: valor for coluna, valor in zip(cursor.description, valores)})
+
+
+def criar_fonte_anexos(tipo: str = None, caminho: str = None) -> FonteAnexos:
+    """
+    Cria a fonte de anexos configurada
+    
+    Args:
+        tipo: "odbc", "diretorio" ou "sqlite" (opcional, usa attachment_source_config.TYPE)
+        caminho: String de conexão, diretório ou arquivo SQLite, conforme o
+            tipo (opcional, usa a configuração)
+    
+    Returns:
+        Fonte de anexos
+    
+    Raises:
+        ValueError: Se o tipo for desconhecido
+    """
+    tipo = tipo or attachment_source_config.TYPE
+    
+    if tipo == "diretorio":
+        return FonteAnexosDiretorio(caminho)
+    if tipo == "sqlite":
+        return FonteAnexosSQLite(caminho)
+    if tipo == "odbc":
+        # Importado aqui para que as fontes locais não exijam o driver ODBC
+        from services.database_service import DatabaseService
+        return DatabaseService(caminho)
+    raise ValueError(f"Fonte de anexos desconhecida: {tipo}")
+
+
+def exportar_anexos(
+    origem: FonteAnexos,
+    destino: FonteAnexos,
+    nums_solic: Iterable[int]
+) -> int:
+    """
+    Copia a apólice e a especificação escolhidas de cada solicitação para outra fonte
+    
+    Serve para montar, a partir da base, um corpus local (diretório ou
+    SQLite) usado em benchmarks e reprocessamentos offline.
+    
+    Args:
+        origem: Fonte lida (ex.: DatabaseService)
+        destino: FonteAnexosDiretorio ou FonteAnexosSQLite
+        nums_solic: Números das solicitações
+    
+    Returns:
+        Número de anexos gravados
+    """
+    gravados = 0
+    for num_solic, *arquivos in origem.carregar_anexos_em_lote(nums_solic):
+        for arquivo in arquivos:
+            if arquivo is None:
+                continue
+            try:
+                destino.gravar_anexo(num_solic, os.path.basename(arquivo.name), arquivo.read())
+                gravados += 1
+            finally:
+                arquivo.close()
+    
+    logger.info(f"{gravados} anexos exportados")
+    return gravados
+
+
+def nome_anexo(row) -> str:
+    """Nome do arquivo do anexo em maiúsculas"""
+    return (getattr(row, "nom_arquivo", "") or "").upper()
+
+
+def classificar_anexo(
+    nome: str,
+    tem_apolice: bool,
+    tem_especificacao: bool
+) -> Optional[str]:
+    """
+    Indica qual arquivo ainda vazio o anexo preenche
+    
+    Args:
+        nome: Nome do arquivo em maiúsculas
+        tem_apolice: Se a apólice já foi escolhida
+        tem_especificacao: Se a especificação já foi escolhida
+    
+    Returns:
+        "apolice", "especificacao" ou None se o anexo não for usado
+    """
+    if "ESPEC" in nome and not tem_especificacao:
+        return "especificacao"
+    if (("AP" in nome and "LICE" in nome and nome.endswith(".PDF"))
+            or "FRONT" in nome) and not tem_apolice:
+        return "apolice"
+    return None
+
+
+def _tamanho_aceito(nome: str, tamanho_base64: Optional[int]) -> bool:
+    """
+    Confere pelo tamanho do base64 se o anexo cabe no limite, sem baixá-lo
+    
+    Args:
+        nome: Nome do arquivo em maiúsculas
+        tamanho_base64: Caracteres base64 (None se desconhecido)
+    
+    Returns:
+        False se o anexo é vazio ou certamente maior que o máximo
+    """
+    if tamanho_base64 is None:
+        return True
+    if tamanho_base64 == 0:
+        return False
+    
+    # Desconta o padding máximo: só recusa o que certamente excede
+    estimated_size = (tamanho_base64 * 3) // 4 - 2
+    max_size = app_config.MAX_FILE_SIZE_MB * 1024 * 1024
+    if estimated_size > max_size:
+        logger.error(
+            f"Anexo {nome} excede tamanho máximo estimado "
+            f"({estimated_size} bytes > {max_size} bytes)"
+        )
+        return False
+    return True
+
+
+def candidatos_por_tipo(rows) -> Dict[str, list]:
+    """
+    Ordena os anexos de uma solicitação como candidatos a cada tipo
+    
+    O primeiro candidato de cada tipo é o que a classificação sequencial
+    escolheria; os seguintes só são usados se ele não puder ser decodificado.
+    
+    Args:
+        rows: Linhas de metadados em ordem de num_seq
+    
+    Returns:
+        Dicionário {"apolice": [...], "especificacao": [...]}
+    """
+    candidatos = {"apolice": [], "especificacao": []}
+    
+    for row in rows:
+        nome = nome_anexo(row)
+        if not _tamanho_aceito(nome, getattr(row, "tamanho_base64", None)):
+            continue
+        
+        tipo = (
+            classificar_anexo(nome, bool(candidatos["apolice"]), bool(candidatos["especificacao"]))
+            or classificar_anexo(nome, False, False)
+        )
+        if tipo is not None:
+            candidatos[tipo].append(row)
+    
+    return candidatos
+
+
+def escolher_anexos(
+    candidatos: Dict[str, list],
+    buscar_conteudos: Callable[[list], Dict[int, Any]]
+) -> Dict[str, Tuple[int, AnexoTemporario]]:
+    """
+    Baixa e decodifica o primeiro candidato de cada tipo
+    
+    Cada rodada busca numa só chamada o próximo candidato dos tipos ainda
+    sem arquivo; se um conteúdo não puder ser decodificado, o candidato
+    seguinte do mesmo tipo entra na próxima rodada.
+    
+    Args:
+        candidatos: Resultado de candidatos_por_tipo
+        buscar_conteudos: Função que recebe as linhas escolhidas e devolve
+            um dicionário num_seq -> conteúdo base64
+    
+    Returns:
+        Dicionário tipo -> (num_seq, arquivo)
+    """
+    arquivos: Dict[str, Tuple[int, AnexoTemporario]] = {}
+    
+    for rodada in range(max((len(lista) for lista in candidatos.values()), default=0)):
+        escolhidos = {
+            tipo: lista[rodada]
+            for tipo, lista in candidatos.items()
+            if tipo not in arquivos and rodada < len(lista)
+        }
+        if not escolhidos:
+            break
+        
+        conteudos = buscar_conteudos(list(escolhidos.values()))
+        for tipo, row in escolhidos.items():
+            # Retira o base64 do dicionário para liberá-lo logo após decodificar
+            arquivo = decodificar_anexo(nome_anexo(row), conteudos.pop(row.num_seq, None))
+            if arquivo is not None:
+                arquivos[tipo] = (row.num_seq, arquivo)
+                registrar_escolha(tipo, arquivo.name)
+    
+    return arquivos
+
+
+def decodificar_anexo(nome: str, b64_data) -> Optional[AnexoTemporario]:
+    """
+    Decodifica o base64 de um anexo respeitando o tamanho máximo
+    
+    A decodificação é feita em partes direto num arquivo temporário que fica
+    em memória até db_config.SPOOL_MAX_MEMORY_MB e depois passa para disco,
+    sem cópias inteiras intermediárias do conteúdo.
+    
+    Args:
+        nome: Nome do arquivo em maiúsculas
+        b64_data: Conteúdo base64 (str ou bytes)
+    
+    Returns:
+        Arquivo temporário posicionado no início, ou None se vazio, grande
+        demais ou inválido
+    """
+    if not b64_data:
+        return None
+    
+    padding = b64_data[-2:].count(b"=" if isinstance(b64_data, bytes) else "=")
+    estimated_size = (len(b64_data) * 3) // 4 - padding
+    max_size = app_config.MAX_FILE_SIZE_MB * 1024 * 1024
+    if estimated_size > max_size:
+        logger.error(
+            f"Anexo {nome} excede tamanho máximo estimado "
+            f"({estimated_size} bytes > {max_size} bytes)"
+        )
+        return None
+    
+    arquivo = AnexoTemporario(nome or "anexo.pdf", db_config.SPOOL_MAX_MEMORY_MB * 1024 * 1024)
+    try:
+        decodificar_base64_em_partes(b64_data, arquivo)
+    except Exception as e:
+        arquivo.close()
+        logger.error(f"Falha ao decodificar base64 de {nome}: {e}")
+        return None
+    
+    arquivo.seek(0)
+    return arquivo
+
+
+def registrar_escolha(tipo: str, nome: str):
+    """Registra no log o anexo escolhido para o tipo"""
+    if tipo == "especificacao":
+        logger.info(f"Especificação encontrada: {nome}")
+    else:
+        logger.info(f"Apólice encontrada: {nome}")
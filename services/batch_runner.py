@@ -0,0 +1,337 @@
+"""
+Processamento em lote de solicitações, sem interface, com checkpoint retomável
+"""
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List
+from config.settings import batch_config
+from services.pdf_processor import PDFProcessor
+from services.pipeline import AnexosNaoEncontrados, processar_solicitacao
+
+logger = logging.getLogger(__name__)
+
+# Status registrados por solicitação
+STATUS_OK = "ok"
+STATUS_INCOMPLETO = "incompleto"
+STATUS_SEM_ANEXOS = "sem_anexos"
+STATUS_ERRO = "erro"
+
+# Status que só são reprocessados com repetir_falhas
+STATUS_FALHA = (STATUS_INCOMPLETO, STATUS_ERRO)
+
+COLUNAS_RELATORIO = ("num_solic", "status", "caminho_arquivo", "duracao_s", "erro", "data")
+
+
+def ler_numeros(
+    nums: Iterable[str] = None,
+    arquivo: str = None,
+    intervalo: str = None
+) -> List[int]:
+    """
+    Monta a lista de solicitações a partir de números avulsos, arquivo e intervalo
+    
+    Args:
+        nums: Números avulsos; cada item pode ter vários separados por vírgula (opcional)
+        arquivo: Arquivo com um número por linha; linhas vazias e iniciadas
+            por "#" são ignoradas (opcional)
+        intervalo: Intervalo inclusivo "inicio-fim" (opcional)
+    
+    Returns:
+        Números na ordem informada, sem repetições
+    
+    Raises:
+        ValueError: Se algum número ou o intervalo for inválido
+    """
+    numeros: List[int] = []
+    
+    for item in nums or []:
+        numeros.extend(int(parte) for parte in str(item).split(",") if parte.strip())
+    
+    if arquivo:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.split("#", 1)[0].strip()
+                if linha:
+                    numeros.append(int(linha))
+    
+    if intervalo:
+        inicio, _, fim = intervalo.partition("-")
+        inicio, fim = int(inicio), int(fim or inicio)
+        if fim < inicio:
+            raise ValueError(f"Intervalo inválido: {intervalo}")
+        numeros.extend(range(inicio, fim + 1))
+    
+    return list(dict.fromkeys(numeros))
+
+
+class CheckpointLote:
+    """
+    Arquivo JSONL com o status de cada solicitação processada
+    
+    Cada solicitação concluída acrescenta uma linha, gravada e descarregada
+    logo em seguida; uma execução interrompida perde no máximo as
+    solicitações em andamento. Na leitura, vale a última linha de cada
+    solicitação e uma linha final truncada é ignorada.
+    """
+    
+    def __init__(self, caminho: str = None):
+        """
+        Inicializa o checkpoint
+        
+        Args:
+            caminho: Arquivo JSONL (opcional, usa batch_config.CHECKPOINT_PATH)
+        """
+        self.caminho = caminho or batch_config.CHECKPOINT_PATH
+        self._lock = threading.Lock()
+    
+    def carregar(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Lê o último registro de cada solicitação
+        
+        Returns:
+            Dicionário num_solic -> registro (vazio se o arquivo não existir)
+        """
+        registros: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.caminho):
+            return registros
+        
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    logger.warning(f"Linha inválida ignorada no checkpoint {self.caminho}")
+                    continue
+                registros[int(registro["num_solic"])] = registro
+        return registros
+    
+    def registrar(self, registro: Dict[str, Any]):
+        """
+        Acrescenta o registro de uma solicitação
+        
+        Só as colunas do relatório são gravadas (o JSON final fica de fora).
+        
+        Args:
+            registro: Dicionário com num_solic, status e demais campos do relatório
+        """
+        registro = {coluna: valor for coluna, valor in registro.items() if coluna in COLUNAS_RELATORIO}
+        linha = json.dumps(registro, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+                f.flush()
+
+
+@dataclass
+class ProgressoLote:
+    """Contadores de um lote em andamento"""
+    total: int
+    ignoradas: int = 0
+    por_status: Dict[str, int] = field(default_factory=dict)
+    inicio: float = field(default_factory=time.monotonic)
+    
+    @property
+    def concluidas(self) -> int:
+        return sum(self.por_status.values())
+    
+    def resumo(self) -> str:
+        """
+        Linha de progresso com contagem por status, vazão e tempo restante estimado
+        
+        Returns:
+            Texto pronto para log
+        """
+        decorrido = time.monotonic() - self.inicio
+        concluidas = self.concluidas
+        vazao = concluidas * 60 / decorrido if decorrido else 0.0
+        restantes = self.total - concluidas
+        estimativa = f"{restantes / vazao:.0f} min" if vazao else "-"
+        contagens = ", ".join(f"{status} {quantidade}" for status, quantidade in sorted(self.por_status.items()))
+        return (
+            f"{concluidas}/{self.total} concluídas ({contagens or 'nenhuma'}) | "
+            f"{vazao:.1f}/min | restante estimado: {estimativa}"
+        )
+
+
+def processar_uma(
+    num_solic: int,
+    fonte,
+    processor: PDFProcessor,
+    diretorio_saida: str = None,
+    ao_iniciar_etapa: Callable = None,
+    ao_receber_item: Callable = None
+) -> Dict[str, Any]:
+    """
+    Processa uma solicitação e monta seu registro de status
+    
+    Erros não são propagados: viram o status "erro" com a mensagem.
+    
+    Args:
+        num_solic: Número da solicitação
+        fonte: Fonte de anexos (FonteAnexos ou equivalente)
+        processor: Processador de PDFs
+        diretorio_saida: Diretório dos JSONs (opcional)
+        ao_iniciar_etapa: Repassada a processar_solicitacao (opcional)
+        ao_receber_item: Repassada a processar_solicitacao (opcional)
+    
+    Returns:
+        Registro com num_solic, status, caminho_arquivo, duracao_s, erro, data
+        e final_json (o JSON gerado, que não vai para o checkpoint)
+    """
+    inicio = time.monotonic()
+    registro = {
+        "num_solic": num_solic,
+        "status": STATUS_OK,
+        "caminho_arquivo": None,
+        "erro": None,
+        "final_json": None
+    }
+    
+    try:
+        resultado = processar_solicitacao(
+            num_solic,
+            fonte,
+            processor,
+            diretorio_saida,
+            ao_iniciar_etapa=ao_iniciar_etapa,
+            ao_receber_item=ao_receber_item
+        )
+        registro["caminho_arquivo"] = resultado.caminho_arquivo
+        registro["final_json"] = resultado.final_json
+        if resultado.incompleto:
+            registro["status"] = STATUS_INCOMPLETO
+    except AnexosNaoEncontrados as e:
+        registro["status"] = STATUS_SEM_ANEXOS
+        registro["erro"] = str(e)
+    except Exception as e:
+        logger.error(f"Solicitação {num_solic} falhou: {e}")
+        registro["status"] = STATUS_ERRO
+        registro["erro"] = f"{type(e).__name__}: {e}"
+    
+    registro["duracao_s"] = round(time.monotonic() - inicio, 3)
+    registro["data"] = datetime.now().isoformat(timespec="seconds")
+    return registro
+
+
+def processar_lote(
+    nums_solic: List[int],
+    fonte,
+    processor: PDFProcessor,
+    checkpoint: CheckpointLote,
+    concorrencia: int = None,
+    diretorio_saida: str = None,
+    repetir_falhas: bool = False,
+    intervalo_progresso: float = None,
+    parar: threading.Event = None,
+    ao_concluir: Callable = None
+) -> ProgressoLote:
+    """
+    Processa várias solicitações em paralelo, retomando do checkpoint
+    
+    Solicitações já registradas no checkpoint são puladas (as com status
+    incompleto ou erro são refeitas se repetir_falhas). No máximo
+    concorrencia solicitações ficam em andamento; as demais só são
+    submetidas quando uma termina, então um sinal em parar interrompe o
+    lote sem perder as concluídas.
+    
+    Args:
+        nums_solic: Números das solicitações, na ordem de processamento
+        fonte: Fonte de anexos (FonteAnexos ou equivalente)
+        processor: Processador de PDFs compartilhado
+        checkpoint: Checkpoint lido no início e atualizado a cada solicitação
+        concorrencia: Solicitações simultâneas (opcional, usa batch_config.CONCURRENCY)
+        diretorio_saida: Diretório dos JSONs (opcional)
+        repetir_falhas: Refaz solicitações registradas como incompleto ou erro
+        intervalo_progresso: Segundos entre linhas de progresso no log
+            (opcional, usa batch_config.PROGRESS_INTERVAL)
+        parar: Evento que interrompe o envio de novas solicitações (opcional)
+        ao_concluir: Função chamada com o registro de cada solicitação (opcional)
+    
+    Returns:
+        Progresso final com as contagens por status
+    """
+    concorrencia = concorrencia or batch_config.CONCURRENCY
+    intervalo_progresso = (
+        batch_config.PROGRESS_INTERVAL if intervalo_progresso is None else intervalo_progresso
+    )
+    
+    anteriores = checkpoint.carregar()
+    pendentes = [
+        n for n in nums_solic
+        if n not in anteriores or (repetir_falhas and anteriores[n]["status"] in STATUS_FALHA)
+    ]
+    progresso = ProgressoLote(total=len(pendentes), ignoradas=len(nums_solic) - len(pendentes))
+    if progresso.ignoradas:
+        logger.info(f"{progresso.ignoradas} solicitações já registradas em {checkpoint.caminho} foram puladas")
+    logger.info(f"Processando {progresso.total} solicitações com concorrência {concorrencia}")
+    
+    fila = iter(pendentes)
+    ultimo_log = time.monotonic()
+    
+    with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="lote") as executor:
+        em_andamento = set()
+        
+        def submeter():
+            while len(em_andamento) < concorrencia and not (parar is not None and parar.is_set()):
+                num_solic = next(fila, None)
+                if num_solic is None:
+                    return
+                em_andamento.add(executor.submit(processar_uma, num_solic, fonte, processor, diretorio_saida))
+        
+        submeter()
+        while em_andamento:
+            concluidos, _ = wait(em_andamento, timeout=intervalo_progresso or None, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                em_andamento.discard(futuro)
+                registro = futuro.result()
+                checkpoint.registrar(registro)
+                progresso.por_status[registro["status"]] = progresso.por_status.get(registro["status"], 0) + 1
+                if ao_concluir:
+                    ao_concluir(registro)
+            
+            if intervalo_progresso and time.monotonic() - ultimo_log >= intervalo_progresso:
+                logger.info(progresso.resumo())
+                ultimo_log = time.monotonic()
+            submeter()
+    
+    if parar is not None and parar.is_set():
+        logger.warning(f"Lote interrompido; retome com o mesmo checkpoint ({checkpoint.caminho})")
+    logger.info(progresso.resumo())
+    return progresso
+
+
+def gravar_relatorio(
+    registros: Dict[int, Dict[str, Any]],
+    caminho: str,
+    nums_solic: Iterable[int] = None
+) -> str:
+    """
+    Grava o status de cada solicitação em CSV
+    
+    Args:
+        registros: Registros por solicitação (ex.: CheckpointLote.carregar())
+        caminho: Arquivo CSV de saída
+        nums_solic: Restringe e ordena o relatório a essas solicitações (opcional)
+    
+    Returns:
+        Caminho do arquivo gravado
+    """
+    nums = list(nums_solic) if nums_solic is not None else sorted(registros)
+    
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_RELATORIO, extrasaction="ignore")
+        escritor.writeheader()
+        for num_solic in nums:
+            escritor.writerow(registros.get(num_solic, {"num_solic": num_solic, "status": "pendente"}))
+    
+    logger.info(f"Relatório de status salvo em: {caminho}")
+    return caminho
@@ -0,0 +1,460 @@
+"""
+Caches persistentes em disco para extrações do Gemini e anexos do banco
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from config.settings import cache_config
+from utils.json_rapido import carregar_json
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando o formato das entradas mudar, invalidando o cache antigo
+VERSAO_CACHE = 1
+
+# Bytes lidos por vez ao calcular o hash e copiar anexos
+_TAMANHO_BLOCO = 1024 * 1024
+
+
+class ExtractionCache:
+    """Cache de respostas do Gemini endereçado pelo conteúdo da requisição"""
+    
+    def __init__(
+        self,
+        diretorio: str = None,
+        tamanho_maximo_mb: int = None,
+        idade_maxima_horas: int = None
+    ):
+        """
+        Inicializa o cache
+        
+        Args:
+            diretorio: Diretório onde as entradas são gravadas (opcional)
+            tamanho_maximo_mb: Tamanho total máximo do cache em MB (opcional)
+            idade_maxima_horas: Idade máxima de uma entrada em horas (opcional)
+        """
+        self.diretorio = diretorio or cache_config.EXTRACTION_DIR
+        self.tamanho_maximo = (
+            tamanho_maximo_mb or cache_config.EXTRACTION_MAX_MB
+        ) * 1024 * 1024
+        self.idade_maxima = (
+            idade_maxima_horas or cache_config.EXTRACTION_MAX_AGE_HOURS
+        ) * 3600
+        
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.gravacoes = 0
+        self.remocoes = 0
+        
+        os.makedirs(self.diretorio, exist_ok=True)
+    
+    @staticmethod
+    def gerar_chave(
+        hash_arquivo: str,
+        prompt: str,
+        modelo: str,
+        temperatura: float
+    ) -> str:
+        """
+        Gera a chave do cache a partir do conteúdo da requisição
+        
+        Args:
+            hash_arquivo: SHA-256 hexadecimal dos bytes do documento
+            prompt: Texto do prompt
+            modelo: Nome do modelo
+            temperatura: Temperatura de geração
+        
+        Returns:
+            Hash SHA-256 hexadecimal da combinação
+        """
+        hash_prompt = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = f"{VERSAO_CACHE}|{hash_arquivo}|{hash_prompt}|{modelo}|{temperatura!r}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def _caminho(self, chave: str) -> str:
+        """Retorna o caminho do arquivo de uma entrada"""
+        return os.path.join(self.diretorio, f"{chave}.json")
+    
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma entrada no cache
+        
+        Args:
+            chave: Chave gerada por gerar_chave
+        
+        Returns:
+            Dicionário armazenado ou None se ausente/expirado
+        """
+        caminho = self._caminho(chave)
+        dados = None
+        
+        try:
+            if time.time() - os.path.getmtime(caminho) > self.idade_maxima:
+                self._remover(caminho)
+            else:
+                with open(caminho, "rb") as f:
+                    dados = carregar_json(f.read())
+                # Atualiza o mtime para que a remoção siga a ordem LRU
+                os.utime(caminho, None)
+        except (OSError, ValueError):
+            dados = None
+        
+        with self._lock:
+            if dados is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return dados
+    
+    def salvar(self, chave: str, dados: Dict[str, Any]):
+        """
+        Grava uma entrada no cache e aplica a política de remoção
+        
+        Args:
+            chave: Chave gerada por gerar_chave
+            dados: Dicionário a ser armazenado
+        """
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar entrada no cache: {e}")
+            self._remover(temporario)
+            return
+        
+        with self._lock:
+            self.gravacoes += 1
+        
+        self._aplicar_limites()
+    
+    def _aplicar_limites(self):
+        """Remove entradas expiradas e as menos usadas até caber no limite"""
+        agora = time.time()
+        entradas = []
+        
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith(".json"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            if agora - info.st_mtime > self.idade_maxima:
+                self._remover(caminho)
+            else:
+                entradas.append((info.st_mtime, info.st_size, caminho))
+        
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.tamanho_maximo:
+                break
+            self._remover(caminho)
+            total -= tamanho
+    
+    def _remover(self, caminho: str):
+        """Remove um arquivo do cache ignorando arquivos já removidos"""
+        try:
+            os.remove(caminho)
+        except OSError:
+            return
+        
+        if caminho.endswith(".json"):
+            with self._lock:
+                self.remocoes += 1
+    
+    def limpar(self):
+        """Remove todas as entradas do cache"""
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".json"):
+                self._remover(os.path.join(self.diretorio, nome))
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do cache
+        
+        Returns:
+            Dicionário com hits, misses, gravações, remoções e taxa de acerto
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "gravacoes": self.gravacoes,
+                "remocoes": self.remocoes,
+                "taxa_acerto": self.hits / consultas if consultas else 0.0
+            }
+
+
+class ArquivoAnexo(io.FileIO):
+    """Arquivo local (cache ou fonte de anexos) aberto para leitura com o nome original do anexo"""
+    
+    def __init__(self, caminho: str, nome: str):
+        """
+        Abre o arquivo
+        
+        Args:
+            caminho: Caminho do conteúdo no cache
+            nome: Nome original do anexo
+        """
+        super().__init__(caminho, "rb")
+        self.name = nome
+
+
+class AttachmentCache:
+    """
+    Cache em disco dos anexos decodificados, por versão da solicitação
+    
+    O índice de cada (num_solic, num_hist_solic) guarda num_seq, nome e hash
+    dos anexos escolhidos; o conteúdo é gravado uma vez por hash SHA-256,
+    compartilhado entre solicitações com o mesmo arquivo. Conteúdos são
+    removidos pelo menos recentemente usado ao passar do tamanho máximo.
+    """
+    
+    def __init__(self, diretorio: str = None, tamanho_maximo_mb: int = None):
+        """
+        Inicializa o cache
+        
+        Args:
+            diretorio: Diretório do cache (opcional)
+            tamanho_maximo_mb: Tamanho total máximo dos conteúdos em MB (opcional)
+        """
+        self.diretorio = diretorio or cache_config.ATTACHMENTS_DIR
+        self.tamanho_maximo = (
+            tamanho_maximo_mb or cache_config.ATTACHMENTS_MAX_MB
+        ) * 1024 * 1024
+        self._diretorio_indice = os.path.join(self.diretorio, "indice")
+        self._diretorio_conteudo = os.path.join(self.diretorio, "conteudo")
+        
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.gravacoes = 0
+        self.deduplicados = 0
+        self.remocoes = 0
+        
+        os.makedirs(self._diretorio_indice, exist_ok=True)
+        os.makedirs(self._diretorio_conteudo, exist_ok=True)
+    
+    def _caminho_indice(self, num_solic: int, num_hist_solic: int) -> str:
+        """Retorna o caminho do índice de uma versão da solicitação"""
+        return os.path.join(self._diretorio_indice, f"{num_solic}_{num_hist_solic}.json")
+    
+    def _caminho_conteudo(self, hash_conteudo: str) -> str:
+        """Retorna o caminho de um conteúdo"""
+        return os.path.join(self._diretorio_conteudo, f"{hash_conteudo}.pdf")
+    
+    def obter(self, num_solic: int, num_hist_solic: int) -> Optional[Dict[str, ArquivoAnexo]]:
+        """
+        Busca os anexos de uma versão da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+            num_hist_solic: Versão atual da solicitação
+        
+        Returns:
+            Dicionário tipo -> arquivo aberto ("apolice", "especificacao"), ou
+            None se a versão não estiver no cache ou algum conteúdo tiver sido
+            removido
+        """
+        caminho_indice = self._caminho_indice(num_solic, num_hist_solic)
+        arquivos: Dict[str, ArquivoAnexo] = {}
+        
+        try:
+            with open(caminho_indice, "rb") as f:
+                indice = carregar_json(f.read())
+            for anexo in indice["anexos"]:
+                caminho = self._caminho_conteudo(anexo["hash"])
+                arquivos[anexo["tipo"]] = ArquivoAnexo(caminho, anexo["nome"])
+                # Atualiza o mtime para que a remoção siga a ordem LRU
+                os.utime(caminho, None)
+        except (OSError, ValueError, KeyError, TypeError):
+            for arquivo in arquivos.values():
+                arquivo.close()
+            arquivos = None
+            if os.path.exists(caminho_indice):
+                # Conteúdo removido pelo limite de tamanho: o índice não serve mais
+                self._remover(caminho_indice)
+        
+        with self._lock:
+            if arquivos is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return arquivos
+    
+    def salvar(self, num_solic: int, num_hist_solic: int, anexos: Dict[str, Tuple[int, Any]]):
+        """
+        Grava os anexos de uma versão da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+            num_hist_solic: Versão dos anexos
+            anexos: Dicionário tipo -> (num_seq, arquivo); os arquivos são
+                rebobinados ao final
+        """
+        entradas = []
+        
+        try:
+            for tipo, (num_seq, arquivo) in anexos.items():
+                entradas.append({
+                    "tipo": tipo,
+                    "num_seq": num_seq,
+                    "nome": arquivo.name,
+                    "hash": self._gravar_conteudo(arquivo)
+                })
+            
+            caminho = self._caminho_indice(num_solic, num_hist_solic)
+            temporario = f"{caminho}.{threading.get_ident()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"anexos": entradas}, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar anexos no cache: {e}")
+            return
+        
+        with self._lock:
+            self.gravacoes += 1
+        
+        self._aplicar_limites()
+    
+    def _gravar_conteudo(self, arquivo) -> str:
+        """
+        Grava o conteúdo do arquivo pelo hash, se ainda não existir
+        
+        Args:
+            arquivo: Arquivo aberto para leitura binária
+        
+        Returns:
+            Hash SHA-256 hexadecimal do conteúdo
+        """
+        arquivo.seek(0)
+        hash_conteudo = hashlib.sha256()
+        for bloco in iter(lambda: arquivo.read(_TAMANHO_BLOCO), b""):
+            hash_conteudo.update(bloco)
+        hash_conteudo = hash_conteudo.hexdigest()
+        
+        caminho = self._caminho_conteudo(hash_conteudo)
+        if os.path.exists(caminho):
+            os.utime(caminho, None)
+            with self._lock:
+                self.deduplicados += 1
+        else:
+            arquivo.seek(0)
+            temporario = f"{caminho}.{threading.get_ident()}.tmp"
+            try:
+                with open(temporario, "wb") as f:
+                    for bloco in iter(lambda: arquivo.read(_TAMANHO_BLOCO), b""):
+                        f.write(bloco)
+                os.replace(temporario, caminho)
+            except OSError:
+                self._remover(temporario)
+                raise
+        
+        arquivo.seek(0)
+        return hash_conteudo
+    
+    def _aplicar_limites(self):
+        """Remove os conteúdos menos usados até caber no limite"""
+        entradas = []
+        
+        for nome in os.listdir(self._diretorio_conteudo):
+            if not nome.endswith(".pdf"):
+                continue
+            caminho = os.path.join(self._diretorio_conteudo, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+        
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.tamanho_maximo:
+                break
+            self._remover(caminho)
+            total -= tamanho
+    
+    def _remover(self, caminho: str):
+        """Remove um arquivo do cache ignorando arquivos já removidos"""
+        try:
+            os.remove(caminho)
+        except OSError:
+            return
+        
+        if caminho.endswith(".pdf"):
+            with self._lock:
+                self.remocoes += 1
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do cache
+        
+        Returns:
+            Dicionário com hits, misses, gravações, conteúdos deduplicados,
+            remoções e taxa de acerto
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "gravacoes": self.gravacoes,
+                "deduplicados": self.deduplicados,
+                "remocoes": self.remocoes,
+                "taxa_acerto": self.hits / consultas if consultas else 0.0
+            }
+
+
+_cache_global: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_extracoes() -> Optional[ExtractionCache]:
+    """
+    Retorna o cache de extrações compartilhado pelo processo
+    
+    Returns:
+        Instância única do cache ou None se o cache estiver desabilitado
+    """
+    global _cache_global
+    
+    if not cache_config.ENABLED:
+        return None
+    
+    with _cache_lock:
+        if _cache_global is None:
+            _cache_global = ExtractionCache()
+        return _cache_global
+
+
+_cache_anexos: Optional[AttachmentCache] = None
+
+
+def obter_cache_anexos() -> Optional[AttachmentCache]:
+    """
+    Retorna o cache de anexos compartilhado pelo processo
+    
+    Returns:
+        Instância única do cache ou None se o cache estiver desabilitado
+    """
+    global _cache_anexos
+    
+    if not (cache_config.ENABLED and cache_config.ATTACHMENTS_ENABLED):
+        return None
+    
+    with _cache_lock:
+        if _cache_anexos is None:
+            _cache_anexos = AttachmentCache()
+        return _cache_anexos
@@ -0,0 +1,300 @@
+"""
+Pool de conexões com o banco de dados compartilhado pelo processo
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from config.settings import db_config
+
+logger = logging.getLogger(__name__)
+
+
+def verificar_conexao(conexao) -> bool:
+    """
+    Confere se a conexão ainda responde com uma consulta trivial
+    
+    Args:
+        conexao: Conexão DB-API (ex.: pyodbc.Connection)
+    
+    Returns:
+        True se a consulta funcionou
+    """
+    try:
+        cursor = conexao.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+        return True
+    except Exception as e:
+        logger.warning(f"Conexão ociosa falhou na verificação: {e}")
+        return False
+
+
+class PoolConexoes:
+    """
+    Pool de conexões reaproveitadas entre consultas, sessões e workers
+    
+    Conexões ociosas há mais de verificar_apos segundos são verificadas antes
+    do empréstimo; as ociosas há mais de tempo_ocioso_maximo são fechadas,
+    mantendo pelo menos tamanho_minimo abertas. Uma conexão cujo uso termina
+    em exceção é descartada em vez de voltar ao pool; as demais voltam depois
+    de um rollback, sem transação aberta.
+    """
+    
+    def __init__(
+        self,
+        fabrica: Callable,
+        tamanho_minimo: int = None,
+        tamanho_maximo: int = None,
+        tempo_ocioso_maximo: float = None,
+        verificar_apos: float = None,
+        verificador: Callable = None
+    ):
+        """
+        Inicializa o pool
+        
+        Args:
+            fabrica: Função que abre uma nova conexão
+            tamanho_minimo: Conexões mantidas abertas mesmo ociosas (opcional)
+            tamanho_maximo: Número máximo de conexões abertas (opcional)
+            tempo_ocioso_maximo: Segundos ociosa antes de ser fechada (opcional)
+            verificar_apos: Segundos ociosa antes de exigir verificação (opcional)
+            verificador: Função que confere a conexão (opcional, usa verificar_conexao)
+        """
+        self.fabrica = fabrica
+        self.tamanho_maximo = tamanho_maximo or db_config.POOL_MAX_SIZE
+        self.tamanho_minimo = min(
+            db_config.POOL_MIN_SIZE if tamanho_minimo is None else tamanho_minimo,
+            self.tamanho_maximo
+        )
+        self.tempo_ocioso_maximo = (
+            db_config.POOL_IDLE_TIMEOUT if tempo_ocioso_maximo is None else tempo_ocioso_maximo
+        )
+        self.verificar_apos = (
+            db_config.POOL_HEALTHCHECK_AFTER if verificar_apos is None else verificar_apos
+        )
+        self.verificador = verificador or verificar_conexao
+        
+        # (conexão, instante em que foi devolvida); as mais recentes no fim
+        self._ociosas: List[Tuple[Any, float]] = []
+        self._em_uso = 0
+        self._abertas = 0
+        self._fechado = False
+        self._condicao = threading.Condition()
+        
+        self._emprestimos = 0
+        self._criadas = 0
+        self._descartadas = 0
+        self._falhas_verificacao = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+    
+    def aquecer(self, quantidade: int = None):
+        """
+        Abre conexões antecipadamente para evitar latência na primeira consulta
+        
+        Args:
+            quantidade: Conexões ociosas desejadas (opcional, usa o tamanho mínimo)
+        """
+        quantidade = min(quantidade or self.tamanho_minimo, self.tamanho_maximo)
+        
+        while True:
+            with self._condicao:
+                if (len(self._ociosas) >= quantidade
+                        or self._abertas >= self.tamanho_maximo or self._fechado):
+                    break
+                self._abertas += 1
+            
+            try:
+                conexao = self._abrir()
+            except Exception:
+                with self._condicao:
+                    self._abertas -= 1
+                    self._condicao.notify()
+                raise
+            
+            with self._condicao:
+                self._ociosas.append((conexao, time.monotonic()))
+                self._condicao.notify()
+        
+        logger.info(f"Pool de conexões aquecido: {self.estatisticas()}")
+    
+    @contextmanager
+    def adquirir(self, timeout: float = None):
+        """
+        Empresta uma conexão do pool, aguardando se todas estiverem em uso
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos (opcional, espera indefinidamente)
+        
+        Yields:
+            Conexão pronta para uso
+        
+        Raises:
+            TimeoutError: Se nenhuma conexão ficar livre dentro do timeout
+        """
+        conexao = self._retirar(timeout)
+        try:
+            yield conexao
+        except BaseException:
+            self._descartar(conexao)
+            raise
+        else:
+            self._devolver(conexao)
+    
+    def _retirar(self, timeout: Optional[float]):
+        """Retira uma conexão ociosa válida ou abre uma nova se houver espaço"""
+        inicio = time.monotonic()
+        prazo = None if timeout is None else inicio + timeout
+        
+        while True:
+            with self._condicao:
+                restante = None if prazo is None else max(prazo - time.monotonic(), 0)
+                disponivel = self._condicao.wait_for(
+                    lambda: self._fechado or self._ociosas or self._abertas < self.tamanho_maximo,
+                    timeout=restante
+                )
+                if self._fechado:
+                    raise RuntimeError("Pool de conexões fechado")
+                if not disponivel:
+                    raise TimeoutError("Nenhuma conexão com o banco disponível no pool")
+                
+                expiradas = self._remover_expiradas()
+                if self._ociosas:
+                    conexao, devolvida_em = self._ociosas.pop()
+                else:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._abertas += 1
+                    conexao, devolvida_em = None, None
+                self._em_uso += 1
+            
+            for expirada in expiradas:
+                self._fechar(expirada)
+            
+            if conexao is None:
+                try:
+                    conexao = self._abrir()
+                except Exception:
+                    with self._condicao:
+                        self._abertas -= 1
+                        self._em_uso -= 1
+                        self._condicao.notify()
+                    raise
+            elif (time.monotonic() - devolvida_em >= self.verificar_apos
+                    and not self.verificador(conexao)):
+                with self._condicao:
+                    self._falhas_verificacao += 1
+                self._descartar(conexao)
+                continue
+            
+            with self._condicao:
+                espera = time.monotonic() - inicio
+                self._emprestimos += 1
+                self._espera_total += espera
+                self._espera_maxima = max(self._espera_maxima, espera)
+            return conexao
+    
+    def _devolver(self, conexao):
+        """Encerra a transação implícita da conexão e a devolve ao pool"""
+        # pyodbc abre as conexões com autocommit=False: sem o rollback, a conexão
+        # ociosa manteria a transação (e as travas de leitura) aberta no servidor
+        try:
+            conexao.rollback()
+        except Exception as e:
+            logger.warning(f"Conexão descartada: falha ao encerrar a transação: {e}")
+            self._descartar(conexao)
+            return
+        
+        with self._condicao:
+            self._em_uso -= 1
+            if self._fechado:
+                self._abertas -= 1
+                fechar = [conexao]
+            else:
+                self._ociosas.append((conexao, time.monotonic()))
+                fechar = self._remover_expiradas()
+            self._condicao.notify()
+        
+        for conexao in fechar:
+            self._fechar(conexao)
+    
+    def _descartar(self, conexao):
+        """Fecha uma conexão emprestada e libera a vaga"""
+        with self._condicao:
+            self._em_uso -= 1
+            self._abertas -= 1
+            self._descartadas += 1
+            self._condicao.notify()
+        self._fechar(conexao)
+    
+    def _remover_expiradas(self) -> List[Any]:
+        """
+        Retira as ociosas há mais de tempo_ocioso_maximo (chamado com o lock)
+        
+        Returns:
+            Conexões a fechar depois de liberar o lock
+        """
+        agora = time.monotonic()
+        expiradas = []
+        while (self._ociosas and self._abertas > self.tamanho_minimo
+               and agora - self._ociosas[0][1] > self.tempo_ocioso_maximo):
+            conexao, _ = self._ociosas.pop(0)
+            self._abertas -= 1
+            self._descartadas += 1
+            expiradas.append(conexao)
+        return expiradas
+    
+    def _abrir(self):
+        """Abre uma conexão com a fábrica e contabiliza"""
+        conexao = self.fabrica()
+        with self._condicao:
+            self._criadas += 1
+        return conexao
+    
+    @staticmethod
+    def _fechar(conexao):
+        """Fecha a conexão ignorando erros de uma conexão já quebrada"""
+        try:
+            conexao.close()
+        except Exception as e:
+            logger.debug(f"Falha ao fechar conexão: {e}")
+    
+    def fechar(self):
+        """Fecha as conexões ociosas; as em uso são fechadas ao serem devolvidas"""
+        with self._condicao:
+            self._fechado = True
+            ociosas = [conexao for conexao, _ in self._ociosas]
+            self._ociosas.clear()
+            self._abertas -= len(ociosas)
+            self._condicao.notify_all()
+        
+        for conexao in ociosas:
+            self._fechar(conexao)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna o estado atual e os contadores do pool
+        
+        Returns:
+            Dicionário com conexões em uso, ociosas e abertas, limites,
+            empréstimos, conexões criadas e descartadas, falhas de verificação
+            e tempos de espera em segundos
+        """
+        with self._condicao:
+            return {
+                "em_uso": self._em_uso,
+                "ociosas": len(self._ociosas),
+                "abertas": self._abertas,
+                "tamanho_minimo": self.tamanho_minimo,
+                "tamanho_maximo": self.tamanho_maximo,
+                "emprestimos": self._emprestimos,
+                "criadas": self._criadas,
+                "descartadas": self._descartadas,
+                "falhas_verificacao": self._falhas_verificacao,
+                "espera_media_s": self._espera_total / self._emprestimos if self._emprestimos else 0.0,
+                "espera_maxima_s": self._espera_maxima
+            }
@@ -1,82 +1,275 @@
 """
 Serviço de acesso ao banco de dados
 """
+import asyncio
 import pyodbc
-import base64
 import logging
-from io import BytesIO
-from typing import Tuple, Optional
-from config.settings import db_config, app_config
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
+from config.settings import db_config
+from services.attachment_sources import (
+    FILTRO_NOMES,
+    FonteAnexos,
+    candidatos_por_tipo,
+    decodificar_anexo,
+    escolher_anexos,
+    nome_anexo
+)
+from services.cache_service import ArquivoAnexo, AttachmentCache, obter_cache_anexos
+from services.database_pool import PoolConexoes
+from utils.base64_incremental import AnexoTemporario
+from utils.retry import (
+    DisjuntorCircuito,
+    OperacaoCancelada,
+    PoliticaRetry,
+    executar_com_retry
+)
 
 logger = logging.getLogger(__name__)
 
+_executor_banco: Optional[ThreadPoolExecutor] = None
+_executor_banco_lock = threading.Lock()
 
-class DatabaseService:
-    """Serviço para operações no banco de dados"""
+# SQLSTATEs de falhas transitórias: conexão (classe 08), timeout (HYT00/HYT01),
+# deadlock ou serialização (40001) e transação revertida pelo servidor (40003)
+_SQLSTATES_TRANSITORIOS = ("08", "HYT00", "HYT01", "40001", "40003")
+
+# Erros nativos do SQL Server/Azure SQL que indicam indisponibilidade momentânea
+# (deadlock, failover, limite de recursos); o número vem entre parênteses na mensagem
+_ERROS_NATIVOS_TRANSITORIOS = ("(1205)", "(40197)", "(40501)", "(40613)", "(49918)", "(10928)", "(10929)")
+
+
+def eh_erro_banco_retentavel(erro: Exception) -> bool:
+    """
+    Indica se um erro do ODBC justifica nova tentativa
+    
+    Falhas de conexão, timeouts, deadlocks e failovers são transitórias;
+    erros de sintaxe (42xxx), permissão e login (28000), violação de
+    restrição (23xxx) e cancelamento (HY008) são fatais e não se repetem.
+    
+    Args:
+        erro: Exceção lançada pela consulta
+        
+    Returns:
+        True se a consulta deve ser repetida
+    """
+    if not isinstance(erro, pyodbc.Error):
+        return False
+    
+    sqlstate = str(erro.args[0]) if erro.args else ""
+    if sqlstate.startswith(_SQLSTATES_TRANSITORIOS):
+        return True
+    mensagem = " ".join(str(arg) for arg in erro.args[1:])
+    return any(codigo in mensagem for codigo in _ERROS_NATIVOS_TRANSITORIOS)
+
+
+class CancelamentoConsulta:
+    """Cancela, a partir de outra thread, as consultas de uma operação no banco"""
+    
+    def __init__(self):
+        self._evento = threading.Event()
+        self._cursor = None
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelado(self) -> bool:
+        return self._evento.is_set()
+    
+    @property
+    def evento(self) -> threading.Event:
+        """Evento sinalizado no cancelamento; interrompe a espera entre tentativas"""
+        return self._evento
     
-    def __init__(self, connection_string: str = None):
+    def cancelar(self):
+        """Impede novas consultas e interrompe a que estiver em andamento"""
+        self._evento.set()
+        with self._lock:
+            cursor = self._cursor
+        if cursor is not None:
+            try:
+                cursor.cancel()
+            except pyodbc.Error as e:
+                logger.debug(f"Falha ao cancelar consulta: {e}")
+    
+    @contextmanager
+    def acompanhar(self, cursor):
+        """
+        Registra o cursor da consulta em andamento
+        
+        Args:
+            cursor: Cursor que executará a consulta
+        
+        Raises:
+            OperacaoCancelada: Se a operação já foi cancelada
+        """
+        with self._lock:
+            if self.cancelado:
+                raise OperacaoCancelada("Consulta ao banco cancelada")
+            self._cursor = cursor
+        try:
+            yield cursor
+        finally:
+            with self._lock:
+                self._cursor = None
+
+
+def _obter_executor_banco() -> ThreadPoolExecutor:
+    """
+    Retorna o executor compartilhado das consultas assíncronas
+    
+    Tem tantas threads quanto conexões no pool: operações além disso
+    aguardam na fila do executor sem ocupar uma thread.
+    """
+    global _executor_banco
+    
+    with _executor_banco_lock:
+        if _executor_banco is None:
+            _executor_banco = ThreadPoolExecutor(
+                max_workers=db_config.POOL_MAX_SIZE,
+                thread_name_prefix="banco"
+            )
+        return _executor_banco
+
+
+@dataclass
+class _LoteAnexos:
+    """Anexos de um lote lidos do banco e ainda não entregues"""
+    # Versão atual (num_hist_solic) de cada solicitação com anexos
+    versoes: Dict[int, int] = field(default_factory=dict)
+    # Candidatos por tipo de cada solicitação fora do cache
+    candidatos: Dict[int, Dict[str, list]] = field(default_factory=dict)
+    # (num_solic, num_seq) -> (tipo, nome) do primeiro candidato de cada tipo
+    escolhidos: Dict[Tuple[int, int], Tuple[str, str]] = field(default_factory=dict)
+    em_cache: Dict[int, Dict[str, ArquivoAnexo]] = field(default_factory=dict)
+    baixados: Dict[int, Dict[str, Tuple[int, AnexoTemporario]]] = field(default_factory=dict)
+    
+    def fechar(self):
+        """Fecha os arquivos que não foram entregues"""
+        for arquivos in self.em_cache.values():
+            for arquivo in arquivos.values():
+                arquivo.close()
+        for baixados in self.baixados.values():
+            for _, arquivo in baixados.values():
+                arquivo.close()
+        self.em_cache.clear()
+        self.baixados.clear()
+
+
+class DatabaseService(FonteAnexos):
+    """Serviço para operações no banco de dados (fonte de anexos ODBC)"""
+    
+    def __init__(
+        self,
+        connection_string: str = None,
+        pool: PoolConexoes = None,
+        cache: AttachmentCache = None,
+        disjuntor: DisjuntorCircuito = None,
+        politica_retry: PoliticaRetry = None
+    ):
         """
         Inicializa o serviço de banco de dados
         
         Args:
             connection_string: String de conexão SQL (opcional)
+            pool: Pool de conexões (opcional, usa o pool compartilhado da string de conexão)
+            cache: Cache de anexos (opcional, usa o cache global se omitido)
+            disjuntor: Disjuntor de circuito (opcional, usa o compartilhado da string de conexão)
+            politica_retry: Política de retry (opcional, usa db_config)
         """
         self.connection_string = connection_string or db_config.CONNECTION_STRING
+        self.pool = pool or obter_pool_banco(self.connection_string)
+        self.cache = cache or obter_cache_anexos()
+        self.disjuntor = disjuntor or obter_disjuntor_banco(self.connection_string)
+        self.politica_retry = politica_retry or PoliticaRetry(
+            tentativas=db_config.MAX_RETRIES,
+            espera_inicial=db_config.RETRY_BASE_DELAY,
+            espera_maxima=db_config.RETRY_MAX_DELAY
+        )
         
-    def _executar_com_retry(self, query: str, params: tuple, max_retries: int = 3):
+    def _executar_com_retry(
+        self,
+        query: str,
+        params: tuple,
+        cancelamento: CancelamentoConsulta = None
+    ):
         """
-        Executa uma query com retry em caso de falha
+        Executa uma query com retry em caso de falha transitória
+        
+        A conexão vem do pool; se a consulta falhar, a conexão é descartada e
+        a próxima tentativa usa outra, depois de um backoff exponencial com
+        jitter. Erros fatais (ver eh_erro_banco_retentavel) não se repetem e
+        nenhuma espera passa de db_config.RETRY_DEADLINE. Cada consulta tem o
+        limite de tempo db_config.QUERY_TIMEOUT. Enquanto o banco estiver
+        fora do ar, o disjuntor compartilhado recusa as consultas na hora.
         
         Args:
             query: SQL query
             params: Parâmetros da query
-            max_retries: Número máximo de tentativas
+            cancelamento: Cancelamento da operação (opcional)
             
         Returns:
             Resultado da query
+            
+        Raises:
+            OperacaoCancelada: Se a operação for cancelada
+            CircuitoAberto: Se o disjuntor estiver aberto
         """
-        ultima_excecao = None
-        
-        for tentativa in range(max_retries):
-            try:
-                with pyodbc.connect(self.connection_string, timeout=db_config.TIMEOUT) as conn:
-                    with conn.cursor() as cur:
+        def executar():
+            with self.pool.adquirir(timeout=db_config.TIMEOUT) as conn:
+                conn.timeout = db_config.QUERY_TIMEOUT
+                with conn.cursor() as cur:
+                    with cancelamento.acompanhar(cur) if cancelamento else nullcontext():
                         cur.execute(query, params)
                         return cur.fetchall()
-            except pyodbc.Error as e:
-                ultima_excecao = e
-                logger.warning(f"Tentativa {tentativa + 1}/{max_retries} falhou: {e}")
-                if tentativa < max_retries - 1:
-                    continue
         
-        raise ultima_excecao
+        return executar_com_retry(
+            executar,
+            self.politica_retry,
+            eh_erro_banco_retentavel,
+            cancelamento=cancelamento.evento if cancelamento else None,
+            descricao="Consulta ao banco",
+            prazo=db_config.RETRY_DEADLINE,
+            disjuntor=self.disjuntor
+        )
     
     def carregar_anexos(
         self,
-        num_solic: int
-    ) -> Tuple[Optional[BytesIO], Optional[BytesIO]]:
+        num_solic: int,
+        cancelamento: CancelamentoConsulta = None
+    ) -> Tuple[Optional[AnexoTemporario], Optional[AnexoTemporario]]:
         """
-        Busca na base os anexos da solicitação e devolve dois arquivos em memória
+        Busca na base os anexos da solicitação e devolve dois arquivos temporários
+        
+        A primeira consulta traz só nomes, sequências e tamanhos; a escolha e a
+        verificação de tamanho são feitas localmente e só os conteúdos da
+        apólice e da especificação escolhidas são baixados. Se um deles não
+        puder ser decodificado, o próximo candidato do mesmo tipo é buscado.
+        
+        Com o cache de anexos habilitado, uma consulta a MAX(num_hist_solic)
+        verifica se a versão em cache ainda é a atual; se for, nenhum
+        conteúdo é baixado.
         
         Args:
             num_solic: Número da solicitação
+            cancelamento: Cancelamento da operação (opcional)
             
         Returns:
-            Tupla (arquivo_apolice, arquivo_especificacao) como BytesIO
+            Tupla (arquivo_apolice, arquivo_especificacao) como arquivos
+            temporários (em memória até SPOOL_MAX_MEMORY_MB, depois em disco)
+            ou abertos do cache
+            
+        Raises:
+            OperacaoCancelada: Se a operação for cancelada
         """
-        query = """
-        SELECT anexo.num_solic,
-               anexo.num_hist_solic,
-               anexo.num_seq,
-               anexo.nom_arquivo,
-               anexo.arq_anexo_base64
+        query = f"""
+        SELECT {_COLUNAS_METADADOS}
         FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo anexo
         WHERE anexo.num_solic = ?
-          AND (
-                anexo.nom_arquivo LIKE '%AP%LICE%.pdf'
-                OR anexo.nom_arquivo LIKE '%FRONT%'
-                OR anexo.nom_arquivo LIKE '%ESPEC%'
-          )
+          AND {FILTRO_NOMES}
           AND anexo.num_hist_solic = (
                 SELECT MAX(t.num_hist_solic)
                 FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo t
@@ -87,56 +280,447 @@ class DatabaseService:
         
         logger.info(f"Consultando anexos no banco para num_solic={num_solic}...")
         
-        f_apolice = None
-        f_especificacao = None
-        
         try:
-            rows = self._executar_com_retry(query, (num_solic,))
+            if self.cache:
+                em_cache = self._obter_do_cache(num_solic, cancelamento)
+                if em_cache is not None:
+                    return em_cache.get("apolice"), em_cache.get("especificacao")
+            
+            rows = self._executar_com_retry(query, (num_solic,), cancelamento=cancelamento)
             logger.info(f"{len(rows)} anexos retornados da base.")
+            baixados = escolher_anexos(
+                candidatos_por_tipo(rows),
+                lambda escolhidos: self._buscar_conteudos(escolhidos, cancelamento)
+            )
             
-            for row in rows:
-                nome = (getattr(row, "nom_arquivo", "") or "").upper()
-                b64_data = getattr(row, "arq_anexo_base64", None)
-                
-                if not b64_data:
-                    continue
-                
-                try:
-                    if isinstance(b64_data, bytes):
-                        b64_str = b64_data.decode("ascii", errors="ignore")
-                        b64_len = len(b64_data)
-                        padding = b64_data[-2:].count(b"=") if b64_data else 0
-                    else:
-                        b64_str = str(b64_data)
-                        b64_len = len(b64_str)
-                        padding = b64_str[-2:].count("=") if b64_str else 0
-                    estimated_size = (b64_len * 3) // 4 - padding
-                    max_size = app_config.MAX_FILE_SIZE_MB * 1024 * 1024
-                    if estimated_size > max_size:
-                        logger.error(
-                            f"Anexo {nome} excede tamanho máximo estimado "
-                            f"({estimated_size} bytes > {max_size} bytes)"
-                        )
-                        continue
-                    pdf_bytes = base64.b64decode(b64_data)
-                except Exception as e:
-                    logger.error(f"Falha ao decodificar base64 de {nome}: {e}")
-                    continue
-                
-                bio = BytesIO(pdf_bytes)
-                bio.name = nome or "anexo.pdf"
-                
-                # Classifica o tipo de anexo
-                if "ESPEC" in nome and f_especificacao is None:
-                    f_especificacao = bio
-                    logger.info(f"Especificação encontrada: {nome}")
-                elif (("AP" in nome and "LICE" in nome and nome.endswith(".PDF")) 
-                      or "FRONT" in nome) and f_apolice is None:
-                    f_apolice = bio
-                    logger.info(f"Apólice encontrada: {nome}")
+            if self.cache and baixados:
+                self.cache.salvar(num_solic, rows[0].num_hist_solic, baixados)
             
-            return f_apolice, f_especificacao
+            arquivos = {tipo: arquivo for tipo, (_, arquivo) in baixados.items()}
+            return arquivos.get("apolice"), arquivos.get("especificacao")
             
         except pyodbc.Error as e:
             logger.error(f"Erro ao consultar banco de dados: {e}")
             raise
+    
+    async def carregar_anexos_async(
+        self,
+        num_solic: int,
+        timeout: float = None
+    ) -> Tuple[Optional[AnexoTemporario], Optional[AnexoTemporario]]:
+        """
+        Variante assíncrona de carregar_anexos
+        
+        As consultas rodam no executor compartilhado do banco, limitado ao
+        tamanho do pool de conexões; operações além desse limite aguardam na
+        fila sem ocupar uma thread. Se a tarefa for cancelada ou passar do
+        timeout, a consulta em andamento é interrompida e não há novas
+        tentativas.
+        
+        Args:
+            num_solic: Número da solicitação
+            timeout: Tempo máximo da operação em segundos (opcional)
+            
+        Returns:
+            Tupla (arquivo_apolice, arquivo_especificacao)
+            
+        Raises:
+            asyncio.TimeoutError: Se a operação passar do timeout
+        """
+        cancelamento = CancelamentoConsulta()
+        futuro = asyncio.get_running_loop().run_in_executor(
+            _obter_executor_banco(),
+            self.carregar_anexos,
+            num_solic,
+            cancelamento
+        )
+        
+        try:
+            return await asyncio.wait_for(futuro, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            logger.warning(f"Carga de anexos de num_solic={num_solic} cancelada")
+            cancelamento.cancelar()
+            raise
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do pool de conexões e do disjuntor
+        
+        Returns:
+            Dicionário com as estatísticas do pool e do disjuntor
+        """
+        return {"pool": self.pool.estatisticas(), "disjuntor": self.disjuntor.estatisticas()}
+    
+    def _obter_do_cache(
+        self,
+        num_solic: int,
+        cancelamento: CancelamentoConsulta = None
+    ) -> Optional[Dict[str, ArquivoAnexo]]:
+        """
+        Busca no cache os anexos da versão atual da solicitação
+        
+        Args:
+            num_solic: Número da solicitação
+            cancelamento: Cancelamento da operação (opcional)
+            
+        Returns:
+            Dicionário tipo -> arquivo, ou None se a versão atual não estiver no cache
+        """
+        query = """
+        SELECT MAX(anexo.num_hist_solic) AS num_hist_solic
+        FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo anexo
+        WHERE anexo.num_solic = ?;
+        """
+        rows = self._executar_com_retry(query, (num_solic,), cancelamento=cancelamento)
+        num_hist_solic = rows[0].num_hist_solic if rows else None
+        if num_hist_solic is None:
+            return None
+        
+        em_cache = self.cache.obter(num_solic, num_hist_solic)
+        if em_cache is not None:
+            logger.info(
+                f"Anexos de num_solic={num_solic} (versão {num_hist_solic}) "
+                f"recuperados do cache local"
+            )
+        return em_cache
+    
+    def _buscar_conteudos(
+        self,
+        rows: list,
+        cancelamento: CancelamentoConsulta = None
+    ) -> Dict[int, object]:
+        """
+        Baixa o base64 dos anexos escolhidos de uma mesma solicitação
+        
+        Args:
+            rows: Linhas de metadados (mesmo num_solic e num_hist_solic)
+            cancelamento: Cancelamento da operação (opcional)
+            
+        Returns:
+            Dicionário num_seq -> conteúdo base64
+        """
+        marcadores = ", ".join("?" for _ in rows)
+        query = f"""
+        SELECT anexo.num_seq, anexo.arq_anexo_base64
+        FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo anexo
+        WHERE anexo.num_solic = ?
+          AND anexo.num_hist_solic = ?
+          AND anexo.num_seq IN ({marcadores});
+        """
+        params = (rows[0].num_solic, rows[0].num_hist_solic, *(row.num_seq for row in rows))
+        return {
+            conteudo.num_seq: conteudo.arq_anexo_base64
+            for conteudo in self._executar_com_retry(query, params, cancelamento=cancelamento)
+        }
+    
+    def carregar_anexos_em_lote(
+        self,
+        nums_solic: Iterable[int],
+        tamanho_lote: int = None,
+        tamanho_fetch: int = None
+    ) -> Iterator[Tuple[int, Optional[AnexoTemporario], Optional[AnexoTemporario]]]:
+        """
+        Busca os anexos de várias solicitações com uma consulta por lote
+        
+        Os números de cada lote são gravados numa tabela temporária e uma única
+        consulta, agrupada por solicitação em vez da subconsulta correlacionada,
+        traz os metadados dos anexos da última versão de todas elas. A escolha
+        é feita localmente e uma segunda consulta traz só os conteúdos
+        escolhidos, lidos com fetchmany e decodificados para arquivos
+        temporários em disco. A conexão volta ao pool antes da primeira
+        entrega: o consumidor pode levar minutos em cada solicitação sem
+        manter a consulta aberta. Se um anexo escolhido não puder ser
+        decodificado, os candidatos seguintes do mesmo tipo são buscados na
+        entrega, como em carregar_anexos.
+        
+        Args:
+            nums_solic: Números das solicitações (lista, range, etc.)
+            tamanho_lote: Solicitações por consulta (opcional)
+            tamanho_fetch: Linhas por fetchmany (opcional)
+            
+        Yields:
+            Tupla (num_solic, arquivo_apolice, arquivo_especificacao) para cada
+            solicitação, em ordem crescente; arquivos não encontrados vêm None
+        """
+        tamanho_lote = tamanho_lote or db_config.BULK_BATCH_SIZE
+        tamanho_fetch = tamanho_fetch or db_config.BULK_FETCH_SIZE
+        nums = sorted({int(n) for n in nums_solic})
+        
+        for inicio in range(0, len(nums), tamanho_lote):
+            lote = nums[inicio:inicio + tamanho_lote]
+            logger.info(
+                f"Consultando anexos de {len(lote)} solicitações "
+                f"({lote[0]} a {lote[-1]})..."
+            )
+            yield from self._carregar_lote(lote, tamanho_fetch)
+    
+    def _carregar_lote(
+        self,
+        lote: List[int],
+        tamanho_fetch: int
+    ) -> Iterator[Tuple[int, Optional[AnexoTemporario], Optional[AnexoTemporario]]]:
+        """Baixa um lote já ordenado e entrega os anexos por solicitação"""
+        dados = self._baixar_lote(lote, tamanho_fetch)
+        try:
+            for num_solic in lote:
+                yield _resultado(num_solic, self._concluir_solicitacao(num_solic, dados))
+        finally:
+            # Consumo interrompido: os arquivos não entregues não ficam abertos
+            dados.fechar()
+    
+    def _baixar_lote(self, lote: List[int], tamanho_fetch: int) -> _LoteAnexos:
+        """
+        Lê metadados e conteúdos de um lote com uma única conexão do pool
+        
+        Args:
+            lote: Números das solicitações, em ordem crescente
+            tamanho_fetch: Linhas por fetchmany
+        
+        Returns:
+            Anexos do lote; a conexão já voltou ao pool
+        """
+        # Sem retry: o lote inteiro seria lido de novo; só o disjuntor é consultado
+        with _protegido(self.disjuntor), self.pool.adquirir(timeout=db_config.TIMEOUT) as conn:
+            conn.timeout = db_config.QUERY_TIMEOUT
+            cur = conn.cursor()
+            try:
+                # A conexão volta ao pool depois; as tabelas não podem sobrar de um uso anterior
+                cur.execute(_SQL_REMOVER_TEMPORARIAS + """
+                CREATE TABLE #solicitacoes_lote (num_solic INT PRIMARY KEY);
+                CREATE TABLE #anexos_lote (
+                    num_solic INT, num_hist_solic INT, num_seq INT,
+                    PRIMARY KEY (num_solic, num_hist_solic, num_seq)
+                );
+                """)
+                cur.fast_executemany = True
+                cur.executemany(
+                    "INSERT INTO #solicitacoes_lote (num_solic) VALUES (?)",
+                    [(n,) for n in lote]
+                )
+                
+                dados = self._ler_metadados_lote(cur)
+                try:
+                    self._ler_conteudos_lote(cur, dados, tamanho_fetch)
+                except BaseException:
+                    dados.fechar()
+                    raise
+                return dados
+            finally:
+                try:
+                    cur.execute(_SQL_REMOVER_TEMPORARIAS)
+                    conn.commit()
+                except pyodbc.Error as e:
+                    logger.debug(f"Falha ao remover tabelas temporárias: {e}")
+                cur.close()
+    
+    def _ler_metadados_lote(self, cur) -> _LoteAnexos:
+        """
+        Escolhe localmente o anexo de cada tipo pelos metadados do lote
+        
+        Metadados são pequenos e lidos de uma vez. A versão de cada
+        solicitação também serve para consultar o cache.
+        
+        Args:
+            cur: Cursor com #solicitacoes_lote preenchida
+        
+        Returns:
+            Versões, candidatos, escolhidos e arquivos do cache do lote
+        """
+        query = f"""
+        WITH ultima_versao AS (
+            SELECT t.num_solic, MAX(t.num_hist_solic) AS num_hist_solic
+            FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo t
+            JOIN #solicitacoes_lote s ON s.num_solic = t.num_solic
+            GROUP BY t.num_solic
+        )
+        SELECT {_COLUNAS_METADADOS}
+        FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo anexo
+        JOIN ultima_versao u
+          ON u.num_solic = anexo.num_solic
+         AND u.num_hist_solic = anexo.num_hist_solic
+        WHERE {FILTRO_NOMES}
+        ORDER BY anexo.num_solic, anexo.num_seq ASC;
+        """
+        dados = _LoteAnexos()
+        por_solicitacao: Dict[int, list] = {}
+        for row in cur.execute(query).fetchall():
+            por_solicitacao.setdefault(row.num_solic, []).append(row)
+        
+        for num_solic, rows in por_solicitacao.items():
+            dados.versoes[num_solic] = rows[0].num_hist_solic
+            arquivos_cache = self.cache.obter(num_solic, dados.versoes[num_solic]) if self.cache else None
+            if arquivos_cache is not None:
+                dados.em_cache[num_solic] = arquivos_cache
+                continue
+            dados.candidatos[num_solic] = candidatos_por_tipo(rows)
+            for tipo, lista in dados.candidatos[num_solic].items():
+                if lista:
+                    dados.escolhidos[(num_solic, lista[0].num_seq)] = (tipo, nome_anexo(lista[0]))
+        
+        if dados.em_cache:
+            logger.info(f"{len(dados.em_cache)} solicitações do lote recuperadas do cache local")
+        return dados
+    
+    def _ler_conteudos_lote(self, cur, dados: _LoteAnexos, tamanho_fetch: int):
+        """
+        Baixa com fetchmany os conteúdos escolhidos e os decodifica
+        
+        Os arquivos aguardam a entrega em disco, então a memória não cresce
+        com o tamanho do lote.
+        
+        Args:
+            cur: Cursor com #anexos_lote criada
+            dados: Anexos do lote (preenche baixados)
+            tamanho_fetch: Linhas por fetchmany
+        """
+        if not dados.escolhidos:
+            return
+        
+        cur.executemany(
+            "INSERT INTO #anexos_lote (num_solic, num_hist_solic, num_seq) VALUES (?, ?, ?)",
+            [(num_solic, dados.versoes[num_solic], num_seq) for num_solic, num_seq in dados.escolhidos]
+        )
+        cur.execute("""
+        SELECT anexo.num_solic, anexo.num_seq, anexo.arq_anexo_base64
+        FROM DBCIT_SSC_MTS..tb_solic_cotacao_anexo anexo
+        JOIN #anexos_lote e
+          ON e.num_solic = anexo.num_solic
+         AND e.num_hist_solic = anexo.num_hist_solic
+         AND e.num_seq = anexo.num_seq
+        ORDER BY anexo.num_solic, anexo.num_seq ASC;
+        """)
+        
+        while True:
+            bloco = cur.fetchmany(tamanho_fetch)
+            if not bloco:
+                break
+            for row in bloco:
+                tipo, nome = dados.escolhidos[(row.num_solic, row.num_seq)]
+                arquivo = decodificar_anexo(nome, row.arq_anexo_base64)
+                if arquivo is not None:
+                    arquivo.rollover()
+                    dados.baixados.setdefault(row.num_solic, {})[tipo] = (row.num_seq, arquivo)
+    
+    def _concluir_solicitacao(self, num_solic: int, dados: _LoteAnexos) -> Dict[str, Any]:
+        """
+        Retira do lote os arquivos de uma solicitação para a entrega
+        
+        Como em carregar_anexos, os tipos cujo primeiro candidato não
+        decodificou recorrem aos seguintes; a conexão do lote já voltou ao
+        pool, então essa busca não ocupa uma segunda conexão. Os anexos
+        baixados são gravados no cache.
+        
+        Args:
+            num_solic: Número da solicitação
+            dados: Anexos do lote (a solicitação é retirada)
+        
+        Returns:
+            Dicionário tipo -> arquivo; vazio se a solicitação não tiver anexos
+        """
+        if num_solic in dados.em_cache:
+            return dados.em_cache.pop(num_solic)
+        
+        baixados = dados.baixados.pop(num_solic, {})
+        restantes = {
+            tipo: lista[1:]
+            for tipo, lista in dados.candidatos.get(num_solic, {}).items()
+            if tipo not in baixados and len(lista) > 1
+        }
+        if restantes:
+            baixados.update(escolher_anexos(restantes, self._buscar_conteudos))
+        if self.cache and baixados:
+            self.cache.salvar(num_solic, dados.versoes[num_solic], baixados)
+        return {tipo: arquivo for tipo, (_, arquivo) in baixados.items()}
+
+
+# Metadados da primeira fase; o conteúdo é varchar, então DATALENGTH é o
+# número de caracteres base64 e não exige ler o blob
+_COLUNAS_METADADOS = """anexo.num_solic,
+               anexo.num_hist_solic,
+               anexo.num_seq,
+               anexo.nom_arquivo,
+               DATALENGTH(anexo.arq_anexo_base64) AS tamanho_base64"""
+
+_SQL_REMOVER_TEMPORARIAS = """
+IF OBJECT_ID('tempdb..#solicitacoes_lote') IS NOT NULL DROP TABLE #solicitacoes_lote;
+IF OBJECT_ID('tempdb..#anexos_lote') IS NOT NULL DROP TABLE #anexos_lote;
+"""
+
+
+def _resultado(num_solic: int, arquivos: Dict[str, Any]) -> Tuple[int, Any, Any]:
+    """Monta a tupla (num_solic, arquivo_apolice, arquivo_especificacao)"""
+    return num_solic, arquivos.get("apolice"), arquivos.get("especificacao")
+
+
+@contextmanager
+def _protegido(disjuntor: DisjuntorCircuito):
+    """
+    Passa um trecho pelo disjuntor, registrando sucesso ou falha transitória
+    
+    Raises:
+        CircuitoAberto: Se o disjuntor estiver aberto
+    """
+    disjuntor.verificar()
+    try:
+        yield
+    except BaseException as e:
+        if eh_erro_banco_retentavel(e):
+            disjuntor.registrar_falha()
+        else:
+            disjuntor.liberar()
+        raise
+    else:
+        disjuntor.registrar_sucesso()
+
+
+_pools: Dict[str, PoolConexoes] = {}
+_disjuntores: Dict[str, DisjuntorCircuito] = {}
+_pools_lock = threading.Lock()
+
+
+def obter_pool_banco(connection_string: str = None) -> PoolConexoes:
+    """
+    Retorna o pool de conexões compartilhado pelo processo
+    
+    Há um pool por string de conexão, reaproveitado por todas as sessões do
+    Streamlit e workers de lote.
+    
+    Args:
+        connection_string: String de conexão SQL (opcional)
+        
+    Returns:
+        Instância única do pool para a string de conexão
+    """
+    connection_string = connection_string or db_config.CONNECTION_STRING
+    
+    with _pools_lock:
+        if connection_string not in _pools:
+            _pools[connection_string] = PoolConexoes(
+                partial(pyodbc.connect, connection_string, timeout=db_config.TIMEOUT)
+            )
+        return _pools[connection_string]
+
+
+def obter_disjuntor_banco(connection_string: str = None) -> DisjuntorCircuito:
+    """
+    Retorna o disjuntor compartilhado pelo processo
+    
+    Como o pool, há um disjuntor por string de conexão: quando o banco cai,
+    as falhas de todas as sessões e workers abrem o mesmo circuito.
+    
+    Args:
+        connection_string: String de conexão SQL (opcional)
+        
+    Returns:
+        Instância única do disjuntor para a string de conexão
+    """
+    connection_string = connection_string or db_config.CONNECTION_STRING
+    
+    with _pools_lock:
+        if connection_string not in _disjuntores:
+            _disjuntores[connection_string] = DisjuntorCircuito(
+                "Banco de dados",
+                limite_falhas=db_config.CIRCUIT_FAILURE_THRESHOLD,
+                tempo_recuperacao=db_config.CIRCUIT_RESET_TIMEOUT
+            )
+        return _disjuntores[connection_string]
@@ -0,0 +1,423 @@
+"""
+Backend local que substitui a API Gemini em testes de carga e execuções offline
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from google.api_core import exceptions as google_exceptions
+from config.prompts import (
+    PROMPT_MESTRE_APOLICE,
+    PROMPT_LOCAIS_V4_1,
+    PROMPT_COBERTURAS_V3_GENERICO,
+    PROMPT_LMI_UNICO_CBI,
+    PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL
+)
+from config.settings import local_backend_config
+from services.rate_limiter import TOKENS_POR_PAGINA
+from utils.pdf_utils import contar_paginas_pdf
+
+logger = logging.getLogger(__name__)
+
+# Nome usado para buscar respostas gravadas de cada prompt conhecido
+PROMPTS_CONHECIDOS = {
+    PROMPT_MESTRE_APOLICE: 'mestre',
+    PROMPT_LOCAIS_V4_1: 'locais',
+    PROMPT_COBERTURAS_V3_GENERICO: 'coberturas',
+    PROMPT_LMI_UNICO_CBI: 'clausulas',
+    PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL: 'especificacao'
+}
+
+
+@dataclass
+class PerfilLatencia:
+    """Distribuição do tempo de resposta simulado"""
+    # "fixa", "uniforme" ou "lognormal"
+    distribuicao: str = "lognormal"
+    # Mediana em segundos (valor exato na distribuição fixa)
+    mediana: float = 2.0
+    # Desvio do log (lognormal) ou meia amplitude relativa (uniforme)
+    dispersao: float = 0.5
+    # Segundos adicionais por página do documento
+    por_pagina: float = 0.0
+    maximo: float = 120.0
+    
+    def amostrar(self, rng: random.Random, paginas: int = 1) -> float:
+        """
+        Sorteia uma latência
+        
+        Args:
+            rng: Gerador aleatório do backend
+            paginas: Páginas do documento enviado
+        
+        Returns:
+            Latência em segundos
+        """
+        if self.distribuicao == "fixa":
+            base = self.mediana
+        elif self.distribuicao == "uniforme":
+            base = rng.uniform(self.mediana * (1 - self.dispersao), self.mediana * (1 + self.dispersao))
+        else:
+            base = rng.lognormvariate(0.0, self.dispersao) * self.mediana
+        return min(max(base, 0.0) + self.por_pagina * paginas, self.maximo)
+
+
+@dataclass
+class PerfilFalhas:
+    """Probabilidades de falha injetadas por chamada"""
+    taxa_429: float = 0.0
+    taxa_503: float = 0.0
+    taxa_timeout: float = 0.0
+    # Acima dessa quantidade de chamadas simultâneas, responde 429 (None = sem limite)
+    limite_concorrencia: Optional[int] = None
+
+
+@dataclass
+class PerfilBackend:
+    """Perfil completo do backend local"""
+    latencia: PerfilLatencia = field(default_factory=PerfilLatencia)
+    falhas: PerfilFalhas = field(default_factory=PerfilFalhas)
+    # Trechos em que a resposta é dividida no modo streaming
+    trechos_streaming: int = 8
+
+
+# Perfis prontos, selecionados por local_backend_config.PROFILE
+PERFIS = {
+    'instantaneo': PerfilBackend(latencia=PerfilLatencia(distribuicao="fixa", mediana=0.0)),
+    'rapido': PerfilBackend(latencia=PerfilLatencia(mediana=0.2, dispersao=0.3)),
+    'realista': PerfilBackend(
+        latencia=PerfilLatencia(mediana=8.0, dispersao=0.6, por_pagina=0.15),
+        falhas=PerfilFalhas(taxa_429=0.02, taxa_503=0.01)
+    ),
+    'instavel': PerfilBackend(
+        latencia=PerfilLatencia(mediana=8.0, dispersao=1.0, por_pagina=0.15),
+        falhas=PerfilFalhas(taxa_429=0.15, taxa_503=0.05, taxa_timeout=0.05, limite_concorrencia=4)
+    )
+}
+
+
+def gerar_resposta_sintetica(nome: str, itens: int = 5) -> Dict[str, Any]:
+    """
+    Gera um JSON plausível para um prompt conhecido
+    
+    Args:
+        nome: Nome do prompt (chave de PROMPTS_CONHECIDOS)
+        itens: Quantidade de locais/coberturas gerados
+    
+    Returns:
+        Dicionário no formato esperado pelo prompt
+    """
+    if nome == 'mestre':
+        return {
+            "document_type": "Apólice",
+            "seguradora_canon": "MITSUI",
+            "segurado": "Empresa Sintética Ltda",
+            "cnpj": "11.222.333/0001-81",
+            "numero_apolice_lider": "1180000001",
+            "inicio_vigencia": "01/01/2024",
+            "fim_vigencia": "01/01/2025",
+            "moeda": "BRL",
+            "valor_limite_maximo_garantia": "10.000.000,00",
+            "premio_emitido_ou_liquido": "50.000,00",
+            "participacao_mitsui_sumitomo": "30%",
+            "lmi_unico": "Não",
+            "tem_cobertura_cbi": "Não",
+            "cosseguro_completo": [
+                {"nome_raw": "Mitsui Sumitomo", "percentual": "30%", "lider": True},
+                {"nome_raw": "Cosseguradora", "percentual": "70%", "lider": False}
+            ]
+        }
+    if nome == 'locais':
+        return {"locais_risco": [
+            {
+                "nro_local_risco": str(i),
+                "endereco": f"Rua Sintética, {i}",
+                "cidade": "São Paulo",
+                "estado": "SP",
+                "cep": "01000-000",
+                "atividade_principal_risco": "Indústria",
+                "valor_risco_predio": "1.000.000,00",
+                "valor_risco_mmu": "500.000,00",
+                "valor_risco_mmp": "250.000,00"
+            }
+            for i in range(1, itens + 1)
+        ]}
+    if nome == 'coberturas':
+        return {"coberturas_completas": [
+            {"nome_raw": f"Cobertura {i}", "lmi": "1.000.000,00", "franquia_raw": "10% POS", "premio": "1.000,00"}
+            for i in range(1, itens + 1)
+        ]}
+    if nome == 'clausulas':
+        return {"lmi_unico": "Não", "tem_cobertura_cbi": "Não"}
+    if nome == 'especificacao':
+        return {"especificacao_cosseguro_cedido": {
+            "dados_gerais": {
+                "seguradora_lider": "Seguradora Líder Sintética",
+                "tomador": "Empresa Sintética Ltda",
+                "cnpj_tomador": "11.222.333/0001-81",
+                "apolice": "1180000001",
+                "vigencia_inicio": "01/01/2024",
+                "vigencia_fim": "01/01/2025",
+                "moeda": "BRL"
+            },
+            "seguradoras_participantes": [
+                {"codigo": "001", "nome": "Seguradora Líder Sintética", "numero_ordem": "1", "percentual_participacao": "70%"},
+                {"codigo": "002", "nome": "Mitsui Sumitomo", "numero_ordem": "2", "percentual_participacao": "30%"}
+            ],
+            "outros_ramos": [],
+            "parcelas": [
+                {"num_parc": "1", "premio_tarifario": "50.000,00", "total_liquido": "45.000,00"}
+            ],
+            "totais_parcelas": {"total_premio_tarifario": "50.000,00", "total_liquido": "45.000,00"}
+        }}
+    return {"ok": True}
+
+
+class _UsoTokens:
+    """Equivalente local de usage_metadata"""
+    
+    def __init__(self, entrada: int, saida: int):
+        self.prompt_token_count = entrada
+        self.candidates_token_count = saida
+        self.cached_content_token_count = 0
+        self.total_token_count = entrada + saida
+
+
+class _Trecho:
+    """Trecho de uma resposta em streaming"""
+    
+    def __init__(self, texto: str):
+        self.text = texto
+
+
+class RespostaLocal:
+    """
+    Resposta no formato de generate_content
+    
+    Em streaming, iterar a resposta entrega os trechos espaçados pela
+    latência sorteada; sem streaming, a latência já foi cumprida.
+    """
+    
+    def __init__(self, texto: str, uso: _UsoTokens, trechos: List[str] = None, intervalo: float = 0.0):
+        self.text = texto
+        self.usage_metadata = uso
+        self._trechos = trechos or [texto]
+        self._intervalo = intervalo
+    
+    def __iter__(self):
+        for texto in self._trechos:
+            if self._intervalo:
+                time.sleep(self._intervalo)
+            yield _Trecho(texto)
+
+
+class BackendGeminiLocal:
+    """
+    Substituto local da API Gemini compartilhado por todos os modelos do pool
+    
+    Serve respostas gravadas (arquivos <nome>.json no diretório de
+    respostas) ou sintéticas, com latência e falhas sorteadas por um
+    gerador com semente fixa, e contabiliza chamadas e tokens.
+    """
+    
+    def __init__(
+        self,
+        perfil: PerfilBackend = None,
+        respostas: Dict[str, Any] = None,
+        diretorio_respostas: str = None,
+        semente: int = None,
+        itens_sinteticos: int = 5
+    ):
+        """
+        Inicializa o backend
+        
+        Args:
+            perfil: Perfil de latência e falhas (opcional, usa local_backend_config.PROFILE)
+            respostas: Respostas por nome ou texto do prompt; valores podem ser
+                dicionários, textos ou funções prompt -> dicionário (opcional)
+            diretorio_respostas: Diretório com respostas gravadas <nome>.json (opcional)
+            semente: Semente do gerador aleatório (opcional)
+            itens_sinteticos: Locais/coberturas nas respostas sintéticas
+        """
+        self.perfil = perfil or PERFIS[local_backend_config.PROFILE]
+        self.respostas = dict(respostas or {})
+        self.itens_sinteticos = itens_sinteticos
+        self._rng = random.Random(local_backend_config.SEED if semente is None else semente)
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self._estatisticas = {
+            "chamadas": 0,
+            "sucessos": 0,
+            "falhas_429": 0,
+            "falhas_503": 0,
+            "timeouts": 0,
+            "tokens_entrada": 0,
+            "tokens_saida": 0,
+            "concorrencia_maxima": 0
+        }
+        
+        diretorio = diretorio_respostas or local_backend_config.RESPONSES_DIR
+        if diretorio:
+            self._carregar_respostas(diretorio)
+    
+    def _carregar_respostas(self, diretorio: str):
+        """Carrega respostas gravadas sem sobrescrever as informadas no construtor"""
+        if not os.path.isdir(diretorio):
+            logger.warning(f"Diretório de respostas locais não encontrado: {diretorio}")
+            return
+        
+        for arquivo in os.listdir(diretorio):
+            nome, extensao = os.path.splitext(arquivo)
+            if extensao != ".json" or nome in self.respostas:
+                continue
+            with open(os.path.join(diretorio, arquivo), "r", encoding="utf-8") as f:
+                self.respostas[nome] = json.load(f)
+    
+    def criar_modelo(self) -> "ModeloGeminiLocal":
+        """Fábrica de modelos para o GeminiClientPool"""
+        return ModeloGeminiLocal(self)
+    
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna chamadas, falhas injetadas, tokens e concorrência máxima observada"""
+        with self._lock:
+            return dict(self._estatisticas)
+    
+    def _resposta(self, prompt: str) -> str:
+        """Resolve a resposta do prompt como texto JSON"""
+        nome = PROMPTS_CONHECIDOS.get(prompt)
+        resposta = self.respostas.get(prompt, self.respostas.get(nome))
+        if resposta is None:
+            resposta = gerar_resposta_sintetica(nome, self.itens_sinteticos)
+        if callable(resposta):
+            resposta = resposta(prompt)
+        return resposta if isinstance(resposta, str) else json.dumps(resposta, ensure_ascii=False)
+    
+    def _sortear(self, paginas: int):
+        """Sorteia latência e falha da chamada sob o lock do gerador"""
+        falhas = self.perfil.falhas
+        with self._lock:
+            latencia = self.perfil.latencia.amostrar(self._rng, paginas)
+            sorteio = self._rng.random()
+        if sorteio < falhas.taxa_429:
+            return latencia, "falhas_429"
+        if sorteio < falhas.taxa_429 + falhas.taxa_503:
+            return latencia, "falhas_503"
+        if sorteio < falhas.taxa_429 + falhas.taxa_503 + falhas.taxa_timeout:
+            return latencia, "timeouts"
+        return latencia, None
+    
+    def gerar(self, conteudo: List[Any], stream: bool, timeout: Optional[float]) -> RespostaLocal:
+        """
+        Atende uma chamada de generate_content
+        
+        Args:
+            conteudo: [prompt, parte do documento]
+            stream: Se a resposta deve ser entregue em trechos
+            timeout: Timeout da requisição em segundos (opcional)
+        
+        Returns:
+            RespostaLocal com texto e usage_metadata
+        
+        Raises:
+            ResourceExhausted, ServiceUnavailable, DeadlineExceeded: Falhas injetadas
+        """
+        prompt = conteudo[0] if conteudo and isinstance(conteudo[0], str) else ""
+        parte = conteudo[1] if len(conteudo) > 1 else None
+        dados = parte.get("data", b"") if isinstance(parte, dict) else b""
+        paginas = contar_paginas_pdf(dados) if dados else 1
+        
+        with self._lock:
+            self._estatisticas["chamadas"] += 1
+            self._em_andamento += 1
+            em_andamento = self._em_andamento
+            self._estatisticas["concorrencia_maxima"] = max(
+                self._estatisticas["concorrencia_maxima"], em_andamento
+            )
+        
+        try:
+            limite = self.perfil.falhas.limite_concorrencia
+            if limite is not None and em_andamento > limite:
+                self._contar("falhas_429")
+                raise google_exceptions.ResourceExhausted("429 Limite de concorrência do backend local")
+            
+            latencia, falha = self._sortear(paginas)
+            if falha == "timeouts" or (timeout and latencia > timeout):
+                time.sleep(min(latencia, timeout) if timeout else latencia)
+                self._contar("timeouts")
+                raise google_exceptions.DeadlineExceeded("504 Timeout simulado pelo backend local")
+            
+            texto = self._resposta(prompt)
+            uso = _UsoTokens(len(prompt) // 4 + paginas * TOKENS_POR_PAGINA, max(len(texto) // 4, 1))
+            
+            if falha:
+                time.sleep(latencia * self._rng.random())
+                self._contar(falha)
+                if falha == "falhas_429":
+                    raise google_exceptions.ResourceExhausted("429 Cota simulada pelo backend local")
+                raise google_exceptions.ServiceUnavailable("503 Indisponibilidade simulada pelo backend local")
+            
+            if stream:
+                quantidade = max(self.perfil.trechos_streaming, 1)
+                tamanho = max(len(texto) // quantidade, 1)
+                trechos = [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+                # Metade da latência até o primeiro trecho, o restante distribuído entre eles
+                time.sleep(latencia / 2)
+                resposta = RespostaLocal(texto, uso, trechos, latencia / 2 / len(trechos))
+            else:
+                time.sleep(latencia)
+                resposta = RespostaLocal(texto, uso)
+            
+            with self._lock:
+                self._estatisticas["sucessos"] += 1
+                self._estatisticas["tokens_entrada"] += uso.prompt_token_count
+                self._estatisticas["tokens_saida"] += uso.candidates_token_count
+            return resposta
+        finally:
+            with self._lock:
+                self._em_andamento -= 1
+    
+    def _contar(self, chave: str):
+        """Incrementa um contador de falha"""
+        with self._lock:
+            self._estatisticas[chave] += 1
+
+
+class ModeloGeminiLocal:
+    """Modelo emprestado pelo pool quando o backend local está ativo"""
+    
+    def __init__(self, backend: BackendGeminiLocal):
+        self.backend = backend
+    
+    def generate_content(
+        self,
+        conteudo: List[Any],
+        stream: bool = False,
+        request_options: Dict = None,
+        generation_config: Dict = None
+    ):
+        """Mesma assinatura usada de genai.GenerativeModel.generate_content (o schema é ignorado)"""
+        timeout = (request_options or {}).get("timeout")
+        return self.backend.gerar(conteudo, stream, timeout)
+
+
+_backend_global: Optional[BackendGeminiLocal] = None
+_backend_lock = threading.Lock()
+
+
+def obter_backend_local() -> BackendGeminiLocal:
+    """
+    Retorna o backend local compartilhado pelo processo
+    
+    Returns:
+        Instância única do backend local
+    """
+    global _backend_global
+    
+    with _backend_lock:
+        if _backend_global is None:
+            _backend_global = BackendGeminiLocal()
+        return _backend_global
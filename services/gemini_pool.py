@@ -0,0 +1,188 @@
+"""
+Pool de clientes Gemini compartilhado pelo processo
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
+import google.generativeai as genai
+from config.settings import gemini_config
+from services.gemini_local import obter_backend_local
+
+logger = logging.getLogger(__name__)
+
+_configuracao_lock = threading.Lock()
+_api_configurada = False
+
+
+def configurar_api():
+    """
+    Configura a API Gemini uma única vez por processo
+    
+    Reconfigurar a API descarta o cliente global do SDK e, com ele, o canal
+    HTTP/2 já aberto; por isso a configuração não se repete a cada serviço.
+    """
+    global _api_configurada
+    
+    with _configuracao_lock:
+        if not _api_configurada:
+            genai.configure(api_key=gemini_config.API_KEY)
+            _api_configurada = True
+
+
+def criar_modelo():
+    """
+    Cria um GenerativeModel com a configuração padrão do sistema
+    
+    Com GEMINI_BACKEND=local, cria um modelo do backend simulado.
+    
+    Returns:
+        Instância de genai.GenerativeModel (ou ModeloGeminiLocal)
+    """
+    if gemini_config.BACKEND == "local":
+        return obter_backend_local().criar_modelo()
+    
+    configurar_api()
+    return genai.GenerativeModel(
+        gemini_config.MODEL,
+        generation_config=genai.types.GenerationConfig(
+            temperature=gemini_config.TEMPERATURE,
+            response_mime_type=gemini_config.RESPONSE_MIME_TYPE
+        )
+    )
+
+
+class GeminiClientPool:
+    """Pool de modelos Gemini reaproveitados entre chamadas e sessões"""
+    
+    def __init__(self, tamanho_maximo: int = None, fabrica: Callable = None):
+        """
+        Inicializa o pool
+        
+        Args:
+            tamanho_maximo: Número máximo de modelos simultâneos (opcional)
+            fabrica: Função que cria um novo modelo (opcional, usa criar_modelo)
+        """
+        self.tamanho_maximo = tamanho_maximo or gemini_config.POOL_SIZE
+        self.fabrica = fabrica or criar_modelo
+        
+        self._ociosos: List[Any] = []
+        self._em_uso = 0
+        self._criados = 0
+        self._condicao = threading.Condition()
+    
+    def aquecer(self, quantidade: int = None, verificar_conexao: bool = False):
+        """
+        Cria modelos antecipadamente para evitar latência na primeira chamada
+        
+        Args:
+            quantidade: Quantidade de modelos ociosos desejada (opcional, usa o máximo)
+            verificar_conexao: Se True, faz uma chamada leve à API para abrir a
+                conexão (TLS) antes da primeira requisição real
+        """
+        quantidade = min(quantidade or self.tamanho_maximo, self.tamanho_maximo)
+        
+        with self._condicao:
+            while (len(self._ociosos) < quantidade
+                   and self._criados < self.tamanho_maximo):
+                self._ociosos.append(self.fabrica())
+                self._criados += 1
+        
+        if verificar_conexao and gemini_config.BACKEND != "local":
+            try:
+                genai.get_model(f"models/{gemini_config.MODEL}")
+            except Exception as e:
+                logger.warning(f"Falha ao aquecer conexão com a API Gemini: {e}")
+        
+        logger.info(f"Pool Gemini aquecido: {self.estatisticas()}")
+    
+    @contextmanager
+    def adquirir(self, timeout: float = None):
+        """
+        Empresta um modelo do pool, aguardando se todos estiverem em uso
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos (opcional, espera indefinidamente)
+        
+        Yields:
+            Modelo Gemini pronto para generate_content
+        
+        Raises:
+            TimeoutError: Se nenhum modelo ficar livre dentro do timeout
+        """
+        modelo = self._retirar(timeout)
+        try:
+            yield modelo
+        finally:
+            self._devolver(modelo)
+    
+    def _retirar(self, timeout: Optional[float]):
+        """Retira um modelo ocioso ou cria um novo se houver espaço"""
+        with self._condicao:
+            disponivel = self._condicao.wait_for(
+                lambda: self._ociosos or self._criados < self.tamanho_maximo,
+                timeout=timeout
+            )
+            if not disponivel:
+                raise TimeoutError("Nenhum cliente Gemini disponível no pool")
+            
+            if self._ociosos:
+                modelo = self._ociosos.pop()
+            else:
+                # Reserva a vaga antes de criar o modelo fora do lock
+                self._criados += 1
+                modelo = None
+            self._em_uso += 1
+        
+        if modelo is None:
+            try:
+                modelo = self.fabrica()
+            except Exception:
+                with self._condicao:
+                    self._criados -= 1
+                    self._em_uso -= 1
+                    self._condicao.notify()
+                raise
+        
+        return modelo
+    
+    def _devolver(self, modelo):
+        """Devolve um modelo ao pool e acorda quem estiver aguardando"""
+        with self._condicao:
+            self._em_uso -= 1
+            self._ociosos.append(modelo)
+            self._condicao.notify()
+    
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Retorna o estado atual do pool
+        
+        Returns:
+            Dicionário com modelos em uso, ociosos, criados e o tamanho máximo
+        """
+        with self._condicao:
+            return {
+                "em_uso": self._em_uso,
+                "ociosos": len(self._ociosos),
+                "criados": self._criados,
+                "tamanho_maximo": self.tamanho_maximo
+            }
+
+
+_pool_global: Optional[GeminiClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool_gemini() -> GeminiClientPool:
+    """
+    Retorna o pool de clientes Gemini compartilhado pelo processo
+    
+    Returns:
+        Instância única do pool
+    """
+    global _pool_global
+    
+    with _pool_lock:
+        if _pool_global is None:
+            _pool_global = GeminiClientPool()
+        return _pool_global
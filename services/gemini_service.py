@@ -1,48 +1,230 @@
 """
 Serviço de integração com a API Gemini
 """
+import asyncio
+import hashlib
 import json
 import re
 import logging
-from typing import Dict, Any
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+from google.api_core import exceptions as google_exceptions
+from config.prompts import PROMPT_CONTINUACAO_LISTA, SCHEMAS_RESPOSTA
 from config.settings import gemini_config, app_config
-from utils.validators import validar_arquivo_pdf, ValidationError
+from services.cache_service import ExtractionCache, obter_cache_extracoes
+from services.gemini_pool import GeminiClientPool, configurar_api, obter_pool_gemini
+from services.hedging import RastreadorLatencia, executar_com_hedge
+from services.metrics import MedicaoChamada, RegistroMetricas, obter_registro_metricas
+from services.rate_limiter import (
+    GeminiRateLimiter,
+    eh_erro_sobrecarga,
+    estimar_tokens,
+    obter_limitador_gemini
+)
+from services.upload_service import (
+    DocumentoCompartilhado,
+    GeminiFileUploader,
+    InlineUploader
+)
+from utils.json_incremental import ColetorItens, ExtratorItensJson
+from utils.json_rapido import carregar_json
+from utils.retry import OperacaoCancelada, PoliticaRetry, executar_com_retry
+from utils.validators import validar_arquivo_pdf, validar_schema_resposta, ValidationError
 
 logger = logging.getLogger(__name__)
 
+_ERROS_TRANSITORIOS = (
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    ConnectionError,
+    TimeoutError
+)
+
+# Latências observadas por prompt, compartilhadas pelo processo (base do hedging)
+_rastreadores: Dict[str, RastreadorLatencia] = {}
+_rastreadores_lock = threading.Lock()
+
+_executor_hedge: Optional[ThreadPoolExecutor] = None
+_executor_hedge_lock = threading.Lock()
+
+
+class RespostaInvalida(Exception):
+    """Resposta do modelo que não é JSON válido ou não segue o schema do prompt"""
+    
+    def __init__(self, mensagem: str, texto: str = ""):
+        super().__init__(mensagem)
+        self.texto = texto
+
+
+def eh_erro_retentavel(erro: Exception) -> bool:
+    """
+    Indica se um erro da API Gemini justifica nova tentativa
+    
+    Args:
+        erro: Exceção recebida da API
+    
+    Returns:
+        True para sobrecarga (429/503), timeouts, falhas transitórias de
+        rede/servidor e respostas malformadas
+    """
+    return (
+        isinstance(erro, _ERROS_TRANSITORIOS + (RespostaInvalida,))
+        or eh_erro_sobrecarga(erro)
+    )
+
+
+def _obter_rastreador(prompt: str) -> RastreadorLatencia:
+    """Retorna o rastreador de latência do prompt, criando-o se necessário"""
+    chave = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    with _rastreadores_lock:
+        if chave not in _rastreadores:
+            _rastreadores[chave] = RastreadorLatencia()
+        return _rastreadores[chave]
+
+
+def _obter_executor_hedge() -> ThreadPoolExecutor:
+    """Retorna o executor compartilhado usado pelas chamadas com hedging"""
+    global _executor_hedge
+    
+    with _executor_hedge_lock:
+        if _executor_hedge is None:
+            _executor_hedge = ThreadPoolExecutor(
+                max_workers=gemini_config.POOL_SIZE * 2,
+                thread_name_prefix="gemini-hedge"
+            )
+        return _executor_hedge
+
 
 class GeminiService:
     """Serviço para interação com a API Gemini"""
     
-    def __init__(self):
-        """Inicializa o serviço Gemini"""
+    def __init__(
+        self,
+        cache: ExtractionCache = None,
+        uploader=None,
+        pool: GeminiClientPool = None,
+        limitador: GeminiRateLimiter = None,
+        politica_retry: PoliticaRetry = None,
+        hedge: bool = None,
+        metricas: RegistroMetricas = None,
+        schema_resposta: bool = None
+    ):
+        """
+        Inicializa o serviço Gemini
+        
+        Args:
+            cache: Cache de extrações (opcional, usa o cache global se omitido)
+            uploader: Uploader de documentos compartilhados (opcional, definido
+                por gemini_config.UPLOAD_MODE se omitido; o backend local usa
+                sempre o envio inline)
+            pool: Pool de clientes Gemini (opcional, usa o pool global se omitido)
+            limitador: Limitador de taxa e concorrência (opcional, usa o global se omitido)
+            politica_retry: Política de retry para erros transitórios (opcional)
+            hedge: Habilita requisições redundantes para chamadas lentas
+                (opcional, usa gemini_config.HEDGE_ENABLED)
+            metricas: Registro das métricas por chamada (opcional, usa o global)
+            schema_resposta: Envia e valida o schema de resposta de cada prompt
+                (opcional, usa gemini_config.RESPONSE_SCHEMA)
+        """
         try:
-            genai.configure(api_key=gemini_config.API_KEY)
-            self.model = genai.GenerativeModel(
-                gemini_config.MODEL,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=gemini_config.TEMPERATURE,
-                    response_mime_type=gemini_config.RESPONSE_MIME_TYPE
-                )
-            )
+            configurar_api()
         except Exception as e:
             logger.error(f"Erro ao configurar API Gemini: {e}")
             raise
+        
+        self.cache = cache or obter_cache_extracoes()
+        self.pool = pool or obter_pool_gemini()
+        self.limitador = limitador or obter_limitador_gemini()
+        self.politica_retry = politica_retry or PoliticaRetry(
+            tentativas=gemini_config.MAX_RETRIES,
+            espera_inicial=gemini_config.RETRY_BASE_DELAY,
+            espera_maxima=gemini_config.RETRY_MAX_DELAY
+        )
+        self.hedge = gemini_config.HEDGE_ENABLED if hedge is None else hedge
+        self.metricas = metricas or obter_registro_metricas()
+        self.schema_resposta = (
+            gemini_config.RESPONSE_SCHEMA if schema_resposta is None else schema_resposta
+        )
+        
+        if uploader is not None:
+            self.uploader = uploader
+        elif gemini_config.UPLOAD_MODE == "file_api" and gemini_config.BACKEND != "local":
+            self.uploader = GeminiFileUploader()
+        else:
+            self.uploader = InlineUploader()
+    
+    def preparar_documento(
+        self,
+        file_stream,
+        mime_type: str = "application/pdf",
+        compartilhado: bool = False
+    ) -> DocumentoCompartilhado:
+        """
+        Lê e valida um documento, preparando-o para um ou mais prompts
+        
+        Args:
+            file_stream: Stream do arquivo (BytesIO)
+            mime_type: Tipo MIME do arquivo
+            compartilhado: Se True, o documento é enviado uma única vez e
+                reaproveitado por todos os prompts que o referenciarem
+            
+        Returns:
+            DocumentoCompartilhado pronto para processar_documento
+            
+        Raises:
+            ValidationError: Se o arquivo for inválido
+        """
+        # Rebobina e lê o arquivo
+        file_stream.seek(0)
+        file_bytes = file_stream.read()
+        
+        # Valida o arquivo
+        validar_arquivo_pdf(file_bytes, max_size_mb=app_config.MAX_FILE_SIZE_MB)
+        
+        uploader = self.uploader if compartilhado else InlineUploader()
+        return DocumentoCompartilhado(
+            file_bytes,
+            uploader,
+            mime_type=mime_type,
+            nome=getattr(file_stream, "name", None) or "documento.pdf"
+        )
     
     def processar_documento(
         self,
         file_stream,
         prompt: str,
-        mime_type: str = "application/pdf"
+        mime_type: str = "application/pdf",
+        cancelamento: threading.Event = None,
+        chave_lista: str = None,
+        ao_receber_item: Callable = None,
+        nome_prompt: str = None
     ) -> Dict[str, Any]:
         """
         Processa um documento usando a API Gemini
         
+        Quando chave_lista é informada, a resposta é recebida em streaming e
+        cada item completo dessa lista é repassado a ao_receber_item assim que
+        chega. Se a chamada falhar no meio, os itens já recebidos são
+        devolvidos junto com o erro e a marca "extracao_parcial". Se a lista
+        for cortada pelo limite de saída do modelo, novas chamadas pedem os
+        itens seguintes até a lista se completar.
+        
+        Prompts com schema em config/prompts.py enviam o schema ao modelo e
+        têm a resposta validada contra ele; respostas malformadas contam
+        como erro transitório e são repetidas pela política de retry.
+        
         Args:
-            file_stream: Stream do arquivo (BytesIO)
+            file_stream: Stream do arquivo (BytesIO) ou DocumentoCompartilhado
+                já preparado por preparar_documento
             prompt: Prompt para o modelo
             mime_type: Tipo MIME do arquivo
+            cancelamento: Evento que, quando sinalizado, impede o envio à API (opcional)
+            chave_lista: Lista do JSON acompanhada em streaming (opcional)
+            ao_receber_item: Função chamada com cada item da lista (opcional)
+            nome_prompt: Nome do prompt nas métricas (opcional, usa um hash do prompt)
             
         Returns:
             Dicionário com os dados extraídos
@@ -51,47 +233,483 @@ class GeminiService:
             ValidationError: Se o arquivo for inválido
             Exception: Para outros erros da API
         """
+        coletor = ColetorItens(chave_lista, ao_receber_item) if chave_lista else None
+        schema = SCHEMAS_RESPOSTA.get(prompt) if self.schema_resposta else None
+        medicao = MedicaoChamada(
+            nome_prompt or "prompt_" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8],
+            streaming=coletor is not None
+        )
+        
         try:
-            # Rebobina e lê o arquivo
-            file_stream.seek(0)
-            file_bytes = file_stream.read()
+            if isinstance(file_stream, DocumentoCompartilhado):
+                documento = file_stream
+            else:
+                documento = self.preparar_documento(file_stream, mime_type)
+            medicao.metrica.tamanho_pdf = documento.tamanho
+            medicao.metrica.paginas = documento.paginas
             
-            # Valida o arquivo
-            validar_arquivo_pdf(file_bytes, max_size_mb=app_config.MAX_FILE_SIZE_MB)
+            # Consulta o cache antes de chamar a API
+            chave_cache = None
+            if self.cache:
+                chave_cache = self.cache.gerar_chave(
+                    documento.sha256,
+                    prompt,
+                    gemini_config.MODEL,
+                    gemini_config.TEMPERATURE
+                )
+                json_cache = self.cache.obter(chave_cache)
+                if json_cache is not None:
+                    logger.info("Resultado recuperado do cache de extrações")
+                    if coletor:
+                        coletor.repetir(json_cache.get(chave_lista) or [])
+                    self._registrar_metrica(medicao, "cache")
+                    return json_cache
             
-            # Cria o objeto "Part" para envio nativo
-            document_part = {
-                "mime_type": mime_type,
-                "data": file_bytes
-            }
+            if cancelamento is not None and cancelamento.is_set():
+                raise OperacaoCancelada("Processamento cancelado")
+            
+            # Obtém a parte do documento (inline ou referência ao upload único)
+            document_part = documento.parte()
             
-            logger.info(f"Enviando documento ({len(file_bytes)} bytes) para processamento...")
+            logger.info(f"Enviando documento ({documento.tamanho} bytes) para processamento...")
             
-            # Envia para a API
-            response = self.model.generate_content(
+            # Envia para a API com retry em erros transitórios e, se habilitado,
+            # requisição redundante quando a chamada passa do p95 histórico
+            tokens_estimados = estimar_tokens(prompt, documento.paginas)
+            response, json_data = self._executar_chamada(
                 [prompt, document_part],
-                request_options={'timeout': gemini_config.TIMEOUT}
+                prompt,
+                tokens_estimados,
+                cancelamento,
+                coletor,
+                medicao,
+                schema
             )
+            medicao.registrar_uso(response)
+            
+            if json_data is None:
+                json_data = self._continuar_lista(
+                    prompt,
+                    document_part,
+                    tokens_estimados,
+                    cancelamento,
+                    coletor,
+                    medicao,
+                    schema
+                )
             
-            # Limpa e parseia a resposta
-            clean_response = self._limpar_resposta(response.text)
-            json_data = json.loads(clean_response)
+            if chave_cache and isinstance(json_data, dict):
+                self.cache.salvar(chave_cache, json_data)
             
             logger.info("Documento processado com sucesso")
+            self._registrar_metrica(medicao, "sucesso")
             return json_data
             
-        except json.JSONDecodeError as e:
+        except RespostaInvalida as e:
             logger.error(f"Erro ao decodificar JSON da resposta: {e}")
-            logger.error(f"Resposta recebida: {response.text[:500]}")
-            return {"erro_agente": f"Resposta inválida: {str(e)}"}
+            logger.error(f"Resposta recebida: {e.texto[:500]}")
+            self._registrar_metrica(medicao, "erro", f"Resposta inválida: {str(e)}")
+            return self._resultado_erro(f"Resposta inválida: {str(e)}", coletor)
         
         except ValidationError as e:
             logger.error(f"Erro de validação: {e}")
+            self._registrar_metrica(medicao, "erro", str(e))
             return {"erro_agente": str(e)}
         
+        except OperacaoCancelada:
+            logger.info("Processamento cancelado antes do envio")
+            self._registrar_metrica(medicao, "cancelado")
+            return self._resultado_erro("Processamento cancelado", coletor)
+        
         except Exception as e:
             logger.error(f"Erro ao processar documento: {e}")
-            return {"erro_agente": str(e)}
+            self._registrar_metrica(medicao, "erro", str(e))
+            return self._resultado_erro(str(e), coletor)
+    
+    async def processar_documento_async(
+        self,
+        file_stream,
+        prompt: str,
+        mime_type: str = "application/pdf",
+        chave_lista: str = None,
+        ao_receber_item: Callable = None,
+        nome_prompt: str = None
+    ) -> Dict[str, Any]:
+        """
+        Variante assíncrona de processar_documento
+        
+        A chamada ao SDK roda em uma thread de trabalho, de modo que cache,
+        pool e demais controles seguem o mesmo caminho da versão síncrona.
+        Se a tarefa for cancelada, chamadas que ainda não foram enviadas à
+        API são descartadas. O callback de itens roda no loop de eventos,
+        não na thread de trabalho.
+        
+        Args:
+            file_stream: Stream do arquivo (BytesIO) ou DocumentoCompartilhado
+            prompt: Prompt para o modelo
+            mime_type: Tipo MIME do arquivo
+            chave_lista: Lista do JSON acompanhada em streaming (opcional)
+            ao_receber_item: Função chamada com cada item da lista (opcional)
+            nome_prompt: Nome do prompt nas métricas (opcional)
+            
+        Returns:
+            Dicionário com os dados extraídos
+        """
+        cancelamento = threading.Event()
+        
+        # Os itens chegam na thread de trabalho e são repassados ao loop
+        loop = asyncio.get_running_loop()
+        callback = (
+            (lambda item: loop.call_soon_threadsafe(ao_receber_item, item))
+            if ao_receber_item else None
+        )
+        
+        try:
+            return await asyncio.to_thread(
+                self.processar_documento,
+                file_stream,
+                prompt,
+                mime_type,
+                cancelamento,
+                chave_lista,
+                callback,
+                nome_prompt
+            )
+        except asyncio.CancelledError:
+            cancelamento.set()
+            raise
+    
+    def _executar_chamada(
+        self,
+        conteudo: List[Any],
+        prompt: str,
+        tokens_estimados: int,
+        cancelamento: threading.Event = None,
+        coletor: ColetorItens = None,
+        medicao: MedicaoChamada = None,
+        schema: Dict[str, Any] = None
+    ):
+        """
+        Executa generate_content com retry e hedging
+        
+        Chamadas em streaming não recebem cópia redundante: duas respostas
+        concorrentes alimentariam o mesmo coletor de itens. A resposta é
+        decodificada dentro da tentativa, para que uma resposta malformada
+        seja repetida como qualquer outro erro transitório; uma lista cortada
+        pelo limite de saída não é repetida, e sim devolvida para continuação.
+        
+        Args:
+            conteudo: Conteúdo enviado ao modelo (prompt e documento)
+            prompt: Prompt usado para agrupar as latências observadas
+            tokens_estimados: Tokens de entrada estimados para o limitador
+            cancelamento: Evento que interrompe novas tentativas (opcional)
+            coletor: Coletor de itens para resposta em streaming (opcional)
+            medicao: Medição onde cada tentativa é somada (opcional)
+            schema: Schema de resposta do prompt (opcional)
+        
+        Returns:
+            Tupla (resposta de generate_content, JSON decodificado ou None se
+            a lista acompanhada pelo coletor foi truncada)
+        """
+        rastreador = _obter_rastreador(prompt)
+        limiar = None if coletor else self._limiar_hedge(rastreador)
+        
+        def chamar():
+            response = self._chamar_modelo(
+                conteudo, tokens_estimados, rastreador, cancelamento, coletor, medicao, schema
+            )
+            if coletor is not None and self._resposta_truncada(response, coletor.chave_lista):
+                return response, None
+            return response, self._decodificar_resposta(response.text, schema)
+        
+        def chamar_com_hedge():
+            return executar_com_hedge(chamar, limiar, _obter_executor_hedge())
+        
+        return executar_com_retry(
+            chamar_com_hedge,
+            self.politica_retry,
+            eh_erro_retentavel,
+            cancelamento=cancelamento,
+            descricao="chamada ao Gemini"
+        )
+    
+    def _chamar_modelo(
+        self,
+        conteudo: List[Any],
+        tokens_estimados: int,
+        rastreador: RastreadorLatencia,
+        cancelamento: threading.Event = None,
+        coletor: ColetorItens = None,
+        medicao: MedicaoChamada = None,
+        schema: Dict[str, Any] = None
+    ):
+        """
+        Faz uma única chamada ao modelo respeitando limitador e pool
+        
+        Em streaming, a resposta é consumida ainda dentro do pool e do
+        limitador, já que a conexão continua ocupada até o último trecho.
+        
+        Args:
+            conteudo: Conteúdo enviado ao modelo
+            tokens_estimados: Tokens de entrada estimados para o limitador
+            rastreador: Rastreador onde a latência da chamada é registrada
+            cancelamento: Evento que impede o envio (opcional)
+            coletor: Coletor de itens para resposta em streaming (opcional)
+            medicao: Medição onde a tentativa é somada (opcional)
+            schema: Schema enviado como response_schema (opcional)
+        
+        Returns:
+            Resposta de generate_content
+        
+        Raises:
+            OperacaoCancelada: Se o cancelamento for sinalizado antes do envio
+        """
+        opcoes = {'request_options': {'timeout': gemini_config.TIMEOUT}}
+        if schema:
+            opcoes['generation_config'] = {
+                'response_mime_type': gemini_config.RESPONSE_MIME_TYPE,
+                'response_schema': schema
+            }
+        
+        with self.limitador.permissao(tokens_estimados) as permissao:
+            inicio_fila = time.monotonic()
+            with self.pool.adquirir() as model:
+                if cancelamento is not None and cancelamento.is_set():
+                    raise OperacaoCancelada("Processamento cancelado")
+                
+                inicio = time.monotonic()
+                espera_fila = permissao.espera + (inicio - inicio_fila)
+                try:
+                    if coletor is None:
+                        response = model.generate_content(conteudo, **opcoes)
+                    else:
+                        response = model.generate_content(conteudo, stream=True, **opcoes)
+                        extrator = coletor.novo_extrator()
+                        for trecho in response:
+                            coletor.alimentar(extrator, self._texto_trecho(trecho))
+                finally:
+                    if medicao is not None:
+                        medicao.registrar_tentativa(espera_fila, time.monotonic() - inicio)
+                rastreador.registrar(time.monotonic() - inicio)
+            permissao.registrar_tokens(self._tokens_entrada(response))
+        
+        return response
+    
+    def _limiar_hedge(self, rastreador: RastreadorLatencia) -> Optional[float]:
+        """
+        Calcula após quantos segundos uma chamada recebe uma cópia redundante
+        
+        Args:
+            rastreador: Latências observadas para o prompt
+            
+        Returns:
+            Limiar em segundos ou None se o hedging estiver desligado ou sem histórico
+        """
+        if not self.hedge:
+            return None
+        
+        percentil = rastreador.percentil(gemini_config.HEDGE_PERCENTILE)
+        if percentil is None:
+            return None
+        return max(percentil, gemini_config.HEDGE_MIN_DELAY)
+    
+    def _texto_trecho(self, trecho) -> str:
+        """
+        Lê o texto de um trecho da resposta em streaming
+        
+        Args:
+            trecho: Trecho recebido de generate_content(stream=True)
+            
+        Returns:
+            Texto do trecho (vazio se o trecho não trouxer texto)
+        """
+        try:
+            return trecho.text or ""
+        except ValueError:
+            # Trechos finais só com metadados não têm partes de texto
+            return ""
+    
+    def _registrar_metrica(self, medicao: MedicaoChamada, resultado: str, erro: str = None):
+        """
+        Encerra a medição da chamada e a envia ao registro de métricas
+        
+        Args:
+            medicao: Medição da chamada
+            resultado: "sucesso", "cache", "erro" ou "cancelado"
+            erro: Mensagem de erro (opcional)
+        """
+        metrica = medicao.finalizar(resultado, erro)
+        self.metricas.registrar(metrica)
+        logger.info(
+            f"Métrica '{metrica.prompt}': {metrica.resultado} em {metrica.duracao:.2f}s "
+            f"(fila {metrica.espera_fila:.2f}s, tokens {metrica.tokens_entrada}/{metrica.tokens_saida})"
+        )
+    
+    def _resultado_erro(self, mensagem: str, coletor: ColetorItens = None) -> Dict[str, Any]:
+        """
+        Monta o resultado de erro, preservando itens já recebidos em streaming
+        
+        Args:
+            mensagem: Descrição do erro
+            coletor: Coletor de itens da chamada (opcional)
+            
+        Returns:
+            Dicionário com erro_agente e, se houver, os itens parciais
+        """
+        if coletor and coletor.itens:
+            logger.warning(
+                f"Extração parcial: {len(coletor.itens)} itens de "
+                f"'{coletor.chave_lista}' recebidos antes do erro"
+            )
+            return {
+                coletor.chave_lista: list(coletor.itens),
+                "erro_agente": mensagem,
+                "extracao_parcial": True
+            }
+        return {"erro_agente": mensagem}
+    
+    def _tokens_entrada(self, response) -> Optional[int]:
+        """
+        Lê a contagem de tokens de entrada informada pela API
+        
+        Args:
+            response: Resposta de generate_content
+            
+        Returns:
+            Tokens de entrada ou None se a resposta não trouxer a contagem
+        """
+        uso = getattr(response, "usage_metadata", None)
+        tokens = getattr(uso, "prompt_token_count", None)
+        return tokens if isinstance(tokens, int) else None
+    
+    def _continuar_lista(
+        self,
+        prompt: str,
+        document_part: Any,
+        tokens_estimados: int,
+        cancelamento: Optional[threading.Event],
+        coletor: ColetorItens,
+        medicao: MedicaoChamada,
+        schema: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Completa uma lista truncada pelo limite de saída do modelo
+        
+        Os itens completos já recebidos são mantidos e cada continuação pede
+        os itens seguintes ao último deles. Termina quando uma resposta fecha
+        o JSON; desiste se uma continuação não trouxer itens novos ou após
+        gemini_config.MAX_CONTINUATIONS chamadas.
+        
+        Args:
+            prompt: Prompt original
+            document_part: Parte do documento já enviada na primeira chamada
+            tokens_estimados: Tokens de entrada estimados para o limitador
+            cancelamento: Evento que interrompe novas chamadas (opcional)
+            coletor: Coletor com os itens recebidos até aqui
+            medicao: Medição da chamada
+            schema: Schema de resposta do prompt (opcional)
+            
+        Returns:
+            JSON completo, com a lista de todas as chamadas
+            
+        Raises:
+            RespostaInvalida: Se a lista não puder ser completada
+        """
+        chave = coletor.chave_lista
+        
+        for continuacao in range(1, gemini_config.MAX_CONTINUATIONS + 1):
+            anteriores = list(coletor.itens)
+            if not anteriores:
+                raise RespostaInvalida(f"Resposta truncada sem itens completos em '{chave}'")
+            
+            logger.warning(
+                f"Lista '{chave}' truncada após {len(anteriores)} itens; "
+                f"continuação {continuacao}/{gemini_config.MAX_CONTINUATIONS}"
+            )
+            coletor.continuar()
+            instrucao = PROMPT_CONTINUACAO_LISTA.format(
+                quantidade=len(anteriores),
+                chave_lista=chave,
+                ultimo_item=json.dumps(anteriores[-1], ensure_ascii=False)
+            )
+            response, dados = self._executar_chamada(
+                [prompt + instrucao, document_part],
+                prompt,
+                tokens_estimados,
+                cancelamento,
+                coletor,
+                medicao,
+                schema
+            )
+            medicao.registrar_uso(response)
+            
+            if dados is not None:
+                if not isinstance(dados, dict):
+                    raise RespostaInvalida(f"Continuação de '{chave}' não é um objeto JSON")
+                novos = list(dados.get(chave) or [])
+                # O modelo às vezes repete o último item informado
+                if novos and novos[0] == anteriores[-1]:
+                    novos = novos[1:]
+                logger.info(f"Lista '{chave}' completa com {len(anteriores) + len(novos)} itens")
+                return {**dados, chave: anteriores + novos}
+            
+            if len(coletor.itens) == len(anteriores):
+                raise RespostaInvalida(f"Continuação de '{chave}' sem itens novos")
+        
+        raise RespostaInvalida(
+            f"Lista '{chave}' incompleta após {gemini_config.MAX_CONTINUATIONS} continuações"
+        )
+    
+    def _resposta_truncada(self, response, chave_lista: str) -> bool:
+        """
+        Indica se a resposta parou no limite de saída no meio da lista
+        
+        Considera o finish_reason MAX_TOKENS ou, sem ele, um JSON cuja lista
+        tem itens completos mas nunca foi fechada.
+        
+        Args:
+            response: Resposta de generate_content
+            chave_lista: Lista acompanhada na resposta
+            
+        Returns:
+            True se a resposta foi truncada
+        """
+        try:
+            motivo = response.candidates[0].finish_reason
+        except (AttributeError, IndexError, TypeError, ValueError):
+            motivo = None
+        if getattr(motivo, "name", motivo) == "MAX_TOKENS":
+            return True
+        
+        extrator = ExtratorItensJson(chave_lista)
+        extrator.alimentar(self._limpar_resposta(response.text))
+        return bool(extrator.itens) and not extrator.concluido
+    
+    def _decodificar_resposta(self, texto: str, schema: Dict[str, Any] = None) -> Any:
+        """
+        Decodifica o JSON da resposta e o valida contra o schema do prompt
+        
+        Args:
+            texto: Texto completo da resposta
+            schema: Schema de resposta do prompt (opcional)
+        
+        Returns:
+            JSON decodificado
+        
+        Raises:
+            RespostaInvalida: Se o texto não for JSON ou divergir do schema
+        """
+        try:
+            dados = carregar_json(self._limpar_resposta(texto))
+        except json.JSONDecodeError as e:
+            raise RespostaInvalida(f"JSON inválido: {e}", texto) from e
+        
+        if schema:
+            try:
+                validar_schema_resposta(dados, schema)
+            except ValidationError as e:
+                raise RespostaInvalida(str(e), texto) from e
+        return dados
     
     def _limpar_resposta(self, texto: str) -> str:
         """
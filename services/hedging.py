@@ -0,0 +1,93 @@
+"""
+Requisições redundantes (hedging) para reduzir a cauda de latência
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Callable, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RastreadorLatencia:
+    """Janela deslizante de latências observadas para cálculo de percentis"""
+    
+    def __init__(self, janela: int = 100, minimo_amostras: int = 10):
+        """
+        Inicializa o rastreador
+        
+        Args:
+            janela: Número máximo de amostras mantidas
+            minimo_amostras: Amostras necessárias antes de reportar percentis
+        """
+        self.minimo_amostras = minimo_amostras
+        self._amostras = deque(maxlen=janela)
+        self._lock = threading.Lock()
+    
+    def registrar(self, segundos: float):
+        """Registra a duração de uma chamada bem-sucedida"""
+        with self._lock:
+            self._amostras.append(segundos)
+    
+    def percentil(self, p: float) -> Optional[float]:
+        """
+        Calcula um percentil das latências registradas
+        
+        Args:
+            p: Percentil entre 0 e 1 (ex.: 0.95)
+            
+        Returns:
+            Latência no percentil ou None se ainda não houver amostras suficientes
+        """
+        with self._lock:
+            if len(self._amostras) < self.minimo_amostras:
+                return None
+            ordenadas = sorted(self._amostras)
+        
+        indice = min(int(p * len(ordenadas)), len(ordenadas) - 1)
+        return ordenadas[indice]
+
+
+def executar_com_hedge(
+    funcao: Callable[[], Any],
+    limiar: Optional[float],
+    executor: Executor
+) -> Any:
+    """
+    Executa a função e, se ela passar do limiar, dispara uma cópia
+    
+    O resultado é o da primeira execução que terminar com sucesso. A
+    execução perdedora não é interrompida (o SDK não permite abortar a
+    chamada), apenas ignorada.
+    
+    Args:
+        funcao: Função sem argumentos a executar
+        limiar: Segundos de espera antes de disparar a cópia (None desativa o hedge)
+        executor: Executor onde as execuções rodam
+        
+    Returns:
+        Resultado da primeira execução bem-sucedida
+        
+    Raises:
+        Exception: O erro da última execução, se ambas falharem
+    """
+    if limiar is None:
+        return funcao()
+    
+    original = executor.submit(funcao)
+    concluidas, _ = wait([original], timeout=limiar)
+    if concluidas:
+        return original.result()
+    
+    logger.info(f"Chamada excedeu {limiar:.1f}s: disparando requisição redundante")
+    pendentes = {original, executor.submit(funcao)}
+    
+    while True:
+        concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in concluidas:
+            if futuro.exception() is None:
+                return futuro.result()
+        if not pendentes:
+            # Ambas falharam: propaga o erro da última
+            return concluidas.pop().result()
@@ -0,0 +1,586 @@
+"""
+Fila persistente de extrações em SQLite, executada por um pool de workers
+
+A interface só enfileira a solicitação e consulta o status do job; a
+extração roda em threads de PoolWorkers (dentro do processo do Streamlit ou
+em um worker.py à parte), então um refresh do navegador ou um rerun de
+widget não interrompe o processamento. Jobs em execução renovam um sinal de
+vida; se o processo morrer, eles voltam para a fila no próximo início.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+from config.settings import db_config, job_queue_config
+from services.batch_runner import STATUS_ERRO, processar_uma
+from services.pdf_processor import PDFProcessor
+
+logger = logging.getLogger(__name__)
+
+# Estados do job na fila; o desfecho da extração fica em Job.status
+ESTADO_PENDENTE = "pendente"
+ESTADO_EXECUTANDO = "executando"
+ESTADO_CONCLUIDO = "concluido"
+ESTADO_CANCELADO = "cancelado"
+
+ESTADOS_ATIVOS = (ESTADO_PENDENTE, ESTADO_EXECUTANDO)
+
+_SQL_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    num_solic INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    etapa TEXT,
+    progresso TEXT,
+    status TEXT,
+    caminho_arquivo TEXT,
+    erro TEXT,
+    duracao_s REAL,
+    resultado TEXT,
+    worker TEXT,
+    criado_em REAL NOT NULL,
+    iniciado_em REAL,
+    concluido_em REAL,
+    sinal_vida REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_estado ON jobs (estado, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_num_solic ON jobs (num_solic, estado);
+"""
+
+# Colunas lidas na listagem (sem o JSON do resultado)
+_COLUNAS_RESUMO = (
+    "id, num_solic, estado, tentativas, etapa, progresso, status, caminho_arquivo, "
+    "erro, duracao_s, worker, criado_em, iniciado_em, concluido_em, sinal_vida"
+)
+
+
+@dataclass
+class Job:
+    """Job de extração de uma solicitação"""
+    id: int
+    num_solic: int
+    estado: str
+    tentativas: int = 0
+    # Etapa atual do pipeline (ETAPAS) e texto de progresso de locais e coberturas
+    etapa: Optional[str] = None
+    progresso: Optional[str] = None
+    # Desfecho da extração: ok, incompleto, sem_anexos ou erro (batch_runner)
+    status: Optional[str] = None
+    caminho_arquivo: Optional[str] = None
+    erro: Optional[str] = None
+    duracao_s: Optional[float] = None
+    # JSON final, só preenchido por FilaJobs.obter
+    resultado: Optional[Dict[str, Any]] = None
+    worker: Optional[str] = None
+    # Instantes em segundos desde a época (time.time())
+    criado_em: Optional[float] = None
+    iniciado_em: Optional[float] = None
+    concluido_em: Optional[float] = None
+    sinal_vida: Optional[float] = None
+    
+    @property
+    def ativo(self) -> bool:
+        return self.estado in ESTADOS_ATIVOS
+
+
+class FilaJobs:
+    """
+    Fila de jobs em uma base SQLite, compartilhável entre processos
+    
+    A reserva de um job e o enfileiramento rodam em transações BEGIN
+    IMMEDIATE, então dois workers (ou dois processos) nunca pegam o mesmo
+    job. A base usa WAL para que a interface consulte o status enquanto os
+    workers gravam. Cada thread usa sua própria conexão.
+    """
+    
+    def __init__(self, caminho: str = None):
+        """
+        Inicializa a fila, criando o arquivo e a tabela se não existirem
+        
+        Args:
+            caminho: Arquivo SQLite (opcional, usa job_queue_config.PATH)
+        """
+        self.caminho = caminho or job_queue_config.PATH
+        self._local = threading.local()
+        
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        conexao = self._conexao()
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript(_SQL_CRIAR_TABELA)
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual, em modo autocommit (transações explícitas)"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=db_config.TIMEOUT, isolation_level=None)
+            conexao.row_factory = sqlite3.Row
+            self._local.conexao = conexao
+        return conexao
+    
+    @contextmanager
+    def _transacao(self) -> Iterator[sqlite3.Connection]:
+        """Transação com trava de escrita desde o início"""
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexao
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+    
+    def enfileirar(self, num_solic: int) -> int:
+        """
+        Enfileira a extração de uma solicitação
+        
+        Se a solicitação já tiver um job pendente ou em execução, ele é
+        reaproveitado: cliques repetidos e reruns não duplicam o trabalho.
+        
+        Args:
+            num_solic: Número da solicitação
+        
+        Returns:
+            Id do job
+        """
+        with self._transacao() as conexao:
+            existente = conexao.execute(
+                "SELECT id FROM jobs WHERE num_solic = ? AND estado IN (?, ?) ORDER BY id LIMIT 1",
+                (num_solic, *ESTADOS_ATIVOS)
+            ).fetchone()
+            if existente:
+                return existente["id"]
+            
+            cursor = conexao.execute(
+                "INSERT INTO jobs (num_solic, estado, criado_em) VALUES (?, ?, ?)",
+                (num_solic, ESTADO_PENDENTE, time.time())
+            )
+        logger.info(f"Solicitação {num_solic} enfileirada (job {cursor.lastrowid})")
+        return cursor.lastrowid
+    
+    def obter(self, job_id: int) -> Optional[Job]:
+        """
+        Lê um job com o JSON do resultado
+        
+        Args:
+            job_id: Id do job
+        
+        Returns:
+            Job ou None se não existir
+        """
+        row = self._conexao().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+    
+    def listar(self, limite: int = 20, num_solic: int = None) -> List[Job]:
+        """
+        Lista os jobs mais recentes, sem o JSON do resultado
+        
+        Args:
+            limite: Quantidade máxima de jobs
+            num_solic: Restringe a uma solicitação (opcional)
+        
+        Returns:
+            Jobs do mais novo para o mais antigo
+        """
+        filtro, params = ("WHERE num_solic = ?", (num_solic,)) if num_solic is not None else ("", ())
+        rows = self._conexao().execute(
+            f"SELECT {_COLUNAS_RESUMO} FROM jobs {filtro} ORDER BY id DESC LIMIT ?",
+            (*params, limite)
+        ).fetchall()
+        return [_job(row) for row in rows]
+    
+    def reservar(self, worker: str) -> Optional[Job]:
+        """
+        Pega o job pendente mais antigo e o marca como em execução
+        
+        Args:
+            worker: Identificação de quem executa (registrada no job)
+        
+        Returns:
+            Job reservado ou None se a fila estiver vazia
+        """
+        with self._transacao() as conexao:
+            row = conexao.execute(
+                "SELECT id FROM jobs WHERE estado = ? ORDER BY id LIMIT 1",
+                (ESTADO_PENDENTE,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            agora = time.time()
+            conexao.execute(
+                "UPDATE jobs SET estado = ?, tentativas = tentativas + 1, worker = ?, "
+                "iniciado_em = ?, sinal_vida = ?, etapa = NULL, progresso = NULL WHERE id = ?",
+                (ESTADO_EXECUTANDO, worker, agora, agora, row["id"])
+            )
+            job = conexao.execute(f"SELECT {_COLUNAS_RESUMO} FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return _job(job)
+    
+    def atualizar_progresso(self, job_id: int, etapa: str = None, progresso: str = None):
+        """
+        Registra a etapa ou o progresso de um job em execução e renova seu sinal de vida
+        
+        Args:
+            job_id: Id do job
+            etapa: Etapa atual (opcional, mantém a anterior)
+            progresso: Texto de progresso (opcional, mantém o anterior)
+        """
+        self._conexao().execute(
+            "UPDATE jobs SET etapa = COALESCE(?, etapa), progresso = COALESCE(?, progresso), "
+            "sinal_vida = ? WHERE id = ? AND estado = ?",
+            (etapa, progresso, time.time(), job_id, ESTADO_EXECUTANDO)
+        )
+    
+    def renovar(self, job_ids: List[int]):
+        """
+        Renova o sinal de vida de jobs em execução
+        
+        Args:
+            job_ids: Ids dos jobs do worker
+        """
+        if not job_ids:
+            return
+        marcadores = ", ".join("?" for _ in job_ids)
+        self._conexao().execute(
+            f"UPDATE jobs SET sinal_vida = ? WHERE estado = ? AND id IN ({marcadores})",
+            (time.time(), ESTADO_EXECUTANDO, *job_ids)
+        )
+    
+    def concluir(self, job_id: int, worker: str, registro: Dict[str, Any]) -> bool:
+        """
+        Grava o desfecho de um job, se ele ainda estiver reservado para o worker
+        
+        Um job devolvido à fila por recuperar_abandonados pode ter sido
+        reservado por outro worker; o desfecho do primeiro é então descartado.
+        
+        Args:
+            job_id: Id do job
+            worker: Identificação usada na reserva
+            registro: Registro de processar_uma (status, caminho_arquivo, erro,
+                duracao_s e final_json)
+        
+        Returns:
+            True se o desfecho foi gravado
+        """
+        resultado = registro.get("final_json")
+        cursor = self._conexao().execute(
+            "UPDATE jobs SET estado = ?, status = ?, caminho_arquivo = ?, erro = ?, duracao_s = ?, "
+            "resultado = ?, concluido_em = ? WHERE id = ? AND estado = ? AND worker = ?",
+            (
+                ESTADO_CONCLUIDO,
+                registro["status"],
+                registro.get("caminho_arquivo"),
+                registro.get("erro"),
+                registro.get("duracao_s"),
+                json.dumps(resultado, ensure_ascii=False) if resultado is not None else None,
+                time.time(),
+                job_id,
+                ESTADO_EXECUTANDO,
+                worker
+            )
+        )
+        if cursor.rowcount != 1:
+            logger.warning(
+                f"Job {job_id}: desfecho de {worker} descartado; o job foi devolvido à fila "
+                f"ou reservado por outro worker"
+            )
+            return False
+        return True
+    
+    def cancelar(self, job_id: int) -> bool:
+        """
+        Cancela um job que ainda não começou
+        
+        Args:
+            job_id: Id do job
+        
+        Returns:
+            True se o job estava pendente e foi cancelado
+        """
+        cursor = self._conexao().execute(
+            "UPDATE jobs SET estado = ?, concluido_em = ? WHERE id = ? AND estado = ?",
+            (ESTADO_CANCELADO, time.time(), job_id, ESTADO_PENDENTE)
+        )
+        return cursor.rowcount == 1
+    
+    def recuperar_abandonados(self, tempo_limite: float = None, tentativas_maximas: int = None) -> int:
+        """
+        Devolve à fila os jobs em execução cujo worker parou de dar sinal de vida
+        
+        Jobs que já foram interrompidos tentativas_maximas vezes terminam com
+        status erro em vez de voltar para a fila.
+        
+        Args:
+            tempo_limite: Segundos sem sinal de vida (opcional, usa job_queue_config.HEARTBEAT_TIMEOUT)
+            tentativas_maximas: Execuções aceitas (opcional, usa job_queue_config.MAX_ATTEMPTS)
+        
+        Returns:
+            Quantidade de jobs recuperados ou encerrados
+        """
+        tempo_limite = job_queue_config.HEARTBEAT_TIMEOUT if tempo_limite is None else tempo_limite
+        tentativas_maximas = tentativas_maximas or job_queue_config.MAX_ATTEMPTS
+        limite = time.time() - tempo_limite
+        
+        with self._transacao() as conexao:
+            encerrados = conexao.execute(
+                "UPDATE jobs SET estado = ?, status = ?, erro = ?, concluido_em = ? "
+                "WHERE estado = ? AND sinal_vida < ? AND tentativas >= ?",
+                (
+                    ESTADO_CONCLUIDO,
+                    STATUS_ERRO,
+                    f"Execução interrompida {tentativas_maximas} vezes (worker encerrado)",
+                    time.time(),
+                    ESTADO_EXECUTANDO,
+                    limite,
+                    tentativas_maximas
+                )
+            ).rowcount
+            devolvidos = conexao.execute(
+                "UPDATE jobs SET estado = ?, worker = NULL WHERE estado = ? AND sinal_vida < ?",
+                (ESTADO_PENDENTE, ESTADO_EXECUTANDO, limite)
+            ).rowcount
+        
+        if encerrados or devolvidos:
+            logger.warning(
+                f"Jobs abandonados: {devolvidos} devolvidos à fila, {encerrados} encerrados com erro"
+            )
+        return encerrados + devolvidos
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna a quantidade de jobs por estado
+        
+        Returns:
+            Dicionário estado -> quantidade
+        """
+        rows = self._conexao().execute("SELECT estado, COUNT(*) AS quantidade FROM jobs GROUP BY estado")
+        return {row["estado"]: row["quantidade"] for row in rows}
+
+
+def _job(row: sqlite3.Row) -> Job:
+    """Converte uma linha da tabela em Job"""
+    dados = dict(zip(row.keys(), row))
+    if dados.get("resultado"):
+        dados["resultado"] = json.loads(dados["resultado"])
+    return Job(**dados)
+
+
+class PoolWorkers:
+    """
+    Threads que retiram jobs da fila e executam o pipeline de cada solicitação
+    
+    Uma thread extra renova o sinal de vida dos jobs em andamento (as
+    chamadas ao Gemini podem passar minutos sem nenhuma etapa nova) e
+    devolve à fila os jobs abandonados por outros processos.
+    """
+    
+    def __init__(
+        self,
+        fila: FilaJobs = None,
+        fonte=None,
+        processor: PDFProcessor = None,
+        workers: int = None,
+        diretorio_saida: str = None,
+        intervalo_consulta: float = None
+    ):
+        """
+        Inicializa o pool (as threads só começam em iniciar)
+        
+        Args:
+            fila: Fila de jobs (opcional, usa obter_fila_jobs())
+            fonte: Fonte de anexos (opcional, usa criar_fonte_anexos())
+            processor: Processador de PDFs compartilhado (opcional, cria um novo)
+            workers: Jobs simultâneos (opcional, usa job_queue_config.WORKERS)
+            diretorio_saida: Diretório dos JSONs (opcional)
+            intervalo_consulta: Segundos entre consultas à fila vazia
+                (opcional, usa job_queue_config.POLL_INTERVAL)
+        """
+        if fonte is None:
+            from services.attachment_sources import criar_fonte_anexos
+            fonte = criar_fonte_anexos()
+        
+        self.fila = fila or obter_fila_jobs()
+        self.fonte = fonte
+        self.processor = processor or PDFProcessor()
+        self.workers = workers or job_queue_config.WORKERS
+        self.diretorio_saida = diretorio_saida
+        self.intervalo_consulta = intervalo_consulta or job_queue_config.POLL_INTERVAL
+        self.identificacao = f"{socket.gethostname()}:{os.getpid()}"
+        
+        self._parar = threading.Event()
+        self._fim_sinal_vida = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._sinal_vida: Optional[threading.Thread] = None
+        self._em_andamento: set = set()
+        self._processados = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def ativo(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def iniciar(self):
+        """Recupera jobs abandonados e inicia as threads"""
+        if self.ativo:
+            return
+        
+        self._parar.clear()
+        self._fim_sinal_vida.clear()
+        self.fila.recuperar_abandonados()
+        self._threads = [
+            threading.Thread(target=self._executar, name=f"job-worker-{i + 1}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._sinal_vida = threading.Thread(target=self._manter_sinal_vida, name="job-sinal-vida", daemon=True)
+        for thread in (*self._threads, self._sinal_vida):
+            thread.start()
+        logger.info(f"{self.workers} workers consumindo a fila {self.fila.caminho}")
+    
+    def parar(self, aguardar: bool = True, timeout: float = None):
+        """
+        Para de retirar jobs da fila
+        
+        Args:
+            aguardar: Espera os jobs em andamento terminarem (sem esperar, o
+                sinal de vida continua sendo renovado até o fim do processo)
+            timeout: Segundos máximos de espera por thread (opcional, sem limite)
+        """
+        self._parar.set()
+        if aguardar:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._fim_sinal_vida.set()
+            if self._sinal_vida:
+                self._sinal_vida.join(timeout)
+    
+    def _executar(self):
+        """Laço de uma thread: reserva, processa e conclui jobs até o sinal de parada"""
+        worker = f"{self.identificacao}:{threading.current_thread().name}"
+        while not self._parar.is_set():
+            try:
+                job = self.fila.reservar(worker)
+            except sqlite3.Error as e:
+                logger.error(f"Falha ao consultar a fila de jobs: {e}")
+                job = None
+            
+            if job is None:
+                self._parar.wait(self.intervalo_consulta)
+                continue
+            
+            with self._lock:
+                self._em_andamento.add(job.id)
+            try:
+                self._processar(job)
+            except Exception as e:
+                # Falha fora do pipeline (ex.: base da fila travada): encerra o job
+                # com erro e mantém a thread consumindo a fila
+                logger.error(f"Job {job.id}: falha ao processar a solicitação {job.num_solic}: {e}")
+                try:
+                    self.fila.concluir(job.id, worker, {"status": STATUS_ERRO, "erro": f"{type(e).__name__}: {e}"})
+                except sqlite3.Error as erro_fila:
+                    # Sem sinal de vida renovado, o job volta à fila em recuperar_abandonados
+                    logger.error(f"Job {job.id}: falha ao registrar o erro na fila: {erro_fila}")
+            finally:
+                with self._lock:
+                    self._em_andamento.discard(job.id)
+                    self._processados += 1
+    
+    def _processar(self, job: Job):
+        """Executa o pipeline de um job e grava o desfecho"""
+        logger.info(f"Job {job.id}: processando solicitação {job.num_solic} (tentativa {job.tentativas})")
+        contagem = {'locais': 0, 'coberturas': 0}
+        
+        def ao_iniciar_etapa(etapa: str):
+            self.fila.atualizar_progresso(job.id, etapa=etapa)
+        
+        def ao_receber_item(secao: str, item: dict):
+            contagem[secao] += 1
+            self.fila.atualizar_progresso(
+                job.id,
+                progresso=f"{contagem['locais']} locais e {contagem['coberturas']} coberturas recebidos"
+            )
+        
+        registro = processar_uma(
+            job.num_solic,
+            self.fonte,
+            self.processor,
+            self.diretorio_saida,
+            ao_iniciar_etapa=ao_iniciar_etapa,
+            ao_receber_item=ao_receber_item
+        )
+        
+        if self.fila.concluir(job.id, job.worker, registro):
+            logger.info(f"Job {job.id}: solicitação {job.num_solic} concluída com status {registro['status']}")
+    
+    def _manter_sinal_vida(self):
+        """Renova o sinal de vida dos jobs em andamento e recupera os abandonados"""
+        intervalo = max(job_queue_config.HEARTBEAT_TIMEOUT / 4, self.intervalo_consulta)
+        while not self._fim_sinal_vida.wait(intervalo):
+            try:
+                with self._lock:
+                    job_ids = list(self._em_andamento)
+                self.fila.renovar(job_ids)
+                self.fila.recuperar_abandonados()
+            except sqlite3.Error as e:
+                logger.error(f"Falha ao renovar o sinal de vida dos jobs: {e}")
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do pool e da fila
+        
+        Returns:
+            Dicionário com workers, em_andamento, processados e jobs por estado
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "em_andamento": len(self._em_andamento),
+                "processados": self._processados,
+                "fila": self.fila.estatisticas()
+            }
+
+
+_fila_global: Optional[FilaJobs] = None
+_pool_global: Optional[PoolWorkers] = None
+_fila_lock = threading.Lock()
+
+
+def obter_fila_jobs() -> FilaJobs:
+    """
+    Retorna a fila de jobs compartilhada pelo processo
+    
+    Returns:
+        Instância única da fila em job_queue_config.PATH
+    """
+    global _fila_global
+    
+    with _fila_lock:
+        if _fila_global is None:
+            _fila_global = FilaJobs()
+        return _fila_global
+
+
+def obter_pool_workers(processor: PDFProcessor = None) -> PoolWorkers:
+    """
+    Retorna o pool de workers do processo, iniciando-o na primeira chamada
+    
+    Args:
+        processor: Processador de PDFs compartilhado (opcional, usado só na criação)
+    
+    Returns:
+        Instância única do pool, já iniciada
+    """
+    global _pool_global
+    
+    fila = obter_fila_jobs()
+    with _fila_lock:
+        if _pool_global is None:
+            _pool_global = PoolWorkers(fila, processor=processor)
+        _pool_global.iniciar()
+        return _pool_global
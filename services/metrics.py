@@ -0,0 +1,224 @@
+"""
+Métricas por chamada ao Gemini: registro em memória e exportação JSONL
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from config.settings import metrics_config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MetricaChamada:
+    """Medição de uma chamada a processar_documento"""
+    prompt: str
+    tamanho_pdf: int = 0
+    paginas: int = 0
+    inicio: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    duracao: float = 0.0
+    espera_fila: float = 0.0
+    tempo_api: float = 0.0
+    tentativas: int = 0
+    tokens_entrada: Optional[int] = None
+    tokens_saida: Optional[int] = None
+    tokens_cache: Optional[int] = None
+    streaming: bool = False
+    # "sucesso", "cache", "erro" ou "cancelado"
+    resultado: str = "sucesso"
+    erro: Optional[str] = None
+
+
+class MedicaoChamada:
+    """
+    Acumula os tempos de uma chamada enquanto ela está em andamento
+    
+    Tentativas de retry e cópias de hedging somam espera e tempo de API;
+    os tokens ficam com os da resposta aproveitada.
+    """
+    
+    def __init__(self, prompt: str, tamanho_pdf: int = 0, paginas: int = 0, streaming: bool = False):
+        """
+        Inicia a medição
+        
+        Args:
+            prompt: Nome do prompt (ex.: "mestre", "locais")
+            tamanho_pdf: Tamanho do documento enviado em bytes
+            paginas: Páginas do documento enviado
+            streaming: Se a resposta é recebida em streaming
+        """
+        self.metrica = MetricaChamada(
+            prompt=prompt,
+            tamanho_pdf=tamanho_pdf,
+            paginas=paginas,
+            streaming=streaming
+        )
+        self._inicio = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def registrar_tentativa(self, espera_fila: float, tempo_api: float):
+        """
+        Soma uma tentativa enviada à API
+        
+        Args:
+            espera_fila: Segundos aguardando limitador e pool
+            tempo_api: Segundos de generate_content (incluindo o streaming)
+        """
+        with self._lock:
+            self.metrica.tentativas += 1
+            self.metrica.espera_fila += espera_fila
+            self.metrica.tempo_api += tempo_api
+    
+    def registrar_uso(self, response):
+        """
+        Soma as contagens de tokens de usage_metadata da resposta
+        
+        Chamadas de continuação de uma lista truncada somam às da primeira.
+        
+        Args:
+            response: Resposta de generate_content
+        """
+        uso = getattr(response, "usage_metadata", None)
+        
+        def somar(atual, nome):
+            valor = getattr(uso, nome, None)
+            if not isinstance(valor, int):
+                return atual
+            return (atual or 0) + valor
+        
+        self.metrica.tokens_entrada = somar(self.metrica.tokens_entrada, "prompt_token_count")
+        self.metrica.tokens_saida = somar(self.metrica.tokens_saida, "candidates_token_count")
+        self.metrica.tokens_cache = somar(self.metrica.tokens_cache, "cached_content_token_count")
+    
+    def finalizar(self, resultado: str = "sucesso", erro: str = None) -> MetricaChamada:
+        """
+        Encerra a medição
+        
+        Args:
+            resultado: "sucesso", "cache", "erro" ou "cancelado"
+            erro: Mensagem de erro (opcional)
+        
+        Returns:
+            Métrica concluída
+        """
+        self.metrica.duracao = time.monotonic() - self._inicio
+        self.metrica.resultado = resultado
+        self.metrica.erro = erro
+        return self.metrica
+
+
+def percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil por posição na lista ordenada"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(p * len(ordenados)), len(ordenados) - 1)]
+
+
+class RegistroMetricas:
+    """
+    Registro das chamadas recentes, compartilhado pelo processo
+    
+    Mantém as últimas chamadas em memória para consulta (aplicação
+    Streamlit, execução em lote) e grava cada uma como uma linha JSONL.
+    """
+    
+    def __init__(self, arquivo_jsonl: str = None, capacidade: int = None):
+        """
+        Inicializa o registro
+        
+        Args:
+            arquivo_jsonl: Caminho do arquivo JSONL (opcional; None desativa a gravação)
+            capacidade: Número máximo de chamadas mantidas em memória (opcional)
+        """
+        self.arquivo_jsonl = arquivo_jsonl
+        self._metricas = deque(maxlen=capacidade or metrics_config.MEMORY_CAPACITY)
+        self._lock = threading.Lock()
+        
+        if arquivo_jsonl:
+            os.makedirs(os.path.dirname(arquivo_jsonl) or ".", exist_ok=True)
+    
+    def registrar(self, metrica: MetricaChamada):
+        """
+        Guarda a métrica em memória e a anexa ao arquivo JSONL
+        
+        Args:
+            metrica: Métrica concluída
+        """
+        linha = json.dumps(asdict(metrica), ensure_ascii=False)
+        
+        with self._lock:
+            self._metricas.append(metrica)
+            if self.arquivo_jsonl:
+                try:
+                    with open(self.arquivo_jsonl, "a", encoding="utf-8") as f:
+                        f.write(linha + "\n")
+                except OSError as e:
+                    logger.warning(f"Falha ao gravar métricas em {self.arquivo_jsonl}: {e}")
+    
+    def metricas(self) -> List[MetricaChamada]:
+        """Retorna uma cópia das métricas em memória, da mais antiga à mais recente"""
+        with self._lock:
+            return list(self._metricas)
+    
+    def resumo(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Agrega as métricas em memória por prompt
+        
+        Returns:
+            Dicionário prompt: chamadas, erros, acertos de cache, p50/p95 de
+            duração e espera na fila e total de tokens
+        """
+        por_prompt: Dict[str, List[MetricaChamada]] = {}
+        for metrica in self.metricas():
+            por_prompt.setdefault(metrica.prompt, []).append(metrica)
+        
+        resumo = {}
+        for prompt, metricas in por_prompt.items():
+            enviadas = [m for m in metricas if m.resultado != "cache"]
+            duracoes = [m.duracao for m in enviadas]
+            esperas = [m.espera_fila for m in enviadas]
+            resumo[prompt] = {
+                "chamadas": len(metricas),
+                "erros": sum(1 for m in metricas if m.resultado == "erro"),
+                "cache": len(metricas) - len(enviadas),
+                "duracao_p50": percentil(duracoes, 0.5),
+                "duracao_p95": percentil(duracoes, 0.95),
+                "espera_fila_p95": percentil(esperas, 0.95),
+                "tokens_entrada": sum(m.tokens_entrada or 0 for m in metricas),
+                "tokens_saida": sum(m.tokens_saida or 0 for m in metricas),
+                "tokens_cache": sum(m.tokens_cache or 0 for m in metricas)
+            }
+        return resumo
+    
+    def limpar(self):
+        """Descarta as métricas em memória (o arquivo JSONL é preservado)"""
+        with self._lock:
+            self._metricas.clear()
+
+
+_registro_global: Optional[RegistroMetricas] = None
+_registro_lock = threading.Lock()
+
+
+def obter_registro_metricas() -> RegistroMetricas:
+    """
+    Retorna o registro de métricas compartilhado pelo processo
+    
+    Returns:
+        Instância única do registro
+    """
+    global _registro_global
+    
+    with _registro_lock:
+        if _registro_global is None:
+            _registro_global = RegistroMetricas(
+                metrics_config.JSONL_PATH if metrics_config.ENABLED else None
+            )
+        return _registro_global
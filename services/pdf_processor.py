@@ -1,11 +1,16 @@
 """
 Serviço de processamento de PDFs de apólices
 """
+import asyncio
 import logging
-from io import BytesIO
-from typing import Dict, Any, List, Tuple
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from config.settings import page_selection_config
 from services.gemini_service import GeminiService
+from services.text_extractor import CAMPOS_CLAUSULAS, ExtratorTextoApolice
+from services.upload_service import DocumentoCompartilhado
 from config.prompts import (
     PROMPT_MESTRE_APOLICE,
     PROMPT_LOCAIS_V4_1,
@@ -13,42 +18,210 @@ from config.prompts import (
     PROMPT_LMI_UNICO_CBI,
     PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL
 )
-from utils.formatters import formatar_moeda
+from utils.formatters import formatar_moeda, normalizar_texto
+from utils.pdf_utils import (
+    dividir_em_faixas,
+    extrair_textos_paginas,
+    gerar_sub_pdf,
+    possui_camada_texto
+)
+from utils.validators import ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Prompts aplicados sobre a apólice, por seção
+PROMPTS_APOLICE = {
+    'mestre': PROMPT_MESTRE_APOLICE,
+    'locais': PROMPT_LOCAIS_V4_1,
+    'coberturas': PROMPT_COBERTURAS_V3_GENERICO,
+    'clausulas': PROMPT_LMI_UNICO_CBI
+}
+
+# Seções recebidas em streaming e a lista do JSON acompanhada em cada uma
+LISTAS_STREAMING = {
+    'locais': 'locais_risco',
+    'coberturas': 'coberturas_completas'
+}
+
+# Campo que identifica um item das listas fragmentadas em faixas de páginas,
+# usado para descartar os itens repetidos nas páginas sobrepostas
+CHAVES_DEDUPLICACAO = {
+    'locais': 'nro_local_risco',
+    'coberturas': 'nome_raw'
+}
+
+# Separa a seção do número da faixa no nome da tarefa (ex.: "locais#2")
+SEPARADOR_FRAGMENTO = '#'
+
+# Termos (sem acentos, minúsculos) que localizam as páginas de cada seção.
+# "titulo" abre um bloco; a página seguinte continua o bloco se tiver ao
+# menos dois termos de "continuacao". Seções ausentes recebem sempre o
+# documento completo.
+TERMOS_PAGINAS = {
+    'locais': {
+        'titulo': [
+            'identificacao do bem segurado',
+            'locais de risco',
+            'local de risco',
+            'relacao de locais'
+        ],
+        'continuacao': ['endereco', 'cep', 'cidade', 'local', 'atividade', 'predio']
+    },
+    'coberturas': {
+        'titulo': [
+            'coberturas contratadas',
+            'quadro de coberturas',
+            'tabela de coberturas',
+            'coberturas e limites',
+            'limite maximo de indenizacao'
+        ],
+        'continuacao': ['cobertura', 'lmi', 'franquia', 'premio', 'pos', 'participacao obrigatoria']
+    }
+}
+
+
+class ClassificadorPaginas:
+    """
+    Classifica as páginas de uma apólice pela camada de texto
+    
+    Na dúvida (PDF escaneado, nenhum título encontrado ou seleção grande
+    demais), selecionar() devolve None e a seção recebe o documento inteiro.
+    """
+    
+    def __init__(self, textos: List[str], termos: Dict[str, Dict[str, List[str]]] = None):
+        """
+        Inicializa o classificador
+        
+        Args:
+            textos: Texto de cada página, na ordem do documento
+            termos: Termos por seção (opcional, usa TERMOS_PAGINAS)
+        """
+        self.termos = termos or TERMOS_PAGINAS
+        self.textos = [normalizar_texto(texto) for texto in textos]
+        self.tem_camada_texto = possui_camada_texto(
+            self.textos,
+            page_selection_config.MIN_CHARS_PER_PAGE
+        )
+    
+    def selecionar(self, secao: str) -> Optional[List[int]]:
+        """
+        Seleciona as páginas relevantes para uma seção
+        
+        Args:
+            secao: Nome da seção (chave de TERMOS_PAGINAS)
+            
+        Returns:
+            Índices das páginas (base 0) ou None para usar o documento inteiro
+        """
+        total = len(self.textos)
+        if secao not in self.termos or total < page_selection_config.MIN_PAGES:
+            return None
+        if not self.tem_camada_texto:
+            logger.info(f"Seção '{secao}': PDF sem camada de texto, documento inteiro")
+            return None
+        
+        titulos = self.termos[secao]['titulo']
+        continuacao = self.termos[secao]['continuacao']
+        selecionadas = set()
+        
+        for indice, texto in enumerate(self.textos):
+            if not any(termo in texto for termo in titulos):
+                continue
+            
+            fim = indice
+            while (fim + 1 < total
+                   and sum(termo in self.textos[fim + 1] for termo in continuacao) >= 2):
+                fim += 1
+            fim = min(fim + page_selection_config.TRAILING_PAGES, total - 1)
+            selecionadas.update(range(indice, fim + 1))
+        
+        if not selecionadas:
+            logger.info(f"Seção '{secao}': nenhuma página identificada, documento inteiro")
+            return None
+        if len(selecionadas) > page_selection_config.MAX_FRACTION * total:
+            logger.info(f"Seção '{secao}': seleção cobre {len(selecionadas)}/{total} páginas, documento inteiro")
+            return None
+        
+        return sorted(selecionadas)
+
+
+def _secao_da_tarefa(nome_tarefa: str) -> str:
+    """Seção de uma tarefa, com ou sem número de faixa"""
+    return nome_tarefa.split(SEPARADOR_FRAGMENTO)[0]
+
 
 class PDFProcessor:
     """Processador de PDFs de apólices e especificações"""
     
-    def __init__(self):
-        """Inicializa o processador"""
-        self.gemini_service = GeminiService()
+    def __init__(
+        self,
+        gemini_service: GeminiService = None,
+        selecionar_paginas: bool = None,
+        campos_por_texto: bool = None,
+        fragmentar: bool = None
+    ):
+        """
+        Inicializa o processador
+        
+        Args:
+            gemini_service: Serviço Gemini compartilhado (opcional)
+            selecionar_paginas: Envia a locais e coberturas apenas as páginas
+                relevantes (opcional, usa page_selection_config.ENABLED)
+            campos_por_texto: Resolve campos simples pela camada de texto antes
+                de chamar o Gemini (opcional, usa page_selection_config.TEXT_FAST_PATH)
+            fragmentar: Divide locais e coberturas longos em faixas de páginas
+                extraídas em paralelo (opcional, usa page_selection_config.SHARDING_ENABLED)
+        """
+        self.gemini_service = gemini_service or GeminiService()
+        self.selecionar_paginas = (
+            page_selection_config.ENABLED if selecionar_paginas is None else selecionar_paginas
+        )
+        self.campos_por_texto = (
+            page_selection_config.TEXT_FAST_PATH if campos_por_texto is None else campos_por_texto
+        )
+        self.fragmentar = (
+            page_selection_config.SHARDING_ENABLED if fragmentar is None else fragmentar
+        )
     
-    def processar_apolice(self, arquivo_apolice) -> Dict[str, Any]:
+    def processar_apolice(
+        self,
+        arquivo_apolice,
+        ao_receber_item: Callable = None
+    ) -> Dict[str, Any]:
         """
         Processa o arquivo de apólice extraindo todas as informações
         
         Args:
             arquivo_apolice: BytesIO com o PDF da apólice
+            ao_receber_item: Função chamada com (secao, item) para cada local
+                ou cobertura assim que recebido (opcional)
             
         Returns:
             Dicionário com dados consolidados da apólice
         """
         logger.info("Iniciando processamento paralelo da apólice...")
         
-        # Processamento paralelo dos diferentes aspectos da apólice
-        arquivo_apolice.seek(0)
-        apolice_bytes = arquivo_apolice.read()
-        tarefas = {
-            'mestre': (BytesIO(apolice_bytes), PROMPT_MESTRE_APOLICE),
-            'locais': (BytesIO(apolice_bytes), PROMPT_LOCAIS_V4_1),
-            'coberturas': (BytesIO(apolice_bytes), PROMPT_COBERTURAS_V3_GENERICO),
-            'clausulas': (BytesIO(apolice_bytes), PROMPT_LMI_UNICO_CBI)
-        }
+        # O documento é lido e enviado uma única vez para os quatro prompts
+        try:
+            documento = self.gemini_service.preparar_documento(
+                arquivo_apolice,
+                compartilhado=True
+            )
+        except ValidationError as e:
+            logger.error(f"Erro de validação da apólice: {e}")
+            return {nome: {"erro_agente": str(e)} for nome in PROMPTS_APOLICE}
         
-        resultados = self._processar_paralelo(tarefas)
+        # Processamento paralelo dos diferentes aspectos da apólice
+        documentos, campos = self._preparar_secoes(documento)
+        try:
+            resultados = self._secoes_resolvidas(campos)
+            tarefas = self._tarefas_apolice(documentos, resultados)
+            resultados.update(self._processar_paralelo(tarefas, ao_receber_item))
+        finally:
+            self._liberar_documentos(documentos)
         
+        self._mesclar_fragmentos(resultados)
+        self._mesclar_campos_texto(resultados, campos)
         return resultados
     
     def processar_especificacao(self, arquivo_especificacao) -> Dict[str, Any]:
@@ -65,30 +238,432 @@ class PDFProcessor:
         
         resultado = self.gemini_service.processar_documento(
             arquivo_especificacao,
-            PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL
+            PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL,
+            nome_prompt='especificacao'
         )
         
         return resultado
     
-    def _processar_paralelo(self, tarefas: Dict[str, Tuple]) -> Dict[str, Any]:
+    async def processar_solicitacao_async(
+        self,
+        arquivo_apolice,
+        arquivo_especificacao,
+        ao_receber_item: Callable = None,
+        duracoes: Dict[str, float] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Processa apólice e especificação ao mesmo tempo em um único event loop
+        
+        As quatro extrações da apólice e a da especificação são agendadas
+        juntas, então o tempo total fica próximo ao da chamada mais lenta.
+        A seleção de páginas da apólice roda enquanto a especificação já está
+        em andamento. Cancelar a tarefa cancela todas as extrações pendentes.
+        
+        Args:
+            arquivo_apolice: BytesIO com o PDF da apólice
+            arquivo_especificacao: BytesIO com o PDF da especificação
+            ao_receber_item: Função chamada no event loop com (secao, item)
+                para cada local ou cobertura assim que recebido (opcional)
+            duracoes: Dicionário que recebe, em segundos desde o início, o
+                término de 'processar_apolice' e 'processar_especificacao' (opcional)
+            
+        Returns:
+            Tupla (dados_apolice, dados_especificacao)
+        """
+        logger.info("Iniciando processamento assíncrono da solicitação...")
+        inicio = time.monotonic()
+        fim_apolice = inicio
+        
+        def marcar_fim_apolice(_):
+            nonlocal fim_apolice
+            fim_apolice = time.monotonic()
+        
+        try:
+            documento = self.gemini_service.preparar_documento(
+                arquivo_apolice,
+                compartilhado=True
+            )
+        except ValidationError as e:
+            logger.error(f"Erro de validação da apólice: {e}")
+            documento = None
+            dados_apolice = {nome: {"erro_agente": str(e)} for nome in PROMPTS_APOLICE}
+        
+        tarefas = {}
+        tarefas['especificacao'] = asyncio.create_task(
+            self.gemini_service.processar_documento_async(
+                arquivo_especificacao,
+                PROMPT_ESPECIFICACAO_FINANCEIRA_VISUAL,
+                nome_prompt='especificacao'
+            )
+        )
+        if duracoes is not None:
+            tarefas['especificacao'].add_done_callback(
+                lambda _: duracoes.__setitem__('processar_especificacao', time.monotonic() - inicio)
+            )
+        
+        documentos, campos, resolvidas = {}, {}, {}
+        try:
+            if documento is not None:
+                # A leitura da camada de texto roda enquanto a especificação já é processada
+                documentos, campos = await asyncio.to_thread(self._preparar_secoes, documento)
+                resolvidas = self._secoes_resolvidas(campos)
+                tarefas_apolice = self._tarefas_apolice(documentos, resolvidas)
+                callbacks = self._callbacks_por_secao(tarefas_apolice, ao_receber_item)
+                for nome, (parte, prompt) in tarefas_apolice.items():
+                    secao = _secao_da_tarefa(nome)
+                    tarefas[nome] = asyncio.create_task(
+                        self.gemini_service.processar_documento_async(
+                            parte,
+                            prompt,
+                            chave_lista=LISTAS_STREAMING.get(secao),
+                            ao_receber_item=callbacks[secao],
+                            nome_prompt=secao
+                        )
+                    )
+                    tarefas[nome].add_done_callback(marcar_fim_apolice)
+            
+            concluidos = await asyncio.gather(*tarefas.values(), return_exceptions=True)
+            if duracoes is not None:
+                duracoes['processar_apolice'] = fim_apolice - inicio
+        except asyncio.CancelledError:
+            logger.warning("Processamento da solicitação cancelado")
+            for tarefa in tarefas.values():
+                tarefa.cancel()
+            raise
+        finally:
+            if documento is not None:
+                self._liberar_documentos(documentos or {'apolice': [documento]})
+        
+        resultados = {}
+        for nome_tarefa, resultado in zip(tarefas, concluidos):
+            if isinstance(resultado, Exception):
+                logger.error(f"Erro na tarefa '{nome_tarefa}': {resultado}")
+                resultado = {"erro": str(resultado)}
+            else:
+                logger.info(f"Tarefa '{nome_tarefa}' concluída")
+            resultados[nome_tarefa] = resultado
+        
+        dados_especificacao = resultados.pop('especificacao')
+        if documento is not None:
+            dados_apolice = {**resolvidas, **resultados}
+            self._mesclar_fragmentos(dados_apolice)
+            self._mesclar_campos_texto(dados_apolice, campos)
+        
+        return dados_apolice, dados_especificacao
+    
+    def _preparar_secoes(
+        self,
+        documento: DocumentoCompartilhado
+    ) -> Tuple[Dict[str, List[DocumentoCompartilhado]], Dict[str, str]]:
+        """
+        Lê a camada de texto uma única vez e prepara o envio de cada seção
+        
+        Args:
+            documento: Apólice completa já preparada
+        
+        Returns:
+            Tupla (documentos por seção, campos resolvidos pelo texto)
+        """
+        textos = None
+        if self.selecionar_paginas or self.campos_por_texto or self.fragmentar:
+            textos = extrair_textos_paginas(documento.file_bytes)
+        
+        campos = {}
+        if textos and self.campos_por_texto:
+            campos = ExtratorTextoApolice(
+                textos,
+                page_selection_config.MIN_CHARS_PER_PAGE
+            ).extrair()
+        
+        return self._documentos_por_secao(documento, textos), campos
+    
+    def _secoes_resolvidas(self, campos: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna as seções respondidas inteiramente pela camada de texto
+        
+        Args:
+            campos: Campos resolvidos pelo ExtratorTextoApolice
+            
+        Returns:
+            Dicionário secao: resultado das seções que dispensam o Gemini
+        """
+        if all(campo in campos for campo in CAMPOS_CLAUSULAS):
+            logger.info("Cláusulas resolvidas pela camada de texto, sem chamada ao Gemini")
+            return {'clausulas': {campo: campos[campo] for campo in CAMPOS_CLAUSULAS}}
+        return {}
+    
+    def _mesclar_campos_texto(self, resultados: Dict[str, Any], campos: Dict[str, str]):
+        """
+        Acrescenta ao resultado do mestre os campos resolvidos pela camada de texto
+        
+        CNPJ, número e vigência, validados, substituem a resposta do Gemini.
+        As perguntas Sim/Não são heurísticas: só preenchem o que o Gemini
+        deixou vazio.
+        
+        Args:
+            resultados: Resultados por seção (alterado no lugar)
+            campos: Campos resolvidos pelo ExtratorTextoApolice
+        """
+        mestre = resultados.get('mestre')
+        if not campos or not isinstance(mestre, dict):
+            return
+        
+        for campo, valor in campos.items():
+            if campo in CAMPOS_CLAUSULAS and mestre.get(campo) not in (None, ""):
+                continue
+            mestre[campo] = valor
+    
+    def _documentos_por_secao(
+        self,
+        documento: DocumentoCompartilhado,
+        textos: Optional[List[str]]
+    ) -> Dict[str, List[DocumentoCompartilhado]]:
+        """
+        Monta os documentos enviados a cada prompt da apólice
+        
+        Seções com termos em TERMOS_PAGINAS recebem um sub-PDF só com as
+        páginas relevantes; as demais, ou qualquer seção em caso de dúvida,
+        recebem o documento completo. Locais e coberturas com mais de
+        SHARD_MIN_PAGES páginas são divididos em faixas, uma chamada por faixa.
+        
+        Args:
+            documento: Apólice completa já preparada
+            textos: Texto de cada página ou None se indisponível
+            
+        Returns:
+            Dicionário secao: documentos a enviar (mais de um quando fragmentada)
+        """
+        documentos = {nome: [documento] for nome in PROMPTS_APOLICE}
+        if not textos or not (self.selecionar_paginas or self.fragmentar):
+            return documentos
+        
+        classificador = ClassificadorPaginas(textos) if self.selecionar_paginas else None
+        for secao in LISTAS_STREAMING:
+            paginas = classificador.selecionar(secao) if classificador else None
+            if paginas is None:
+                paginas = list(range(len(textos)))
+            
+            faixas = [paginas]
+            if self.fragmentar and len(paginas) > page_selection_config.SHARD_MIN_PAGES:
+                faixas = dividir_em_faixas(
+                    paginas,
+                    page_selection_config.SHARD_PAGES,
+                    page_selection_config.SHARD_OVERLAP
+                )
+            if len(faixas) == 1 and len(paginas) == len(textos):
+                continue
+            
+            try:
+                partes = [gerar_sub_pdf(documento.file_bytes, faixa) for faixa in faixas]
+            except Exception as e:
+                logger.warning(f"Falha ao montar sub-PDF de '{secao}', usando documento inteiro: {e}")
+                continue
+            
+            if len(partes) == 1:
+                logger.info(
+                    f"Seção '{secao}': {len(paginas)} de {len(textos)} páginas "
+                    f"({len(partes[0])} de {documento.tamanho} bytes)"
+                )
+            else:
+                logger.info(
+                    f"Seção '{secao}': {len(paginas)} páginas em {len(partes)} faixas "
+                    f"de até {page_selection_config.SHARD_PAGES}"
+                )
+            documentos[secao] = [
+                DocumentoCompartilhado(
+                    parte,
+                    documento.uploader,
+                    mime_type=documento.mime_type,
+                    nome=f"{secao}{indice if len(partes) > 1 else ''}_{documento.nome}"
+                )
+                for indice, parte in enumerate(partes, start=1)
+            ]
+        
+        return documentos
+    
+    def _liberar_documentos(self, documentos: Dict[str, List[DocumentoCompartilhado]]):
+        """Libera cada documento distinto (completo, sub-PDFs e faixas) uma única vez"""
+        distintos = {id(doc): doc for partes in documentos.values() for doc in partes}
+        for documento in distintos.values():
+            documento.liberar()
+    
+    def _tarefas_apolice(
+        self,
+        documentos: Dict[str, List[DocumentoCompartilhado]],
+        resolvidas: Dict[str, Any]
+    ) -> Dict[str, Tuple[DocumentoCompartilhado, str]]:
+        """
+        Monta as chamadas da apólice: uma por seção ou uma por faixa
+        
+        Args:
+            documentos: Documentos por seção (_documentos_por_secao)
+            resolvidas: Seções já resolvidas pela camada de texto
+            
+        Returns:
+            Dicionário nome_tarefa: (documento, prompt); faixas recebem o
+            nome "secao#n"
+        """
+        tarefas = {}
+        for secao, prompt in PROMPTS_APOLICE.items():
+            if secao in resolvidas:
+                continue
+            partes = documentos[secao]
+            if len(partes) == 1:
+                tarefas[secao] = (partes[0], prompt)
+                continue
+            for indice, parte in enumerate(partes, start=1):
+                tarefas[f"{secao}{SEPARADOR_FRAGMENTO}{indice}"] = (parte, prompt)
+        return tarefas
+    
+    def _chave_item(self, item: Any, campo: str) -> Optional[str]:
+        """Identificador normalizado do item, ou None se ausente ("Não consta")"""
+        valor = item.get(campo) if isinstance(item, dict) else None
+        if not isinstance(valor, str):
+            return None
+        chave = normalizar_texto(valor)
+        return chave if chave and chave != "nao consta" else None
+    
+    def _mesclar_fragmentos(self, resultados: Dict[str, Any]):
+        """
+        Junta os resultados das faixas de cada seção fragmentada
+        
+        As listas são concatenadas na ordem das páginas e itens repetidos
+        (mesma chave em CHAVES_DEDUPLICACAO) viram um só, completando campos
+        vazios com os da repetição. Faixas com erro marcam a seção como
+        extração parcial.
+        
+        Args:
+            resultados: Resultados por tarefa (alterado no lugar)
+        """
+        fragmentos: Dict[str, List[Tuple[int, Any]]] = {}
+        for nome in [nome for nome in resultados if SEPARADOR_FRAGMENTO in nome]:
+            secao, indice = nome.split(SEPARADOR_FRAGMENTO)
+            fragmentos.setdefault(secao, []).append((int(indice), resultados.pop(nome)))
+        
+        for secao, partes in fragmentos.items():
+            chave_lista = LISTAS_STREAMING[secao]
+            campo = CHAVES_DEDUPLICACAO[secao]
+            itens, posicoes, erros = [], {}, []
+            
+            for _, parte in sorted(partes, key=lambda p: p[0]):
+                if not isinstance(parte, dict):
+                    continue
+                erro = parte.get("erro_agente") or parte.get("erro")
+                if erro:
+                    erros.append(erro)
+                for item in parte.get(chave_lista) or []:
+                    chave = self._chave_item(item, campo)
+                    if chave is None:
+                        itens.append(item)
+                    elif chave in posicoes:
+                        repetido = itens[posicoes[chave]]
+                        for nome_campo, valor in item.items():
+                            if repetido.get(nome_campo) in (None, "", "Não consta"):
+                                repetido[nome_campo] = valor
+                    else:
+                        posicoes[chave] = len(itens)
+                        itens.append(item)
+            
+            logger.info(f"Seção '{secao}': {len(itens)} itens após mesclar {len(partes)} faixas")
+            if erros and not itens:
+                resultados[secao] = {"erro_agente": erros[0]}
+            elif erros:
+                resultados[secao] = {
+                    chave_lista: itens,
+                    "erro_agente": f"{len(erros)} de {len(partes)} faixas com erro: {erros[0]}",
+                    "extracao_parcial": True
+                }
+            else:
+                resultados[secao] = {chave_lista: itens}
+    
+    def _callbacks_por_secao(
+        self,
+        tarefas: Dict[str, Tuple],
+        ao_receber_item: Optional[Callable]
+    ) -> Dict[str, Optional[Callable]]:
+        """
+        Monta um callback por seção, compartilhado pelas faixas da seção
+        
+        Args:
+            tarefas: Tarefas da apólice (_tarefas_apolice)
+            ao_receber_item: Callback (secao, item) informado pelo chamador (opcional)
+            
+        Returns:
+            Dicionário secao: callback de item único ou None
+        """
+        fragmentadas = {_secao_da_tarefa(nome) for nome in tarefas if SEPARADOR_FRAGMENTO in nome}
+        return {
+            secao: self._callback_secao(secao, ao_receber_item, secao in fragmentadas)
+            for secao in {_secao_da_tarefa(nome) for nome in tarefas}
+        }
+    
+    def _callback_secao(
+        self,
+        secao: str,
+        ao_receber_item: Optional[Callable],
+        deduplicar: bool = False
+    ) -> Optional[Callable]:
+        """
+        Adapta o callback (secao, item) para uma seção recebida em streaming
+        
+        Args:
+            secao: Nome da seção (chave de PROMPTS_APOLICE)
+            ao_receber_item: Callback informado pelo chamador (opcional)
+            deduplicar: Ignora itens já repassados por outra faixa da seção
+        
+        Returns:
+            Callback de item único ou None se a seção não usa streaming
+        """
+        if ao_receber_item is None or secao not in LISTAS_STREAMING:
+            return None
+        if not deduplicar:
+            return lambda item: ao_receber_item(secao, item)
+        
+        campo = CHAVES_DEDUPLICACAO[secao]
+        repassados = set()
+        lock = threading.Lock()
+        
+        def callback(item):
+            chave = self._chave_item(item, campo)
+            if chave is not None:
+                with lock:
+                    if chave in repassados:
+                        return
+                    repassados.add(chave)
+            ao_receber_item(secao, item)
+        
+        return callback
+    
+    def _processar_paralelo(
+        self,
+        tarefas: Dict[str, Tuple],
+        ao_receber_item: Callable = None
+    ) -> Dict[str, Any]:
         """
         Processa múltiplas tarefas em paralelo
         
         Args:
-            tarefas: Dicionário com nome_tarefa: (arquivo, prompt)
+            tarefas: Dicionário com nome_tarefa: (arquivo ou DocumentoCompartilhado, prompt)
+            ao_receber_item: Função chamada com (secao, item) nas seções
+                recebidas em streaming (opcional)
             
         Returns:
             Dicionário com os resultados de cada tarefa
         """
         resultados = {}
+        callbacks = self._callbacks_por_secao(tarefas, ao_receber_item)
         
-        with ThreadPoolExecutor(max_workers=4) as executor:
+        # A concorrência real é controlada pelo limitador compartilhado do GeminiService
+        with ThreadPoolExecutor(max_workers=max(len(tarefas), 1)) as executor:
             # Submete todas as tarefas
             futures = {
                 executor.submit(
-                    GeminiService().processar_documento,
+                    self.gemini_service.processar_documento,
                     arquivo,
-                    prompt
+                    prompt,
+                    chave_lista=LISTAS_STREAMING.get(_secao_da_tarefa(nome)),
+                    ao_receber_item=callbacks[_secao_da_tarefa(nome)],
+                    nome_prompt=_secao_da_tarefa(nome)
                 ): nome
                 for nome, (arquivo, prompt) in tarefas.items()
             }
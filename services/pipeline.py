@@ -0,0 +1,164 @@
+"""
+Pipeline completo de uma solicitação: anexos, extração, consolidação e gravação
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+from config.settings import app_config
+from services.pdf_processor import PDFProcessor
+from utils.formatters import sanitizar_nome_arquivo
+
+logger = logging.getLogger(__name__)
+
+# Etapas na ordem em que são informadas a ao_iniciar_etapa e registradas em duracoes
+ETAPAS = (
+    'carregar_anexos',
+    'processar_apolice',
+    'processar_especificacao',
+    'consolidar_dados',
+    'salvar_json'
+)
+
+
+class AnexosNaoEncontrados(Exception):
+    """A solicitação não tem apólice e especificação na base"""
+    pass
+
+
+@dataclass
+class ResultadoSolicitacao:
+    """Resultado do processamento de uma solicitação"""
+    num_solic: int
+    caminho_arquivo: Optional[str] = None
+    final_json: Optional[Dict[str, Any]] = None
+    # Segundos por etapa; apólice e especificação correm em paralelo e
+    # ambas são medidas a partir do início da extração
+    duracoes: Dict[str, float] = field(default_factory=dict)
+    # Alguma seção da apólice terminou com erro
+    incompleto: bool = False
+
+
+def salvar_json(final_json: dict, diretorio: str = None) -> str:
+    """
+    Salva o JSON em arquivo
+    
+    Args:
+        final_json: Dicionário com dados processados
+        diretorio: Diretório de saída (opcional, usa app_config.JSON_OUTPUT_DIR)
+    
+    Returns:
+        Caminho do arquivo salvo
+    """
+    diretorio = diretorio or app_config.JSON_OUTPUT_DIR
+    
+    # Cria diretório se não existir
+    os.makedirs(diretorio, exist_ok=True)
+    
+    # Extrai informações para nome do arquivo
+    dados_apolice = final_json.get("dados_gerais_apolice", {})
+    
+    # Tenta extrair nome da seguradora do arquivo
+    if "dados_gerais_apolice" in final_json:
+        seguradora_nome = "SEGURADORA"
+        apolice_numero = dados_apolice.get("numero_apolice_lider", "000")
+    else:
+        seguradora_nome = "SEGURADORA"
+        apolice_numero = "000"
+    
+    # Monta nome do arquivo
+    nome_arquivo = sanitizar_nome_arquivo(f"{seguradora_nome}-{apolice_numero}.json")
+    caminho_completo = os.path.join(diretorio, nome_arquivo)
+    
+    # Salva
+    with open(caminho_completo, "w", encoding="utf-8") as f:
+        json.dump(final_json, f, indent=2, ensure_ascii=False)
+    
+    logger.info(f"JSON salvo em: {caminho_completo}")
+    
+    return caminho_completo
+
+
+def processar_solicitacao(
+    num_solic: int,
+    db_service,
+    processor: PDFProcessor,
+    diretorio_saida: str = None,
+    ao_iniciar_etapa: Callable = None,
+    ao_receber_item: Callable = None
+) -> ResultadoSolicitacao:
+    """
+    Processa uma solicitação de ponta a ponta
+    
+    Args:
+        num_solic: Número da solicitação
+        db_service: Fonte com carregar_anexos(num_solic) (FonteAnexos, DatabaseService ou equivalente)
+        processor: Processador de PDFs
+        diretorio_saida: Diretório do JSON gerado (opcional)
+        ao_iniciar_etapa: Função chamada com o nome de cada etapa de ETAPAS (opcional)
+        ao_receber_item: Função chamada com (secao, item) para locais e
+            coberturas recebidos em streaming (opcional)
+    
+    Returns:
+        ResultadoSolicitacao com o JSON final, o arquivo salvo e as durações
+    
+    Raises:
+        AnexosNaoEncontrados: Se apólice ou especificação não estiverem na base
+    """
+    resultado = ResultadoSolicitacao(num_solic=num_solic)
+    
+    def iniciar(etapa: str) -> float:
+        if ao_iniciar_etapa:
+            ao_iniciar_etapa(etapa)
+        return time.monotonic()
+    
+    inicio = iniciar('carregar_anexos')
+    f_apolice, f_especificacao = db_service.carregar_anexos(num_solic)
+    resultado.duracoes['carregar_anexos'] = time.monotonic() - inicio
+    
+    try:
+        if not f_apolice or not f_especificacao:
+            raise AnexosNaoEncontrados(
+                f"Anexos (Apólice e Especificação) não encontrados para a solicitação {num_solic}"
+            )
+        
+        # Apólice e especificação são processadas simultaneamente
+        iniciar('processar_apolice')
+        iniciar('processar_especificacao')
+        dados_apolice, dados_especificacao = asyncio.run(
+            processor.processar_solicitacao_async(
+                f_apolice,
+                f_especificacao,
+                ao_receber_item=ao_receber_item,
+                duracoes=resultado.duracoes
+            )
+        )
+    finally:
+        # Anexos grandes ficam em arquivos temporários em disco: libera assim que
+        # lidos, inclusive o único encontrado quando falta o outro
+        for arquivo in (f_apolice, f_especificacao):
+            if arquivo is not None:
+                arquivo.close()
+    
+    resultado.incompleto = any(
+        'erro' in v or 'erro_agente' in v for v in dados_apolice.values()
+    )
+    if resultado.incompleto:
+        logger.warning(f"Solicitação {num_solic}: alguns dados da apólice podem estar incompletos")
+    
+    inicio = iniciar('consolidar_dados')
+    resultado.final_json = processor.consolidar_dados(
+        dados_apolice,
+        dados_especificacao,
+        f_apolice.name
+    )
+    resultado.duracoes['consolidar_dados'] = time.monotonic() - inicio
+    
+    inicio = iniciar('salvar_json')
+    resultado.caminho_arquivo = salvar_json(resultado.final_json, diretorio_saida)
+    resultado.duracoes['salvar_json'] = time.monotonic() - inicio
+    
+    return resultado
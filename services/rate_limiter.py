@@ -0,0 +1,331 @@
+"""
+Limitador de taxa e controle adaptativo de concorrência para a API Gemini
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+from google.api_core import exceptions as google_exceptions
+from config.settings import gemini_config
+
+logger = logging.getLogger(__name__)
+
+# Tokens cobrados por página de PDF enviada ao Gemini
+TOKENS_POR_PAGINA = 258
+
+_EXCECOES_SOBRECARGA = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable
+)
+
+
+def eh_erro_sobrecarga(erro: Exception) -> bool:
+    """
+    Indica se o erro sinaliza cota excedida ou serviço sobrecarregado (429/503)
+    
+    Args:
+        erro: Exceção recebida da API
+    
+    Returns:
+        True se o erro for de sobrecarga
+    """
+    if isinstance(erro, _EXCECOES_SOBRECARGA):
+        return True
+    texto = str(erro)
+    return "429" in texto or "503" in texto or "quota" in texto.lower()
+
+
+def estimar_tokens(prompt: str, paginas: int) -> int:
+    """
+    Estima os tokens de entrada de uma chamada antes do envio
+    
+    Args:
+        prompt: Texto do prompt
+        paginas: Número de páginas do documento
+    
+    Returns:
+        Quantidade estimada de tokens de entrada
+    """
+    return len(prompt) // 4 + paginas * TOKENS_POR_PAGINA
+
+
+class TokenBucket:
+    """Balde de fichas com reposição contínua (capacidade por minuto)"""
+    
+    def __init__(self, capacidade_por_minuto: int, relogio: Callable = time.monotonic):
+        """
+        Inicializa o balde cheio
+        
+        Args:
+            capacidade_por_minuto: Fichas repostas por minuto (também é a rajada máxima)
+            relogio: Função de tempo monotônico (injetável para testes)
+        """
+        self.capacidade = float(capacidade_por_minuto)
+        self.taxa_por_segundo = capacidade_por_minuto / 60.0
+        self.relogio = relogio
+        
+        self._fichas = self.capacidade
+        self._ultima_reposicao = relogio()
+        self._lock = threading.Lock()
+    
+    def _repor(self):
+        """Repõe as fichas acumuladas desde a última consulta"""
+        agora = self.relogio()
+        decorrido = agora - self._ultima_reposicao
+        self._ultima_reposicao = agora
+        self._fichas = min(self.capacidade, self._fichas + decorrido * self.taxa_por_segundo)
+    
+    def reservar(self, quantidade: float) -> float:
+        """
+        Reserva fichas, permitindo saldo negativo, e informa quanto esperar
+        
+        Args:
+            quantidade: Fichas necessárias
+        
+        Returns:
+            Segundos de espera até que a reserva esteja coberta
+        """
+        quantidade = min(quantidade, self.capacidade)
+        
+        with self._lock:
+            self._repor()
+            self._fichas -= quantidade
+            if self._fichas >= 0:
+                return 0.0
+            return -self._fichas / self.taxa_por_segundo
+    
+    def consumir(self, quantidade: float) -> float:
+        """
+        Reserva fichas e bloqueia até que estejam disponíveis
+        
+        Args:
+            quantidade: Fichas necessárias
+        
+        Returns:
+            Segundos efetivamente aguardados
+        """
+        espera = self.reservar(quantidade)
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+    
+    def ajustar(self, diferenca: float):
+        """
+        Corrige o saldo quando o consumo real difere da reserva
+        
+        Args:
+            diferenca: Fichas a debitar (positivo) ou devolver (negativo)
+        """
+        with self._lock:
+            self._repor()
+            self._fichas = min(self.capacidade, self._fichas - diferenca)
+    
+    @property
+    def disponiveis(self) -> float:
+        """Fichas disponíveis no momento"""
+        with self._lock:
+            self._repor()
+            return self._fichas
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Controle de concorrência AIMD
+    
+    Cada sucesso aumenta o limite em 1/limite (cerca de +1 por janela
+    completa de chamadas); cada sobrecarga multiplica o limite pelo fator
+    de redução, no máximo uma vez por intervalo de resfriamento.
+    """
+    
+    def __init__(
+        self,
+        inicial: int = None,
+        minimo: int = None,
+        maximo: int = None,
+        fator_reducao: float = 0.5,
+        resfriamento: float = 5.0,
+        relogio: Callable = time.monotonic
+    ):
+        """
+        Inicializa o controle
+        
+        Args:
+            inicial: Limite inicial de chamadas simultâneas (opcional)
+            minimo: Limite mínimo (opcional)
+            maximo: Limite máximo (opcional)
+            fator_reducao: Fator multiplicativo aplicado em sobrecarga
+            resfriamento: Segundos mínimos entre duas reduções
+            relogio: Função de tempo monotônico (injetável para testes)
+        """
+        self.minimo = minimo or gemini_config.CONCURRENCY_MIN
+        self.maximo = maximo or gemini_config.CONCURRENCY_MAX
+        self.fator_reducao = fator_reducao
+        self.resfriamento = resfriamento
+        self.relogio = relogio
+        
+        inicial = inicial or gemini_config.CONCURRENCY_INITIAL
+        self._limite = float(min(max(inicial, self.minimo), self.maximo))
+        self._em_uso = 0
+        self._ultima_reducao = float("-inf")
+        self._condicao = threading.Condition()
+    
+    @property
+    def limite(self) -> int:
+        """Limite atual de chamadas simultâneas"""
+        return int(self._limite)
+    
+    def adquirir(self, timeout: float = None) -> float:
+        """
+        Aguarda uma vaga de execução
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos (opcional)
+        
+        Returns:
+            Segundos aguardados na fila
+        
+        Raises:
+            TimeoutError: Se nenhuma vaga abrir dentro do timeout
+        """
+        inicio = time.monotonic()
+        with self._condicao:
+            if not self._condicao.wait_for(lambda: self._em_uso < self.limite, timeout):
+                raise TimeoutError("Limite de concorrência Gemini esgotado")
+            self._em_uso += 1
+        return time.monotonic() - inicio
+    
+    def liberar(self, sobrecarga: bool = False, sucesso: bool = True):
+        """
+        Devolve a vaga e ajusta o limite conforme o resultado da chamada
+        
+        Args:
+            sobrecarga: True se a chamada terminou em 429/503
+            sucesso: True se a chamada terminou com sucesso
+        """
+        with self._condicao:
+            self._em_uso -= 1
+            
+            if sobrecarga:
+                agora = self.relogio()
+                if agora - self._ultima_reducao >= self.resfriamento:
+                    self._ultima_reducao = agora
+                    self._limite = max(self.minimo, self._limite * self.fator_reducao)
+                    logger.warning(f"Sobrecarga na API Gemini: concorrência reduzida para {self.limite}")
+            elif sucesso:
+                self._limite = min(self.maximo, self._limite + 1.0 / self._limite)
+            
+            self._condicao.notify_all()
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna o limite atual e as vagas em uso"""
+        with self._condicao:
+            return {"limite": self.limite, "em_uso": self._em_uso}
+
+
+class PermissaoChamada:
+    """Permissão concedida a uma chamada; permite informar o consumo real de tokens"""
+    
+    def __init__(self, limitador: "GeminiRateLimiter", tokens_reservados: int, espera: float):
+        self.limitador = limitador
+        self.tokens_reservados = tokens_reservados
+        self.espera = espera
+    
+    def registrar_tokens(self, tokens_reais: Optional[int]):
+        """
+        Ajusta o balde de tokens com o consumo informado pela API
+        
+        Args:
+            tokens_reais: Tokens de entrada reportados em usage_metadata
+        """
+        if tokens_reais:
+            self.limitador.tokens.ajustar(tokens_reais - self.tokens_reservados)
+            self.tokens_reservados = tokens_reais
+
+
+class GeminiRateLimiter:
+    """Limitador compartilhado: requisições/min, tokens/min e concorrência adaptativa"""
+    
+    def __init__(
+        self,
+        requisicoes_por_minuto: int = None,
+        tokens_por_minuto: int = None,
+        concorrencia: AdaptiveConcurrencyLimiter = None
+    ):
+        """
+        Inicializa o limitador
+        
+        Args:
+            requisicoes_por_minuto: Cota de requisições por minuto (opcional)
+            tokens_por_minuto: Cota de tokens de entrada por minuto (opcional)
+            concorrencia: Controle de concorrência (opcional)
+        """
+        self.requisicoes = TokenBucket(requisicoes_por_minuto or gemini_config.RATE_LIMIT_RPM)
+        self.tokens = TokenBucket(tokens_por_minuto or gemini_config.RATE_LIMIT_TPM)
+        self.concorrencia = concorrencia or AdaptiveConcurrencyLimiter()
+    
+    @contextmanager
+    def permissao(self, tokens_estimados: int):
+        """
+        Aguarda vaga e cota para uma chamada e registra seu resultado
+        
+        Erros de sobrecarga (429/503) reduzem a concorrência; sucessos a
+        aumentam gradualmente. Outros erros não alteram o limite.
+        
+        Args:
+            tokens_estimados: Tokens de entrada estimados para a chamada
+        
+        Yields:
+            PermissaoChamada da chamada em andamento
+        """
+        espera = self.concorrencia.adquirir()
+        try:
+            espera += self.requisicoes.consumir(1)
+            espera += self.tokens.consumir(tokens_estimados)
+        except BaseException:
+            self.concorrencia.liberar(sucesso=False)
+            raise
+        
+        sucesso = False
+        sobrecarga = False
+        try:
+            yield PermissaoChamada(self, tokens_estimados, espera)
+            sucesso = True
+        except Exception as e:
+            sobrecarga = eh_erro_sobrecarga(e)
+            raise
+        finally:
+            self.concorrencia.liberar(sobrecarga=sobrecarga, sucesso=sucesso)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna o estado atual do limitador
+        
+        Returns:
+            Dicionário com concorrência e fichas disponíveis
+        """
+        return {
+            **self.concorrencia.estatisticas(),
+            "requisicoes_disponiveis": int(self.requisicoes.disponiveis),
+            "tokens_disponiveis": int(self.tokens.disponiveis)
+        }
+
+
+_limitador_global: Optional[GeminiRateLimiter] = None
+_limitador_lock = threading.Lock()
+
+
+def obter_limitador_gemini() -> GeminiRateLimiter:
+    """
+    Retorna o limitador compartilhado por todos os GeminiService do processo
+    
+    Returns:
+        Instância única do limitador
+    """
+    global _limitador_global
+    
+    with _limitador_lock:
+        if _limitador_global is None:
+            _limitador_global = GeminiRateLimiter()
+        return _limitador_global
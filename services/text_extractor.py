@@ -0,0 +1,167 @@
+"""
+Extração determinística de campos simples pela camada de texto da apólice
+"""
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from utils.formatters import normalizar_texto
+from utils.pdf_utils import possui_camada_texto
+from utils.validators import validar_data_formato, validar_digitos_cnpj
+
+logger = logging.getLogger(__name__)
+
+# Campos do prompt mestre e do prompt de cláusulas que o texto pode resolver
+CAMPOS_MESTRE = ("cnpj", "numero_apolice_lider", "inicio_vigencia", "fim_vigencia")
+CAMPOS_CLAUSULAS = ("lmi_unico", "tem_cobertura_cbi")
+
+_CNPJ = r"\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}"
+_DATA = r"\d{2}/\d{2}/\d{4}"
+
+# CNPJ após o rótulo "segurado" (não "seguradora") sem passar por outro rótulo de seguradora
+_PADRAO_CNPJ_SEGURADO = re.compile(
+    r"\bsegurado\b(?:(?!segurador).){0,150}?(" + _CNPJ + r")"
+)
+_PADROES_NUMERO_APOLICE = [
+    re.compile(r"\bapolice\s+(?:n|no|nr|numero)\b\.?\s*[:\-]?\s*(\d[\d.\-/]*\d)"),
+    re.compile(r"\bnumero da apolice\s*[:\-]?\s*(\d[\d.\-/]*\d)")
+]
+_PADRAO_VIGENCIA = re.compile(
+    r"\bvigencia\b.{0,80}?(" + _DATA + r").{0,60}?(" + _DATA + r")"
+)
+
+_TERMOS_LMI_UNICO = [
+    re.compile(r"\blmi unico\b"),
+    re.compile(r"\blimite maximo de indenizacao unico\b"),
+    re.compile(r"\blimite unico\b")
+]
+_TERMOS_CBI = [
+    re.compile(r"\bcbi\b"),
+    re.compile(r"\bcontingent business interruption\b"),
+    re.compile(r"\blucros cessantes (?:contingentes|dependentes)\b")
+]
+# Negação ou condição perto de uma menção torna a resposta ambígua (fica para o
+# Gemini): condições gerais listam cláusulas disponíveis "mediante contratação"
+_PADRAO_NEGACAO = re.compile(r"\bnao\b|\bsem\b|excluid|\bexceto\b")
+_PADRAO_CONDICAO = re.compile(
+    r"mediante contratacao|\b(?:se|quando|caso|desde que)\b.{0,20}contratad|opcion|facultativ"
+)
+_JANELA_NEGACAO = 40
+
+
+class ExtratorTextoApolice:
+    """
+    Resolve campos simples da apólice com regras sobre a camada de texto
+    
+    Só devolve um campo quando a resposta é inequívoca: um único valor
+    distinto, validado por utils.validators. As perguntas Sim/Não só são
+    respondidas com "Sim"; a ausência de um termo não prova "Não". Campos
+    ausentes do retorno continuam sendo extraídos pelo Gemini.
+    """
+    
+    def __init__(self, textos: List[str], caracteres_minimos: int = 50):
+        """
+        Inicializa o extrator
+        
+        Args:
+            textos: Texto de cada página, na ordem do documento
+            caracteres_minimos: Caracteres mínimos para a página contar como texto
+        """
+        self.textos = [normalizar_texto(texto) for texto in textos]
+        self.tem_camada_texto = possui_camada_texto(self.textos, caracteres_minimos)
+    
+    def extrair(self) -> Dict[str, str]:
+        """
+        Extrai os campos resolvidos com confiança
+        
+        Returns:
+            Dicionário apenas com os campos resolvidos (subconjunto de
+            CAMPOS_MESTRE e CAMPOS_CLAUSULAS)
+        """
+        campos = {}
+        
+        cnpj = self._cnpj_segurado()
+        if cnpj:
+            campos["cnpj"] = cnpj
+        
+        numero = self._numero_apolice()
+        if numero:
+            campos["numero_apolice_lider"] = numero
+        
+        vigencia = self._vigencia()
+        if vigencia:
+            campos["inicio_vigencia"], campos["fim_vigencia"] = vigencia
+        
+        for campo, termos in (("lmi_unico", _TERMOS_LMI_UNICO), ("tem_cobertura_cbi", _TERMOS_CBI)):
+            if self._mencao_confirmada(termos):
+                campos[campo] = "Sim"
+        
+        logger.info(f"Camada de texto resolveu {len(campos)} campos: {', '.join(campos) or 'nenhum'}")
+        return campos
+    
+    def _valor_unico(self, valores: List[str]) -> Optional[str]:
+        """Retorna o valor se todos os encontrados forem iguais"""
+        distintos = set(valores)
+        return distintos.pop() if len(distintos) == 1 else None
+    
+    def _cnpj_segurado(self) -> Optional[str]:
+        """CNPJ do segurado, com dígitos verificadores conferidos"""
+        encontrados = []
+        for texto in self.textos:
+            for cnpj in _PADRAO_CNPJ_SEGURADO.findall(texto):
+                if validar_digitos_cnpj(cnpj):
+                    numeros = re.sub(r"\D", "", cnpj)
+                    encontrados.append(
+                        f"{numeros[:2]}.{numeros[2:5]}.{numeros[5:8]}/{numeros[8:12]}-{numeros[12:]}"
+                    )
+        return self._valor_unico(encontrados)
+    
+    def _numero_apolice(self) -> Optional[str]:
+        """Número da apólice indicado por rótulo explícito"""
+        encontrados = []
+        for texto in self.textos:
+            for padrao in _PADROES_NUMERO_APOLICE:
+                encontrados.extend(
+                    numero for numero in padrao.findall(texto)
+                    if not validar_data_formato(numero)
+                )
+        return self._valor_unico(encontrados)
+    
+    def _vigencia(self) -> Optional[Tuple[str, str]]:
+        """Datas de início e fim de vigência, com início anterior ao fim"""
+        encontrados = []
+        for texto in self.textos:
+            for inicio, fim in _PADRAO_VIGENCIA.findall(texto):
+                if not (validar_data_formato(inicio) and validar_data_formato(fim)):
+                    continue
+                try:
+                    if datetime.strptime(inicio, "%d/%m/%Y") < datetime.strptime(fim, "%d/%m/%Y"):
+                        encontrados.append((inicio, fim))
+                except ValueError:
+                    continue
+        
+        distintos = set(encontrados)
+        return distintos.pop() if len(distintos) == 1 else None
+    
+    def _mencao_confirmada(self, termos: List[re.Pattern]) -> bool:
+        """
+        Indica se os termos aparecem e nenhuma menção tem ressalva
+        
+        Qualquer menção com negação ou condição por perto ("não contratada",
+        "mediante contratação") deixa a pergunta para o Gemini. A ausência
+        dos termos não responde nada: a cláusula pode estar com outro nome
+        ou em uma página escaneada.
+        """
+        mencoes = 0
+        for texto in self.textos:
+            for padrao in termos:
+                for ocorrencia in padrao.finditer(texto):
+                    contexto = texto[
+                        max(ocorrencia.start() - _JANELA_NEGACAO, 0):
+                        ocorrencia.end() + _JANELA_NEGACAO
+                    ]
+                    if _PADRAO_NEGACAO.search(contexto) or _PADRAO_CONDICAO.search(contexto):
+                        return False
+                    mencoes += 1
+        
+        return mencoes > 0
@@ -0,0 +1,182 @@
+"""
+Envio de documentos para o Gemini (upload único reaproveitado entre prompts)
+"""
+import hashlib
+import logging
+import threading
+import time
+from io import BytesIO
+from typing import Any
+import google.generativeai as genai
+from config.settings import gemini_config
+from utils.pdf_utils import contar_paginas_pdf
+
+logger = logging.getLogger(__name__)
+
+
+class InlineUploader:
+    """
+    Envia o documento inline em cada requisição
+    
+    Também serve como implementação local para testes: não acessa a rede
+    e conta quantos envios foram realizados.
+    """
+    
+    def __init__(self):
+        """Inicializa o uploader"""
+        self.envios = 0
+        self._lock = threading.Lock()
+    
+    def enviar(self, file_bytes: bytes, mime_type: str, nome: str) -> Any:
+        """
+        Prepara a parte do documento para o modelo
+        
+        Args:
+            file_bytes: Bytes do documento
+            mime_type: Tipo MIME do documento
+            nome: Nome de exibição do documento
+        
+        Returns:
+            Parte inline aceita por generate_content
+        """
+        with self._lock:
+            self.envios += 1
+        return {"mime_type": mime_type, "data": file_bytes}
+    
+    def remover(self, parte: Any):
+        """Nada a remover: o conteúdo inline não fica armazenado no servidor"""
+        pass
+
+
+class GeminiFileUploader:
+    """Envia o documento uma única vez pela File API do Gemini"""
+    
+    def __init__(self, timeout: int = None, intervalo_verificacao: float = 2.0):
+        """
+        Inicializa o uploader
+        
+        Args:
+            timeout: Tempo máximo aguardando o processamento do arquivo (opcional)
+            intervalo_verificacao: Intervalo entre verificações de estado em segundos
+        """
+        self.timeout = timeout or gemini_config.TIMEOUT
+        self.intervalo_verificacao = intervalo_verificacao
+        self.envios = 0
+        self._lock = threading.Lock()
+    
+    def enviar(self, file_bytes: bytes, mime_type: str, nome: str) -> Any:
+        """
+        Faz o upload do documento e aguarda até que esteja disponível
+        
+        Args:
+            file_bytes: Bytes do documento
+            mime_type: Tipo MIME do documento
+            nome: Nome de exibição do documento
+        
+        Returns:
+            Arquivo remoto (genai File) aceito por generate_content
+        
+        Raises:
+            TimeoutError: Se o arquivo não ficar ativo dentro do timeout
+            RuntimeError: Se o processamento do arquivo falhar no servidor
+        """
+        logger.info(f"Enviando documento {nome} ({len(file_bytes)} bytes) pela File API...")
+        
+        arquivo = genai.upload_file(
+            BytesIO(file_bytes),
+            mime_type=mime_type,
+            display_name=nome
+        )
+        with self._lock:
+            self.envios += 1
+        
+        limite = time.monotonic() + self.timeout
+        while arquivo.state.name == "PROCESSING":
+            if time.monotonic() > limite:
+                self.remover(arquivo)
+                raise TimeoutError(f"Arquivo {nome} não ficou disponível em {self.timeout}s")
+            time.sleep(self.intervalo_verificacao)
+            arquivo = genai.get_file(arquivo.name)
+        
+        if arquivo.state.name != "ACTIVE":
+            self.remover(arquivo)
+            raise RuntimeError(f"Falha no processamento do arquivo {nome}: {arquivo.state.name}")
+        
+        logger.info(f"Documento disponível como {arquivo.name}")
+        return arquivo
+    
+    def remover(self, parte: Any):
+        """Remove o arquivo do armazenamento do Gemini"""
+        try:
+            genai.delete_file(parte.name)
+        except Exception as e:
+            logger.warning(f"Falha ao remover arquivo {getattr(parte, 'name', '?')}: {e}")
+
+
+class DocumentoCompartilhado:
+    """
+    Documento referenciado por vários prompts
+    
+    O upload acontece na primeira vez em que a parte é solicitada, de forma
+    que prompts atendidos pelo cache de extrações não geram envio algum.
+    """
+    
+    def __init__(
+        self,
+        file_bytes: bytes,
+        uploader,
+        mime_type: str = "application/pdf",
+        nome: str = "documento.pdf"
+    ):
+        """
+        Inicializa o documento
+        
+        Args:
+            file_bytes: Bytes do documento
+            uploader: Uploader responsável pelo envio (InlineUploader ou GeminiFileUploader)
+            mime_type: Tipo MIME do documento
+            nome: Nome de exibição do documento
+        """
+        self.file_bytes = file_bytes
+        self.uploader = uploader
+        self.mime_type = mime_type
+        self.nome = nome
+        self.tamanho = len(file_bytes)
+        self.sha256 = hashlib.sha256(file_bytes).hexdigest()
+        self.paginas = contar_paginas_pdf(file_bytes)
+        
+        self._parte = None
+        self._liberado = False
+        self._lock = threading.Lock()
+    
+    def parte(self) -> Any:
+        """
+        Retorna a parte do documento para generate_content, enviando-o se necessário
+        
+        Returns:
+            Parte do documento (inline ou arquivo remoto)
+            
+        Raises:
+            RuntimeError: Se o documento já foi liberado
+        """
+        with self._lock:
+            if self._liberado:
+                raise RuntimeError(f"Documento {self.nome} já foi liberado")
+            if self._parte is None:
+                self._parte = self.uploader.enviar(self.file_bytes, self.mime_type, self.nome)
+            return self._parte
+    
+    def liberar(self):
+        """Remove o arquivo remoto, se houver, e descarta os bytes em memória"""
+        with self._lock:
+            if self._parte is not None:
+                self.uploader.remover(self._parte)
+                self._parte = None
+            self._liberado = True
+            self.file_bytes = b""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.liberar()
@@ -4,11 +4,31 @@ Configurações e fixtures compartilhadas para todos os testes
 import pytest
 import os
 import sys
+import types
 from pathlib import Path
+from unittest.mock import MagicMock
 
 # Adiciona o diretório raiz ao path para imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Sem o driver ODBC (ex.: CI), um pyodbc mínimo permite testar o DatabaseService
+# com conexões falsas; nenhuma conexão real é aberta nos testes unitários
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    pyodbc_falso = types.ModuleType("pyodbc")
+    
+    class Error(Exception):
+        """Erro base do pyodbc: args = (sqlstate, mensagem)"""
+        pass
+    
+    def connect(*args, **kwargs):
+        raise Error("IM002", "Driver ODBC não instalado")
+    
+    pyodbc_falso.Error = Error
+    pyodbc_falso.connect = connect
+    sys.modules["pyodbc"] = pyodbc_falso
+
 
 @pytest.fixture(scope="session")
 def setup_test_env():
@@ -20,12 +40,71 @@ def setup_test_env():
     # Cleanup se necessário
 
 
+@pytest.fixture
+def modelo_gemini():
+    """Modelo Gemini simulado que responde um JSON fixo"""
+    modelo = MagicMock()
+    modelo.generate_content.return_value.text = '{"ok": true}'
+    return modelo
+
+
+@pytest.fixture
+def pool_gemini(modelo_gemini):
+    """Pool de clientes Gemini que empresta sempre o modelo simulado"""
+    from services.gemini_pool import GeminiClientPool
+    return GeminiClientPool(tamanho_maximo=4, fabrica=lambda: modelo_gemini)
+
+
+@pytest.fixture
+def limitador_gemini():
+    """Limitador isolado com cotas altas, para não interferir entre testes"""
+    from services.rate_limiter import AdaptiveConcurrencyLimiter, GeminiRateLimiter
+    return GeminiRateLimiter(
+        requisicoes_por_minuto=100000,
+        tokens_por_minuto=100000000,
+        concorrencia=AdaptiveConcurrencyLimiter(inicial=8, minimo=1, maximo=8)
+    )
+
+
+@pytest.fixture
+def registro_metricas(tmp_path):
+    """Registro de métricas isolado, gravando JSONL no diretório temporário"""
+    from services.metrics import RegistroMetricas
+    return RegistroMetricas(arquivo_jsonl=str(tmp_path / "metricas" / "chamadas.jsonl"))
+
+
+@pytest.fixture
+def gemini_service(tmp_path, pool_gemini, limitador_gemini, registro_metricas):
+    """GeminiService com modelo simulado, cache isolado e uploader local (sem validação de schema)"""
+    from services.cache_service import ExtractionCache
+    from services.gemini_service import GeminiService
+    from services.upload_service import InlineUploader
+    from utils.retry import PoliticaRetry
+    return GeminiService(
+        cache=ExtractionCache(diretorio=str(tmp_path / "cache_extracoes")),
+        uploader=InlineUploader(),
+        pool=pool_gemini,
+        limitador=limitador_gemini,
+        politica_retry=PoliticaRetry(tentativas=3, espera_inicial=0.01, espera_maxima=0.01),
+        hedge=False,
+        metricas=registro_metricas,
+        schema_resposta=False
+    )
+
+
 @pytest.fixture
 def mock_pdf_bytes():
     """Retorna bytes de um PDF mínimo válido"""
     return b'%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\n%EOF'
 
 
+@pytest.fixture
+def gerar_pdf_texto():
+    """Retorna uma função que monta um PDF com uma página por texto informado"""
+    from utils.pdf_utils import gerar_pdf_texto as gerar
+    return gerar
+
+
 @pytest.fixture
 def sample_apolice_data():
     """Dados de exemplo de uma apólice"""
@@ -0,0 +1,105 @@
+"""
+Testes unitários para as fontes de anexos locais (diretório e SQLite)
+"""
+import asyncio
+import pytest
+from services.attachment_sources import (
+    FonteAnexosDiretorio,
+    FonteAnexosSQLite,
+    criar_fonte_anexos,
+    exportar_anexos
+)
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    """Diretório com duas solicitações no layout <num_solic>/<arquivo>"""
+    fonte = FonteAnexosDiretorio(str(tmp_path))
+    fonte.gravar_anexo(10, "APOLICE.pdf", b"%PDF apolice 10")
+    fonte.gravar_anexo(10, "ESPECIFICACAO.pdf", b"%PDF espec 10")
+    fonte.gravar_anexo(10, "OUTRO.pdf", b"%PDF ignorado")
+    fonte.gravar_anexo(20, "FRONTING.pdf", b"%PDF fronting 20")
+    return fonte
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    """Base SQLite com duas versões da mesma solicitação"""
+    fonte = FonteAnexosSQLite(str(tmp_path / "anexos.sqlite"), criar=True)
+    fonte.gravar_anexo(10, "APOLICE.pdf", b"%PDF antiga", num_hist_solic=1)
+    fonte.gravar_anexo(10, "APOLICE.pdf", b"%PDF apolice", num_hist_solic=2)
+    fonte.gravar_anexo(10, "ESPEC.pdf", b"%PDF espec", num_hist_solic=2)
+    return fonte
+
+
+class TestFonteAnexosDiretorio:
+    """Testes para a fonte de PDFs em diretório"""
+    
+    def test_escolhe_pelos_nomes(self, diretorio):
+        """Testa que apólice e especificação seguem as regras de nome da base"""
+        apolice, especificacao = diretorio.carregar_anexos(10)
+        
+        assert apolice.read() == b"%PDF apolice 10"
+        assert especificacao.name == "ESPECIFICACAO.PDF"
+        assert especificacao.read() == b"%PDF espec 10"
+    
+    def test_solicitacao_sem_anexos(self, diretorio):
+        """Testa que solicitações sem subdiretório ou sem especificação vêm None"""
+        assert diretorio.carregar_anexos(99) == (None, None)
+        apolice, especificacao = diretorio.carregar_anexos(20)
+        assert apolice.read() == b"%PDF fronting 20"
+        assert especificacao is None
+    
+    def test_lista_e_carrega_em_lote(self, diretorio):
+        """Testa a listagem das solicitações e a carga em lote padrão"""
+        assert diretorio.listar_solicitacoes() == [10, 20]
+        assert [r[0] for r in diretorio.carregar_anexos_em_lote([20, 10, 10])] == [10, 20]
+        assert diretorio.estatisticas()["carregamentos"] == 2
+    
+    def test_diretorio_inexistente(self, tmp_path):
+        """Testa que um diretório inexistente é recusado na criação"""
+        with pytest.raises(FileNotFoundError):
+            FonteAnexosDiretorio(str(tmp_path / "nao_existe"))
+
+
+class TestFonteAnexosSQLite:
+    """Testes para a fonte SQLite com a tabela do SQL Server"""
+    
+    def test_usa_a_ultima_versao(self, sqlite):
+        """Testa que só os anexos do maior num_hist_solic são considerados"""
+        apolice, especificacao = sqlite.carregar_anexos(10)
+        
+        assert apolice.read() == b"%PDF apolice"
+        assert especificacao.read() == b"%PDF espec"
+    
+    def test_variante_assincrona(self, sqlite):
+        """Testa que a variante assíncrona padrão devolve os mesmos anexos"""
+        apolice, _ = asyncio.run(sqlite.carregar_anexos_async(10, timeout=5))
+        assert apolice.read() == b"%PDF apolice"
+    
+    def test_base_inexistente(self, tmp_path):
+        """Testa que sem criar=True o arquivo precisa existir"""
+        with pytest.raises(FileNotFoundError):
+            FonteAnexosSQLite(str(tmp_path / "nao_existe.sqlite"))
+
+
+class TestCriarEExportar:
+    """Testes para a seleção da fonte e a exportação de corpus"""
+    
+    def test_criar_fonte_por_tipo(self, diretorio, sqlite):
+        """Testa que o tipo escolhe a implementação"""
+        assert isinstance(criar_fonte_anexos("diretorio", diretorio.diretorio), FonteAnexosDiretorio)
+        assert isinstance(criar_fonte_anexos("sqlite", sqlite.caminho), FonteAnexosSQLite)
+        with pytest.raises(ValueError):
+            criar_fonte_anexos("ftp")
+    
+    def test_exporta_diretorio_para_sqlite(self, diretorio, tmp_path):
+        """Testa que o corpus exportado devolve os mesmos anexos"""
+        destino = FonteAnexosSQLite(str(tmp_path / "corpus.sqlite"), criar=True)
+        
+        assert exportar_anexos(diretorio, destino, diretorio.listar_solicitacoes()) == 3
+        
+        assert destino.listar_solicitacoes() == [10, 20]
+        apolice, especificacao = destino.carregar_anexos(10)
+        assert apolice.read() == b"%PDF apolice 10"
+        assert especificacao.read() == b"%PDF espec 10"
@@ -0,0 +1,58 @@
+"""
+Testes unitários para a decodificação de base64 em partes
+"""
+import base64
+import binascii
+import os
+from io import BytesIO
+import pytest
+from utils.base64_incremental import AnexoTemporario, decodificar_base64_em_partes
+
+
+class TestDecodificarBase64EmPartes:
+    """Testes para a decodificação incremental"""
+    
+    @pytest.mark.parametrize("tamanho_parte", [1, 3, 5, 64, 10_000])
+    def test_igual_a_b64decode(self, tamanho_parte):
+        """Testa que o resultado independe do tamanho das partes"""
+        dados = os.urandom(1000)
+        codificado = base64.b64encode(dados)
+        
+        for conteudo in (codificado, codificado.decode("ascii")):
+            destino = BytesIO()
+            escritos = decodificar_base64_em_partes(conteudo, destino, tamanho_parte=tamanho_parte)
+            assert destino.getvalue() == dados
+            assert escritos == len(dados)
+    
+    def test_ignora_quebras_de_linha(self):
+        """Testa base64 gravado com quebras a cada 76 caracteres"""
+        dados = os.urandom(500)
+        codificado = base64.encodebytes(dados)
+        destino = BytesIO()
+        
+        decodificar_base64_em_partes(codificado, destino, tamanho_parte=7)
+        
+        assert destino.getvalue() == dados
+    
+    def test_padding_incorreto(self):
+        """Testa que base64 truncado gera erro como em b64decode"""
+        with pytest.raises(binascii.Error):
+            decodificar_base64_em_partes("QUJDRA", BytesIO(), tamanho_parte=4)
+
+
+class TestAnexoTemporario:
+    """Testes para o arquivo temporário dos anexos"""
+    
+    def test_passa_para_disco_acima_do_limite(self):
+        """Testa que o conteúdo vai para disco acima de max_size e mantém o nome"""
+        arquivo = AnexoTemporario("APOLICE.PDF", max_size=10)
+        arquivo.write(b"x" * 5)
+        assert not arquivo._rolled
+        
+        arquivo.write(b"x" * 10)
+        arquivo.seek(0)
+        
+        assert arquivo._rolled
+        assert arquivo.read() == b"x" * 15
+        assert arquivo.name == "APOLICE.PDF"
+        arquivo.close()
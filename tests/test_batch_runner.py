@@ -0,0 +1,159 @@
+"""
+Testes unitários para o processamento em lote e o checkpoint
+"""
+import csv
+import threading
+from io import BytesIO
+from types import SimpleNamespace
+import pytest
+import batch
+from services.batch_runner import (
+    STATUS_ERRO,
+    STATUS_INCOMPLETO,
+    STATUS_OK,
+    STATUS_SEM_ANEXOS,
+    CheckpointLote,
+    ler_numeros,
+    processar_lote,
+    processar_uma
+)
+from services.pipeline import AnexosNaoEncontrados, ResultadoSolicitacao
+
+
+def processar_falso(num_solic, fonte, processor, diretorio_saida=None, **callbacks):
+    """Pipeline simulado: 2 sem anexos, 3 com erro, 4 incompleta, demais ok"""
+    fonte.append(num_solic)
+    if num_solic == 2:
+        raise AnexosNaoEncontrados("sem anexos")
+    if num_solic == 3:
+        raise RuntimeError("falha no Gemini")
+    return ResultadoSolicitacao(
+        num_solic=num_solic,
+        caminho_arquivo=f"json/{num_solic}.json",
+        incompleto=num_solic == 4
+    )
+
+
+@pytest.fixture
+def pipeline_falso(monkeypatch):
+    """Substitui o pipeline de uma solicitação e devolve a lista das processadas"""
+    monkeypatch.setattr("services.batch_runner.processar_solicitacao", processar_falso)
+    return []
+
+
+class TestLerNumeros:
+    """Testes para a montagem da lista de solicitações"""
+    
+    def test_combina_numeros_arquivo_e_intervalo(self, tmp_path):
+        """Testa que as três formas são combinadas na ordem, sem repetições"""
+        arquivo = tmp_path / "nums.txt"
+        arquivo.write_text("# backfill\n7\n\n8  # repetida abaixo\n", encoding="utf-8")
+        
+        assert ler_numeros(["1,2", "3"], str(arquivo), "8-10") == [1, 2, 3, 7, 8, 9, 10]
+    
+    def test_intervalo_invalido(self):
+        """Testa que um intervalo decrescente é recusado"""
+        with pytest.raises(ValueError):
+            ler_numeros(intervalo="10-1")
+
+
+class TestCheckpointLote:
+    """Testes para o checkpoint JSONL"""
+    
+    def test_ultimo_registro_vale_e_linha_truncada_ignorada(self, tmp_path):
+        """Testa a leitura após uma execução interrompida no meio de uma gravação"""
+        checkpoint = CheckpointLote(str(tmp_path / "lote" / "checkpoint.jsonl"))
+        checkpoint.registrar({"num_solic": 1, "status": STATUS_ERRO})
+        checkpoint.registrar({"num_solic": 1, "status": STATUS_OK})
+        with open(checkpoint.caminho, "a", encoding="utf-8") as f:
+            f.write('{"num_solic": 2, "sta')
+        
+        assert checkpoint.carregar() == {1: {"num_solic": 1, "status": STATUS_OK}}
+
+
+class TestProcessarLote:
+    """Testes para o processamento paralelo com retomada"""
+    
+    def test_status_por_solicitacao(self, tmp_path, pipeline_falso):
+        """Testa que cada desfecho vira um status e nenhum erro interrompe o lote"""
+        checkpoint = CheckpointLote(str(tmp_path / "checkpoint.jsonl"))
+        
+        progresso = processar_lote([1, 2, 3, 4, 5], pipeline_falso, None, checkpoint, concorrencia=3)
+        
+        registros = checkpoint.carregar()
+        assert {n: r["status"] for n, r in registros.items()} == {
+            1: STATUS_OK, 2: STATUS_SEM_ANEXOS, 3: STATUS_ERRO, 4: STATUS_INCOMPLETO, 5: STATUS_OK
+        }
+        assert registros[3]["erro"] == "RuntimeError: falha no Gemini"
+        assert registros[1]["caminho_arquivo"] == "json/1.json"
+        assert "final_json" not in registros[1]
+        assert progresso.concluidas == 5
+        assert progresso.por_status[STATUS_OK] == 2
+    
+    def test_retoma_do_checkpoint(self, tmp_path, pipeline_falso):
+        """Testa que uma nova execução pula as registradas e refaz as falhas se pedido"""
+        checkpoint = CheckpointLote(str(tmp_path / "checkpoint.jsonl"))
+        processar_lote([1, 2, 3, 4], pipeline_falso, None, checkpoint)
+        pipeline_falso.clear()
+        
+        progresso = processar_lote([1, 2, 3, 4, 5], pipeline_falso, None, checkpoint)
+        assert pipeline_falso == [5]
+        assert progresso.ignoradas == 4
+        
+        pipeline_falso.clear()
+        processar_lote([1, 2, 3, 4, 5], pipeline_falso, None, checkpoint, repetir_falhas=True)
+        assert sorted(pipeline_falso) == [3, 4]
+    
+    def test_parar_nao_envia_novas(self, tmp_path, pipeline_falso):
+        """Testa que o sinal de parada deixa as restantes para a próxima execução"""
+        checkpoint = CheckpointLote(str(tmp_path / "checkpoint.jsonl"))
+        parar = threading.Event()
+        
+        processar_lote([1, 5, 6], pipeline_falso, None, checkpoint, concorrencia=1,
+                       parar=parar, ao_concluir=lambda registro: parar.set())
+        
+        assert pipeline_falso == [1]
+        assert list(checkpoint.carregar()) == [1]
+
+
+class TestProcessarUma:
+    """Testes para uma solicitação pelo pipeline real"""
+    
+    def test_anexo_unico_e_fechado(self):
+        """Testa que, sem a especificação, a apólice encontrada é fechada antes do sem_anexos"""
+        apolice = BytesIO(b"%PDF apolice")
+        fonte = SimpleNamespace(carregar_anexos=lambda num_solic: (apolice, None))
+        
+        registro = processar_uma(1, fonte, processor=object())
+        
+        assert registro["status"] == STATUS_SEM_ANEXOS
+        assert apolice.closed
+
+
+class TestLinhaDeComando:
+    """Testes para o batch.py"""
+    
+    def test_grava_relatorio_e_codigo_de_saida(self, tmp_path, monkeypatch, pipeline_falso):
+        """Testa o relatório CSV por solicitação e o código 1 quando há falhas"""
+        (tmp_path / "anexos").mkdir()
+        monkeypatch.setattr("config.settings.gemini_config.API_KEY", "chave")
+        monkeypatch.setattr("services.batch_runner.processar_solicitacao",
+                            lambda n, *args, **kwargs: processar_falso(n, pipeline_falso, None))
+        monkeypatch.setattr(batch, "PDFProcessor", lambda: None)
+        checkpoint = tmp_path / "lote" / "checkpoint.jsonl"
+        
+        codigo = batch.main([
+            "--intervalo", "1-3", "--fonte", "diretorio", "--fonte-caminho", str(tmp_path / "anexos"),
+            "--checkpoint", str(checkpoint)
+        ])
+        
+        assert codigo == 1
+        with open(tmp_path / "lote" / "status.csv", encoding="utf-8") as f:
+            linhas = list(csv.DictReader(f))
+        assert [(linha["num_solic"], linha["status"]) for linha in linhas] == [
+            ("1", STATUS_OK), ("2", STATUS_SEM_ANEXOS), ("3", STATUS_ERRO)
+        ]
+    
+    def test_sem_solicitacoes(self):
+        """Testa que sem lista de solicitações o comando termina com código 2"""
+        assert batch.main([]) == 2
@@ -0,0 +1,100 @@
+"""
+Testes do benchmark de ponta a ponta
+"""
+import json
+from benchmarks.benchmark_pipeline import (
+    BancoSimulado,
+    comparar_relatorios,
+    executar_benchmark,
+    main
+)
+from services.attachment_sources import FonteAnexosDiretorio, exportar_anexos
+from services.pipeline import ETAPAS
+from utils.pdf_utils import contar_paginas_pdf
+
+
+class TestBancoSimulado:
+    """Testes para os anexos sintéticos"""
+    
+    def test_documentos_distintos_por_solicitacao(self):
+        """Testa que cada solicitação recebe uma apólice própria com as páginas pedidas"""
+        banco = BancoSimulado(paginas_apolice=10)
+        apolice_1, especificacao_1 = banco.carregar_anexos(1)
+        apolice_2, _ = banco.carregar_anexos(2)
+        
+        assert contar_paginas_pdf(apolice_1.getvalue()) == 10
+        assert apolice_1.getvalue() != apolice_2.getvalue()
+        assert apolice_1.name == "apolice_1.pdf"
+        assert especificacao_1.name == "especificacao_1.pdf"
+
+
+class TestBenchmark:
+    """Testes para execução e comparação do benchmark"""
+    
+    def test_relatorio_por_etapa(self, tmp_path):
+        """Testa que o relatório traz percentis de todas as etapas e do total"""
+        relatorio = executar_benchmark(
+            solicitacoes=3,
+            concorrencia=2,
+            perfil="instantaneo",
+            paginas=8,
+            latencia_banco=0.0,
+            diretorio=str(tmp_path)
+        )
+        
+        assert relatorio["erros"] == 0
+        assert set(ETAPAS) | {"total"} <= set(relatorio["etapas"])
+        assert relatorio["etapas"]["total"]["p95"] is not None
+        assert relatorio["vazao_por_minuto"] > 0
+        assert relatorio["backend"]["chamadas"] >= 3
+        assert "especificacao" in relatorio["prompts"]
+    
+    def test_fonte_de_corpus_local(self, tmp_path):
+        """Testa que o benchmark processa as solicitações listadas por uma fonte real"""
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        fonte = FonteAnexosDiretorio(str(corpus))
+        exportar_anexos(BancoSimulado(paginas_apolice=8), fonte, [7, 8])
+        
+        relatorio = executar_benchmark(
+            solicitacoes=5,
+            concorrencia=2,
+            perfil="instantaneo",
+            diretorio=str(tmp_path / "trabalho"),
+            fonte=fonte
+        )
+        
+        assert relatorio["erros"] == 0
+        assert relatorio["parametros"]["fonte"] == "FonteAnexosDiretorio"
+        assert relatorio["parametros"]["solicitacoes"] == 2
+        assert fonte.estatisticas()["carregamentos"] == 2
+    
+    def test_comparacao_detecta_regressao(self):
+        """Testa que pioras acima da tolerância são apontadas e ruído pequeno não"""
+        base = {
+            "etapas": {"total": {"p50": 1.0, "p95": 2.0}, "salvar_json": {"p50": 0.001, "p95": 0.002}},
+            "vazao_por_minuto": 60.0,
+            "memoria_pico_mb": 100.0
+        }
+        atual = {
+            "etapas": {"total": {"p50": 1.1, "p95": 3.0}, "salvar_json": {"p50": 0.004, "p95": 0.008}},
+            "vazao_por_minuto": 40.0,
+            "memoria_pico_mb": 105.0
+        }
+        
+        regressoes = comparar_relatorios(atual, base, tolerancia=0.2)
+        
+        assert len(regressoes) == 2
+        assert regressoes[0].startswith("total p95")
+        assert regressoes[1].startswith("vazão")
+    
+    def test_linha_de_comando_salva_e_compara(self, tmp_path, capsys):
+        """Testa salvar a linha de base e compará-la com folga total"""
+        caminho = tmp_path / "resultados" / "base.json"
+        argumentos = ["--solicitacoes", "2", "--perfil", "instantaneo", "--latencia-banco", "0"]
+        
+        assert main(argumentos + ["--salvar", str(caminho)]) == 0
+        assert json.loads(caminho.read_text(encoding="utf-8"))["parametros"]["solicitacoes"] == 2
+        
+        assert main(argumentos + ["--comparar", str(caminho), "--tolerancia", "100"]) == 0
+        assert "Sem regressões" in capsys.readouterr().out
@@ -0,0 +1,162 @@
+"""
+Testes unitários para o cache de extrações
+"""
+import os
+import time
+import pytest
+from io import BytesIO
+from services.cache_service import AttachmentCache, ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cria um cache isolado em diretório temporário"""
+    return ExtractionCache(diretorio=str(tmp_path / "cache"))
+
+
+class TestGerarChave:
+    """Testes para a geração de chaves do cache"""
+    
+    def test_chave_deterministica(self):
+        """Testa que a mesma requisição gera a mesma chave"""
+        chave1 = ExtractionCache.gerar_chave("hash1", "prompt", "modelo", 0.0)
+        chave2 = ExtractionCache.gerar_chave("hash1", "prompt", "modelo", 0.0)
+        assert chave1 == chave2
+    
+    def test_chave_muda_com_cada_componente(self):
+        """Testa que qualquer componente diferente gera outra chave"""
+        base = ExtractionCache.gerar_chave("hash1", "prompt", "modelo", 0.0)
+        assert ExtractionCache.gerar_chave("hash2", "prompt", "modelo", 0.0) != base
+        assert ExtractionCache.gerar_chave("hash1", "outro", "modelo", 0.0) != base
+        assert ExtractionCache.gerar_chave("hash1", "prompt", "outro", 0.0) != base
+        assert ExtractionCache.gerar_chave("hash1", "prompt", "modelo", 0.5) != base
+
+
+class TestExtractionCache:
+    """Testes para leitura, gravação e remoção de entradas"""
+    
+    def test_miss_e_hit(self, cache):
+        """Testa contadores de miss e hit"""
+        assert cache.obter("chave") is None
+        cache.salvar("chave", {"segurado": "EMPRESA TESTE LTDA"})
+        assert cache.obter("chave") == {"segurado": "EMPRESA TESTE LTDA"}
+        
+        estatisticas = cache.estatisticas()
+        assert estatisticas["hits"] == 1
+        assert estatisticas["misses"] == 1
+        assert estatisticas["gravacoes"] == 1
+        assert estatisticas["taxa_acerto"] == 0.5
+    
+    def test_entrada_expirada(self, cache):
+        """Testa que entradas mais antigas que a idade máxima são descartadas"""
+        cache.salvar("chave", {"campo": "valor"})
+        antigo = time.time() - cache.idade_maxima - 10
+        os.utime(cache._caminho("chave"), (antigo, antigo))
+        
+        assert cache.obter("chave") is None
+        assert not os.path.exists(cache._caminho("chave"))
+    
+    def test_remocao_por_tamanho_lru(self, tmp_path):
+        """Testa que as entradas menos usadas são removidas ao exceder o limite"""
+        cache = ExtractionCache(diretorio=str(tmp_path), tamanho_maximo_mb=1)
+        payload = {"dados": "x" * 400_000}
+        
+        cache.salvar("a", payload)
+        cache.salvar("b", payload)
+        antigo = time.time() - 60
+        os.utime(cache._caminho("a"), (antigo, antigo))
+        os.utime(cache._caminho("b"), (antigo + 1, antigo + 1))
+        cache.obter("a")
+        cache.salvar("c", payload)
+        
+        assert os.path.exists(cache._caminho("a"))
+        assert not os.path.exists(cache._caminho("b"))
+        assert os.path.exists(cache._caminho("c"))
+    
+    def test_limpar(self, cache):
+        """Testa remoção de todas as entradas"""
+        cache.salvar("a", {"x": 1})
+        cache.salvar("b", {"x": 2})
+        cache.limpar()
+        assert cache.obter("a") is None
+        assert cache.obter("b") is None
+
+
+def anexo_em_memoria(nome: str, conteudo: bytes) -> BytesIO:
+    """Arquivo de anexo com nome, como os devolvidos pelo banco"""
+    arquivo = BytesIO(conteudo)
+    arquivo.name = nome
+    return arquivo
+
+
+class TestAttachmentCache:
+    """Testes para o cache de anexos por versão da solicitação"""
+    
+    def test_salvar_e_obter(self, tmp_path):
+        """Testa que os anexos voltam com conteúdo e nome originais"""
+        cache = AttachmentCache(diretorio=str(tmp_path))
+        apolice = anexo_em_memoria("APOLICE.PDF", b"%PDF apolice")
+        
+        cache.salvar(10, 2, {"apolice": (1, apolice)})
+        arquivos = cache.obter(10, 2)
+        
+        assert arquivos["apolice"].read() == b"%PDF apolice"
+        assert arquivos["apolice"].name == "APOLICE.PDF"
+        assert apolice.tell() == 0
+        assert cache.obter(10, 3) is None
+        assert cache.estatisticas()["hits"] == 1
+        assert cache.estatisticas()["misses"] == 1
+        arquivos["apolice"].close()
+    
+    def test_conteudo_repetido_gravado_uma_vez(self, tmp_path):
+        """Testa a deduplicação de anexos iguais entre solicitações"""
+        cache = AttachmentCache(diretorio=str(tmp_path))
+        
+        cache.salvar(1, 1, {"especificacao": (2, anexo_em_memoria("ESPEC.PDF", b"%PDF igual"))})
+        cache.salvar(2, 1, {"especificacao": (5, anexo_em_memoria("ESPEC_2.PDF", b"%PDF igual"))})
+        
+        assert len(os.listdir(cache._diretorio_conteudo)) == 1
+        assert cache.estatisticas()["deduplicados"] == 1
+        arquivo = cache.obter(2, 1)["especificacao"]
+        assert arquivo.name == "ESPEC_2.PDF"
+        arquivo.close()
+    
+    def test_remocao_lru_invalida_indice(self, tmp_path):
+        """Testa que um conteúdo removido pelo limite torna a versão um miss"""
+        cache = AttachmentCache(diretorio=str(tmp_path), tamanho_maximo_mb=1)
+        grande = b"%PDF" + b"x" * 600_000
+        
+        cache.salvar(1, 1, {"apolice": (1, anexo_em_memoria("A.PDF", grande + b"1"))})
+        antigo = time.time() - 60
+        for nome in os.listdir(cache._diretorio_conteudo):
+            caminho = os.path.join(cache._diretorio_conteudo, nome)
+            os.utime(caminho, (antigo, antigo))
+        cache.salvar(2, 1, {"apolice": (1, anexo_em_memoria("B.PDF", grande + b"2"))})
+        
+        assert cache.obter(1, 1) is None
+        assert not os.path.exists(cache._caminho_indice(1, 1))
+        arquivo = cache.obter(2, 1)["apolice"]
+        arquivo.close()
+
+
+class TestGeminiServiceCache:
+    """Testes da integração do cache com o GeminiService"""
+    
+    def test_segunda_chamada_usa_cache(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que a mesma requisição não chama a API duas vezes"""
+        modelo_gemini.generate_content.return_value.text = '```json\n{"lmi_unico": "Sim"}\n```'
+        
+        primeiro = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt")
+        segundo = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt")
+        
+        assert primeiro == segundo == {"lmi_unico": "Sim"}
+        assert modelo_gemini.generate_content.call_count == 1
+    
+    def test_erro_nao_e_cacheado(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que falhas da API não são gravadas no cache"""
+        modelo_gemini.generate_content.side_effect = RuntimeError("falha")
+        
+        resultado = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt")
+        
+        assert "erro_agente" in resultado
+        assert gemini_service.cache.estatisticas()["gravacoes"] == 0
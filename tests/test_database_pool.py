@@ -0,0 +1,159 @@
+"""
+Testes unitários para o pool de conexões com o banco
+"""
+import threading
+import time
+import pytest
+from services.database_pool import PoolConexoes
+
+
+class ConexaoFalsa:
+    """Conexão mínima com rollback() e close()"""
+    
+    def __init__(self):
+        self.fechada = False
+        self.rollbacks = 0
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def close(self):
+        self.fechada = True
+
+
+class ConexaoQuebrada(ConexaoFalsa):
+    """Conexão que perdeu o vínculo com o servidor: o rollback falha"""
+    
+    def rollback(self):
+        raise RuntimeError("conexão perdida")
+
+
+def criar_pool(fabrica=ConexaoFalsa, **kwargs):
+    """Pool com conexões falsas e sem verificação, salvo indicação contrária"""
+    opcoes = {
+        "tamanho_minimo": 0,
+        "tamanho_maximo": 2,
+        "tempo_ocioso_maximo": 60,
+        "verificar_apos": 60,
+        "verificador": lambda conexao: True
+    }
+    opcoes.update(kwargs)
+    return PoolConexoes(fabrica, **opcoes)
+
+
+class TestPoolConexoes:
+    """Testes para empréstimo, verificação e descarte de conexões"""
+    
+    def test_reaproveita_conexao(self):
+        """Testa que uma conexão devolvida é reaproveitada"""
+        pool = criar_pool()
+        
+        with pool.adquirir() as primeira:
+            pass
+        with pool.adquirir() as segunda:
+            assert pool.estatisticas()["em_uso"] == 1
+        
+        assert primeira is segunda
+        estatisticas = pool.estatisticas()
+        assert estatisticas["criadas"] == 1
+        assert estatisticas["emprestimos"] == 2
+        assert estatisticas["ociosas"] == 1
+    
+    def test_devolucao_encerra_transacao(self):
+        """Testa que a conexão volta ao pool sem transação aberta"""
+        pool = criar_pool()
+        
+        with pool.adquirir() as conexao:
+            pass
+        
+        assert conexao.rollbacks == 1
+        assert pool.estatisticas()["ociosas"] == 1
+    
+    def test_rollback_com_falha_descarta_conexao(self):
+        """Testa que uma conexão cujo rollback falha é fechada em vez de voltar ao pool"""
+        pool = criar_pool(ConexaoQuebrada)
+        
+        with pool.adquirir() as conexao:
+            pass
+        
+        assert conexao.fechada
+        estatisticas = pool.estatisticas()
+        assert estatisticas["abertas"] == 0
+        assert estatisticas["descartadas"] == 1
+    
+    def test_excecao_descarta_conexao(self):
+        """Testa que uma conexão que falhou durante o uso não volta ao pool"""
+        pool = criar_pool()
+        
+        with pytest.raises(RuntimeError):
+            with pool.adquirir() as conexao:
+                raise RuntimeError("falha na consulta")
+        
+        assert conexao.fechada
+        assert pool.estatisticas()["abertas"] == 0
+        assert pool.estatisticas()["descartadas"] == 1
+    
+    def test_verificacao_no_emprestimo(self):
+        """Testa que uma conexão ociosa quebrada é trocada por uma nova"""
+        pool = criar_pool(verificar_apos=0, verificador=lambda conexao: not conexao.quebrada)
+        
+        with pool.adquirir() as quebrada:
+            quebrada.quebrada = True
+        with pool.adquirir() as nova:
+            pass
+        
+        assert nova is not quebrada
+        assert quebrada.fechada
+        assert pool.estatisticas()["falhas_verificacao"] == 1
+    
+    def test_remove_ociosas_acima_do_minimo(self):
+        """Testa que conexões ociosas há muito tempo são fechadas até o mínimo"""
+        pool = criar_pool(tamanho_minimo=1, tempo_ocioso_maximo=0.01)
+        pool.aquecer(2)
+        time.sleep(0.02)
+        
+        with pool.adquirir():
+            pass
+        
+        estatisticas = pool.estatisticas()
+        assert estatisticas["abertas"] == 1
+        assert estatisticas["descartadas"] == 1
+    
+    def test_timeout_quando_esgotado(self):
+        """Testa que o pool não abre mais conexões que o máximo"""
+        pool = criar_pool(tamanho_maximo=1)
+        
+        with pool.adquirir():
+            with pytest.raises(TimeoutError):
+                with pool.adquirir(timeout=0.05):
+                    pass
+    
+    def test_aguarda_devolucao(self):
+        """Testa que uma thread aguardando recebe a conexão devolvida"""
+        pool = criar_pool(tamanho_maximo=1)
+        obtidas = []
+        
+        with pool.adquirir() as conexao:
+            def consumidor():
+                with pool.adquirir(timeout=5) as c:
+                    obtidas.append(c)
+            
+            thread = threading.Thread(target=consumidor)
+            thread.start()
+            time.sleep(0.02)
+        
+        thread.join(timeout=5)
+        assert obtidas == [conexao]
+        assert pool.estatisticas()["criadas"] == 1
+    
+    def test_fechar(self):
+        """Testa que fechar o pool fecha as ociosas e recusa novos empréstimos"""
+        pool = criar_pool()
+        pool.aquecer(2)
+        
+        pool.fechar()
+        
+        assert pool.estatisticas()["abertas"] == 0
+        with pytest.raises(RuntimeError):
+            with pool.adquirir():
+                pass
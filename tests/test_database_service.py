@@ -0,0 +1,448 @@
+"""
+Testes unitários para o serviço de banco de dados (sem o driver ODBC, usam o pyodbc mínimo do conftest)
+"""
+import asyncio
+import base64
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pyodbc
+import pytest
+from services.cache_service import AttachmentCache
+from services.database_pool import PoolConexoes
+from services.database_service import DatabaseService, eh_erro_banco_retentavel
+from utils.retry import CircuitoAberto, DisjuntorCircuito, PoliticaRetry
+
+POLITICA_RAPIDA = PoliticaRetry(tentativas=3, espera_inicial=0.001, espera_maxima=0.001)
+
+
+@pytest.fixture(autouse=True)
+def sem_cache_global(monkeypatch):
+    """Evita que os testes usem o cache de anexos do processo"""
+    monkeypatch.setattr("config.settings.cache_config.ATTACHMENTS_ENABLED", False)
+
+
+def anexo(num_solic, num_seq, nome, conteudo=b"%PDF-1.4 conteudo"):
+    """Linha da tabela de anexos"""
+    b64 = base64.b64encode(conteudo)
+    return SimpleNamespace(
+        num_solic=num_solic,
+        num_hist_solic=1,
+        num_seq=num_seq,
+        nom_arquivo=nome,
+        arq_anexo_base64=b64,
+        tamanho_base64=len(b64)
+    )
+
+
+class CursorFalso:
+    """Cursor que responde às consultas de metadados e de conteúdo sobre uma tabela em memória"""
+    
+    def __init__(self, anexos):
+        self.anexos = list(anexos)
+        self.linhas = []
+        self.comandos = []
+        self.solicitacoes = []
+        self.chaves = set()
+        self.blocos = []
+        self.conteudos_lidos = []
+    
+    def execute(self, sql, params=()):
+        self.comandos.append(sql)
+        if "SELECT MAX(anexo.num_hist_solic)" in sql:
+            versoes = [a.num_hist_solic for a in self.anexos if a.num_solic == params[0]]
+            self.linhas = [SimpleNamespace(num_hist_solic=max(versoes, default=None))]
+        elif "DATALENGTH" in sql:
+            filtro = {params[0]} if params else set(self.solicitacoes)
+            self.linhas = [a for a in self.anexos if a.num_solic in filtro]
+        elif "IN (" in sql:
+            num_solic, _, *seqs = params
+            self.linhas = [a for a in self.anexos if a.num_solic == num_solic and a.num_seq in seqs]
+            self.conteudos_lidos.extend(a.nom_arquivo for a in self.linhas)
+        elif "#anexos_lote e" in sql:
+            self.linhas = [a for a in self.anexos if (a.num_solic, a.num_hist_solic, a.num_seq) in self.chaves]
+            self.conteudos_lidos.extend(a.nom_arquivo for a in self.linhas)
+        return self
+    
+    def executemany(self, sql, parametros):
+        if "#solicitacoes_lote" in sql:
+            self.solicitacoes.extend(p[0] for p in parametros)
+        else:
+            self.chaves.update(parametros)
+    
+    def fetchmany(self, tamanho):
+        bloco, self.linhas = self.linhas[:tamanho], self.linhas[tamanho:]
+        self.blocos.append(len(bloco))
+        return bloco
+    
+    def fetchall(self):
+        linhas, self.linhas = self.linhas, []
+        return linhas
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        return False
+
+
+class CursorLento(CursorFalso):
+    """Cursor cuja consulta só termina quando é cancelada"""
+    
+    def __init__(self, anexos):
+        super().__init__(anexos)
+        self.cancelado = threading.Event()
+    
+    def execute(self, sql, params=()):
+        if not self.cancelado.wait(timeout=5):
+            raise AssertionError("Consulta não foi cancelada")
+        raise pyodbc.Error("HY008", "Operation canceled")
+    
+    def cancel(self):
+        self.cancelado.set()
+
+
+class CursorInstavel(CursorFalso):
+    """Cursor que lança os erros indicados antes de responder normalmente"""
+    
+    def __init__(self, anexos, erros):
+        super().__init__(anexos)
+        self.erros = list(erros)
+        self.tentativas = 0
+    
+    def execute(self, sql, params=()):
+        self.tentativas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return super().execute(sql, params)
+
+
+class PoolFalso:
+    """Pool que empresta sempre a mesma conexão com o cursor falso"""
+    
+    def __init__(self, cursor):
+        self.conexao = SimpleNamespace(cursor=lambda: cursor, commit=lambda: None, timeout=0)
+    
+    @contextmanager
+    def adquirir(self, timeout=None):
+        yield self.conexao
+
+
+class ConexaoFalsa:
+    """Conexão com o cursor falso que registra os rollbacks e o fechamento"""
+    
+    def __init__(self, cursor, falhar_rollback=False):
+        self._cursor = cursor
+        self.falhar_rollback = falhar_rollback
+        self.rollbacks = 0
+        self.fechada = False
+        self.timeout = 0
+    
+    def cursor(self):
+        return self._cursor
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        self.rollbacks += 1
+        if self.falhar_rollback:
+            raise pyodbc.Error("08S01", "Communication link failure")
+    
+    def close(self):
+        self.fechada = True
+
+
+def pool_real(*conexoes):
+    """PoolConexoes de verdade que abre, em ordem, as conexões informadas"""
+    fila = list(conexoes)
+    return PoolConexoes(
+        lambda: fila.pop(0),
+        tamanho_minimo=0,
+        tamanho_maximo=2,
+        verificar_apos=60,
+        verificador=lambda conexao: True
+    )
+
+
+class TestCarregarAnexos:
+    """Testes para a escolha dos anexos de uma solicitação"""
+    
+    def test_baixa_apenas_os_escolhidos(self):
+        """Testa que só a primeira apólice e a primeira especificação são baixadas"""
+        cursor = CursorFalso([
+            anexo(1, 1, "APOLICE.pdf", b"%PDF apolice"),
+            anexo(1, 2, "ESPECIFICACAO.pdf", b"%PDF espec"),
+            anexo(1, 3, "APOLICE_V2.pdf", b"%PDF outra")
+        ])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        apolice, especificacao = db.carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF apolice"
+        assert especificacao.read() == b"%PDF espec"
+        assert sorted(cursor.conteudos_lidos) == ["APOLICE.pdf", "ESPECIFICACAO.pdf"]
+    
+    def test_ignora_anexo_grande_sem_baixar(self, monkeypatch):
+        """Testa que um anexo acima do limite é descartado pelo tamanho informado"""
+        monkeypatch.setattr("config.settings.app_config.MAX_FILE_SIZE_MB", 1)
+        grande = anexo(1, 1, "APOLICE.pdf")
+        grande.tamanho_base64 = 4 * 1024 * 1024
+        cursor = CursorFalso([grande, anexo(1, 2, "APOLICE_2.pdf", b"%PDF menor")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        apolice, especificacao = db.carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF menor"
+        assert especificacao is None
+        assert cursor.conteudos_lidos == ["APOLICE_2.pdf"]
+    
+    def test_proximo_candidato_se_base64_invalido(self):
+        """Testa que um conteúdo corrompido leva ao próximo anexo do mesmo tipo"""
+        corrompido = anexo(1, 1, "ESPEC.pdf")
+        corrompido.arq_anexo_base64 = b"abc"
+        cursor = CursorFalso([corrompido, anexo(1, 2, "ESPEC_2.pdf", b"%PDF espec")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        _, especificacao = db.carregar_anexos(1)
+        
+        assert especificacao.read() == b"%PDF espec"
+    
+    def test_versao_em_cache_nao_baixa_conteudo(self, tmp_path):
+        """Testa que uma nova execução com a mesma versão usa o cache local"""
+        anexos = [anexo(1, 1, "APOLICE.pdf", b"%PDF apolice"), anexo(1, 2, "ESPEC.pdf", b"%PDF espec")]
+        cache = AttachmentCache(diretorio=str(tmp_path))
+        DatabaseService("dsn", pool=PoolFalso(CursorFalso(anexos)), cache=cache).carregar_anexos(1)
+        
+        cursor = CursorFalso(anexos)
+        apolice, especificacao = DatabaseService("dsn", pool=PoolFalso(cursor), cache=cache).carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF apolice"
+        assert especificacao.name == "ESPEC.PDF"
+        assert cursor.conteudos_lidos == []
+        assert not any("DATALENGTH" in c for c in cursor.comandos)
+    
+    def test_nova_versao_baixa_de_novo(self, tmp_path):
+        """Testa que uma mudança de num_hist_solic invalida o cache"""
+        cache = AttachmentCache(diretorio=str(tmp_path))
+        DatabaseService("dsn", pool=PoolFalso(CursorFalso([anexo(1, 1, "APOLICE.pdf")])), cache=cache).carregar_anexos(1)
+        
+        nova = anexo(1, 1, "APOLICE.pdf", b"%PDF nova")
+        nova.num_hist_solic = 2
+        cursor = CursorFalso([nova])
+        apolice, _ = DatabaseService("dsn", pool=PoolFalso(cursor), cache=cache).carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF nova"
+        assert cursor.conteudos_lidos == ["APOLICE.pdf"]
+
+
+class TestPoolNoServico:
+    """Testes do DatabaseService com o pool de conexões real"""
+    
+    def test_reaproveita_conexao_sem_transacao_aberta(self):
+        """Testa que consultas seguidas usam a mesma conexão, devolvida com rollback"""
+        cursor = CursorFalso([anexo(1, 1, "APOLICE.pdf"), anexo(1, 2, "ESPEC.pdf")])
+        conexao = ConexaoFalsa(cursor)
+        pool = pool_real(conexao)
+        db = DatabaseService("dsn", pool=pool, disjuntor=DisjuntorCircuito("teste"), politica_retry=POLITICA_RAPIDA)
+        
+        db.carregar_anexos(1)
+        db.carregar_anexos(1)
+        
+        estatisticas = pool.estatisticas()
+        assert estatisticas["criadas"] == 1
+        assert estatisticas["emprestimos"] == 4
+        assert estatisticas["em_uso"] == 0
+        assert conexao.rollbacks == 4
+        assert not conexao.fechada
+    
+    def test_rollback_com_falha_descarta_conexao(self):
+        """Testa que uma conexão que não encerra a transação não volta ao pool"""
+        quebrada = ConexaoFalsa(CursorFalso([anexo(1, 1, "APOLICE.pdf")]), falhar_rollback=True)
+        nova = ConexaoFalsa(CursorFalso([anexo(1, 1, "APOLICE.pdf")]))
+        pool = pool_real(quebrada, nova)
+        db = DatabaseService("dsn", pool=pool, disjuntor=DisjuntorCircuito("teste"), politica_retry=POLITICA_RAPIDA)
+        
+        apolice, _ = db.carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF-1.4 conteudo"
+        assert quebrada.fechada
+        assert pool.estatisticas()["criadas"] == 2
+    
+    def test_erro_na_consulta_descarta_conexao(self):
+        """Testa que a conexão de uma consulta que falhou é fechada e a repetição usa outra"""
+        instavel = ConexaoFalsa(CursorInstavel([], [pyodbc.Error("08S01", "Communication link failure")]))
+        boa = ConexaoFalsa(CursorFalso([anexo(1, 1, "APOLICE.pdf")]))
+        pool = pool_real(instavel, boa)
+        db = DatabaseService("dsn", pool=pool, disjuntor=DisjuntorCircuito("teste"), politica_retry=POLITICA_RAPIDA)
+        
+        apolice, _ = db.carregar_anexos(1)
+        
+        assert apolice is not None
+        assert instavel.fechada
+        assert pool.estatisticas()["descartadas"] == 1
+
+
+class TestCarregarAnexosEmLote:
+    """Testes para a carga de várias solicitações por consulta"""
+    
+    def test_agrupa_por_solicitacao(self):
+        """Testa que cada solicitação é entregue com seus anexos, inclusive as sem anexos"""
+        cursor = CursorFalso([
+            anexo(1, 1, "APOLICE.pdf"),
+            anexo(1, 2, "ESPEC.pdf"),
+            anexo(1, 3, "ESPEC_ANTIGA.pdf"),
+            anexo(3, 1, "FRONTING.pdf")
+        ])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        resultados = list(db.carregar_anexos_em_lote(range(1, 5), tamanho_fetch=2))
+        
+        assert [r[0] for r in resultados] == [1, 2, 3, 4]
+        assert resultados[0][1] is not None and resultados[0][2] is not None
+        assert resultados[1][1:] == (None, None)
+        assert resultados[2][1] is not None and resultados[2][2] is None
+        assert resultados[3][1:] == (None, None)
+        assert cursor.solicitacoes == [1, 2, 3, 4]
+        assert "ESPEC_ANTIGA.pdf" not in cursor.conteudos_lidos
+        assert cursor.blocos == [2, 1, 0]
+    
+    def test_proximo_candidato_se_base64_invalido(self):
+        """Testa que o lote também recorre ao próximo anexo do mesmo tipo, como a carga individual"""
+        corrompido = anexo(1, 2, "ESPEC.pdf")
+        corrompido.arq_anexo_base64 = b"abc"
+        anexos = [anexo(1, 1, "APOLICE.pdf"), corrompido, anexo(1, 3, "ESPEC_2.pdf", b"%PDF espec")]
+        pool = pool_real(ConexaoFalsa(CursorFalso(anexos)))
+        db = DatabaseService("dsn", pool=pool, disjuntor=DisjuntorCircuito("teste"), politica_retry=POLITICA_RAPIDA)
+        
+        [(num_solic, apolice, especificacao)] = db.carregar_anexos_em_lote([1])
+        
+        assert num_solic == 1
+        assert apolice is not None
+        assert especificacao.read() == b"%PDF espec"
+        # O candidato seguinte é buscado depois que a conexão do lote voltou ao pool
+        assert pool.estatisticas()["criadas"] == 1
+    
+    def test_conexao_devolvida_antes_da_entrega(self):
+        """Testa que o consumidor recebe os anexos sem manter a conexão do lote emprestada"""
+        anexos = [anexo(1, 1, "APOLICE.pdf", b"%PDF um"), anexo(2, 1, "APOLICE.pdf", b"%PDF dois")]
+        pool = pool_real(ConexaoFalsa(CursorFalso(anexos)))
+        db = DatabaseService("dsn", pool=pool, disjuntor=DisjuntorCircuito("teste"))
+        
+        lote = db.carregar_anexos_em_lote([1, 2], tamanho_fetch=1)
+        num_solic, apolice, _ = next(lote)
+        
+        assert num_solic == 1
+        assert pool.estatisticas()["em_uso"] == 0
+        assert apolice.read() == b"%PDF um"
+        assert [r[0] for r in lote] == [2]
+    
+    def test_divide_em_lotes(self):
+        """Testa que números repetidos são ignorados e cada lote faz sua consulta"""
+        cursor = CursorFalso([])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        resultados = list(db.carregar_anexos_em_lote([5, 3, 3, 9], tamanho_lote=2))
+        
+        assert [r[0] for r in resultados] == [3, 5, 9]
+        assert cursor.solicitacoes == [3, 5, 9]
+        assert sum("ultima_versao" in c for c in cursor.comandos) == 2
+    
+    def test_lote_usa_cache(self, tmp_path):
+        """Testa que solicitações em cache não têm conteúdo baixado no lote"""
+        anexos = [anexo(1, 1, "APOLICE.pdf", b"%PDF um"), anexo(2, 1, "APOLICE.pdf", b"%PDF dois")]
+        cache = AttachmentCache(diretorio=str(tmp_path))
+        DatabaseService("dsn", pool=PoolFalso(CursorFalso(anexos)), cache=cache).carregar_anexos(1)
+        
+        cursor = CursorFalso(anexos)
+        db = DatabaseService("dsn", pool=PoolFalso(cursor), cache=cache)
+        resultados = list(db.carregar_anexos_em_lote([1, 2, 3]))
+        
+        assert [r[0] for r in resultados] == [1, 2, 3]
+        assert resultados[0][1].read() == b"%PDF um"
+        assert resultados[1][1].read() == b"%PDF dois"
+        assert resultados[2][1:] == (None, None)
+        assert cursor.conteudos_lidos == ["APOLICE.pdf"]
+        assert cache.obter(2, 1) is not None
+
+
+class TestCarregarAnexosAsync:
+    """Testes para a variante assíncrona com timeout e cancelamento"""
+    
+    def test_mesmo_resultado_da_versao_sincrona(self):
+        """Testa que a variante assíncrona devolve os mesmos anexos"""
+        cursor = CursorFalso([anexo(1, 1, "APOLICE.pdf", b"%PDF apolice")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        apolice, especificacao = asyncio.run(db.carregar_anexos_async(1))
+        
+        assert apolice.read() == b"%PDF apolice"
+        assert especificacao is None
+    
+    def test_timeout_cancela_consulta(self):
+        """Testa que o timeout interrompe a consulta em andamento"""
+        cursor = CursorLento([anexo(1, 1, "APOLICE.pdf")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor))
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(db.carregar_anexos_async(1, timeout=0.05))
+        
+        assert cursor.cancelado.wait(timeout=1)
+
+
+class TestRetryBanco:
+    """Testes para retry, classificação de erros e disjuntor do banco"""
+    
+    def test_classificacao_de_erros(self):
+        """Testa quais erros do ODBC são retentáveis"""
+        assert eh_erro_banco_retentavel(pyodbc.Error("08S01", "Communication link failure"))
+        assert eh_erro_banco_retentavel(pyodbc.Error("HYT00", "Query timeout expired"))
+        assert eh_erro_banco_retentavel(pyodbc.Error("40001", "Deadlock (1205) (SQLExecDirectW)"))
+        assert eh_erro_banco_retentavel(pyodbc.Error("42000", "Database is not currently available (40613)"))
+        assert not eh_erro_banco_retentavel(pyodbc.Error("42S02", "Invalid object name (208)"))
+        assert not eh_erro_banco_retentavel(pyodbc.Error("28000", "Login failed (18456)"))
+        assert not eh_erro_banco_retentavel(pyodbc.Error("HY008", "Operation canceled"))
+        assert not eh_erro_banco_retentavel(TimeoutError())
+    
+    def test_repete_erro_transitorio(self):
+        """Testa que uma queda de conexão é repetida até o sucesso"""
+        cursor = CursorInstavel([anexo(1, 1, "APOLICE.pdf", b"%PDF apolice")],
+                                [pyodbc.Error("08S01", "Communication link failure")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor), politica_retry=POLITICA_RAPIDA,
+                             disjuntor=DisjuntorCircuito("banco"))
+        
+        apolice, _ = db.carregar_anexos(1)
+        
+        assert apolice.read() == b"%PDF apolice"
+        assert db.disjuntor.estatisticas()["falhas_seguidas"] == 0
+    
+    def test_erro_fatal_nao_repete(self):
+        """Testa que um erro de sintaxe propaga na primeira tentativa"""
+        cursor = CursorInstavel([], [pyodbc.Error("42000", "Incorrect syntax")])
+        db = DatabaseService("dsn", pool=PoolFalso(cursor), politica_retry=POLITICA_RAPIDA,
+                             disjuntor=DisjuntorCircuito("banco"))
+        
+        with pytest.raises(pyodbc.Error):
+            db.carregar_anexos(1)
+        
+        assert cursor.tentativas == 1
+    
+    def test_disjuntor_compartilhado_falha_na_hora(self):
+        """Testa que, com o banco fora do ar, outro serviço nem chega ao banco"""
+        disjuntor = DisjuntorCircuito("banco", limite_falhas=3, tempo_recuperacao=60)
+        fora_do_ar = CursorInstavel([], [pyodbc.Error("08001", "TCP Provider")] * 3)
+        db = DatabaseService("dsn", pool=PoolFalso(fora_do_ar), politica_retry=POLITICA_RAPIDA,
+                             disjuntor=disjuntor)
+        with pytest.raises(pyodbc.Error):
+            db.carregar_anexos(1)
+        
+        outro = CursorInstavel([anexo(1, 1, "APOLICE.pdf")], [])
+        with pytest.raises(CircuitoAberto):
+            DatabaseService("dsn", pool=PoolFalso(outro), disjuntor=disjuntor).carregar_anexos(1)
+        with pytest.raises(CircuitoAberto):
+            list(DatabaseService("dsn", pool=PoolFalso(outro), disjuntor=disjuntor).carregar_anexos_em_lote([1]))
+        
+        assert outro.tentativas == 0
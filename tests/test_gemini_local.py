@@ -0,0 +1,103 @@
+"""
+Testes unitários para o backend Gemini local
+"""
+import random
+import pytest
+from io import BytesIO
+from google.api_core import exceptions as google_exceptions
+from config.prompts import PROMPT_LOCAIS_V4_1
+from services.gemini_local import (
+    BackendGeminiLocal,
+    PerfilBackend,
+    PerfilFalhas,
+    PerfilLatencia
+)
+from services.gemini_pool import GeminiClientPool
+from services.pdf_processor import PDFProcessor
+
+INSTANTANEO = PerfilLatencia(distribuicao="fixa", mediana=0.0)
+
+
+@pytest.fixture
+def service_local(gemini_service):
+    """GeminiService cujo pool empresta modelos do backend local"""
+    def configurar(perfil: PerfilBackend, **kwargs):
+        backend = BackendGeminiLocal(perfil=perfil, semente=7, **kwargs)
+        gemini_service.pool = GeminiClientPool(tamanho_maximo=8, fabrica=backend.criar_modelo)
+        return gemini_service, backend
+    return configurar
+
+
+class TestBackendGeminiLocal:
+    """Testes para latência, falhas e respostas do backend local"""
+    
+    def test_latencia_reproduzivel(self):
+        """Testa que a mesma semente gera a mesma sequência de latências"""
+        perfil = PerfilLatencia(mediana=2.0, dispersao=0.8, por_pagina=0.1)
+        
+        primeira = [perfil.amostrar(random.Random(3), paginas=10) for _ in range(5)]
+        segunda = [perfil.amostrar(random.Random(3), paginas=10) for _ in range(5)]
+        
+        assert primeira == segunda
+        assert all(0 < latencia <= perfil.maximo for latencia in primeira)
+    
+    def test_resposta_gravada_e_tokens(self, mock_pdf_bytes):
+        """Testa resposta gravada por nome de prompt e contagem de tokens"""
+        backend = BackendGeminiLocal(
+            perfil=PerfilBackend(latencia=INSTANTANEO),
+            respostas={"locais": {"locais_risco": [{"nro_local_risco": "9"}]}}
+        )
+        parte = {"mime_type": "application/pdf", "data": mock_pdf_bytes}
+        
+        resposta = backend.criar_modelo().generate_content([PROMPT_LOCAIS_V4_1, parte])
+        
+        assert '"9"' in resposta.text
+        assert resposta.usage_metadata.prompt_token_count > 0
+        assert backend.estatisticas()["tokens_saida"] == resposta.usage_metadata.candidates_token_count
+    
+    def test_limite_de_concorrencia_gera_429(self):
+        """Testa a falha 429 quando o limite simultâneo do backend é excedido"""
+        backend = BackendGeminiLocal(
+            perfil=PerfilBackend(latencia=INSTANTANEO, falhas=PerfilFalhas(limite_concorrencia=0))
+        )
+        
+        with pytest.raises(google_exceptions.ResourceExhausted):
+            backend.criar_modelo().generate_content(["prompt"])
+        assert backend.estatisticas()["falhas_429"] == 1
+
+
+class TestPipelineComBackendLocal:
+    """Testes do PDFProcessor completo contra o backend local"""
+    
+    def test_apolice_completa(self, service_local, mock_pdf_bytes):
+        """Testa extração e consolidação com respostas sintéticas em streaming"""
+        service, backend = service_local(PerfilBackend(latencia=INSTANTANEO), itens_sinteticos=3)
+        processor = PDFProcessor(gemini_service=service)
+        recebidos = []
+        
+        dados = processor.processar_apolice(
+            BytesIO(mock_pdf_bytes),
+            ao_receber_item=lambda secao, item: recebidos.append(secao)
+        )
+        final = processor.consolidar_dados(dados, {}, "apolice.pdf")
+        
+        assert len(final["locais_risco"]) == 3
+        assert len(final["coberturas_completas"]) == 3
+        assert recebidos.count("locais") == 3
+        assert backend.estatisticas()["chamadas"] == 4
+    
+    def test_retry_absorve_falhas_injetadas(self, service_local, mock_pdf_bytes):
+        """Testa que retries recuperam falhas 503 sorteadas pelo perfil"""
+        service, backend = service_local(
+            PerfilBackend(latencia=INSTANTANEO, falhas=PerfilFalhas(taxa_503=0.3))
+        )
+        service.politica_retry.tentativas = 10
+        
+        resultados = [
+            service.processar_documento(BytesIO(mock_pdf_bytes + bytes([i])), f"prompt {i}")
+            for i in range(10)
+        ]
+        
+        assert all("erro_agente" not in r for r in resultados)
+        assert backend.estatisticas()["falhas_503"] > 0
+        assert backend.estatisticas()["sucessos"] == 10
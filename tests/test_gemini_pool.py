@@ -0,0 +1,76 @@
+"""
+Testes unitários para o pool de clientes Gemini
+"""
+import threading
+import pytest
+from services.gemini_pool import GeminiClientPool
+
+
+class TestGeminiClientPool:
+    """Testes para empréstimo e reaproveitamento de modelos"""
+    
+    def test_reaproveita_modelo(self):
+        """Testa que um modelo devolvido é reaproveitado"""
+        pool = GeminiClientPool(tamanho_maximo=2, fabrica=object)
+        
+        with pool.adquirir() as primeiro:
+            pass
+        with pool.adquirir() as segundo:
+            assert pool.estatisticas()["em_uso"] == 1
+        
+        assert primeiro is segundo
+        assert pool.estatisticas() == {
+            "em_uso": 0,
+            "ociosos": 1,
+            "criados": 1,
+            "tamanho_maximo": 2
+        }
+    
+    def test_aquecer(self):
+        """Testa criação antecipada de modelos"""
+        pool = GeminiClientPool(tamanho_maximo=3, fabrica=object)
+        pool.aquecer()
+        
+        estatisticas = pool.estatisticas()
+        assert estatisticas["criados"] == 3
+        assert estatisticas["ociosos"] == 3
+    
+    def test_timeout_quando_esgotado(self):
+        """Testa que o pool não cria mais modelos que o máximo"""
+        pool = GeminiClientPool(tamanho_maximo=1, fabrica=object)
+        
+        with pool.adquirir():
+            with pytest.raises(TimeoutError):
+                with pool.adquirir(timeout=0.05):
+                    pass
+    
+    def test_aguarda_devolucao(self):
+        """Testa que uma thread aguardando recebe o modelo devolvido"""
+        pool = GeminiClientPool(tamanho_maximo=1, fabrica=object)
+        obtidos = []
+        
+        with pool.adquirir() as modelo:
+            def consumidor():
+                with pool.adquirir(timeout=5) as m:
+                    obtidos.append(m)
+            
+            thread = threading.Thread(target=consumidor)
+            thread.start()
+        
+        thread.join(timeout=5)
+        assert obtidos == [modelo]
+        assert pool.estatisticas()["criados"] == 1
+    
+    def test_falha_na_criacao_libera_vaga(self):
+        """Testa que erro na fábrica não consome a vaga do pool"""
+        def fabrica():
+            raise RuntimeError("sem conexão")
+        
+        pool = GeminiClientPool(tamanho_maximo=1, fabrica=fabrica)
+        
+        with pytest.raises(RuntimeError):
+            with pool.adquirir():
+                pass
+        
+        assert pool.estatisticas()["criados"] == 0
+        assert pool.estatisticas()["em_uso"] == 0
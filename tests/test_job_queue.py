@@ -0,0 +1,176 @@
+"""
+Testes unitários para a fila persistente de extrações e o pool de workers
+"""
+import json
+import threading
+import time
+import pytest
+from services.batch_runner import STATUS_ERRO, STATUS_OK, STATUS_SEM_ANEXOS
+from services.job_queue import (
+    ESTADO_CANCELADO,
+    ESTADO_CONCLUIDO,
+    ESTADO_EXECUTANDO,
+    ESTADO_PENDENTE,
+    FilaJobs,
+    PoolWorkers
+)
+from services.pipeline import AnexosNaoEncontrados, ResultadoSolicitacao
+
+
+@pytest.fixture
+def fila(tmp_path):
+    """Fila isolada no diretório temporário"""
+    return FilaJobs(str(tmp_path / "fila" / "jobs.sqlite"))
+
+
+def processar_falso(num_solic, fonte, processor, diretorio_saida=None, ao_iniciar_etapa=None, ao_receber_item=None):
+    """Pipeline simulado: todas gravam o mesmo arquivo; a solicitação 2 não tem anexos"""
+    ao_iniciar_etapa("carregar_anexos")
+    if num_solic == 2:
+        raise AnexosNaoEncontrados("sem anexos")
+    ao_iniciar_etapa("processar_apolice")
+    ao_receber_item("locais", {"nro_local_risco": "1"})
+    # Mesmo nome de arquivo para todas, como duas solicitações da mesma apólice
+    caminho = f"{diretorio_saida}/SEGURADORA-000.json"
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"num_solic": "outra"}, f)
+    return ResultadoSolicitacao(num_solic=num_solic, caminho_arquivo=caminho, final_json={"num_solic": num_solic})
+
+
+def aguardar(condicao, timeout=5.0):
+    """Espera até a condição ser verdadeira"""
+    limite = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < limite, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+class TestFilaJobs:
+    """Testes para a fila SQLite"""
+    
+    def test_enfileirar_reaproveita_job_ativo(self, fila):
+        """Testa que cliques repetidos não duplicam o job, mas um concluído permite outro"""
+        job_id = fila.enfileirar(10)
+        assert fila.enfileirar(10) == job_id
+        
+        job = fila.reservar("w1")
+        assert fila.concluir(job.id, "w1", {"status": STATUS_OK, "caminho_arquivo": "json/10.json",
+                                            "duracao_s": 1.0, "final_json": {"ok": True}})
+        
+        assert fila.enfileirar(10) != job_id
+        concluido = fila.obter(job_id)
+        assert concluido.estado == ESTADO_CONCLUIDO
+        assert concluido.resultado == {"ok": True}
+    
+    def test_reserva_unica_entre_threads(self, fila):
+        """Testa que workers concorrentes nunca pegam o mesmo job, na ordem da fila"""
+        ids = [fila.enfileirar(n) for n in range(20)]
+        reservados = []
+        
+        def consumir(nome):
+            while True:
+                job = fila.reservar(nome)
+                if job is None:
+                    return
+                reservados.append(job.id)
+        
+        threads = [threading.Thread(target=consumir, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(reservados) == ids
+        assert fila.estatisticas() == {ESTADO_EXECUTANDO: 20}
+    
+    def test_cancelar_so_pendentes(self, fila):
+        """Testa que só jobs que não começaram podem ser cancelados"""
+        executando, pendente = fila.enfileirar(1), fila.enfileirar(2)
+        fila.reservar("w1")
+        
+        assert not fila.cancelar(executando)
+        assert fila.cancelar(pendente)
+        assert fila.obter(pendente).estado == ESTADO_CANCELADO
+        assert fila.reservar("w1") is None
+    
+    def test_recupera_jobs_abandonados(self, fila):
+        """Testa que um job sem sinal de vida volta à fila, até esgotar as tentativas"""
+        job_id = fila.enfileirar(10)
+        fila.reservar("processo-encerrado")
+        
+        # Outro processo abre a mesma base depois de um reinício
+        reaberta = FilaJobs(fila.caminho)
+        assert reaberta.recuperar_abandonados(tempo_limite=60) == 0
+        assert reaberta.recuperar_abandonados(tempo_limite=-1, tentativas_maximas=2) == 1
+        assert reaberta.obter(job_id).estado == ESTADO_PENDENTE
+        
+        assert reaberta.reservar("w2").tentativas == 2
+        reaberta.recuperar_abandonados(tempo_limite=-1, tentativas_maximas=2)
+        job = reaberta.obter(job_id)
+        assert job.estado == ESTADO_CONCLUIDO
+        assert job.status == STATUS_ERRO
+    
+    def test_worker_devolvido_nao_sobrescreve(self, fila):
+        """Testa que o desfecho de um worker cujo job foi devolvido à fila é descartado"""
+        job_id = fila.enfileirar(10)
+        fila.reservar("lento")
+        fila.recuperar_abandonados(tempo_limite=-1)
+        fila.reservar("novo")
+        
+        assert not fila.concluir(job_id, "lento", {"status": STATUS_ERRO, "erro": "atrasado"})
+        job = fila.obter(job_id)
+        assert job.estado == ESTADO_EXECUTANDO
+        assert job.worker == "novo"
+        
+        assert fila.concluir(job_id, "novo", {"status": STATUS_OK, "final_json": {"ok": True}})
+        assert fila.obter(job_id).resultado == {"ok": True}
+
+
+class TestPoolWorkers:
+    """Testes para a execução dos jobs em threads"""
+    
+    def test_executa_jobs_e_grava_resultado(self, fila, tmp_path, monkeypatch):
+        """Testa o ciclo completo: enfileirado, executado, concluído com o JSON no job"""
+        monkeypatch.setattr("services.batch_runner.processar_solicitacao", processar_falso)
+        pool = PoolWorkers(fila, fonte=object(), processor=object(), workers=2,
+                           diretorio_saida=str(tmp_path), intervalo_consulta=0.01)
+        ok, sem_anexos = fila.enfileirar(1), fila.enfileirar(2)
+        
+        pool.iniciar()
+        try:
+            aguardar(lambda: not any(job.ativo for job in fila.listar()))
+        finally:
+            pool.parar()
+        
+        job = fila.obter(ok)
+        assert job.status == STATUS_OK
+        # O resultado vem do pipeline, não do arquivo (sobrescrito por outra solicitação)
+        assert job.resultado == {"num_solic": 1}
+        assert job.etapa == "processar_apolice"
+        assert job.progresso == "1 locais e 0 coberturas recebidos"
+        assert fila.obter(sem_anexos).status == STATUS_SEM_ANEXOS
+        assert pool.estatisticas()["processados"] == 2
+        assert not pool.ativo
+    
+    def test_falha_fora_do_pipeline_nao_derruba_o_worker(self, fila, tmp_path, monkeypatch):
+        """Testa que uma exceção inesperada encerra o job com erro e a thread segue na fila"""
+        def processar_uma_instavel(num_solic, *args, **kwargs):
+            if num_solic == 1:
+                raise OSError("disco cheio")
+            return {"num_solic": num_solic, "status": STATUS_OK, "final_json": {"num_solic": num_solic}}
+        
+        monkeypatch.setattr("services.job_queue.processar_uma", processar_uma_instavel)
+        pool = PoolWorkers(fila, fonte=object(), processor=object(), workers=1,
+                           diretorio_saida=str(tmp_path), intervalo_consulta=0.01)
+        falha, seguinte = fila.enfileirar(1), fila.enfileirar(3)
+        
+        pool.iniciar()
+        try:
+            aguardar(lambda: not any(job.ativo for job in fila.listar()))
+        finally:
+            pool.parar()
+        
+        job = fila.obter(falha)
+        assert job.status == STATUS_ERRO
+        assert job.erro == "OSError: disco cheio"
+        assert fila.obter(seguinte).status == STATUS_OK
@@ -0,0 +1,203 @@
+"""
+Testes unitários para o parser incremental e a extração em streaming
+"""
+import pytest
+from io import BytesIO
+from unittest.mock import MagicMock
+from google.api_core import exceptions as google_exceptions
+from utils.json_incremental import ColetorItens, ExtratorItensJson
+
+
+RESPOSTA = (
+    '```json\n{"numero_apolice": "123", "locais_risco": ['
+    '{"item": 1, "endereco": "Rua \\"A\\", {1}"}, '
+    '{"item": 2, "dados": {"cep": "01000-000", "tags": [1, 2]}}'
+    '], "total": 2}\n```'
+)
+
+
+def fatiar(texto: str, tamanho: int):
+    """Divide o texto em trechos de tamanho fixo"""
+    return [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+
+
+def resposta_streaming(trechos):
+    """Simula a resposta de generate_content(stream=True)"""
+    resposta = MagicMock()
+    resposta.__iter__.return_value = iter([MagicMock(text=t) for t in trechos])
+    resposta.text = "".join(trechos)
+    resposta.usage_metadata = None
+    return resposta
+
+
+class TestExtratorItensJson:
+    """Testes para o extrator de itens de lista"""
+    
+    @pytest.mark.parametrize("tamanho", [1, 7, 1000])
+    def test_itens_independentes_do_fatiamento(self, tamanho):
+        """Testa que o resultado não depende de onde os trechos são cortados"""
+        extrator = ExtratorItensJson("locais_risco")
+        recebidos = []
+        for trecho in fatiar(RESPOSTA, tamanho):
+            recebidos.extend(extrator.alimentar(trecho))
+        
+        assert [item["item"] for item in recebidos] == [1, 2]
+        assert recebidos[0]["endereco"] == 'Rua "A", {1}'
+        assert recebidos[1]["dados"]["tags"] == [1, 2]
+        assert extrator.concluido
+    
+    def test_item_liberado_antes_do_fim(self):
+        """Testa que o item sai assim que seu objeto fecha"""
+        extrator = ExtratorItensJson("locais_risco")
+        
+        assert extrator.alimentar('{"locais_risco": [{"item": 1}') == [{"item": 1}]
+        assert extrator.alimentar(', {"item": 2') == []
+        assert not extrator.concluido
+    
+    def test_ignora_listas_de_outras_chaves(self):
+        """Testa que listas aninhadas ou de outras chaves não geram itens"""
+        extrator = ExtratorItensJson("locais_risco")
+        texto = '{"outros": [{"a": 1}], "meta": {"locais_risco": [{"b": 2}]}, "locais_risco": []}'
+        
+        assert extrator.alimentar(texto) == []
+
+
+class TestColetorItens:
+    """Testes para o acúmulo de itens entre tentativas"""
+    
+    def test_nova_tentativa_nao_repete_callback(self):
+        """Testa que itens já repassados não são repassados de novo"""
+        recebidos = []
+        coletor = ColetorItens("locais_risco", recebidos.append)
+        
+        primeira = coletor.novo_extrator()
+        coletor.alimentar(primeira, '{"locais_risco": [{"item": 1}, ')
+        segunda = coletor.novo_extrator()
+        coletor.alimentar(segunda, '{"locais_risco": [{"item": 1}, {"item": 2}]}')
+        
+        assert recebidos == [{"item": 1}, {"item": 2}]
+        assert coletor.itens == recebidos
+
+
+class TestGeminiServiceStreaming:
+    """Testes para processar_documento com chave_lista"""
+    
+    def test_callback_por_item(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que cada item é repassado e o JSON completo é devolvido"""
+        modelo_gemini.generate_content.return_value = resposta_streaming(fatiar(RESPOSTA, 5))
+        recebidos = []
+        
+        resultado = gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco",
+            ao_receber_item=recebidos.append
+        )
+        
+        assert resultado["total"] == 2
+        assert recebidos == resultado["locais_risco"]
+        assert modelo_gemini.generate_content.call_args.kwargs["stream"] is True
+    
+    def test_cache_repete_callback(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que um resultado vindo do cache também alimenta o callback"""
+        modelo_gemini.generate_content.return_value = resposta_streaming([RESPOSTA])
+        gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt", chave_lista="locais_risco")
+        recebidos = []
+        
+        gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco",
+            ao_receber_item=recebidos.append
+        )
+        
+        assert len(recebidos) == 2
+        assert modelo_gemini.generate_content.call_count == 1
+    
+    def test_falha_preserva_itens_recebidos(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que uma falha no meio do streaming devolve os itens parciais"""
+        def interrompida(*args, **kwargs):
+            def trechos():
+                yield MagicMock(text='{"locais_risco": [{"item": 1}, ')
+                raise google_exceptions.InvalidArgument("conexão encerrada")
+            resposta = MagicMock()
+            resposta.__iter__.side_effect = trechos
+            return resposta
+        
+        modelo_gemini.generate_content.side_effect = interrompida
+        
+        resultado = gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco"
+        )
+        
+        assert resultado["locais_risco"] == [{"item": 1}]
+        assert resultado["extracao_parcial"] is True
+        assert "erro_agente" in resultado
+
+
+class TestContinuacaoLista:
+    """Testes para listas truncadas pelo limite de saída do modelo"""
+    
+    def test_coletor_numera_continuacao_apos_itens_recebidos(self):
+        """Testa que os itens da continuação não são confundidos com os anteriores"""
+        recebidos = []
+        coletor = ColetorItens("locais_risco", recebidos.append)
+        
+        coletor.alimentar(coletor.novo_extrator(), '{"locais_risco": [{"item": 1}, {"item": 2}, {"it')
+        coletor.continuar()
+        coletor.alimentar(coletor.novo_extrator(), '{"locais_risco": [{"item": 3}]}')
+        
+        assert [item["item"] for item in recebidos] == [1, 2, 3]
+    
+    def test_lista_truncada_e_continuada(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que uma lista cortada é completada por uma chamada de continuação"""
+        truncada = resposta_streaming(['{"locais_risco": [{"item": 1}, {"item": 2}, {"ite'])
+        truncada.candidates[0].finish_reason.name = "MAX_TOKENS"
+        continuacao = resposta_streaming(['{"locais_risco": [{"item": 2}, {"item": 3}]}'])
+        modelo_gemini.generate_content.side_effect = [truncada, continuacao]
+        recebidos = []
+        
+        resultado = gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco",
+            ao_receber_item=recebidos.append
+        )
+        
+        assert [item["item"] for item in resultado["locais_risco"]] == [1, 2, 3]
+        assert "extracao_parcial" not in resultado
+        prompt_continuacao = modelo_gemini.generate_content.call_args.args[0][0]
+        assert '{"item": 2}' in prompt_continuacao
+    
+    def test_truncamento_sem_finish_reason(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que um JSON com a lista aberta também é tratado como truncado"""
+        modelo_gemini.generate_content.side_effect = [
+            resposta_streaming(['{"locais_risco": [{"item": 1}, {"item": 2']),
+            resposta_streaming(['{"locais_risco": [{"item": 2}]}'])
+        ]
+        
+        resultado = gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco"
+        )
+        
+        assert resultado["locais_risco"] == [{"item": 1}, {"item": 2}]
+    
+    def test_continuacao_sem_itens_novos(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que uma continuação que não avança devolve o resultado parcial"""
+        modelo_gemini.generate_content.side_effect = lambda *args, **kwargs: resposta_streaming(
+            ['{"locais_risco": [{"item": 1}, {"ite']
+        )
+        
+        resultado = gemini_service.processar_documento(
+            BytesIO(mock_pdf_bytes),
+            "prompt",
+            chave_lista="locais_risco"
+        )
+        
+        assert resultado["locais_risco"] == [{"item": 1}]
+        assert resultado["extracao_parcial"] is True
+        assert modelo_gemini.generate_content.call_count == 2
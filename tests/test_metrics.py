@@ -0,0 +1,68 @@
+"""
+Testes unitários para as métricas por chamada ao Gemini
+"""
+import json
+from io import BytesIO
+from unittest.mock import MagicMock
+from google.api_core import exceptions as google_exceptions
+from services.metrics import MedicaoChamada, RegistroMetricas
+
+
+class TestRegistroMetricas:
+    """Testes para o registro em memória e a exportação JSONL"""
+    
+    def test_resumo_por_prompt(self):
+        """Testa a agregação de chamadas, erros, cache e tokens"""
+        registro = RegistroMetricas()
+        for resultado, tokens in [("sucesso", 100), ("erro", None), ("cache", None)]:
+            medicao = MedicaoChamada("mestre", tamanho_pdf=1000)
+            medicao.registrar_tentativa(0.1, 1.0)
+            medicao.metrica.tokens_entrada = tokens
+            registro.registrar(medicao.finalizar(resultado))
+        
+        resumo = registro.resumo()["mestre"]
+        
+        assert resumo["chamadas"] == 3
+        assert resumo["erros"] == 1
+        assert resumo["cache"] == 1
+        assert resumo["tokens_entrada"] == 100
+    
+    def test_capacidade_em_memoria(self):
+        """Testa que apenas as chamadas mais recentes ficam em memória"""
+        registro = RegistroMetricas(capacidade=2)
+        for nome in ["a", "b", "c"]:
+            registro.registrar(MedicaoChamada(nome).finalizar())
+        
+        assert [m.prompt for m in registro.metricas()] == ["b", "c"]
+
+
+class TestMetricasGeminiService:
+    """Testes para a instrumentação de processar_documento"""
+    
+    def test_chamada_registrada_em_jsonl(self, gemini_service, modelo_gemini, registro_metricas, mock_pdf_bytes):
+        """Testa tempo, tokens, tamanho e nome do prompt da chamada"""
+        uso = MagicMock(prompt_token_count=1200, candidates_token_count=80, cached_content_token_count=0)
+        modelo_gemini.generate_content.return_value = MagicMock(text='{"ok": true}', usage_metadata=uso)
+        
+        gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt", nome_prompt="mestre")
+        gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt", nome_prompt="mestre")
+        
+        with open(registro_metricas.arquivo_jsonl, encoding="utf-8") as f:
+            linhas = [json.loads(linha) for linha in f]
+        
+        assert [linha["resultado"] for linha in linhas] == ["sucesso", "cache"]
+        assert linhas[0]["prompt"] == "mestre"
+        assert linhas[0]["tamanho_pdf"] == len(mock_pdf_bytes)
+        assert linhas[0]["tentativas"] == 1
+        assert (linhas[0]["tokens_entrada"], linhas[0]["tokens_saida"]) == (1200, 80)
+        assert linhas[0]["duracao"] >= linhas[0]["tempo_api"]
+    
+    def test_tentativas_e_erro(self, gemini_service, modelo_gemini, registro_metricas, mock_pdf_bytes):
+        """Testa que retries somam tentativas e a falha final é registrada"""
+        modelo_gemini.generate_content.side_effect = google_exceptions.ServiceUnavailable("503")
+        
+        gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt", nome_prompt="locais")
+        
+        metrica = registro_metricas.metricas()[-1]
+        assert metrica.resultado == "erro"
+        assert metrica.tentativas == 3
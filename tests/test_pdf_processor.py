@@ -0,0 +1,315 @@
+"""
+Testes unitários para o processador de PDFs
+"""
+import asyncio
+import json
+import re
+import time
+import pytest
+from io import BytesIO
+from unittest.mock import MagicMock
+from services.pdf_processor import ClassificadorPaginas, PDFProcessor
+from services.text_extractor import ExtratorTextoApolice
+from config.prompts import PROMPT_LOCAIS_V4_1
+from utils.pdf_utils import contar_paginas_pdf, extrair_textos_paginas
+
+
+@pytest.fixture
+def processor(gemini_service):
+    """Processador com Gemini simulado, cache isolado e uploader local"""
+    return PDFProcessor(gemini_service=gemini_service)
+
+
+class TestProcessarApolice:
+    """Testes para o processamento paralelo da apólice"""
+    
+    def test_quatro_prompts_um_envio(self, processor, pool_gemini, mock_pdf_bytes):
+        """Testa que os quatro prompts compartilham o serviço e o upload"""
+        resultado = processor.processar_apolice(BytesIO(mock_pdf_bytes))
+        
+        assert set(resultado) == {"mestre", "locais", "coberturas", "clausulas"}
+        assert processor.gemini_service.uploader.envios == 1
+        assert pool_gemini.estatisticas()["em_uso"] == 0
+    
+    def test_apolice_invalida(self, processor):
+        """Testa que um arquivo inválido gera erro em todas as seções"""
+        resultado = processor.processar_apolice(BytesIO(b"nao e pdf"))
+        
+        assert all("erro_agente" in secao for secao in resultado.values())
+
+
+class TestProcessarSolicitacaoAsync:
+    """Testes para o pipeline assíncrono de apólice e especificação"""
+    
+    def test_cinco_extracoes_simultaneas(self, processor, modelo_gemini, mock_pdf_bytes):
+        """Testa que apólice e especificação são processadas ao mesmo tempo"""
+        def resposta_lenta(*args, **kwargs):
+            time.sleep(0.2)
+            return MagicMock(text='{"ok": true}')
+        
+        modelo_gemini.generate_content.side_effect = resposta_lenta
+        processor.gemini_service.pool.tamanho_maximo = 5
+        
+        inicio = time.monotonic()
+        dados_apolice, dados_especificacao = asyncio.run(
+            processor.processar_solicitacao_async(
+                BytesIO(mock_pdf_bytes),
+                BytesIO(mock_pdf_bytes + b" ")
+            )
+        )
+        duracao = time.monotonic() - inicio
+        
+        assert set(dados_apolice) == {"mestre", "locais", "coberturas", "clausulas"}
+        assert dados_especificacao == {"ok": True}
+        assert modelo_gemini.generate_content.call_count == 5
+        assert duracao < 0.6
+    
+    def test_cancelamento(self, processor, modelo_gemini, mock_pdf_bytes):
+        """Testa que extrações ainda não enviadas são descartadas ao cancelar"""
+        def resposta_lenta(*args, **kwargs):
+            time.sleep(0.3)
+            return MagicMock(text='{"ok": true}')
+        
+        modelo_gemini.generate_content.side_effect = resposta_lenta
+        processor.gemini_service.pool.tamanho_maximo = 1
+        
+        async def executar_e_cancelar():
+            tarefa = asyncio.create_task(
+                processor.processar_solicitacao_async(
+                    BytesIO(mock_pdf_bytes),
+                    BytesIO(mock_pdf_bytes + b" ")
+                )
+            )
+            await asyncio.sleep(0.1)
+            tarefa.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarefa
+        
+        asyncio.run(executar_e_cancelar())
+        
+        assert modelo_gemini.generate_content.call_count == 1
+    
+    def test_apolice_invalida_nao_impede_especificacao(self, processor, mock_pdf_bytes):
+        """Testa que erro de validação da apólice mantém a especificação"""
+        dados_apolice, dados_especificacao = asyncio.run(
+            processor.processar_solicitacao_async(
+                BytesIO(b"nao e pdf"),
+                BytesIO(mock_pdf_bytes)
+            )
+        )
+        
+        assert all("erro_agente" in secao for secao in dados_apolice.values())
+        assert dados_especificacao == {"ok": True}
+
+
+class TestSelecaoPaginas:
+    """Testes para o envio apenas das páginas relevantes de cada seção"""
+    
+    GERAL = "Condicoes gerais do seguro empresarial, clausula {} de texto padrao da apolice"
+    
+    def paginas_apolice(self):
+        """Apólice de 10 páginas com locais nas páginas 3-4 e coberturas na 7"""
+        textos = [self.GERAL.format(i) for i in range(10)]
+        textos[2] = "Identificacao do Bem Segurado - Local 1 Endereco Rua A CEP 01000-000 Cidade SP"
+        textos[3] = "Local 2 Endereco Rua B CEP 02000-000 Cidade Campinas Atividade Industria"
+        textos[6] = "Quadro de Coberturas - Cobertura Basica LMI 1.000.000 Franquia 10% Premio 5.000"
+        return textos
+    
+    def test_seleciona_blocos(self):
+        """Testa a seleção do bloco, continuação e página extra"""
+        classificador = ClassificadorPaginas(self.paginas_apolice())
+        
+        assert classificador.selecionar("locais") == [2, 3, 4]
+        assert classificador.selecionar("coberturas") == [6, 7]
+        assert classificador.selecionar("mestre") is None
+    
+    def test_documento_inteiro_na_duvida(self):
+        """Testa o retorno ao documento inteiro sem texto ou sem títulos"""
+        escaneado = [""] * 10
+        sem_titulos = [self.GERAL.format(i) for i in range(10)]
+        
+        assert ClassificadorPaginas(escaneado).selecionar("locais") is None
+        assert ClassificadorPaginas(sem_titulos).selecionar("coberturas") is None
+        assert ClassificadorPaginas(self.paginas_apolice()[:4]).selecionar("locais") is None
+    
+    def test_sub_pdf_por_secao(self, gemini_service, modelo_gemini, gerar_pdf_texto):
+        """Testa que locais e coberturas recebem sub-PDFs menores"""
+        processor = PDFProcessor(gemini_service=gemini_service, campos_por_texto=False)
+        pdf = gerar_pdf_texto(self.paginas_apolice())
+        
+        processor.processar_apolice(BytesIO(pdf))
+        
+        paginas_enviadas = sorted(
+            contar_paginas_pdf(chamada.args[0][1]["data"])
+            for chamada in modelo_gemini.generate_content.call_args_list
+        )
+        assert paginas_enviadas == [2, 3, 10, 10]
+        assert processor.gemini_service.uploader.envios == 3
+
+
+class TestCamposPorTexto:
+    """Testes para os campos resolvidos pela camada de texto"""
+    
+    GERAL = "Condicoes gerais do seguro empresarial, clausula {} de texto padrao da apolice"
+    
+    def paginas_apolice(self):
+        """Apólice com dados cadastrais na primeira página, LMI único na terceira e CBI na quarta"""
+        textos = [self.GERAL.format(i) for i in range(8)]
+        textos[0] = (
+            "Seguradora: XYZ Seguros CNPJ 11.444.777/0001-61 Apolice No 1180012345 "
+            "Segurado: Empresa ABC Ltda CNPJ/CPF: 11.222.333/0001-81 "
+            "Vigencia: das 24h de 01/03/2024 as 24h de 01/03/2025"
+        )
+        textos[2] = "Limite Maximo de Indenizacao Unico para todas as coberturas contratadas"
+        textos[3] = "Cobertura de Lucros Cessantes Contingentes (CBI) contratada conforme especificacao"
+        return textos
+    
+    def test_campos_resolvidos(self):
+        """Testa CNPJ do segurado, número, vigência e perguntas Sim/Não"""
+        campos = ExtratorTextoApolice(self.paginas_apolice()).extrair()
+        
+        assert campos == {
+            "cnpj": "11.222.333/0001-81",
+            "numero_apolice_lider": "1180012345",
+            "inicio_vigencia": "01/03/2024",
+            "fim_vigencia": "01/03/2025",
+            "lmi_unico": "Sim",
+            "tem_cobertura_cbi": "Sim"
+        }
+    
+    def test_ambiguidade_fica_para_o_gemini(self):
+        """Testa que valores conflitantes, negações e PDFs escaneados não resolvem campos"""
+        textos = self.paginas_apolice()
+        textos[5] = "Apolice No 1180099999 endosso. Cobertura CBI nao contratada pelo segurado"
+        
+        campos = ExtratorTextoApolice(textos).extrair()
+        
+        assert "numero_apolice_lider" not in campos
+        assert "tem_cobertura_cbi" not in campos
+        assert ExtratorTextoApolice([""] * 8).extrair() == {}
+    
+    def test_ausencia_ou_ressalva_nao_responde(self):
+        """Testa que termo ausente não vira Não e cláusula apenas disponível não vira Sim"""
+        textos = self.paginas_apolice()
+        textos[2] = "Limite Maximo de Garantia (LMG) unico para todos os locais"
+        textos[3] = "Clausulas adicionais: cobertura CBI disponivel mediante contratacao e pagamento de premio"
+        
+        campos = ExtratorTextoApolice(textos).extrair()
+        
+        assert "lmi_unico" not in campos
+        assert "tem_cobertura_cbi" not in campos
+        assert campos["cnpj"] == "11.222.333/0001-81"
+    
+    def test_clausulas_sem_chamada(self, processor, modelo_gemini, gerar_pdf_texto):
+        """Testa que cláusulas dispensam o Gemini e o mestre recebe os campos validados"""
+        modelo_gemini.generate_content.return_value.text = '{"cnpj": "errado", "segurado": "ABC"}'
+        pdf = gerar_pdf_texto(self.paginas_apolice())
+        
+        resultado = processor.processar_apolice(BytesIO(pdf))
+        
+        assert modelo_gemini.generate_content.call_count == 3
+        assert resultado["clausulas"] == {"lmi_unico": "Sim", "tem_cobertura_cbi": "Sim"}
+        assert resultado["mestre"]["cnpj"] == "11.222.333/0001-81"
+        assert resultado["mestre"]["segurado"] == "ABC"
+        assert resultado["mestre"]["lmi_unico"] == "Sim"
+    
+    def test_resposta_sim_nao_do_gemini_prevalece(self, processor, modelo_gemini, gerar_pdf_texto):
+        """Testa que Sim/Não pelo texto só preenche o que o mestre deixou vazio"""
+        modelo_gemini.generate_content.return_value.text = (
+            '{"cnpj": "errado", "lmi_unico": "Não", "tem_cobertura_cbi": ""}'
+        )
+        pdf = gerar_pdf_texto(self.paginas_apolice())
+        
+        resultado = processor.processar_apolice(BytesIO(pdf))
+        
+        assert resultado["mestre"]["cnpj"] == "11.222.333/0001-81"
+        assert resultado["mestre"]["lmi_unico"] == "Não"
+        assert resultado["mestre"]["tem_cobertura_cbi"] == "Sim"
+
+
+class TestFragmentacao:
+    """Testes para a divisão de locais e coberturas longos em faixas de páginas"""
+    
+    @pytest.fixture
+    def modelo_por_pagina(self, modelo_gemini):
+        """Modelo que devolve um local e uma cobertura para cada página recebida"""
+        def responder(conteudo, **kwargs):
+            paginas = [
+                int(re.search(r"Pagina (\d+)", texto).group(1))
+                for texto in extrair_textos_paginas(conteudo[1]["data"])
+            ]
+            if conteudo[0] == PROMPT_LOCAIS_V4_1:
+                dados = {"locais_risco": [{"nro_local_risco": str(n), "cidade": "SP"} for n in paginas]}
+            else:
+                dados = {"coberturas_completas": [{"nome_raw": f"Cobertura {n}"} for n in paginas]}
+            texto = json.dumps(dados)
+            resposta = MagicMock(text=texto)
+            resposta.__iter__.return_value = iter([MagicMock(text=texto)])
+            return resposta
+        
+        modelo_gemini.generate_content.side_effect = responder
+        return modelo_gemini
+    
+    def test_faixas_mescladas_sem_repeticao(self, gemini_service, modelo_por_pagina, gerar_pdf_texto):
+        """Testa que 40 páginas viram 3 faixas e os itens das páginas sobrepostas não se repetem"""
+        processor = PDFProcessor(
+            gemini_service=gemini_service,
+            selecionar_paginas=False,
+            campos_por_texto=False,
+            fragmentar=True
+        )
+        pdf = gerar_pdf_texto([f"Pagina {n} da relacao de locais e coberturas" for n in range(1, 41)])
+        recebidos = []
+        
+        resultado = processor.processar_apolice(
+            BytesIO(pdf),
+            ao_receber_item=lambda secao, item: recebidos.append(secao)
+        )
+        
+        assert [local["nro_local_risco"] for local in resultado["locais"]["locais_risco"]] == [
+            str(n) for n in range(1, 41)
+        ]
+        assert len(resultado["coberturas"]["coberturas_completas"]) == 40
+        assert recebidos.count("locais") == 40
+        
+        chamadas_listas = [
+            contar_paginas_pdf(chamada.args[0][1]["data"])
+            for chamada in modelo_por_pagina.generate_content.call_args_list
+            if chamada.kwargs.get("stream")
+        ]
+        assert len(chamadas_listas) == 6
+        assert max(chamadas_listas) == 15
+    
+    def test_async_mescla_faixas(self, gemini_service, modelo_por_pagina, gerar_pdf_texto):
+        """Testa que o pipeline assíncrono também divide e mescla as faixas"""
+        processor = PDFProcessor(gemini_service=gemini_service, campos_por_texto=False, fragmentar=True)
+        pdf = gerar_pdf_texto([f"Pagina {n} da relacao de locais e coberturas" for n in range(1, 41)])
+        
+        dados_apolice, _ = asyncio.run(
+            processor.processar_solicitacao_async(BytesIO(pdf), BytesIO(pdf))
+        )
+        
+        assert len(dados_apolice["locais"]["locais_risco"]) == 40
+        assert not any("#" in nome for nome in dados_apolice)
+    
+    def test_faixa_com_erro_marca_extracao_parcial(self, processor):
+        """Testa que repetições completam campos vazios e erros viram extração parcial"""
+        resultados = {
+            "locais#1": {"locais_risco": [
+                {"nro_local_risco": "1", "cep": "Não consta"},
+                {"nro_local_risco": "Não consta", "cep": "x"}
+            ]},
+            "locais#2": {"locais_risco": [
+                {"nro_local_risco": "1", "cep": "01000-000"},
+                {"nro_local_risco": "Não consta", "cep": "y"}
+            ]},
+            "locais#3": {"erro_agente": "timeout"}
+        }
+        
+        processor._mesclar_fragmentos(resultados)
+        
+        locais = resultados["locais"]
+        assert locais["locais_risco"][0] == {"nro_local_risco": "1", "cep": "01000-000"}
+        assert len(locais["locais_risco"]) == 3
+        assert locais["extracao_parcial"] is True
+        assert "1 de 3 faixas" in locais["erro_agente"]
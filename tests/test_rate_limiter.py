@@ -0,0 +1,152 @@
+"""
+Testes unitários para o limitador de taxa e a concorrência adaptativa
+"""
+import pytest
+from google.api_core import exceptions as google_exceptions
+from services.rate_limiter import (
+    AdaptiveConcurrencyLimiter,
+    GeminiRateLimiter,
+    TokenBucket,
+    eh_erro_sobrecarga,
+    estimar_tokens
+)
+
+
+class RelogioFalso:
+    """Relógio controlado manualmente"""
+    
+    def __init__(self):
+        self.agora = 0.0
+    
+    def __call__(self):
+        return self.agora
+
+
+class TestTokenBucket:
+    """Testes para o balde de fichas"""
+    
+    def test_rajada_ate_a_capacidade(self):
+        """Testa que o balde começa cheio"""
+        balde = TokenBucket(60, relogio=RelogioFalso())
+        assert balde.reservar(60) == 0.0
+    
+    def test_espera_proporcional_ao_deficit(self):
+        """Testa cálculo da espera quando faltam fichas"""
+        balde = TokenBucket(60, relogio=RelogioFalso())
+        balde.reservar(60)
+        assert balde.reservar(2) == pytest.approx(2.0)
+    
+    def test_reposicao_com_o_tempo(self):
+        """Testa reposição contínua das fichas"""
+        relogio = RelogioFalso()
+        balde = TokenBucket(60, relogio=relogio)
+        balde.reservar(60)
+        relogio.agora = 10
+        assert balde.disponiveis == pytest.approx(10)
+    
+    def test_ajuste_pelo_consumo_real(self):
+        """Testa débito adicional quando o consumo real supera a estimativa"""
+        balde = TokenBucket(1000, relogio=RelogioFalso())
+        balde.reservar(100)
+        balde.ajustar(400)
+        assert balde.disponiveis == pytest.approx(500)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Testes para o controle AIMD de concorrência"""
+    
+    def test_aumento_aditivo(self):
+        """Testa aumento gradual do limite após sucessos"""
+        controle = AdaptiveConcurrencyLimiter(inicial=2, minimo=1, maximo=10)
+        for _ in range(4):
+            controle.adquirir()
+            controle.liberar()
+        assert controle.limite == 3
+    
+    def test_reducao_multiplicativa_com_resfriamento(self):
+        """Testa redução pela metade e uma única redução por intervalo"""
+        relogio = RelogioFalso()
+        controle = AdaptiveConcurrencyLimiter(
+            inicial=8, minimo=1, maximo=10, resfriamento=5, relogio=relogio
+        )
+        
+        for _ in range(3):
+            controle.adquirir()
+        for _ in range(3):
+            controle.liberar(sobrecarga=True, sucesso=False)
+        assert controle.limite == 4
+        
+        relogio.agora = 6
+        controle.adquirir()
+        controle.liberar(sobrecarga=True, sucesso=False)
+        assert controle.limite == 2
+    
+    def test_limite_minimo(self):
+        """Testa que o limite nunca fica abaixo do mínimo"""
+        relogio = RelogioFalso()
+        controle = AdaptiveConcurrencyLimiter(
+            inicial=1, minimo=1, maximo=4, resfriamento=0, relogio=relogio
+        )
+        controle.adquirir()
+        controle.liberar(sobrecarga=True, sucesso=False)
+        assert controle.limite == 1
+    
+    def test_bloqueia_acima_do_limite(self):
+        """Testa que não há mais chamadas simultâneas que o limite"""
+        controle = AdaptiveConcurrencyLimiter(inicial=1, minimo=1, maximo=1)
+        controle.adquirir()
+        with pytest.raises(TimeoutError):
+            controle.adquirir(timeout=0.05)
+
+
+class TestGeminiRateLimiter:
+    """Testes para o limitador combinado"""
+    
+    @pytest.fixture
+    def limitador(self):
+        return GeminiRateLimiter(
+            requisicoes_por_minuto=1000,
+            tokens_por_minuto=100000,
+            concorrencia=AdaptiveConcurrencyLimiter(
+                inicial=4, minimo=1, maximo=8, resfriamento=0
+            )
+        )
+    
+    def test_sobrecarga_reduz_concorrencia(self, limitador):
+        """Testa que um 429 reduz o limite e propaga o erro"""
+        with pytest.raises(google_exceptions.ResourceExhausted):
+            with limitador.permissao(100):
+                raise google_exceptions.ResourceExhausted("quota")
+        
+        assert limitador.concorrencia.limite == 2
+        assert limitador.concorrencia.estatisticas()["em_uso"] == 0
+    
+    def test_outros_erros_nao_alteram_limite(self, limitador):
+        """Testa que erros comuns não reduzem a concorrência"""
+        with pytest.raises(ValueError):
+            with limitador.permissao(100):
+                raise ValueError("json inválido")
+        
+        assert limitador.concorrencia.limite == 4
+    
+    def test_registra_tokens_reais(self, limitador):
+        """Testa ajuste do balde de tokens pelo consumo informado"""
+        with limitador.permissao(1000) as permissao:
+            permissao.registrar_tokens(3000)
+        
+        assert limitador.tokens.disponiveis == pytest.approx(97000, abs=50)
+
+
+class TestFuncoesAuxiliares:
+    """Testes para classificação de erros e estimativa de tokens"""
+    
+    def test_erros_de_sobrecarga(self):
+        """Testa detecção de 429/503"""
+        assert eh_erro_sobrecarga(google_exceptions.ResourceExhausted("x"))
+        assert eh_erro_sobrecarga(google_exceptions.ServiceUnavailable("x"))
+        assert eh_erro_sobrecarga(RuntimeError("429 Too Many Requests"))
+        assert not eh_erro_sobrecarga(ValueError("resposta inválida"))
+    
+    def test_estimar_tokens(self):
+        """Testa estimativa por páginas e tamanho do prompt"""
+        assert estimar_tokens("x" * 400, 2) == 100 + 2 * 258
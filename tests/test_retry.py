@@ -0,0 +1,231 @@
+"""
+Testes unitários para retry com backoff e hedging
+"""
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+from google.api_core import exceptions as google_exceptions
+from config.prompts import PROMPT_LMI_UNICO_CBI, SCHEMA_LMI_UNICO_CBI
+from services.gemini_service import RespostaInvalida, eh_erro_retentavel
+from services.hedging import RastreadorLatencia, executar_com_hedge
+from utils.retry import (
+    CircuitoAberto,
+    DisjuntorCircuito,
+    OperacaoCancelada,
+    PoliticaRetry,
+    executar_com_retry
+)
+
+
+POLITICA_RAPIDA = PoliticaRetry(tentativas=3, espera_inicial=0.001, espera_maxima=0.001)
+
+
+class TestPoliticaRetry:
+    """Testes para o cálculo do backoff"""
+    
+    def test_espera_limitada_pelo_teto_exponencial(self):
+        """Testa que a espera fica entre 0 e o teto da tentativa"""
+        politica = PoliticaRetry(espera_inicial=1.0, espera_maxima=5.0, multiplicador=2.0)
+        for _ in range(50):
+            assert 0 <= politica.calcular_espera(0) <= 1.0
+            assert 0 <= politica.calcular_espera(2) <= 4.0
+            assert 0 <= politica.calcular_espera(10) <= 5.0
+
+
+class TestExecutarComRetry:
+    """Testes para a execução com novas tentativas"""
+    
+    def test_sucesso_apos_falhas_retentaveis(self):
+        """Testa que erros transitórios são repetidos até o sucesso"""
+        funcao = MagicMock(side_effect=[TimeoutError(), TimeoutError(), "ok"])
+        assert executar_com_retry(funcao, POLITICA_RAPIDA, lambda e: True) == "ok"
+        assert funcao.call_count == 3
+    
+    def test_erro_nao_retentavel_propaga_imediatamente(self):
+        """Testa que erros fatais não são repetidos"""
+        funcao = MagicMock(side_effect=ValueError("fatal"))
+        with pytest.raises(ValueError):
+            executar_com_retry(funcao, POLITICA_RAPIDA, lambda e: False)
+        assert funcao.call_count == 1
+    
+    def test_esgota_tentativas(self):
+        """Testa que o último erro é propagado ao esgotar as tentativas"""
+        funcao = MagicMock(side_effect=TimeoutError("lento"))
+        with pytest.raises(TimeoutError):
+            executar_com_retry(funcao, POLITICA_RAPIDA, lambda e: True)
+        assert funcao.call_count == 3
+    
+    def test_cancelamento(self):
+        """Testa que um cancelamento impede novas tentativas"""
+        cancelamento = threading.Event()
+        cancelamento.set()
+        with pytest.raises(OperacaoCancelada):
+            executar_com_retry(lambda: "ok", POLITICA_RAPIDA, lambda e: True, cancelamento)
+    
+    def test_prazo_interrompe_novas_tentativas(self):
+        """Testa que uma espera que passaria do prazo não acontece"""
+        politica = PoliticaRetry(tentativas=5, espera_inicial=10.0, espera_maxima=10.0, multiplicador=1.0)
+        funcao = MagicMock(side_effect=TimeoutError("lento"))
+        
+        with patch("utils.retry.random.uniform", return_value=10.0):
+            inicio = time.monotonic()
+            with pytest.raises(TimeoutError):
+                executar_com_retry(funcao, politica, lambda e: True, prazo=1.0)
+        
+        assert funcao.call_count == 1
+        assert time.monotonic() - inicio < 1.0
+
+
+class TestDisjuntorCircuito:
+    """Testes para o disjuntor de circuito"""
+    
+    def test_abre_apos_falhas_seguidas_e_falha_na_hora(self):
+        """Testa que o circuito aberto recusa chamadas sem executá-las"""
+        disjuntor = DisjuntorCircuito("banco", limite_falhas=3, tempo_recuperacao=60)
+        funcao = MagicMock(side_effect=TimeoutError("fora do ar"))
+        
+        with pytest.raises(CircuitoAberto):
+            executar_com_retry(funcao, PoliticaRetry(tentativas=5, espera_inicial=0.001),
+                               lambda e: True, disjuntor=disjuntor)
+        
+        assert funcao.call_count == 3
+        assert disjuntor.estado == DisjuntorCircuito.ABERTO
+        with pytest.raises(CircuitoAberto):
+            executar_com_retry(funcao, POLITICA_RAPIDA, lambda e: True, disjuntor=disjuntor)
+        assert funcao.call_count == 3
+        assert disjuntor.estatisticas()["recusadas"] == 2
+    
+    def test_sondagem_fecha_ou_reabre(self):
+        """Testa que, passado o tempo de recuperação, uma única sondagem decide o estado"""
+        disjuntor = DisjuntorCircuito("banco", limite_falhas=1, tempo_recuperacao=0.05)
+        disjuntor.registrar_falha()
+        time.sleep(0.06)
+        
+        assert disjuntor.estado == DisjuntorCircuito.MEIO_ABERTO
+        disjuntor.verificar()
+        with pytest.raises(CircuitoAberto):
+            disjuntor.verificar()
+        disjuntor.registrar_falha()
+        assert disjuntor.estado == DisjuntorCircuito.ABERTO
+        
+        time.sleep(0.06)
+        disjuntor.verificar()
+        disjuntor.registrar_sucesso()
+        assert disjuntor.estado == DisjuntorCircuito.FECHADO
+        assert disjuntor.estatisticas()["aberturas"] == 2
+    
+    def test_erro_fatal_nao_conta_como_falha(self):
+        """Testa que erros não retentáveis não abrem o circuito"""
+        disjuntor = DisjuntorCircuito("banco", limite_falhas=1)
+        
+        with pytest.raises(ValueError):
+            executar_com_retry(MagicMock(side_effect=ValueError()), POLITICA_RAPIDA,
+                               lambda e: False, disjuntor=disjuntor)
+        
+        assert disjuntor.estado == DisjuntorCircuito.FECHADO
+
+
+class TestHedging:
+    """Testes para requisições redundantes"""
+    
+    def test_percentil(self):
+        """Testa cálculo de percentil após amostras suficientes"""
+        rastreador = RastreadorLatencia(minimo_amostras=10)
+        for i in range(9):
+            rastreador.registrar(i)
+        assert rastreador.percentil(0.95) is None
+        
+        for i in range(9, 100):
+            rastreador.registrar(i)
+        assert rastreador.percentil(0.95) == 95
+    
+    def test_sem_limiar_executa_direto(self):
+        """Testa que sem limiar a função roda uma única vez"""
+        funcao = MagicMock(return_value="ok")
+        assert executar_com_hedge(funcao, None, ThreadPoolExecutor(2)) == "ok"
+        assert funcao.call_count == 1
+    
+    def test_copia_mais_rapida_vence(self):
+        """Testa que a cópia redundante responde quando a original atrasa"""
+        chamadas = []
+        
+        def funcao():
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                time.sleep(1.0)
+                return "lenta"
+            return "rapida"
+        
+        inicio = time.monotonic()
+        resultado = executar_com_hedge(funcao, 0.05, ThreadPoolExecutor(2))
+        
+        assert resultado == "rapida"
+        assert time.monotonic() - inicio < 0.5
+    
+    def test_erro_na_copia_aguarda_original(self):
+        """Testa que uma falha na cópia não descarta a original"""
+        chamadas = []
+        
+        def funcao():
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                time.sleep(0.2)
+                return "original"
+            raise RuntimeError("falha na cópia")
+        
+        assert executar_com_hedge(funcao, 0.05, ThreadPoolExecutor(2)) == "original"
+
+
+class TestGeminiServiceRetry:
+    """Testes do retry integrado ao GeminiService"""
+    
+    def test_retry_em_429(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que um 429 é repetido e o resultado final é retornado"""
+        modelo_gemini.generate_content.side_effect = [
+            google_exceptions.ResourceExhausted("quota"),
+            MagicMock(text='{"ok": true}')
+        ]
+        
+        resultado = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), "prompt")
+        
+        assert resultado == {"ok": True}
+        assert modelo_gemini.generate_content.call_count == 2
+    
+    def test_resposta_fora_do_schema_repetida(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que JSON truncado e campo ausente são repetidos até uma resposta válida"""
+        gemini_service.schema_resposta = True
+        modelo_gemini.generate_content.side_effect = [
+            MagicMock(text='{"lmi_unico": "Sim"'),
+            MagicMock(text='{"lmi_unico": "Sim"}'),
+            MagicMock(text='{"lmi_unico": "Sim", "tem_cobertura_cbi": "Não"}')
+        ]
+        
+        resultado = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), PROMPT_LMI_UNICO_CBI)
+        
+        assert resultado == {"lmi_unico": "Sim", "tem_cobertura_cbi": "Não"}
+        assert modelo_gemini.generate_content.call_count == 3
+        configuracao = modelo_gemini.generate_content.call_args.kwargs["generation_config"]
+        assert configuracao["response_schema"] == SCHEMA_LMI_UNICO_CBI
+    
+    def test_resposta_invalida_esgota_tentativas(self, gemini_service, modelo_gemini, mock_pdf_bytes):
+        """Testa que respostas sempre inválidas viram erro_agente sem ir para o cache"""
+        gemini_service.schema_resposta = True
+        modelo_gemini.generate_content.return_value.text = '{"lmi_unico": 1}'
+        
+        resultado = gemini_service.processar_documento(BytesIO(mock_pdf_bytes), PROMPT_LMI_UNICO_CBI)
+        
+        assert resultado["erro_agente"].startswith("Resposta inválida")
+        assert modelo_gemini.generate_content.call_count == 3
+        assert gemini_service.cache.gravacoes == 0
+    
+    def test_classificacao_de_erros(self):
+        """Testa quais erros da API são retentáveis"""
+        assert eh_erro_retentavel(google_exceptions.ResourceExhausted("x"))
+        assert eh_erro_retentavel(google_exceptions.DeadlineExceeded("x"))
+        assert eh_erro_retentavel(google_exceptions.InternalServerError("x"))
+        assert eh_erro_retentavel(RespostaInvalida("x"))
+        assert not eh_erro_retentavel(google_exceptions.InvalidArgument("x"))
+        assert not eh_erro_retentavel(ValueError("x"))
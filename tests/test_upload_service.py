@@ -0,0 +1,92 @@
+"""
+Testes unitários para o envio único de documentos
+"""
+import pytest
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+from services.upload_service import (
+    DocumentoCompartilhado,
+    GeminiFileUploader
+)
+from utils.validators import ValidationError
+
+
+@pytest.fixture
+def service(gemini_service):
+    """GeminiService com modelo simulado e uploader local"""
+    return gemini_service
+
+
+class TestDocumentoCompartilhado:
+    """Testes para o documento reaproveitado entre prompts"""
+    
+    def test_um_envio_para_varios_prompts(self, service, modelo_gemini, mock_pdf_bytes):
+        """Testa que quatro prompts geram um único envio"""
+        documento = service.preparar_documento(BytesIO(mock_pdf_bytes), compartilhado=True)
+        
+        with documento:
+            for prompt in ["mestre", "locais", "coberturas", "clausulas"]:
+                assert service.processar_documento(documento, prompt) == {"ok": True}
+        
+        assert service.uploader.envios == 1
+        assert modelo_gemini.generate_content.call_count == 4
+    
+    def test_sem_envio_quando_tudo_esta_no_cache(self, service, mock_pdf_bytes):
+        """Testa que o upload não acontece se o cache atende o prompt"""
+        with service.preparar_documento(BytesIO(mock_pdf_bytes), compartilhado=True) as doc:
+            service.processar_documento(doc, "prompt")
+        
+        with service.preparar_documento(BytesIO(mock_pdf_bytes), compartilhado=True) as doc:
+            service.processar_documento(doc, "prompt")
+        
+        assert service.uploader.envios == 1
+    
+    def test_documento_nao_compartilhado_usa_inline(self, service, mock_pdf_bytes):
+        """Testa que documentos avulsos não passam pelo uploader configurado"""
+        service.processar_documento(BytesIO(mock_pdf_bytes), "prompt")
+        assert service.uploader.envios == 0
+    
+    def test_arquivo_invalido(self, service):
+        """Testa que a validação acontece ao preparar o documento"""
+        with pytest.raises(ValidationError):
+            service.preparar_documento(BytesIO(b"nao e pdf"), compartilhado=True)
+    
+    def test_liberar_remove_arquivo_remoto(self, mock_pdf_bytes):
+        """Testa que liberar remove o upload do servidor"""
+        uploader = MagicMock()
+        uploader.enviar.return_value = "arquivo-remoto"
+        documento = DocumentoCompartilhado(mock_pdf_bytes, uploader)
+        
+        documento.parte()
+        documento.liberar()
+        
+        uploader.remover.assert_called_once_with("arquivo-remoto")
+
+
+class TestGeminiFileUploader:
+    """Testes para o upload pela File API"""
+    
+    @patch("services.upload_service.genai")
+    def test_aguarda_processamento(self, mock_genai, mock_pdf_bytes):
+        """Testa espera até o arquivo ficar ativo"""
+        processando = MagicMock()
+        processando.state.name = "PROCESSING"
+        ativo = MagicMock()
+        ativo.state.name = "ACTIVE"
+        mock_genai.upload_file.return_value = processando
+        mock_genai.get_file.return_value = ativo
+        
+        uploader = GeminiFileUploader(intervalo_verificacao=0)
+        assert uploader.enviar(mock_pdf_bytes, "application/pdf", "apolice.pdf") is ativo
+        assert uploader.envios == 1
+    
+    @patch("services.upload_service.genai")
+    def test_falha_no_processamento(self, mock_genai, mock_pdf_bytes):
+        """Testa erro quando o servidor rejeita o arquivo"""
+        falhou = MagicMock()
+        falhou.state.name = "FAILED"
+        mock_genai.upload_file.return_value = falhou
+        
+        with pytest.raises(RuntimeError):
+            GeminiFileUploader().enviar(mock_pdf_bytes, "application/pdf", "apolice.pdf")
+        mock_genai.delete_file.assert_called_once()
@@ -2,9 +2,13 @@
 Testes unitários para funções de validação
 """
 import pytest
+from config.prompts import SCHEMAS_RESPOSTA, SCHEMA_MESTRE_APOLICE
+from services.gemini_local import PROMPTS_CONHECIDOS, gerar_resposta_sintetica
 from utils.validators import (
     validar_resposta_json,
+    validar_schema_resposta,
     validar_cnpj,
+    validar_digitos_cnpj,
     validar_data_formato,
     validar_arquivo_pdf,
     ValidationError
@@ -51,6 +55,45 @@ class TestValidarRespostaJson:
         assert validar_resposta_json(dados, []) is True
 
 
+class TestValidarSchemaResposta:
+    """Testes para validação da resposta contra o schema do prompt"""
+    
+    def test_respostas_sinteticas_seguem_schemas(self):
+        """Testa que cada schema aceita a resposta sintética do seu prompt"""
+        for prompt, schema in SCHEMAS_RESPOSTA.items():
+            assert validar_schema_resposta(gerar_resposta_sintetica(PROMPTS_CONHECIDOS[prompt]), schema)
+    
+    def test_campo_obrigatorio_ausente(self):
+        """Testa que um campo obrigatório ausente é apontado pelo caminho"""
+        resposta = gerar_resposta_sintetica("mestre")
+        del resposta["cnpj"]
+        
+        with pytest.raises(ValidationError, match=r"resposta\.cnpj: campo ausente"):
+            validar_schema_resposta(resposta, SCHEMA_MESTRE_APOLICE)
+    
+    def test_tipo_incorreto_em_item_de_lista(self):
+        """Testa que o tipo é conferido dentro dos itens das listas"""
+        resposta = gerar_resposta_sintetica("mestre")
+        resposta["cosseguro_completo"][1]["lider"] = "não"
+        
+        with pytest.raises(ValidationError, match=r"cosseguro_completo\[1\]\.lider: esperado boolean"):
+            validar_schema_resposta(resposta, SCHEMA_MESTRE_APOLICE)
+    
+    def test_campos_extras_e_nulos(self):
+        """Testa que campos extras são aceitos e nulos só quando nullable"""
+        schema = {
+            "type": "object",
+            "properties": {"a": {"type": "number"}, "b": {"type": "string", "nullable": True}},
+            "required": ["a"]
+        }
+        
+        assert validar_schema_resposta({"a": 1.5, "b": None, "extra": "x"}, schema)
+        with pytest.raises(ValidationError):
+            validar_schema_resposta({"a": None}, schema)
+        with pytest.raises(ValidationError):
+            validar_schema_resposta({"a": True}, schema)
+
+
 class TestValidarCnpj:
     """Testes para validação de CNPJ"""
     
@@ -78,6 +121,13 @@ class TestValidarCnpj:
     def test_cnpj_com_letras(self):
         """Testa CNPJ com letras (deve ignorar)"""
         assert validar_cnpj("12.345.678/0001-9A") is False
+    
+    def test_digitos_verificadores(self):
+        """Testa a conferência dos dígitos verificadores"""
+        assert validar_digitos_cnpj("11.222.333/0001-81") is True
+        assert validar_digitos_cnpj("11.222.333/0001-80") is False
+        assert validar_digitos_cnpj("11.111.111/1111-11") is False
+        assert validar_digitos_cnpj("12345678") is False
 
 
 class TestValidarDataFormato:
@@ -3,7 +3,8 @@ Componentes de interface do Streamlit
 """
 import streamlit as st
 import pandas as pd
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List
 
 
 def exibir_telas_json(final_json: Dict[str, Any]):
@@ -248,4 +249,47 @@ def _exibir_aba_especificacao(especificacao: Dict[str, Any]):
     if totais:
         st.table([totais])
     else:
-        st.info("Nenhum total calculado")
\ No newline at end of file
+        st.info("Nenhum total calculado")
+
+
+def exibir_metricas_chamadas(resumo: Dict[str, Dict[str, Any]]):
+    """
+    Exibe o resumo das métricas por prompt das chamadas ao Gemini
+    
+    Args:
+        resumo: Resultado de RegistroMetricas.resumo()
+    """
+    if not resumo:
+        st.info("Nenhuma chamada ao Gemini registrada.")
+        return
+    
+    df_metricas = pd.DataFrame.from_dict(resumo, orient="index")
+    df_metricas.index.name = "prompt"
+    st.dataframe(df_metricas, use_container_width=True)
+
+
+def exibir_jobs_recentes(jobs: List[Any]):
+    """
+    Exibe os jobs mais recentes da fila de extrações
+    
+    Args:
+        jobs: Resultado de FilaJobs.listar()
+    """
+    if not jobs:
+        st.info("Nenhum job na fila.")
+        return
+    
+    df_jobs = pd.DataFrame([
+        {
+            "job": job.id,
+            "solicitação": job.num_solic,
+            "estado": job.estado,
+            "status": job.status or "",
+            "tentativas": job.tentativas,
+            "duração (s)": job.duracao_s,
+            "criado em": datetime.fromtimestamp(job.criado_em).strftime("%d/%m/%Y %H:%M:%S"),
+            "erro": job.erro or ""
+        }
+        for job in jobs
+    ])
+    st.dataframe(df_jobs, use_container_width=True, hide_index=True)
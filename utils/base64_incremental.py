@@ -0,0 +1,75 @@
+"""
+Decodificação de base64 em partes para um buffer temporário
+"""
+import binascii
+import tempfile
+from typing import Union
+
+# Caracteres de quebra que podem aparecer no base64 gravado no banco
+_ESPACOS = b" \t\r\n"
+
+
+class AnexoTemporario(tempfile.SpooledTemporaryFile):
+    """
+    Arquivo temporário que fica em memória até max_size e depois vai para disco
+    
+    Guarda o nome original do anexo em name, como os BytesIO usados antes.
+    """
+    
+    def __init__(self, nome: str, max_size: int):
+        """
+        Inicializa o arquivo
+        
+        Args:
+            nome: Nome original do anexo
+            max_size: Bytes mantidos em memória antes de passar para disco
+        """
+        super().__init__(max_size=max_size)
+        self._nome = nome
+    
+    @property
+    def name(self) -> str:
+        return self._nome
+
+
+def decodificar_base64_em_partes(
+    conteudo: Union[str, bytes],
+    destino,
+    tamanho_parte: int = 1024 * 1024
+) -> int:
+    """
+    Decodifica base64 em partes, escrevendo direto no destino
+    
+    Evita as cópias inteiras do conteúdo (str convertida para bytes e bytes
+    decodificados): só uma parte de cada vez é convertida e decodificada.
+    Quebras de linha e espaços são ignorados, como em base64.b64decode.
+    
+    Args:
+        conteudo: Texto base64 (str ou bytes)
+        destino: Arquivo aberto para escrita binária
+        tamanho_parte: Caracteres base64 lidos por parte
+    
+    Returns:
+        Número de bytes escritos
+    
+    Raises:
+        binascii.Error: Se o base64 for inválido (ex.: padding incorreto)
+    """
+    visao = conteudo if isinstance(conteudo, str) else memoryview(conteudo)
+    resto = b""
+    escritos = 0
+    
+    for inicio in range(0, len(visao), tamanho_parte):
+        parte = visao[inicio:inicio + tamanho_parte]
+        parte = parte.encode("ascii") if isinstance(parte, str) else bytes(parte)
+        parte = resto + parte.translate(None, _ESPACOS)
+        
+        # Só decodifica grupos completos de 4 caracteres; o resto segue para a próxima parte
+        completo = len(parte) - len(parte) % 4
+        resto = parte[completo:]
+        if completo:
+            escritos += destino.write(binascii.a2b_base64(parte[:completo]))
+    
+    if resto:
+        escritos += destino.write(binascii.a2b_base64(resto))
+    return escritos
@@ -3,6 +3,7 @@ Funções de formatação de dados
 """
 import re
 import logging
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
@@ -67,4 +68,18 @@ def extrair_numero_limpo(texto: str) -> str:
     Returns:
         String com apenas números
     """
-    return re.sub(r'[^\d]', '', str(texto))
\ No newline at end of file
+    return re.sub(r'[^\d]', '', str(texto))
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza um texto para busca por palavras-chave
+    
+    Args:
+        texto: Texto original
+        
+    Returns:
+        Texto sem acentos, em minúsculas e com espaços compactados
+    """
+    sem_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", sem_acentos.lower())
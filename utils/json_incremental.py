@@ -0,0 +1,197 @@
+"""
+Parser incremental para extrair itens de listas JSON recebidas em partes
+"""
+import json
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExtratorItensJson:
+    """
+    Extrai os objetos de uma lista JSON à medida que o texto chega
+    
+    Acompanha apenas a lista indicada por chave_lista no objeto raiz (ex.:
+    "locais_risco"). Cada objeto dessa lista é decodificado assim que seu
+    fechamento é recebido, sem esperar o restante da resposta. Texto antes
+    do primeiro "{" (como cercas de markdown) é ignorado.
+    """
+    
+    def __init__(self, chave_lista: str):
+        """
+        Inicializa o extrator
+        
+        Args:
+            chave_lista: Chave da lista de objetos no objeto raiz
+        """
+        self.chave_lista = chave_lista
+        self.itens: List[Dict[str, Any]] = []
+        
+        self._buffer = ""
+        self._posicao = 0
+        self._pilha: List[str] = []
+        self._em_string = False
+        self._escape = False
+        self._inicio_string = 0
+        self._ultima_string: Optional[str] = None
+        self._chave_atual: Optional[str] = None
+        self._profundidade_lista: Optional[int] = None
+        self._inicio_item: Optional[int] = None
+        self._iniciado = False
+        self.concluido = False
+    
+    def alimentar(self, texto: str) -> List[Dict[str, Any]]:
+        """
+        Processa mais um trecho da resposta
+        
+        Args:
+            texto: Trecho recebido
+            
+        Returns:
+            Itens da lista concluídos neste trecho
+        """
+        self._buffer += texto
+        novos = []
+        buffer = self._buffer
+        
+        for i in range(self._posicao, len(buffer)):
+            c = buffer[i]
+            
+            if not self._iniciado:
+                if c != "{":
+                    continue
+                self._iniciado = True
+            
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+                    self._ultima_string = buffer[self._inicio_string + 1:i]
+                continue
+            
+            if c == '"':
+                self._em_string = True
+                self._inicio_string = i
+            elif c == ":":
+                self._chave_atual = self._ultima_string
+            elif c == ",":
+                self._chave_atual = None
+            elif c in "{[":
+                if (c == "[" and self._pilha == ["{"]
+                        and self._chave_atual == self.chave_lista):
+                    self._profundidade_lista = 2
+                elif c == "{" and len(self._pilha) == self._profundidade_lista:
+                    self._inicio_item = i
+                self._pilha.append(c)
+                self._chave_atual = None
+            elif c in "}]":
+                if not self._pilha:
+                    continue
+                self._pilha.pop()
+                profundidade = len(self._pilha)
+                
+                if (c == "}" and self._inicio_item is not None
+                        and profundidade == self._profundidade_lista):
+                    item = self._decodificar(buffer[self._inicio_item:i + 1])
+                    if item is not None:
+                        self.itens.append(item)
+                        novos.append(item)
+                    self._inicio_item = None
+                elif c == "]" and profundidade == 1 and self._profundidade_lista:
+                    self._profundidade_lista = None
+                elif profundidade == 0:
+                    self.concluido = True
+        
+        self._posicao = len(buffer)
+        return novos
+    
+    def _decodificar(self, trecho: str) -> Optional[Dict[str, Any]]:
+        """Decodifica um item completo, ignorando trechos malformados"""
+        try:
+            return json.loads(trecho)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Item de {self.chave_lista} malformado ignorado: {e}")
+            return None
+    
+    @property
+    def texto(self) -> str:
+        """Texto completo recebido até o momento"""
+        return self._buffer
+
+
+class ColetorItens:
+    """
+    Acumula os itens recebidos ao longo de uma ou mais tentativas de streaming
+    
+    Cada tentativa usa um ExtratorItensJson próprio; itens já repassados por
+    uma tentativa anterior não são repassados de novo quando uma nova
+    tentativa recomeça a lista do início. Depois de continuar(), as tentativas
+    seguintes trazem os itens a partir do último recebido (continuação de
+    uma lista truncada).
+    """
+    
+    def __init__(self, chave_lista: str, ao_receber_item: Callable = None):
+        """
+        Inicializa o coletor
+        
+        Args:
+            chave_lista: Chave da lista acompanhada (ex.: "coberturas_completas")
+            ao_receber_item: Função chamada com cada novo item (opcional)
+        """
+        self.chave_lista = chave_lista
+        self.ao_receber_item = ao_receber_item
+        self.itens: List[Dict[str, Any]] = []
+        self._inicio = 0
+        self._lock = threading.Lock()
+    
+    def novo_extrator(self) -> ExtratorItensJson:
+        """Cria o extrator de uma nova tentativa"""
+        return ExtratorItensJson(self.chave_lista)
+    
+    def continuar(self):
+        """Numera os itens das próximas tentativas após os já recebidos"""
+        with self._lock:
+            self._inicio = len(self.itens)
+    
+    def alimentar(self, extrator: ExtratorItensJson, texto: str):
+        """
+        Alimenta o extrator da tentativa e repassa os itens inéditos
+        
+        Args:
+            extrator: Extrator da tentativa em andamento
+            texto: Trecho recebido
+        """
+        novos = extrator.alimentar(texto)
+        primeiro_indice = self._inicio + len(extrator.itens) - len(novos)
+        # Continuação que recomeça pelo último item já recebido: o item
+        # repetido cai num índice já registrado e não é repassado de novo
+        if self._inicio and extrator.itens and extrator.itens[0] == self.itens[self._inicio - 1]:
+            primeiro_indice -= 1
+        
+        for deslocamento, item in enumerate(novos):
+            self._registrar(primeiro_indice + deslocamento, item)
+    
+    def repetir(self, itens: List[Dict[str, Any]]):
+        """
+        Repassa itens já conhecidos (ex.: resultado vindo do cache)
+        
+        Args:
+            itens: Lista completa de itens
+        """
+        for indice, item in enumerate(itens):
+            self._registrar(indice, item)
+    
+    def _registrar(self, indice: int, item: Dict[str, Any]):
+        """Guarda o item e chama o callback se ele ainda não foi repassado"""
+        with self._lock:
+            if indice < len(self.itens):
+                return
+            self.itens.append(item)
+        
+        if self.ao_receber_item:
+            self.ao_receber_item(item)
@@ -0,0 +1,34 @@
+"""
+Decodificação de JSON pelo orjson quando disponível, com retorno ao json padrão
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    ORJSON_DISPONIVEL = True
+except ImportError:
+    ORJSON_DISPONIVEL = False
+
+
+def carregar_json(texto: Union[str, bytes]) -> Any:
+    """
+    Decodifica um documento JSON
+    
+    O orjson decodifica respostas grandes (listas de locais e coberturas)
+    várias vezes mais rápido que o json padrão; sem ele instalado, o
+    resultado é o mesmo pelo json.loads.
+    
+    Args:
+        texto: Documento JSON (texto ou bytes UTF-8)
+    
+    Returns:
+        Objeto decodificado
+    
+    Raises:
+        json.JSONDecodeError: Se o documento for inválido (orjson.JSONDecodeError
+            é subclasse dela)
+    """
+    if ORJSON_DISPONIVEL:
+        return orjson.loads(texto)
+    return json.loads(texto)
@@ -0,0 +1,174 @@
+"""
+Funções auxiliares para inspeção de arquivos PDF
+"""
+import logging
+import re
+from io import BytesIO
+from typing import List, Optional
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_DISPONIVEL = True
+except ImportError:
+    PYPDF_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+# Objetos de página ("/Type /Page"), sem contar o nó raiz "/Type /Pages"
+_PADRAO_PAGINA = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def contar_paginas_pdf(file_bytes: bytes) -> int:
+    """
+    Estima o número de páginas de um PDF sem decodificá-lo
+    
+    PDFs com object streams comprimidos podem esconder os objetos de
+    página; nesse caso o retorno mínimo é 1.
+    
+    Args:
+        file_bytes: Bytes do PDF
+    
+    Returns:
+        Número estimado de páginas (mínimo 1)
+    """
+    return max(len(_PADRAO_PAGINA.findall(file_bytes)), 1)
+
+
+def possui_camada_texto(
+    textos: List[str],
+    caracteres_minimos: int = 50,
+    fracao_minima: float = 0.9
+) -> bool:
+    """
+    Indica se praticamente todas as páginas têm camada de texto
+    
+    PDFs escaneados (ou com páginas escaneadas) não permitem concluir nada
+    pela ausência de um termo no texto.
+    
+    Args:
+        textos: Texto de cada página
+        caracteres_minimos: Caracteres mínimos para a página contar como texto
+        fracao_minima: Fração mínima de páginas com texto
+    
+    Returns:
+        True se a camada de texto cobre o documento
+    """
+    if not textos:
+        return False
+    com_texto = sum(1 for texto in textos if len(texto.strip()) >= caracteres_minimos)
+    return com_texto >= fracao_minima * len(textos)
+
+
+def extrair_textos_paginas(file_bytes: bytes) -> Optional[List[str]]:
+    """
+    Extrai a camada de texto de cada página do PDF
+    
+    Args:
+        file_bytes: Bytes do PDF
+    
+    Returns:
+        Lista com o texto de cada página, ou None se o pypdf não estiver
+        instalado ou o PDF não puder ser lido
+    """
+    if not PYPDF_DISPONIVEL:
+        logger.info("pypdf não instalado: camada de texto indisponível")
+        return None
+    
+    try:
+        leitor = PdfReader(BytesIO(file_bytes))
+        return [pagina.extract_text() or "" for pagina in leitor.pages]
+    except Exception as e:
+        logger.warning(f"Falha ao extrair texto do PDF: {e}")
+        return None
+
+
+def gerar_sub_pdf(file_bytes: bytes, paginas: List[int]) -> bytes:
+    """
+    Monta um novo PDF apenas com as páginas indicadas
+    
+    Args:
+        file_bytes: Bytes do PDF original
+        paginas: Índices das páginas (base 0) na ordem desejada
+    
+    Returns:
+        Bytes do novo PDF
+    
+    Raises:
+        RuntimeError: Se o pypdf não estiver instalado
+    """
+    if not PYPDF_DISPONIVEL:
+        raise RuntimeError("pypdf não instalado")
+    
+    leitor = PdfReader(BytesIO(file_bytes))
+    escritor = PdfWriter()
+    for indice in paginas:
+        escritor.add_page(leitor.pages[indice])
+    
+    saida = BytesIO()
+    escritor.write(saida)
+    return saida.getvalue()
+
+
+def gerar_pdf_texto(textos: List[str]) -> bytes:
+    """
+    Monta um PDF simples com uma página de texto por item
+    
+    Usado por testes e benchmarks para gerar documentos sintéticos com
+    camada de texto, sem depender do pypdf.
+    
+    Args:
+        textos: Texto de cada página (uma linha, caracteres latin-1)
+    
+    Returns:
+        Bytes do PDF
+    """
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    paginas = []
+    for texto in textos:
+        conteudo = f"BT /F1 10 Tf 20 800 Td ({texto}) Tj ET".encode("latin-1")
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(conteudo), conteudo))
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objetos)
+        )
+        paginas.append(len(objetos))
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % n for n in paginas), len(paginas)
+    )
+    
+    saida = b"%PDF-1.4\n"
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF" % (len(objetos) + 1, xref)
+    return saida
+
+
+def dividir_em_faixas(paginas: List[int], tamanho: int, sobreposicao: int = 0) -> List[List[int]]:
+    """
+    Divide uma sequência de páginas em faixas consecutivas
+    
+    Args:
+        paginas: Índices das páginas, na ordem do documento
+        tamanho: Páginas por faixa
+        sobreposicao: Páginas repetidas no início de cada faixa, vindas do
+            fim da anterior
+    
+    Returns:
+        Lista de faixas; uma única faixa se a sequência couber inteira
+    """
+    passo = max(tamanho - sobreposicao, 1)
+    faixas = []
+    for inicio in range(0, len(paginas), passo):
+        faixas.append(paginas[inicio:inicio + tamanho])
+        if inicio + tamanho >= len(paginas):
+            break
+    return faixas
@@ -0,0 +1,227 @@
+"""
+Retry com backoff exponencial e jitter e disjuntor de circuito
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class OperacaoCancelada(Exception):
+    """Exceção lançada quando uma operação é cancelada antes de concluir"""
+    pass
+
+
+class CircuitoAberto(Exception):
+    """Exceção lançada quando o disjuntor recusa a chamada sem tentá-la"""
+    pass
+
+
+@dataclass
+class PoliticaRetry:
+    """Parâmetros de retry com backoff exponencial e jitter completo"""
+    tentativas: int = 3
+    espera_inicial: float = 1.0
+    espera_maxima: float = 30.0
+    multiplicador: float = 2.0
+    
+    def calcular_espera(self, tentativa: int) -> float:
+        """
+        Calcula a espera antes da próxima tentativa (full jitter)
+        
+        Args:
+            tentativa: Índice da tentativa que falhou (começando em 0)
+            
+        Returns:
+            Segundos de espera, sorteados entre 0 e o teto exponencial
+        """
+        teto = min(self.espera_maxima, self.espera_inicial * self.multiplicador ** tentativa)
+        return random.uniform(0, teto)
+
+
+def executar_com_retry(
+    funcao: Callable[[], Any],
+    politica: PoliticaRetry,
+    eh_retentavel: Callable[[Exception], bool],
+    cancelamento: threading.Event = None,
+    descricao: str = "operação",
+    prazo: float = None,
+    disjuntor: "DisjuntorCircuito" = None
+) -> Any:
+    """
+    Executa uma função repetindo-a em erros retentáveis
+    
+    Args:
+        funcao: Função sem argumentos a executar
+        politica: Política de retry
+        eh_retentavel: Classifica se um erro justifica nova tentativa
+        cancelamento: Evento que interrompe as novas tentativas (opcional)
+        descricao: Descrição usada nos logs
+        prazo: Segundos totais; nenhuma espera termina depois dele (opcional)
+        disjuntor: Disjuntor consultado antes de cada tentativa (opcional)
+        
+    Returns:
+        Resultado da função
+        
+    Raises:
+        OperacaoCancelada: Se o cancelamento for sinalizado entre tentativas
+        CircuitoAberto: Se o disjuntor estiver aberto
+        Exception: O último erro, se não for retentável, se as tentativas
+            acabarem ou se a próxima espera passar do prazo
+    """
+    limite = None if prazo is None else time.monotonic() + prazo
+    
+    for tentativa in range(politica.tentativas):
+        if cancelamento is not None and cancelamento.is_set():
+            raise OperacaoCancelada(f"{descricao} cancelada")
+        if disjuntor is not None:
+            disjuntor.verificar()
+        
+        try:
+            resultado = funcao()
+        except Exception as e:
+            retentavel = eh_retentavel(e)
+            if disjuntor is not None:
+                # Erros fatais (ex.: SQL inválido) não dizem nada sobre a disponibilidade
+                if retentavel:
+                    disjuntor.registrar_falha()
+                else:
+                    disjuntor.liberar()
+            if not retentavel or tentativa == politica.tentativas - 1:
+                raise
+            
+            espera = politica.calcular_espera(tentativa)
+            if limite is not None and time.monotonic() + espera > limite:
+                logger.warning(f"Prazo de {descricao} esgotado após {tentativa + 1} tentativas: {e}")
+                raise
+            logger.warning(
+                f"Tentativa {tentativa + 1}/{politica.tentativas} de {descricao} falhou: {e}. "
+                f"Nova tentativa em {espera:.1f}s"
+            )
+            
+            if cancelamento is not None:
+                if cancelamento.wait(espera):
+                    raise OperacaoCancelada(f"{descricao} cancelada")
+            else:
+                time.sleep(espera)
+        else:
+            if disjuntor is not None:
+                disjuntor.registrar_sucesso()
+            return resultado
+
+
+class DisjuntorCircuito:
+    """
+    Disjuntor que falha na hora enquanto um serviço está fora do ar
+    
+    Depois de limite_falhas falhas seguidas o circuito abre e as chamadas
+    são recusadas com CircuitoAberto. Passado tempo_recuperacao, uma única
+    chamada de sondagem é liberada (meio aberto): se der certo o circuito
+    fecha; se falhar, abre de novo por mais tempo_recuperacao.
+    """
+    
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+    
+    def __init__(self, nome: str, limite_falhas: int = 5, tempo_recuperacao: float = 30.0):
+        """
+        Inicializa o disjuntor
+        
+        Args:
+            nome: Nome do serviço protegido, usado nas mensagens
+            limite_falhas: Falhas seguidas que abrem o circuito
+            tempo_recuperacao: Segundos aberto antes da sondagem
+        """
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_recuperacao = tempo_recuperacao
+        
+        self._falhas = 0
+        self._aberto_em = None
+        self._sondando = False
+        self._lock = threading.Lock()
+        
+        self._aberturas = 0
+        self._recusadas = 0
+    
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado()
+    
+    def _estado(self) -> str:
+        """Estado atual (chamado com o lock)"""
+        if self._aberto_em is None:
+            return self.FECHADO
+        if time.monotonic() - self._aberto_em < self.tempo_recuperacao:
+            return self.ABERTO
+        return self.MEIO_ABERTO
+    
+    def verificar(self):
+        """
+        Autoriza uma chamada; no estado meio aberto, só a de sondagem
+        
+        Raises:
+            CircuitoAberto: Se o circuito estiver aberto ou já houver sondagem em andamento
+        """
+        with self._lock:
+            estado = self._estado()
+            if estado == self.FECHADO:
+                return
+            if estado == self.MEIO_ABERTO and not self._sondando:
+                self._sondando = True
+                return
+            
+            self._recusadas += 1
+            restante = max(self.tempo_recuperacao - (time.monotonic() - self._aberto_em), 0)
+        raise CircuitoAberto(
+            f"{self.nome} indisponível após {self.limite_falhas} falhas seguidas; "
+            f"nova tentativa em {restante:.0f}s"
+        )
+    
+    def registrar_sucesso(self):
+        """Zera as falhas e fecha o circuito"""
+        with self._lock:
+            if self._aberto_em is not None:
+                logger.info(f"Circuito de {self.nome} fechado")
+            self._falhas = 0
+            self._aberto_em = None
+            self._sondando = False
+    
+    def registrar_falha(self):
+        """Conta uma falha e abre o circuito no limite ou se a sondagem falhou"""
+        with self._lock:
+            self._falhas += 1
+            if self._sondando or (self._aberto_em is None and self._falhas >= self.limite_falhas):
+                self._aberto_em = time.monotonic()
+                self._sondando = False
+                self._aberturas += 1
+                logger.warning(
+                    f"Circuito de {self.nome} aberto após {self._falhas} falhas seguidas; "
+                    f"chamadas recusadas por {self.tempo_recuperacao:.0f}s"
+                )
+    
+    def liberar(self):
+        """Encerra a chamada sem contá-la como sucesso nem falha"""
+        with self._lock:
+            self._sondando = False
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna o estado e os contadores do disjuntor
+        
+        Returns:
+            Dicionário com estado, falhas seguidas, aberturas e chamadas recusadas
+        """
+        with self._lock:
+            return {
+                "estado": self._estado(),
+                "falhas_seguidas": self._falhas,
+                "aberturas": self._aberturas,
+                "recusadas": self._recusadas
+            }
@@ -47,6 +47,77 @@ def validar_resposta_json(
     return True
 
 
+# Tipos Python aceitos para cada tipo de schema (subconjunto OpenAPI usado pelo Gemini)
+_TIPOS_SCHEMA = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float)
+}
+
+
+def _problemas_schema(valor: Any, schema: Dict[str, Any], caminho: str) -> List[str]:
+    """Percorre valor e schema juntos acumulando as divergências"""
+    if valor is None:
+        return [] if schema.get("nullable") else [f"{caminho}: valor nulo"]
+    
+    tipo = schema.get("type", "").lower()
+    esperado = _TIPOS_SCHEMA.get(tipo)
+    # bool é subclasse de int, mas não vale como número
+    numero_booleano = tipo in ("integer", "number") and isinstance(valor, bool)
+    if esperado and (not isinstance(valor, esperado) or numero_booleano):
+        return [f"{caminho}: esperado {tipo}, recebido {type(valor).__name__}"]
+    
+    problemas = []
+    if tipo == "object":
+        for campo in schema.get("required", []):
+            if campo not in valor:
+                problemas.append(f"{caminho}.{campo}: campo ausente")
+        for campo, subschema in schema.get("properties", {}).items():
+            if campo in valor:
+                problemas.extend(_problemas_schema(valor[campo], subschema, f"{caminho}.{campo}"))
+    elif tipo == "array" and "items" in schema:
+        for indice, item in enumerate(valor):
+            problemas.extend(_problemas_schema(item, schema["items"], f"{caminho}[{indice}]"))
+    elif "enum" in schema and valor not in schema["enum"]:
+        problemas.append(f"{caminho}: valor fora de {schema['enum']}")
+    return problemas
+
+
+def validar_schema_resposta(
+    json_data: Any,
+    schema: Dict[str, Any],
+    nome_secao: str = "resposta"
+) -> bool:
+    """
+    Valida a resposta do modelo contra o schema do prompt
+    
+    Confere tipos, campos obrigatórios (required) e enums; campos extras
+    são aceitos.
+    
+    Args:
+        json_data: JSON decodificado da resposta
+        schema: Schema no formato de config/prompts.py
+        nome_secao: Nome usado como raiz dos caminhos nas mensagens
+    
+    Returns:
+        True se válido
+    
+    Raises:
+        ValidationError: Com todas as divergências encontradas
+    """
+    problemas = _problemas_schema(json_data, schema, nome_secao)
+    if problemas:
+        # Limita a mensagem em listas longas com o mesmo problema repetido
+        resumo = "; ".join(problemas[:5])
+        if len(problemas) > 5:
+            resumo += f" (+{len(problemas) - 5})"
+        raise ValidationError(f"Resposta fora do schema: {resumo}")
+    return True
+
+
 def validar_cnpj(cnpj: str) -> bool:
     """
     Valida formato básico de CNPJ (não valida dígitos verificadores)
@@ -67,6 +138,33 @@ def validar_cnpj(cnpj: str) -> bool:
     return len(numeros) == 14
 
 
+def validar_digitos_cnpj(cnpj: str) -> bool:
+    """
+    Valida os dígitos verificadores de um CNPJ
+    
+    Args:
+        cnpj: String contendo o CNPJ
+        
+    Returns:
+        True se o CNPJ tem 14 dígitos e os verificadores conferem
+    """
+    if not validar_cnpj(cnpj):
+        return False
+    
+    numeros = [int(d) for d in filter(str.isdigit, cnpj)]
+    if len(set(numeros)) == 1:
+        return False
+    
+    for posicao in (12, 13):
+        pesos = list(range(posicao - 7, 1, -1)) + list(range(9, 1, -1))
+        soma = sum(n * p for n, p in zip(numeros[:posicao], pesos))
+        digito = 11 - soma % 11
+        if numeros[posicao] != (digito if digito < 10 else 0):
+            return False
+    
+    return True
+
+
 def validar_data_formato(data: str) -> bool:
     """
     Valida se a data está em um formato reconhecível
@@ -0,0 +1,77 @@
+"""
+Worker da fila de extrações - Extrator de Apólices V20
+
+Executa os jobs enfileirados pela interface fora do processo do Streamlit
+(use com JOB_EMBEDDED_WORKERS=false). Vários workers, no mesmo servidor,
+podem consumir a mesma fila. Ctrl+C ou SIGTERM para de retirar jobs e
+aguarda os que estão em andamento; jobs de um worker encerrado à força
+voltam para a fila após JOB_HEARTBEAT_TIMEOUT segundos.
+
+Uso:
+    python worker.py --workers 4
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+from typing import List
+from config.settings import job_queue_config, validate_config
+from services.attachment_sources import criar_fonte_anexos
+from services.job_queue import FilaJobs, PoolWorkers
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Ponto de entrada da linha de comando
+    
+    Args:
+        argv: Argumentos (opcional, usa sys.argv)
+    
+    Returns:
+        Código de saída: 0, ou 2 se a configuração for inválida
+    """
+    parser = argparse.ArgumentParser(description="Executa os jobs da fila de extrações")
+    parser.add_argument("--workers", type=int, default=job_queue_config.WORKERS, help="Jobs simultâneos")
+    parser.add_argument("--fila", default=job_queue_config.PATH, help="Base SQLite da fila")
+    parser.add_argument("--fonte", choices=["odbc", "diretorio", "sqlite"], default=None,
+                        help="Origem dos anexos (padrão: ATTACHMENT_SOURCE)")
+    parser.add_argument("--fonte-caminho", default=None, help="String de conexão, diretório ou arquivo SQLite da fonte")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    
+    try:
+        validate_config(args.fonte)
+        fonte = criar_fonte_anexos(args.fonte, args.fonte_caminho)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro de configuração: {e}", file=sys.stderr)
+        return 2
+    
+    pool = PoolWorkers(FilaJobs(args.fila), fonte=fonte, workers=args.workers)
+    
+    # Ctrl+C ou SIGTERM: termina os jobs em andamento e sai
+    parar = threading.Event()
+    tratadores_anteriores = {
+        sinal: signal.signal(sinal, lambda *_: parar.set())
+        for sinal in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        pool.iniciar()
+        while not parar.wait(1.0):
+            pass
+        print("Encerrando: aguardando os jobs em andamento...", file=sys.stderr)
+        pool.parar()
+    finally:
+        for sinal, tratador in tratadores_anteriores.items():
+            signal.signal(sinal, tratador)
+    
+    print(f"Estatísticas: {pool.estatisticas()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())